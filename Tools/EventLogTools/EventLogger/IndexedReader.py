@@ -0,0 +1,223 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+from array import array
+from collections import namedtuple
+import mmap
+import os
+
+import numpy
+
+from EventLogger.Reader import Reader
+from EventLogger.Utils import EventBoundary, EventHeader, LogHeader, Prolog, PrologId
+
+# Thread id of the events logged before the first prolog
+NoThreadId = 0xFFFFFFFFFFFFFFFF
+
+# Number of events indexed at a time when iterating lazily
+IndexChunkSize = 1 << 20
+
+EventHeaderType = numpy.dtype([('event_id', '=u4'), ('size', '=u2'), ('flags', '=u2')])
+EventIndexType = numpy.dtype([('offset', '=u8'), ('event_id', '=u4'), ('size', '=u2'), ('flags', '=u2'), ('thread_id', '=u8')])
+
+# An entry of the index, converted to Python values
+Event = namedtuple('Event', EventIndexType.names)
+
+
+def _event_id_values(event_ids):
+    return numpy.array([int(getattr(event_id, 'hash', event_id)) for event_id in event_ids], dtype=numpy.uint32)
+
+
+class IndexedReader(object):
+    """
+    Reads an event log by memory mapping it and indexing its events in a NumPy structured array of
+    (offset, event_id, size, flags, thread_id), instead of unpacking the events one at a time like Reader.
+    Event payloads are memoryviews of the mapped file, they must be released before the reader is closed.
+    """
+
+    def __init__(self):
+        self.log_header = LogHeader()
+
+        self._file = None
+        self._mmap = None
+        self._file_size = 0
+        self._sizes = None
+        self._view = None
+        self._headers = None
+        self._words = None
+        self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_log_file(self, file_path):
+        self.close()
+        self._file_size = os.path.getsize(file_path)
+        if self._file_size < LogHeader.size():
+            return Reader.ReadStatus_InsufficientFileSize
+
+        self._file = open(file_path, mode='rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.log_header.unpack(self._mmap[:LogHeader.size()])
+        if self.log_header.get_format() not in LogHeader.accepted_formats():
+            return Reader.ReadStatus_InvalidFormat
+
+        # Events start on EventBoundary, so their headers and the thread ids of the prologs are aligned slots of the file
+        slot_count = self._file_size // EventBoundary
+        self._headers = numpy.frombuffer(self._mmap, dtype=EventHeaderType, count=slot_count)
+        self._words = numpy.frombuffer(self._mmap, dtype=numpy.uint64, count=slot_count)
+        self._sizes = memoryview(self._mmap)[:self._file_size & ~1].cast('H')
+        self._view = memoryview(self._mmap)
+
+        if LogHeader.size() + EventHeader.size() > self._file_size:
+            return Reader.ReadStatus_NoEvents
+        return Reader.ReadStatus_Success
+
+    def close(self):
+        self._index = None
+        self._headers = None
+        self._words = None
+        for view in (self._sizes, self._view):
+            if view is not None:
+                view.release()
+        self._sizes = None
+        self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_log_header(self):
+        return self.log_header
+
+    def iter_index_chunks(self, chunk_size=IndexChunkSize):
+        """Indexes the events lazily, yielding the index of up to chunk_size events at a time"""
+        if self._index is not None:
+            for start in range(0, len(self._index), chunk_size):
+                yield self._index[start:start + chunk_size]
+            return
+        if self._mmap is None:
+            return
+
+        position = LogHeader.size()
+        thread_id = NoThreadId
+        while True:
+            offsets, position = self._find_event_offsets(position, chunk_size)
+            if not offsets:
+                return
+            chunk, thread_id = self._build_index_chunk(numpy.frombuffer(offsets, dtype=numpy.int64), thread_id)
+            yield chunk
+
+    def _find_event_offsets(self, position, max_count):
+        # The offset of an event depends on the size of the previous one, so this is the only sequential pass
+        offsets = array('q')
+        append = offsets.append
+        sizes = self._sizes
+        last_position = self._file_size - EventHeader.size()
+        for _ in range(max_count):
+            if position > last_position:
+                break
+            append(position)
+            position += (EventHeader.size() + sizes[(position >> 1) + 2] + EventBoundary - 1) & ~(EventBoundary - 1)
+        return offsets, position
+
+    def _build_index_chunk(self, offsets, thread_id):
+        slots = offsets // EventBoundary
+        headers = self._headers[slots]
+        chunk = numpy.empty(len(offsets), dtype=EventIndexType)
+        chunk['offset'] = offsets
+        chunk['event_id'] = headers['event_id']
+        chunk['size'] = headers['size']
+        chunk['flags'] = headers['flags']
+
+        # Each event belongs to the thread of the last prolog before it
+        prolog_positions = numpy.flatnonzero((headers['event_id'] == PrologId.hash) & (offsets + Prolog.size() <= self._file_size))
+        last_prolog = numpy.full(len(offsets), -1, dtype=numpy.int64)
+        last_prolog[prolog_positions] = prolog_positions
+        numpy.maximum.accumulate(last_prolog, out=last_prolog)
+        thread_ids = numpy.full(len(offsets), thread_id, dtype=numpy.uint64)
+        thread_ids[prolog_positions] = self._words[slots[prolog_positions] + 1]
+        chunk['thread_id'] = numpy.where(last_prolog >= 0, thread_ids[numpy.maximum(last_prolog, 0)], thread_id)
+        return chunk, int(chunk['thread_id'][-1])
+
+    @property
+    def index(self):
+        """The index of all the events, built on first use"""
+        if self._index is None:
+            chunks = list(self.iter_index_chunks())
+            self._index = numpy.concatenate(chunks) if chunks else numpy.empty(0, dtype=EventIndexType)
+        return self._index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, event_index):
+        return self.index[event_index]
+
+    def get_event_data(self, event):
+        """Returns the payload of an entry of the index or Event, as a memoryview of the mapped file"""
+        start = int(event[0]) + EventHeader.size()
+        return self._view[start:min(start + int(event[2]), self._file_size)]
+
+    def get_event_string(self, event):
+        with self.get_event_data(event) as data:
+            return str(data, 'utf-8')
+
+    @staticmethod
+    def filter_index(index, event_ids=None, thread_ids=None):
+        """Returns the events of an index with one of the event ids (EventNameHash or int) and thread ids"""
+        mask = numpy.ones(len(index), dtype=bool)
+        if event_ids is not None:
+            mask &= numpy.isin(index['event_id'], _event_id_values(event_ids))
+        if thread_ids is not None:
+            mask &= numpy.isin(index['thread_id'], numpy.array(list(thread_ids), dtype=numpy.uint64))
+        return index[mask]
+
+    def find(self, pattern, start=0, end=None):
+        """Returns the offsets of the occurrences of a bytes pattern in the file between the start and end offsets"""
+        offsets = array('q')
+        if self._mmap is not None and pattern:
+            end = self._file_size if end is None else min(end, self._file_size)
+            find = self._mmap.find
+            position = find(pattern, start, end)
+            while position >= 0:
+                offsets.append(position)
+                position = find(pattern, position + 1, end)
+        return numpy.array(offsets, dtype=numpy.uint64)
+
+    @staticmethod
+    def match_payloads(index, offsets, length):
+        """Returns the sorted positions in an index of the events whose payload contains a span of length bytes
+        starting at one of the offsets"""
+        offsets = numpy.asarray(offsets, dtype=numpy.uint64)
+        positions = numpy.searchsorted(index['offset'], offsets, side='right') - 1
+        found = positions >= 0
+        positions = positions[found]
+        offsets = offsets[found]
+        starts = index['offset'][positions] + EventHeader.size()
+        found = (offsets >= starts) & (offsets + length <= starts + index['size'][positions])
+        return numpy.unique(positions[found])
+
+    def select(self, event_ids=None, thread_ids=None):
+        """Returns the index of the events with one of the event ids and thread ids"""
+        return IndexedReader.filter_index(self.index, event_ids, thread_ids)
+
+    def iter_events(self, event_ids=None, thread_ids=None, chunk_size=IndexChunkSize):
+        """Lazily yields the (Event, payload) of the events with one of the event ids and thread ids,
+        without indexing the whole file first"""
+        view = self._view
+        file_size = self._file_size
+        for chunk in self.iter_index_chunks(chunk_size):
+            for event in IndexedReader.filter_index(chunk, event_ids, thread_ids).tolist():
+                start = event[0] + EventHeader.size()
+                yield Event._make(event), view[start:min(start + event[2], file_size)]
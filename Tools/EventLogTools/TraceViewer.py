@@ -1,19 +1,25 @@
 #
 # Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
-# 
+#
 # SPDX-License-Identifier: Apache-2.0 OR MIT
 #
 #
 
+from EventLogger.IndexedReader import EventIndexType, IndexedReader, NoThreadId
 from EventLogger.Reader import Reader
-from EventLogger.Utils import EventNameHash, PrologId
+from EventLogger.Utils import EventHeader, EventNameHash, PrologId
 
 from tkinter import filedialog
+from tkinter import font
 from tkinter import ttk
 from tkinter import *
 
+import numpy
+import os
+import queue
+import threading
+import time
 import tkinter
-import struct
 
 AssertId = EventNameHash("Assert")
 ErrorId = EventNameHash("Error")
@@ -21,49 +27,311 @@ MessageId = EventNameHash("Message")
 PrintfId = EventNameHash("Printf")
 WarningId = EventNameHash("Warning")
 
+TaggedMessages = { AssertId.hash : 'Assert', ErrorId.hash : 'Error', WarningId.hash : 'Warning' }
+TextMessageIds = numpy.array([AssertId.hash, ErrorId.hash, WarningId.hash, PrintfId.hash, MessageId.hash], dtype=numpy.uint32)
+
+# Number of events indexed by the loading thread between two progress updates
+LoadChunkSize = 1 << 16
+
+# Milliseconds between two checks of the events indexed by the loading thread
+LoadPollInterval = 50
+
+
+class EventArray(object):
+    """Index entries with amortized appends, so a view can grow while its file is loading"""
+
+    def __init__(self, events=None):
+        self._data = numpy.empty(1024, dtype=EventIndexType)
+        self._size = 0
+        if events is not None:
+            self.extend(events)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def values(self):
+        return self._data[:self._size]
+
+    def extend(self, events):
+        size = self._size + len(events)
+        if size > len(self._data):
+            data = numpy.empty(max(size, 2 * len(self._data)), dtype=EventIndexType)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size:size] = events
+        self._size = size
+
+
+def split_by_thread(events):
+    """Returns the (thread id, events) of each thread of an index chunk, in order of first appearance"""
+    order = numpy.argsort(events['thread_id'], kind='stable')
+    thread_ids = events['thread_id'][order]
+    starts = numpy.flatnonzero(numpy.r_[True, thread_ids[1:] != thread_ids[:-1]])
+    ends = numpy.r_[starts[1:], len(order)]
+    groups = sorted(zip(starts, ends), key=lambda group: order[group[0]])
+    return [(int(thread_ids[start]), events[order[start:end]]) for start, end in groups]
+
+
+def clamp_top_row(row, row_count, page_size):
+    """Returns the top row closest to row which keeps the last page full"""
+    return max(min(row, row_count - page_size), 0)
+
+
+def top_row_showing(row, top_row, page_size):
+    """Returns the top row of a page showing row, the current one if row is already shown, else one centering it"""
+    if top_row <= row < top_row + page_size:
+        return top_row
+    return max(row - page_size // 2, 0)
+
+
+def next_match_row(match_rows, current_row, forward=True):
+    """Returns the first of the sorted match rows after the current row, or the last one before it, wrapping around"""
+    if forward:
+        position = numpy.searchsorted(match_rows, current_row, side='right')
+        return int(match_rows[position % len(match_rows)])
+    position = numpy.searchsorted(match_rows, current_row, side='left') - 1
+    return int(match_rows[position])
+
+
+def page_match_rows(match_rows, top_row, row_count):
+    """Returns the set of the sorted match rows within the row_count rows from the top row"""
+    match_start, match_end = numpy.searchsorted(match_rows, [top_row, top_row + row_count])
+    return set(match_rows[match_start:match_end].tolist())
+
+
+def scrollbar_range(top_row, page_size, row_count):
+    """Returns the (first, last) fractions of the rows shown, as set on a Scrollbar"""
+    if not row_count:
+        return 0, 1
+    return top_row / row_count, min(top_row + page_size, row_count) / row_count
+
+
+class EventView(ttk.Frame):
+    """
+    Tab listing the events of a thread, which only renders the rows visible in its Text widget so that it
+    stays responsive with millions of events
+    """
+
+    def __init__(self, parent, format_event):
+        super().__init__(parent)
+        self._format_event = format_event
+        self._events = EventArray()
+        self._rows = self._events
+        self._filter_ids = None
+        self._counts = dict.fromkeys(TaggedMessages.values(), 0)
+        self._top_row = 0
+        self._selected_row = None
+        self._match_rows = numpy.empty(0, dtype=numpy.int64)
+
+        # Assert/Error/Warning filters
+        toolbar = Frame(self)
+        toolbar.pack(side=TOP, fill=X)
+        Label(toolbar, text='Show only:').pack(side=LEFT)
+        self._filter_vars = {}
+        for tag in TaggedMessages.values():
+            self._filter_vars[tag] = filter_var = BooleanVar(value=False)
+            Checkbutton(toolbar, text=tag, variable=filter_var, command=self._update_filter).pack(side=LEFT)
+        self._summary = Label(toolbar, anchor=E)
+        self._summary.pack(side=RIGHT)
+
+        self._vscrollbar = vscrollbar = Scrollbar(self, command=self._on_yscroll)
+        hscrollbar = Scrollbar(self, orient='horizontal')
+
+        self._text_box = text_box = Text(self, xscrollcommand=hscrollbar.set, wrap=NONE, state=DISABLED)
+        text_box.tag_config('Assert', foreground='red3', background='gray80')
+        text_box.tag_config('Error', foreground='red2')
+        text_box.tag_config('Warning', foreground='SteelBlue3')
+        text_box.tag_config('Match', background='khaki1')
+        text_box.tag_config('Selected', background='gold')
+        self._line_height = max(font.Font(font=text_box['font']).metrics('linespace'), 1)
+
+        hscrollbar.config(command=text_box.xview)
+
+        vscrollbar.pack(side=RIGHT, fill=Y)
+        hscrollbar.pack(side=BOTTOM, fill=X)
+        text_box.pack(fill=BOTH, expand=1)
+
+        text_box.bind('<Configure>', lambda event: self._render())
+        text_box.bind('<MouseWheel>', lambda event: self._scroll_to(self._top_row - 3 if event.delta > 0 else self._top_row + 3))
+        text_box.bind('<Button-4>', lambda event: self._scroll_to(self._top_row - 3))
+        text_box.bind('<Button-5>', lambda event: self._scroll_to(self._top_row + 3))
+        text_box.bind('<Prior>', lambda event: self._scroll_to(self._top_row - self._page_size()))
+        text_box.bind('<Next>', lambda event: self._scroll_to(self._top_row + self._page_size()))
+        text_box.bind('<Control-Home>', lambda event: self._scroll_to(0))
+        text_box.bind('<Control-End>', lambda event: self._scroll_to(len(self._rows)))
+
+    def append(self, events):
+        """Appends index entries of the thread, other than its prologs"""
+        events = events[events['event_id'] != PrologId.hash]
+        if not len(events):
+            return
+        was_visible = self._top_row + self._page_size() >= len(self._rows)
+        self._events.extend(events)
+        if self._filter_ids is not None:
+            self._rows.extend(IndexedReader.filter_index(events, self._filter_ids))
+        for event_id, tag in TaggedMessages.items():
+            self._counts[tag] += int(numpy.count_nonzero(events['event_id'] == event_id))
+        if was_visible:
+            self._render()
+        else:
+            self._update_scrollbar()
+        self._update_summary()
+
+    def find(self, offsets, length, forward=True):
+        """Selects the next row of a text event containing one of the spans of length bytes at the offsets"""
+        rows = self._rows.values
+        match_rows = IndexedReader.match_payloads(rows, offsets, length)
+        self._match_rows = match_rows = match_rows[numpy.isin(rows['event_id'][match_rows], TextMessageIds)]
+        if not len(match_rows):
+            self._selected_row = None
+            self._render()
+            return False
+
+        current_row = self._top_row - 1 if self._selected_row is None else self._selected_row
+        self._selected_row = next_match_row(match_rows, current_row, forward)
+        self._top_row = top_row_showing(self._selected_row, self._top_row, self._page_size())
+        self._render()
+        return True
+
+    def _update_filter(self):
+        filter_ids = [event_id for event_id, tag in TaggedMessages.items() if self._filter_vars[tag].get()]
+
+        # keep the top event in view when it is still listed
+        top_offset = int(self._rows.values['offset'][self._top_row]) if self._top_row < len(self._rows) else None
+        if filter_ids:
+            self._filter_ids = filter_ids
+            self._rows = EventArray(IndexedReader.filter_index(self._events.values, filter_ids))
+        else:
+            self._filter_ids = None
+            self._rows = self._events
+        if top_offset is not None:
+            self._top_row = int(numpy.searchsorted(self._rows.values['offset'], top_offset))
+        self._selected_row = None
+        self._match_rows = numpy.empty(0, dtype=numpy.int64)
+        self._scroll_to(self._top_row)
+
+    def _update_summary(self):
+        counts = ', '.join(f'{count} {tag.lower()}s' for tag, count in self._counts.items())
+        self._summary.config(text=f'{len(self._events)} events, {counts}')
+
+    def _page_size(self):
+        return max(self._text_box.winfo_height() // self._line_height, 1)
+
+    def _scroll_to(self, row):
+        self._top_row = clamp_top_row(row, len(self._rows), self._page_size())
+        self._render()
+        return 'break'
+
+    def _on_yscroll(self, *args):
+        if args[0] == MOVETO:
+            self._scroll_to(int(float(args[1]) * len(self._rows)))
+        elif args[0] == SCROLL:
+            step = self._page_size() if args[2] == PAGES else 1
+            self._scroll_to(self._top_row + int(args[1]) * step)
+
+    def _update_scrollbar(self):
+        self._vscrollbar.set(*scrollbar_range(self._top_row, self._page_size(), len(self._rows)))
+
+    def _render(self):
+        rows = self._rows.values[self._top_row:self._top_row + self._page_size() + 1]
+        match_rows = page_match_rows(self._match_rows, self._top_row, len(rows))
+
+        text_box = self._text_box
+        text_box.config(state=NORMAL)
+        text_box.delete('1.0', END)
+        for row, event in enumerate(rows, self._top_row):
+            text, tag = self._format_event(event)
+            tags = (tag,) if tag else ()
+            if row == self._selected_row:
+                tags += ('Selected',)
+            elif row in match_rows:
+                tags += ('Match',)
+            text_box.insert(END, f'{text}\n', tags)
+        text_box.config(state=DISABLED)
+        self._update_scrollbar()
+
 
 class TraceViewer(object):
 
     def __init__(self):
         self._tab_content = {}
+        self._log_reader = None
+        self._loader = None
+        self._cancel_load = threading.Event()
+        self._loaded_chunks = queue.Queue()
+        self._search = None
+        self._loaded_size = 0
 
         self._window = window = tkinter.Tk()
         window.title('Trace Viewer')
         window.minsize(640, 480)
 
+        toolbar = Frame(window)
+        toolbar.pack(side=TOP, fill=X)
+
         # file menu
-        self._file_menu = file_menu = Menubutton(window, text='File')
+        self._file_menu = file_menu = Menubutton(toolbar, text='File')
         file_menu.menu = Menu(file_menu, tearoff=0)
         file_menu['menu'] = file_menu.menu
-        file_menu.pack(side=TOP, anchor=W)
+        file_menu.pack(side=LEFT)
 
         file_menu.menu.add_command(label='Open...', command=self._open_file)
         file_menu.menu.add_command(label='Exit', command=window.quit)
 
+        # search of the messages of the current thread
+        Button(toolbar, text='Previous', command=lambda: self._find(forward=False)).pack(side=RIGHT)
+        Button(toolbar, text='Next', command=self._find).pack(side=RIGHT)
+        self._search_text = search_text = StringVar()
+        search_entry = Entry(toolbar, textvariable=search_text, width=40)
+        search_entry.bind('<Return>', lambda event: self._find())
+        search_entry.bind('<Shift-Return>', lambda event: self._find(forward=False))
+        search_entry.pack(side=RIGHT)
+        Label(toolbar, text='Find:').pack(side=RIGHT)
+
+        # loading progress
+        status_bar = Frame(window)
+        status_bar.pack(side=BOTTOM, fill=X)
+        self._progress = ttk.Progressbar(status_bar, mode='determinate', maximum=1.0)
+        self._progress.pack(side=RIGHT)
+        self._status = Label(status_bar, anchor=W)
+        self._status.pack(side=LEFT, fill=X, expand=1)
+
         # main content
         self._main_view = main_view = ttk.Notebook(window)
         main_view.pack(fill=BOTH, expand=1)
 
         # setup a debug tab for internal logging
-        self._add_new_tab('Debug')
+        self._add_debug_tab()
 
     def run(self):
         self._window.mainloop()
+        self._close_file()
 
     def _reset(self):
+        self._close_file()
         for tab in self._main_view.winfo_children():
             tab.destroy()
-        self._add_new_tab('Debug')
-
-    def _add_new_tab(self, name):
+        self._tab_content = {}
+        self._add_debug_tab()
+
+    def _close_file(self):
+        if self._loader is not None:
+            self._cancel_load.set()
+            self._loader.join()
+            self._loader = None
+        self._loaded_chunks = queue.Queue()
+        self._search = None
+        if self._log_reader is not None:
+            self._log_reader.close()
+            self._log_reader = None
+
+    def _add_debug_tab(self):
         tab = ttk.Frame(self._main_view)
         vscrollbar = Scrollbar(tab)
         hscrollbar = Scrollbar(tab, orient='horizontal')
 
         text_box = Text(tab, yscrollcommand=vscrollbar.set, xscrollcommand=hscrollbar.set, wrap=NONE)
-        text_box.tag_config('Assert', foreground='red3', background='gray80')
-        text_box.tag_config('Error', foreground='red2')
-        text_box.tag_config('Warning', foreground='SteelBlue3')
 
         vscrollbar.config(command=text_box.yview)
         hscrollbar.config(command=text_box.xview)
@@ -72,24 +340,29 @@ class TraceViewer(object):
         hscrollbar.pack(side=BOTTOM, fill=X)
         text_box.pack(fill=BOTH, expand=1)
 
-        self._main_view.add(tab, text=name)
+        self._main_view.add(tab, text='Debug')
+        self._tab_content['Debug'] = text_box
 
-        self._tab_content[name] = text_box
-        self._active_content = text_box
+    def _add_thread_tab(self, thread_id):
+        tab_name = 'No Thread' if thread_id == NoThreadId else f'Thread {thread_id}'
+        view = EventView(self._main_view, self._format_event)
+        self._main_view.add(view, text=tab_name)
+        if len(self._tab_content) == 1:
+            self._main_view.select(view)
+        self._tab_content[thread_id] = view
+        return view
 
     def _append_debug_message(self, message):
         debug_content = self._tab_content['Debug']
         debug_content.insert(END, f'{message}\n')
 
-    def _append_current_message(self, message):
-        if self._active_content:
-            self._active_content.insert(END, f'{message}\n')
-
-    def _append_current_tagged_message(self, message, tag):
-        if self._active_content:
-            start = self._active_content.index('insert linestart')
-            self._active_content.insert(END, f'{message}\n')
-            self._active_content.tag_add(tag, start, 'insert lineend')
+    def _format_event(self, event):
+        event_id = int(event['event_id'])
+        if event_id in TaggedMessages or event_id in (PrintfId.hash, MessageId.hash):
+            with self._log_reader.get_event_data(event) as data:
+                message = str(data, 'utf-8', 'replace')
+            return message.rstrip('\r\n').replace('\r', ' ').replace('\n', ' '), TaggedMessages.get(event_id)
+        return f'Event ID {event_id}, Size {int(event["size"])}', None
 
     def _open_file(self):
         log_file_types = [
@@ -105,13 +378,15 @@ class TraceViewer(object):
 
         self._reset()
 
-        log_reader = Reader()
+        log_reader = IndexedReader()
         status = log_reader.read_log_file(log_file)
         if status == Reader.ReadStatus_InsufficientFileSize:
             self._append_debug_message('File size too small to contain Event Logger information')
+            log_reader.close()
             return
         elif status == Reader.ReadStatus_InvalidFormat:
             self._append_debug_message('Invalid Event Logger format detected')
+            log_reader.close()
             return
 
         log_header = log_reader.get_log_header()
@@ -119,31 +394,81 @@ class TraceViewer(object):
         self._append_debug_message(f'Format: {log_header.get_format()}')
         self._append_debug_message(f'Version: {log_header.get_version()}')
 
-        tagged_messages = { AssertId : 'Assert', ErrorId : 'Error', WarningId : 'Warning' }
-
-        has_event = (status == Reader.ReadStatus_Success)
-        while has_event:
-            event_id = log_reader.get_event_name()
-
-            if event_id == PrologId:
-                tab_name = f'Thread {log_reader.get_thread_id()}'
-
-                if tab_name in self._tab_content:
-                    self._active_content = self._tab_content[tab_name]
-
-                else:
-                    self._add_new_tab(tab_name)
-
-            elif event_id in tagged_messages:
-                self._append_current_tagged_message(log_reader.get_event_string(), tagged_messages[event_id])
+        # the events are indexed on a background thread and added to the views as they come in
+        self._log_reader = log_reader
+        self._file_size = os.path.getsize(log_file)
+        self._loaded_size = 0
+        self._event_count = 0
+        self._load_start = time.perf_counter()
+        self._cancel_load = threading.Event()
+        self._loader = threading.Thread(target=self._load_events, args=(log_reader, self._loaded_chunks, self._cancel_load), daemon=True)
+        self._loader.start()
+        self._window.after(LoadPollInterval, self._poll_loaded_chunks, self._loaded_chunks)
+
+    @staticmethod
+    def _load_events(log_reader, loaded_chunks, cancel_load):
+        try:
+            for chunk in log_reader.iter_index_chunks(LoadChunkSize):
+                if cancel_load.is_set():
+                    return
+                loaded_chunks.put(chunk)
+        except Exception as e:
+            loaded_chunks.put(e)
+        loaded_chunks.put(None)
+
+    def _poll_loaded_chunks(self, loaded_chunks):
+        if loaded_chunks is not self._loaded_chunks:
+            # a different file was opened since
+            return
+        while True:
+            try:
+                chunk = loaded_chunks.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                self._loader = None
+                self._progress['value'] = 1.0
+                self._status.config(text=f'Loaded {self._event_count} events in {time.perf_counter() - self._load_start:.1f} seconds')
+                return
+            if isinstance(chunk, Exception):
+                self._append_debug_message(f'Failed to read the events: {chunk}')
+                continue
+            self._add_events(chunk)
+
+        self._progress['value'] = self._loaded_size / max(self._file_size, 1)
+        self._status.config(text=f'Loading... {self._event_count} events')
+        self._window.after(LoadPollInterval, self._poll_loaded_chunks, loaded_chunks)
+
+    def _add_events(self, chunk):
+        for thread_id, events in split_by_thread(chunk):
+            view = self._tab_content.get(thread_id)
+            if view is None:
+                view = self._add_thread_tab(thread_id)
+            view.append(events)
+        last_event = chunk[-1]
+        self._loaded_size = int(last_event['offset']) + EventHeader.size() + int(last_event['size'])
+        self._event_count += len(chunk)
+
+    def _find(self, forward=True):
+        view = self._main_view.nametowidget(self._main_view.select())
+        pattern = self._search_text.get().encode('utf-8')
+        if not isinstance(view, EventView) or not pattern:
+            return
 
-            elif event_id in (PrintfId, MessageId):
-                self._append_current_message(log_reader.get_event_string())
+        # the occurrences found in the file are kept, and only the part of the file loaded since is searched again
+        if self._search is None or self._search[0] != pattern:
+            self._search = (pattern, 0, numpy.empty(0, dtype=numpy.uint64))
+        _, searched_size, offsets = self._search
+        if searched_size < self._loaded_size:
+            start = max(searched_size - len(pattern) + 1, 0)
+            offsets = numpy.concatenate((offsets, self._log_reader.find(pattern, start, self._loaded_size)))
+            self._search = (pattern, self._loaded_size, offsets)
 
-            else:
-                self._append_current_message(f'Event ID {event_id}, Size {log_reader.get_event_size()}')
+        if view.find(offsets, len(pattern), forward):
+            self._status.config(text=f'Found "{self._search_text.get()}"')
+        else:
+            self._status.config(text=f'"{self._search_text.get()}" not found')
 
-            has_event = log_reader.next()
 
 def main():
     trace_viewer = TraceViewer()
@@ -0,0 +1,98 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+"""
+Times reading a synthetic event log with the Reader.next() loop against indexing it with the IndexedReader.
+tests/test_indexed_reader.py checks that both read the same events.
+Ex. from the Tools/EventLogTools folder: python benchmark_reader.py --event-count 1000000
+"""
+
+from EventLogger.IndexedReader import IndexedReader
+from EventLogger.Reader import Reader, size_align_up
+from EventLogger.Utils import EventBoundary, EventNameHash, PrologId
+
+import argparse
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+MessageId = EventNameHash("Message")
+OtherId = EventNameHash("Other")
+
+
+def write_synthetic_log(file_path, event_count):
+    random.seed(0)
+    with open(file_path, 'wb') as log_file:
+        log_file.write(struct.pack('@4sIII', b'AZEL', 1, 0, 0))
+        for event_index in range(event_count):
+            if event_index % 1000 == 0:
+                event = struct.pack('@IHHQ', PrologId.hash, 8, 0, random.randrange(1, 16))
+            elif event_index % 3 == 0:
+                message = f'Message {event_index}'.encode('utf-8')
+                event = struct.pack('@IHH', MessageId.hash, len(message), 0) + message
+            else:
+                payload = bytes(random.randrange(0, 64))
+                event = struct.pack('@IHH', OtherId.hash, len(payload), 1) + payload
+            log_file.write(event.ljust(size_align_up(len(event), EventBoundary), b'\0'))
+
+
+def read_with_reader(file_path):
+    events = []
+    log_reader = Reader()
+    has_event = log_reader.read_log_file(file_path) == Reader.ReadStatus_Success
+    while has_event:
+        events.append((log_reader.get_event_name().hash, log_reader.get_event_size(), log_reader.get_thread_id(), log_reader.get_event_data()))
+        has_event = log_reader.next()
+    return events
+
+
+def read_with_indexed_reader(file_path):
+    events = []
+    with IndexedReader() as log_reader:
+        if log_reader.read_log_file(file_path) == Reader.ReadStatus_Success:
+            for event, data in log_reader.iter_events():
+                events.append((event.event_id, event.size, event.thread_id, bytes(data)))
+                data.release()
+    return events
+
+
+def index_with_indexed_reader(file_path):
+    with IndexedReader() as log_reader:
+        log_reader.read_log_file(file_path)
+        return len(log_reader.index), len(log_reader.select(event_ids=[MessageId]))
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Event log reader benchmark')
+    parser.add_argument('--event-count', type=int, default=1000000, help='Number of events of the synthetic log')
+    parsed_args = parser.parse_args(args)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, 'benchmark.azel')
+        write_synthetic_log(file_path, parsed_args.event_count)
+        print(f'Synthetic log: {parsed_args.event_count} events, {os.path.getsize(file_path)} bytes')
+
+        _, reader_time = time_call(read_with_reader, file_path)
+        print(f'Reader.next() loop:                   {reader_time:.2f} seconds')
+        _, indexed_time = time_call(read_with_indexed_reader, file_path)
+        print(f'IndexedReader.iter_events() loop:     {indexed_time:.2f} seconds ({reader_time / indexed_time:.1f}x)')
+        (event_count, message_count), index_time = time_call(index_with_indexed_reader, file_path)
+        print(f'IndexedReader index and Message filter: {index_time:.2f} seconds ({reader_time / index_time:.1f}x), '
+              f'{message_count} of {event_count} events')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,93 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark_reader import MessageId, OtherId, read_with_indexed_reader, read_with_reader, write_synthetic_log
+from EventLogger.IndexedReader import IndexedReader, NoThreadId
+from EventLogger.Reader import Reader
+
+
+def reader_events(file_path):
+    # The Reader has no thread id before the first prolog
+    return [(event_id, size, NoThreadId if thread_id is None else thread_id, data)
+            for event_id, size, thread_id, data in read_with_reader(file_path)]
+
+
+@pytest.fixture
+def synthetic_log(tmp_path):
+    file_path = str(tmp_path / 'synthetic.azel')
+    write_synthetic_log(file_path, 5000)
+    return file_path
+
+
+class TestIndexedReader:
+    def test_iter_events_matches_reader(self, synthetic_log):
+        assert read_with_indexed_reader(synthetic_log) == reader_events(synthetic_log)
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 1000, 4999])
+    def test_iter_events_in_chunks_matches_reader(self, synthetic_log, chunk_size):
+        events = []
+        with IndexedReader() as log_reader:
+            assert log_reader.read_log_file(synthetic_log) == Reader.ReadStatus_Success
+            for event, data in log_reader.iter_events(chunk_size=chunk_size):
+                events.append((event.event_id, event.size, event.thread_id, bytes(data)))
+                data.release()
+
+        assert events == reader_events(synthetic_log)
+
+    def test_index_matches_reader(self, synthetic_log):
+        expected_events = reader_events(synthetic_log)
+        with IndexedReader() as log_reader:
+            log_reader.read_log_file(synthetic_log)
+            index = log_reader.index
+
+            assert len(log_reader) == len(expected_events)
+            assert index['event_id'].tolist() == [event[0] for event in expected_events]
+            assert index['size'].tolist() == [event[1] for event in expected_events]
+            assert index['thread_id'].tolist() == [event[2] for event in expected_events]
+            with log_reader.get_event_data(index[3]) as data:
+                assert bytes(data) == expected_events[3][3]
+
+    def test_select_filters_events(self, synthetic_log):
+        expected_events = reader_events(synthetic_log)
+        thread_id = expected_events[1500][2]
+        with IndexedReader() as log_reader:
+            log_reader.read_log_file(synthetic_log)
+            messages = log_reader.select(event_ids=[MessageId], thread_ids=[thread_id])
+
+            assert len(messages) == len([event for event in expected_events
+                                         if event[0] == MessageId.hash and event[2] == thread_id])
+            assert len(messages) > 0
+            assert log_reader.get_event_string(messages[0]).startswith('Message ')
+            assert len(log_reader.select(event_ids=[OtherId.hash, MessageId])) == len(
+                [event for event in expected_events if event[0] in (OtherId.hash, MessageId.hash)])
+
+    def test_find_and_match_payloads_locate_messages(self, synthetic_log):
+        pattern = b'Message 42'
+        expected_positions = [position for position, event in enumerate(reader_events(synthetic_log))
+                               if pattern in event[3]]
+        with IndexedReader() as log_reader:
+            log_reader.read_log_file(synthetic_log)
+            positions = IndexedReader.match_payloads(log_reader.index, log_reader.find(pattern), len(pattern))
+
+            assert positions.tolist() == expected_positions
+            assert log_reader.get_event_string(log_reader[positions[0]]) == 'Message 42'
+
+    def test_read_log_file_reports_invalid_files(self, tmp_path):
+        short_file = tmp_path / 'short.azel'
+        short_file.write_bytes(b'AZ')
+        empty_log = tmp_path / 'empty.azel'
+        write_synthetic_log(str(empty_log), 0)
+        with IndexedReader() as log_reader:
+            assert log_reader.read_log_file(str(short_file)) == Reader.ReadStatus_InsufficientFileSize
+            assert log_reader.read_log_file(str(empty_log)) == Reader.ReadStatus_NoEvents
+            assert len(log_reader) == 0
@@ -0,0 +1,111 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import os
+import sys
+
+import numpy
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import TraceViewer
+from EventLogger.IndexedReader import EventIndexType, IndexedReader
+
+
+def make_index(thread_ids, event_ids=None, offset=0):
+    """Returns index entries of 32 byte events for the thread ids, starting at the offset"""
+    index = numpy.zeros(len(thread_ids), dtype=EventIndexType)
+    index['offset'] = offset + 32 * numpy.arange(len(thread_ids))
+    index['thread_id'] = thread_ids
+    index['event_id'] = TraceViewer.MessageId.hash if event_ids is None else event_ids
+    index['size'] = 24
+    return index
+
+
+class TestEventArray:
+    def test_extend_grows_past_initial_capacity(self):
+        events = [make_index([1] * 1000, offset=32 * 1000 * chunk) for chunk in range(3)]
+        event_array = TraceViewer.EventArray(events[0])
+        for chunk in events[1:]:
+            event_array.extend(chunk)
+
+        assert len(event_array) == 3000
+        assert numpy.array_equal(event_array.values, numpy.concatenate(events))
+
+    def test_values_only_holds_appended_events(self):
+        event_array = TraceViewer.EventArray()
+        assert len(event_array.values) == 0
+
+        event_array.extend(make_index([1, 2]))
+        assert event_array.values['thread_id'].tolist() == [1, 2]
+
+
+class TestSplitByThread:
+    def test_splits_in_order_of_first_appearance(self):
+        chunk = make_index([7, 3, 7, 9, 3, 3, 7])
+
+        groups = TraceViewer.split_by_thread(chunk)
+
+        assert [thread_id for thread_id, _ in groups] == [7, 3, 9]
+        for thread_id, events in groups:
+            # the events of a thread keep the file order
+            assert numpy.array_equal(events, chunk[chunk['thread_id'] == thread_id])
+
+    def test_single_thread(self):
+        chunk = make_index([5, 5, 5])
+
+        assert [(thread_id, len(events)) for thread_id, events in TraceViewer.split_by_thread(chunk)] == [(5, 3)]
+
+
+class TestPaging:
+    @pytest.mark.parametrize('row, expected_top_row', [(-5, 0), (0, 0), (40, 40), (90, 90), (95, 90), (500, 90)])
+    def test_clamp_top_row_keeps_last_page_full(self, row, expected_top_row):
+        assert TraceViewer.clamp_top_row(row, 100, 10) == expected_top_row
+
+    def test_clamp_top_row_with_fewer_rows_than_page(self):
+        assert TraceViewer.clamp_top_row(3, 5, 10) == 0
+        assert TraceViewer.clamp_top_row(3, 0, 10) == 0
+
+    @pytest.mark.parametrize('row, expected_top_row', [(20, 20), (29, 20), (30, 25), (19, 14), (2, 0)])
+    def test_top_row_showing_centers_rows_out_of_page(self, row, expected_top_row):
+        assert TraceViewer.top_row_showing(row, 20, 10) == expected_top_row
+
+    @pytest.mark.parametrize('current_row, forward, expected_row', [
+        (-1, True, 3), (3, True, 8), (5, True, 8), (20, True, 3),
+        (8, False, 3), (9, False, 8), (3, False, 20), (0, False, 20)])
+    def test_next_match_row_wraps_around(self, current_row, forward, expected_row):
+        match_rows = numpy.array([3, 8, 20])
+
+        assert TraceViewer.next_match_row(match_rows, current_row, forward) == expected_row
+
+    def test_page_match_rows_only_returns_rows_in_page(self):
+        match_rows = numpy.array([3, 8, 20, 21, 30])
+
+        assert TraceViewer.page_match_rows(match_rows, 8, 13) == {8, 20}
+        assert TraceViewer.page_match_rows(match_rows, 22, 8) == set()
+
+    def test_scrollbar_range(self):
+        assert TraceViewer.scrollbar_range(0, 10, 0) == (0, 1)
+        assert TraceViewer.scrollbar_range(0, 10, 5) == (0, 1)
+        assert TraceViewer.scrollbar_range(50, 10, 100) == (0.5, 0.6)
+        assert TraceViewer.scrollbar_range(95, 10, 100) == (0.95, 1)
+
+    def test_find_pages_through_matches_of_filtered_rows(self):
+        # every third event is a warning, search matches land in events 4, 6, 12 and 13 of the file
+        event_ids = [TraceViewer.WarningId.hash if index % 3 == 0 else TraceViewer.MessageId.hash for index in range(15)]
+        events = TraceViewer.EventArray(make_index([1] * 15, event_ids))
+        rows = TraceViewer.EventArray(IndexedReader.filter_index(events.values, [TraceViewer.WarningId]))
+        offsets = numpy.array([32 * event + 10 for event in [4, 6, 12, 13]], dtype=numpy.uint64)
+
+        match_rows = IndexedReader.match_payloads(rows.values, offsets, 4)
+
+        # only the warnings 6 and 12, the rows 2 and 4 of the filtered view, are matched
+        assert match_rows.tolist() == [2, 4]
+        selected_row = TraceViewer.next_match_row(match_rows, -1)
+        assert selected_row == 2
+        assert TraceViewer.next_match_row(match_rows, selected_row) == 4
+        assert TraceViewer.next_match_row(match_rows, selected_row, forward=False) == 4
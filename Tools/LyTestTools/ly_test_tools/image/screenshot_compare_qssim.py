@@ -7,12 +7,16 @@ Python implementation of Quaternion Structural Similarity by Amir Kolaman and Or
 IEEE Transaction on Image Processing Vol 21 No 4 April 2012.
 """
 
-import imageio
-import numpy
+import concurrent.futures
+import functools
 import os
 
+import imageio
+import numpy
 from scipy import ndimage
 
+QSSIM_TILE_ROWS = 256
+
 
 def _quaternion_matrix_conj(q):
     q_out = numpy.zeros(q.shape)
@@ -59,7 +63,87 @@ def _quaternion_matrix_div(q1, q2):
     return numpy.divide(q, numpy.dstack([q2_norm] * 4))
 
 
-def qssim(screenshot, goldenimage, channel_max=255, diff_path='.'):
+def _quaternion_matrix_dot3(v1, v2):
+    """Dot product of the vector (imaginary) parts of two pure quaternion matrices stored as 3 channel arrays."""
+    return numpy.einsum('...k,...k->...', v1, v2)
+
+
+@functools.lru_cache(maxsize=None)
+def _gaussian_kernel(sigma, truncate=4.0):
+    """
+    Returns the 1D gaussian kernel used by scipy.ndimage.gaussian_filter1d, computed once and shared by every blur.
+    """
+    radius = int(truncate * sigma + 0.5)
+    x = numpy.arange(-radius, radius + 1)
+    kernel = numpy.exp(-0.5 / (sigma * sigma) * x ** 2)
+    kernel /= kernel.sum()
+    return kernel.astype(numpy.float32)
+
+
+def _blur(image, kernel):
+    """Separable gaussian blur of the first two axes of image, with the same reflected borders as gaussian_filter1d."""
+    blurred = ndimage.correlate1d(image, kernel, axis=0, mode='reflect')
+    return ndimage.correlate1d(blurred, kernel, axis=1, output=blurred, mode='reflect')
+
+
+def _qssim_map_rows(img1, img2, row_start, row_end, channel_max, kernel, c1, c2):
+    """
+    Computes the rows [row_start, row_end) of the quaternion similarity map of img1 & img2.
+    Only the rows needed by the two chained blurs are loaded around the requested rows, so the memory used is
+    proportional to the number of requested rows instead of the image size.
+
+    The pixels are pure quaternions (0, r, g, b), for which q1 * conj(q2) = (v1 . v2, -(v1 x v2)). The products are
+    computed from the dot & cross products of the color vectors instead of full quaternion multiplications.
+    """
+    # Rows of the similarity map depend on the blurred variances up to one kernel radius away, which depend on the
+    # blurred means up to another kernel radius away.
+    halo = 2 * (len(kernel) // 2)
+    slab_start = max(0, row_start - halo)
+    slab_end = min(img1.shape[0], row_end + halo)
+    rows = slice(row_start - slab_start, row_end - slab_start)
+
+    hue1 = img1[slab_start:slab_end].astype(numpy.float32)
+    hue1 *= numpy.float32(1.0 / channel_max)
+    hue2 = img2[slab_start:slab_end].astype(numpy.float32)
+    hue2 *= numpy.float32(1.0 / channel_max)
+    mu1 = _blur(hue1, kernel)
+    mu2 = _blur(hue2, kernel)
+
+    # hue - mu, in place
+    hue1 -= mu1
+    hue2 -= mu2
+    sigma1 = _blur(_quaternion_matrix_dot3(hue1, hue1), kernel)[rows]
+    sigma2 = _blur(_quaternion_matrix_dot3(hue2, hue2), kernel)[rows]
+    hue12 = numpy.empty(hue1.shape[:2] + (4,), dtype=numpy.float32)
+    hue12[:, :, 0] = _quaternion_matrix_dot3(hue1, hue2)
+    hue12[:, :, 1:4] = numpy.cross(hue1, hue2)
+    sigma12 = _blur(hue12, kernel)[rows]
+    del hue1, hue2, hue12
+
+    mu1 = mu1[rows]
+    mu2 = mu2[rows]
+    # |2 * mu1 * conj(mu2) + C1| / (|mu1|^2 + |mu2|^2 + C1)
+    part1 = 2 * _quaternion_matrix_dot3(mu1, mu2) + c1
+    part1 *= part1
+    mu12_cross = numpy.cross(mu1, mu2)
+    part1 += 4 * _quaternion_matrix_dot3(mu12_cross, mu12_cross)
+    numpy.sqrt(part1, out=part1)
+    part1 /= _quaternion_matrix_dot3(mu1, mu1) + _quaternion_matrix_dot3(mu2, mu2) + c1
+
+    # |2 * sigma12 + C2| / (sigma1 + sigma2 + C2)
+    part2 = 2 * sigma12[:, :, 0] + c2
+    part2 *= part2
+    part2 += 4 * _quaternion_matrix_dot3(sigma12[:, :, 1:4], sigma12[:, :, 1:4])
+    numpy.sqrt(part2, out=part2)
+    sigma1 += sigma2
+    sigma1 += c2
+    part2 /= sigma1
+
+    part1 *= part2
+    return part1
+
+
+def qssim(screenshot, goldenimage, channel_max=255, diff_path='.', threshold=None, tile_rows=QSSIM_TILE_ROWS):
     """
     Returns the mean quaternion similarity index between two images.
     For images that are the same the expected result is 1.000.
@@ -68,35 +152,23 @@ def qssim(screenshot, goldenimage, channel_max=255, diff_path='.'):
     There are a series of tuning parameters that are taken from the 2004 paper by Wang et al
     Image Quality Assesment: From Error Visibility to Structural Similarity.
 
+    The similarity map is computed in float32, in bands of tile_rows rows, so memory use does not grow with the image
+    size beyond the images themselves and the 8bit diff image.
+
     :param screenshot: Screenshot filename to test
     :param goldenimage: Golden image to test against.
     :param channel_max: Maximum channel value.
     :param diff_path: Target path where diff image should be stored.
+    :param threshold: If set, the comparison stops as soon as the mean similarity can no longer reach the threshold.
+        The returned value is then an upper bound of the similarity which is below the threshold, and the rows of the
+        diff image past that point are left black.
+    :param tile_rows: Number of rows of the similarity map computed at once.
     :return: Mean quaternion similarity from 0.00->1.00 (identical).
     """
 
-    # load image and copy it into a 4 channel array to treat rgb like quaternions
-    img1 = imageio.imread(screenshot)
-    img2 = imageio.imread(goldenimage)
-    # Avoid later precision issues
-    img1 = img1.astype(numpy.float64) / channel_max
-    img2 = img2.astype(numpy.float64) / channel_max
-
-    im1_size = img1.shape
-    im2_size = img2.shape
-    # check im1 and im2 are same size
-
-    hue1 = numpy.zeros((im1_size[0], im1_size[1], im1_size[2] + 1))
-    hue2 = numpy.zeros((im1_size[0], im1_size[1], im1_size[2] + 1))
-    mu1 = numpy.zeros((im1_size[0], im1_size[1], im1_size[2] + 1))
-    mu2 = numpy.zeros((im1_size[0], im1_size[1], im1_size[2] + 1))
-    offset1 = numpy.zeros((im1_size[0], im1_size[1], im1_size[2] + 1))
-    offset2 = numpy.zeros((im1_size[0], im1_size[1], im1_size[2] + 1))
-
-    hue1[:, :, 1:4] = img1
-    hue2[:, :, 1:4] = img2
-    mu1[:, :, 1:4] = img1
-    mu2[:, :, 1:4] = img2
+    # load images, the pixels are treated as pure quaternions (0, r, g, b)
+    img1 = numpy.asarray(imageio.imread(screenshot))
+    img2 = numpy.asarray(imageio.imread(goldenimage))
 
     # Algorithm tuning parameters. Can me modified as needed.
     sigma = 1.5
@@ -108,46 +180,56 @@ def qssim(screenshot, goldenimage, channel_max=255, diff_path='.'):
 
     C1 = (K1 * L) ** 2
     C2 = (K2 * L) ** 2
-    offset1[:, :, 0] = C1
-    offset2[:, :, 0] = C2
-
-    # blur each color channel of both images
-    mu1 = ndimage.filters.gaussian_filter1d(mu1, sigma, 0)
-    mu1 = ndimage.filters.gaussian_filter1d(mu1, sigma, 1)
-    mu2 = ndimage.filters.gaussian_filter1d(mu2, sigma, 0)
-    mu2 = ndimage.filters.gaussian_filter1d(mu2, sigma, 1)
-
-    mu1_sq = _quaternion_matrix_mult(mu1, _quaternion_matrix_conj(mu1))
-    mu2_sq = _quaternion_matrix_mult(mu2, _quaternion_matrix_conj(mu2))
-    mu12 = _quaternion_matrix_mult(mu1, _quaternion_matrix_conj(mu2))
-    hue1_sq = _quaternion_matrix_mult(hue1 - mu1, _quaternion_matrix_conj(hue1 - mu1))
-    hue2_sq = _quaternion_matrix_mult(hue2 - mu2, _quaternion_matrix_conj(hue2 - mu2))
-    hue12 = _quaternion_matrix_mult(hue1 - mu1, _quaternion_matrix_conj(hue2 - mu2))
-
-    sigma1 = ndimage.filters.gaussian_filter1d(hue1_sq, sigma, 0)
-    sigma1 = ndimage.filters.gaussian_filter1d(sigma1, sigma, 1)
-    sigma2 = ndimage.filters.gaussian_filter1d(hue2_sq, sigma, 0)
-    sigma2 = ndimage.filters.gaussian_filter1d(sigma2, sigma, 1)
-    sigma12 = ndimage.filters.gaussian_filter1d(hue12, sigma, 0)
-    sigma12 = ndimage.filters.gaussian_filter1d(sigma12, sigma, 1)
-    numerator1 = 2 * mu12 + offset1
-    numerator2 = 2 * sigma12 + offset2
-
-    denominator1 = mu1_sq + mu2_sq + offset1
-    denominator2 = sigma1 + sigma2 + offset2
-
-    part1 = _quaternion_matrix_norm(numerator1) / denominator1[:, :, 0]
-    part2 = _quaternion_matrix_norm(numerator2) / denominator2[:, :, 0]
-
-    qssim_map = numpy.multiply(part1, part2)
+
+    kernel = _gaussian_kernel(sigma)
+    height = img1.shape[0]
+    pixel_count = height * img1.shape[1]
+    diff_image = numpy.zeros(img1.shape[:2], dtype=numpy.uint8)
+    qssim_sum = 0.0
+    for row_start in range(0, height, tile_rows):
+        row_end = min(height, row_start + tile_rows)
+        qssim_map = _qssim_map_rows(img1, img2, row_start, row_end, channel_max, kernel, C1, C2)
+        diff_image[row_start:row_end] = qssim_map * channel_max
+        qssim_sum += numpy.abs(qssim_map).sum(dtype=numpy.float64)
+
+        # Every value of the similarity map is at most 1
+        if threshold is not None:
+            best_possible_mean = (qssim_sum + (height - row_end) * img1.shape[1]) / pixel_count
+            if best_possible_mean < threshold:
+                qssim_sum = best_possible_mean * pixel_count
+                break
 
     extension = os.path.splitext(screenshot)[1]
     screenshot_name = os.path.basename(screenshot)
     diff_name = '.'.join(screenshot_name.split('.')[:-1]) + "_diff" + extension
     diff_full_path = os.path.join(diff_path, diff_name)
 
-    imageio.imwrite(diff_full_path, (qssim_map * channel_max).astype(numpy.uint8))
-    return ndimage.mean(numpy.abs(qssim_map))
+    imageio.imwrite(diff_full_path, diff_image)
+    return qssim_sum / pixel_count
+
+
+def _qssim_pair(image_pair, channel_max, diff_path, threshold):
+    screenshot, goldenimage = image_pair
+    return qssim(screenshot, goldenimage, channel_max=channel_max, diff_path=diff_path, threshold=threshold)
+
+
+def qssim_batch(image_pairs, channel_max=255, diff_path='.', threshold=None, max_workers=None):
+    """
+    Compares many screenshot & golden image pairs in parallel with a process pool. See qssim().
+
+    :param image_pairs: Iterable of (screenshot filename, golden image filename) tuples.
+    :param channel_max: Maximum channel value.
+    :param diff_path: Target path where the diff images should be stored.
+    :param threshold: If set, each comparison stops as soon as its mean similarity can no longer reach the threshold.
+    :param max_workers: Maximum number of processes, defaults to the number of processors.
+    :return: List of the mean quaternion similarity of each pair, in the order of image_pairs.
+    """
+    image_pairs = list(image_pairs)
+    if not image_pairs:
+        return []
+    compare = functools.partial(_qssim_pair, channel_max=channel_max, diff_path=diff_path, threshold=threshold)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(compare, image_pairs))
 
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ SPDX-License-Identifier: Apache-2.0 OR MIT
 
 Functions to aid in monitoring log files being actively written to for a set of lines to read for.
 """
+import collections
 import logging
 import os
 import re
@@ -15,6 +16,7 @@ import ly_test_tools.launchers.platforms.base
 logger = logging.getLogger(__name__)
 
 LOG_MONITOR_INTERVAL = 0.1  # seconds
+LOG_READ_CHUNK_SIZE = 1024 * 1024  # characters
 
 
 class LogMonitorException(Exception):
@@ -45,9 +47,101 @@ def check_exact_match(line, expected_line):
 
     return None
 
+
+def _build_trie_pattern(strings):
+    """
+    Builds a regular expression alternation matching any of the 'strings' values, factored into a prefix tree so
+    that the regex engine follows a single branch per character instead of trying every string in turn.
+
+    :param strings: iterable of strings to match literally.
+    :return: regular expression pattern string.
+    """
+    trie = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[''] = {}  # Terminal marker
+
+    def build(node):
+        is_terminal = '' in node
+        branches = []
+        for char, child in sorted((char, child) for char, child in node.items() if char):
+            # Collapse single child chains into one literal run to keep the nesting shallow
+            literal = char
+            while len(child) == 1 and '' not in child:
+                (next_char, child), = child.items()
+                literal += next_char
+            branches.append(re.escape(literal) + build(child))
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:{})'.format('|'.join(branches))
+        if is_terminal:
+            pattern = '(?:{})?'.format(pattern)
+        return pattern
+
+    return build(trie)
+
+
+class LineMatcher(object):
+
+    def __init__(self, expected_lines, unexpected_lines):
+        """
+        Matches log lines against all expected & unexpected lines at once using the exact (not partial) matching of
+        check_exact_match(). Every line is checked with a single compiled regular expression, so lines that match
+        nothing, which is nearly every line of a log, cost the same regardless of the number of searched strings.
+        Only lines with a match are compared to each remaining string to find which ones matched.
+
+        :param expected_lines: list of strings to search for, removed from the list as they are found.
+        :param unexpected_lines: list of strings that must not be found, removed from the list as they are found.
+        """
+        self.expected_lines = expected_lines
+        self.unexpected_lines = unexpected_lines
+        self._regex = None
+
+    def _compile(self):
+        searched_lines = set(self.expected_lines)
+        searched_lines.update(self.unexpected_lines)
+        self._regex = re.compile("(?:^|(?<=\\s)){}(?:$|(?=\\s))".format(_build_trie_pattern(searched_lines)),
+                                 re.UNICODE)
+
+    def match(self, line):
+        """
+        Finds the expected & unexpected lines present in 'line'. Found strings are removed from the
+        searched lists so each one is only reported once.
+
+        :param line: log line string to search.
+        :return: tuple of (list of expected lines found, list of unexpected lines found) in the 'line' string.
+        """
+        if not self.expected_lines and not self.unexpected_lines:
+            return [], []
+        if self._regex is None:
+            self._compile()
+        if self._regex.search(line) is None:
+            return [], []
+
+        expected_found = [expected_line for expected_line in self.expected_lines
+                          if expected_line in line and check_exact_match(line, expected_line) == expected_line]
+        unexpected_found = [unexpected_line for unexpected_line in self.unexpected_lines
+                            if unexpected_line in line and check_exact_match(line, unexpected_line) == unexpected_line]
+        return expected_found, unexpected_found
+
+    def remove(self, found_lines, searched_lines):
+        """
+        Removes found strings from one of the searched lists, the combined expression is rebuilt on the next match.
+
+        :param found_lines: list of strings returned by match().
+        :param searched_lines: self.expected_lines or self.unexpected_lines
+        """
+        for found_line in found_lines:
+            searched_lines.remove(found_line)
+        if found_lines:
+            self._regex = None
+
+
 class LogMonitor(object):
 
-    def __init__(self, launcher, log_file_path, log_creation_max_wait_time=5):
+    def __init__(self, launcher, log_file_path, log_creation_max_wait_time=5, py_log_max_size=None):
         """
         Log monitor object for monitoring a single log file for expected or unexpected line values.
         Requires a launcher class & valid log file path.
@@ -55,13 +149,52 @@ class LogMonitor(object):
         :param launcher: Launcher class object that opens a locally-accessible log file to write to.
         :param log_file_path: string representing the path to the file to open.
         :param log_creation_max_wait_time: max time to wait in seconds for log to exist
+        :param py_log_max_size: max number of characters of log output kept in self.py_log, the oldest lines are
+            discarded past this size. None keeps the full log output.
         """
         self.unexpected_lines_found = []
         self.expected_lines_not_found = []
         self.launcher = launcher
         self.log_file_path = log_file_path
-        self.py_log = ""
         self.log_creation_max_wait_time = log_creation_max_wait_time
+        self.py_log_max_size = py_log_max_size
+        self._py_log_lines = collections.deque()
+        self._py_log_size = 0
+        self._py_log_discarded_size = 0
+        self._partial_line = ""
+
+    @property
+    def py_log(self):
+        """
+        The monitored log lines prefixed with the log filename, joined into a single string on access.
+        """
+        py_log = "".join(self._py_log_lines)
+        if self._py_log_discarded_size:
+            py_log = "<{} characters discarded>\n{}".format(self._py_log_discarded_size, py_log)
+        return py_log
+
+    @py_log.setter
+    def py_log(self, value):
+        self._py_log_lines.clear()
+        self._py_log_size = 0
+        self._py_log_discarded_size = 0
+        if value:
+            self._append_py_log(value)
+
+    def _append_py_log(self, text):
+        """
+        Appends 'text' to the log buffer in O(1), discarding the oldest entries if py_log_max_size is exceeded.
+
+        :param text: string to append.
+        :return: None
+        """
+        self._py_log_lines.append(text)
+        self._py_log_size += len(text)
+        if self.py_log_max_size is not None:
+            while self._py_log_size > self.py_log_max_size and len(self._py_log_lines) > 1:
+                discarded = self._py_log_lines.popleft()
+                self._py_log_size -= len(discarded)
+                self._py_log_discarded_size += len(discarded)
 
     def monitor_log_for_lines(self,
                               expected_lines=None,
@@ -118,16 +251,16 @@ class LogMonitor(object):
 
         # Log file is now opened by our process, start monitoring log lines:
         self.py_log = ""
+        self._partial_line = ""
         try:
             logger.debug("Monitoring log file in '{}' ".format(self.log_file_path))
             with open(self.log_file_path, mode='r', encoding='utf-8') as log:
                 logger.info(
                     "Monitoring log file '{}' for '{}' seconds".format(self.log_file_path, timeout))
                     
-                search_expected_lines = expected_lines.copy()
-                search_unexpected_lines = unexpected_lines.copy()
+                matcher = LineMatcher(expected_lines.copy(), unexpected_lines.copy())
                 waiter.wait_for(  # Sets the values for self.unexpected_lines_found & self.expected_lines_not_found
-                    lambda: self._find_lines(log, search_expected_lines, search_unexpected_lines, halt_on_unexpected),
+                    lambda: self._find_lines(log, matcher, halt_on_unexpected),
                     timeout=timeout,
                     interval=LOG_MONITOR_INTERVAL)
         except AssertionError:  # Raised by waiter when timeout is reached.
@@ -142,59 +275,71 @@ class LogMonitor(object):
 
         return self._validate_results(self.expected_lines_not_found, self.unexpected_lines_found, expected_lines, unexpected_lines)
 
-    def _find_expected_lines(self, line, expected_lines):
+    def _find_expected_lines(self, line, matcher, expected_lines_found):
         """
-        Checks for any matches between the 'line' string and strings in the 'expected_lines' list.
-        Removes expected_lines strings that are found from the main expected_lines list and returns the remaining
-        expected_lines list values.
+        Removes the expected lines that were matched in the 'line' string from the matcher's expected_lines list and
+        returns the remaining expected_lines list values.
 
         :param line: string from a TextIO or BinaryIO file object being read line by line.
-        :param expected_lines: list of strings to search for in each read line from the log file.
+        :param matcher: LineMatcher holding the expected lines still searched for.
+        :param expected_lines_found: list of expected line strings matched in the 'line' string by the matcher.
         :return: updated expected_lines list of strings after parsing the value of the line param.
         """
-        expected_lines_to_remove = []
-
-        for expected_line in expected_lines:
-            searched_line = check_exact_match(line, expected_line)
-            if expected_line == searched_line:
-                logger.debug("Found expected line: {} from line: {}".format(expected_line, line))
-                expected_lines_to_remove.append(expected_line)
+        for expected_line in expected_lines_found:
+            logger.debug("Found expected line: {} from line: {}".format(expected_line, line))
+        matcher.remove(expected_lines_found, matcher.expected_lines)
 
-        for expected_line in expected_lines_to_remove:
-            expected_lines.remove(expected_line)
+        return matcher.expected_lines
 
-        return expected_lines
-
-    def _find_unexpected_lines(self, line, unexpected_lines, halt_on_unexpected):
+    def _find_unexpected_lines(self, line, matcher, unexpected_lines_found_in_line, halt_on_unexpected):
         """
-        Checks for any matches between the 'line' string and strings in the 'unexpected_lines' list.
-        Removes unexpected_lines strings that are found from the main unexpected_lines list and adds them to the
-        unexpected_lines_found list.
+        Removes the unexpected lines that were matched in the 'line' string from the matcher's unexpected_lines list
+        and adds them to the unexpected_lines_found list.
 
         :param line: string from a TextIO or BinaryIO file object being read line by line.
-        :param unexpected_lines: list of strings to search for in each read line from the log file.
-        :param halt_on_unexpected: boolean to determine whether to raise ValueError on the first
+        :param matcher: LineMatcher holding the unexpected lines still searched for.
+        :param unexpected_lines_found_in_line: list of unexpected line strings matched in the 'line' string by the
+            matcher.
+        :param halt_on_unexpected: boolean to determine whether to raise LogMonitorException on the first
             unexpected line found (True) or not (False)
         :return: unexpected_lines_found from the unexpected_lines searched for in the current log line.
         """
         unexpected_lines_found = self.unexpected_lines_found
-        unexpected_lines_to_remove = []
 
-        for unexpected_line in unexpected_lines:
-            searched_line = check_exact_match(line, unexpected_line)
-            if unexpected_line == searched_line:
-                logger.debug("Found unexpected line: {} from line: {}".format(unexpected_line, line))
-                if halt_on_unexpected:
-                    raise LogMonitorException(
-                        "Unexpected line appeared: {} from line: {}".format(unexpected_line, line))
-                unexpected_lines_found.append(unexpected_line)
-                unexpected_lines_to_remove.append(unexpected_line)
-
-        for unexpected_line in unexpected_lines_to_remove:
-            unexpected_lines.remove(unexpected_line)
+        for unexpected_line in unexpected_lines_found_in_line:
+            logger.debug("Found unexpected line: {} from line: {}".format(unexpected_line, line))
+            if halt_on_unexpected:
+                raise LogMonitorException(
+                    "Unexpected line appeared: {} from line: {}".format(unexpected_line, line))
+            unexpected_lines_found.append(unexpected_line)
+        matcher.remove(unexpected_lines_found_in_line, matcher.unexpected_lines)
 
         return unexpected_lines_found
 
+    def _read_lines(self, log, final_read):
+        """
+        Reads the text appended to the log file since the last read in chunks of LOG_READ_CHUNK_SIZE and yields the
+        complete lines. A trailing partial line is held back until the rest of it is written, unless this is the
+        final read of the log file.
+
+        :param log: TextIO file object to read from.
+        :param final_read: True if the process writing the log has ended and no more text will be written.
+        :return: generator of line strings without the trailing newline.
+        """
+        while True:
+            chunk = log.read(LOG_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            lines = (self._partial_line + chunk).split('\n')
+            self._partial_line = lines.pop()
+            for line in lines:
+                yield line
+
+        if final_read and self._partial_line:
+            line = self._partial_line
+            self._partial_line = ""
+            yield line
+
     def _validate_results(self, expected_lines_not_found, unexpected_lines_found, expected_lines, unexpected_lines):
         """
         Parses the values in the expected_lines_not_found & unexpected_lines_found lists.
@@ -242,15 +387,15 @@ class LogMonitor(object):
     
         return True
 
-    def _find_lines(self, log, expected_lines, unexpected_lines, halt_on_unexpected):
+    def _find_lines(self, log, matcher, halt_on_unexpected):
         """
-        Given a list of strings in expected_lines, unexpected_lines, and a log file, read every line in the log file,
-        and make sure all expected_lines strings appear & no unexpected_lines strings appear in the log file.
+        Given a LineMatcher holding the expected_lines & unexpected_lines strings, and a log file, read every line in
+        the log file, and make sure all expected_lines strings appear & no unexpected_lines strings appear in the log
+        file.
         NOTE: This loop will only end when a launcher process ends or if used as a callback function (i.e. waiter).
 
-        :param log: TextIO or BinaryIO file object to read lines from.
-        :param expected_lines: list of strings to search for in each read line from the log file.
-        :param unexpected_lines: list of strings that must not be present in the log_file_path file.
+        :param log: TextIO file object to read lines from.
+        :param matcher: LineMatcher holding the expected & unexpected lines still searched for.
         :param halt_on_unexpected: boolean to determine whether to raise LogMonitorException on the first
             unexpected line found (True) or not (False)
         :return: (wait_condition) Whether the log processing has finished(True: finished, False: unfinished)
@@ -259,20 +404,19 @@ class LogMonitor(object):
         log_filename = os.path.basename(self.log_file_path)
 
         def process_line(line):
-            self.py_log += ("|%s| %s\n" % (log_filename, line))
-            expected_lines_not_found = self._find_expected_lines(line, expected_lines)
-            unexpected_lines_found = self._find_unexpected_lines(line, unexpected_lines, halt_on_unexpected)
-            self.unexpected_lines_found = unexpected_lines_found
-            self.expected_lines_not_found = expected_lines_not_found
+            self._append_py_log("|%s| %s\n" % (log_filename, line))
+            expected_lines_found, unexpected_lines_found = matcher.match(line)
+            self.expected_lines_not_found = self._find_expected_lines(line, matcher, expected_lines_found)
+            self.unexpected_lines_found = self._find_unexpected_lines(
+                line, matcher, unexpected_lines_found, halt_on_unexpected)
 
         exception_info = None
 
         # To avoid race conditions, we will check *before reading*
         # If in the mean time the file is closed, we will make sure we read everything by issuing an extra call
         # by returning the previous alive state
-        process_runing = self.launcher.is_alive() 
-        for line in log:
-            line = line[:-1]  # remove /n
+        process_runing = self.launcher.is_alive()
+        for line in self._read_lines(log, final_read=not process_runing):
             try:
                 process_line(line)
             except LogMonitorException as e:
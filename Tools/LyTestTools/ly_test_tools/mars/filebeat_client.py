@@ -4,9 +4,44 @@ Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright
 SPDX-License-Identifier: Apache-2.0 OR MIT
 """
 
+import atexit
 import datetime
+import itertools
 import json
+import os
+import queue
 import socket
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, where a file opened by another process cannot be renamed
+    fcntl = None
+
+# Number of events queued by send_event before it blocks until the sender thread catches up
+DEFAULT_QUEUE_SIZE = 10000
+
+# Maximum number of events written to the socket at once
+DEFAULT_BATCH_SIZE = 500
+
+# Seconds between two attempts to reconnect to Filebeat after it became unreachable
+RECONNECT_INTERVAL = 5
+
+# Events which could not be sent are appended to a spool file of the client, named
+# <SPOOL_FILE_PREFIX><client id><SPOOL_FILE_SUFFIX>, which is locked while the client is open. Spool files which are
+# not locked are claimed by renaming them to <REPLAY_FILE_PREFIX><client id>.<number><SPOOL_FILE_SUFFIX>, and then sent.
+SPOOL_FILE_PREFIX = "filebeat_spool."
+REPLAY_FILE_PREFIX = "filebeat_replay."
+SPOOL_FILE_SUFFIX = ".ndjson"
+
+
+def _lock_file(locked_file):
+    """Locks an open file for as long as it is open, raises OSError if another open file holds the lock"""
+    if fcntl is not None:
+        fcntl.flock(locked_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
 
 
 class FilebeatExn(Exception):
@@ -14,16 +49,87 @@ class FilebeatExn(Exception):
 
 
 class FilebeatClient(object):
-    def __init__(self, logger, host="127.0.0.1", port=9000, timeout=20):
+    """
+    Sends events to Filebeat from a background thread. send_event only serialises the event and queues it, the sender
+    thread writes the queued events to the socket in newline delimited batches.
+
+    When Filebeat is unreachable and a spool directory is given, the events are appended to a spool file in it instead,
+    and the spool file is sent ahead of the new events once Filebeat is reachable again, possibly by another client
+    using the same spool directory once this one is closed. Without a spool directory, the events which could not be
+    sent are dropped, and the next call to flush or close returns False.
+
+    Queued events are flushed when the client is closed, or when the interpreter exits.
+    """
+
+    def __init__(self, logger, host="127.0.0.1", port=9000, timeout=20, queue_size=DEFAULT_QUEUE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE, spool_dir=None):
         self._logger = logger.getChild("filebeat_client")
         self._filebeat_host = host
         self._filebeat_port = port
         self._socket_timeout = timeout
         self._socket = None
+        self._next_connect_time = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._closed = False
 
-        self._open_socket()
+        self._spool_dir = spool_dir
+        self._spool_lock = threading.Lock()
+        self._spool_pending = False
+        self._spool_file = None
+        self._replay_files = []
+        self._client_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._replay_file_numbers = itertools.count()
+        if spool_dir is not None:
+            os.makedirs(spool_dir, exist_ok=True)
+            self._spool_pending = bool(self._list_spooled_files())
+
+        self.sent_event_count = 0
+        self.spooled_event_count = 0
+        self.dropped_event_count = 0
+        self._reported_dropped_event_count = 0
+
+        try:
+            self._open_socket()
+        except FilebeatExn:
+            if spool_dir is None:
+                raise
+            self._logger.warning(f"Failed to connect to Filebeat, events will be spooled to {spool_dir}")
+            self._next_connect_time = time.monotonic() + RECONNECT_INTERVAL
+
+        self._sender = threading.Thread(target=self._send_events, name="filebeat_client", daemon=True)
+        self._sender.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def _spool_path(self):
+        return os.path.join(self._spool_dir, f"{SPOOL_FILE_PREFIX}{self._client_id}{SPOOL_FILE_SUFFIX}")
+
+    def _check_dropped_events(self):
+        dropped_event_count = self.dropped_event_count - self._reported_dropped_event_count
+        self._reported_dropped_event_count += dropped_event_count
+        return dropped_event_count
 
     def send_event(self, payload, index, timestamp=None, pipeline="filebeat"):
+        """
+        Queues an event to send to Filebeat. When the queue is full, waits up to the socket timeout for the sender
+        thread to make room, then spools the event. Events dropped by the sender thread are reported by flush and
+        close, an exception means that this event was not queued.
+        :param payload: JSON serialisable payload of the event
+        :param index: Index of the event
+        :param timestamp: Timestamp of the event, defaults to now
+        :param pipeline: Ingest pipeline of the event
+        """
+        if self._closed:
+            raise FilebeatExn("The Filebeat client is closed")
+
         if timestamp is None:
             timestamp = datetime.datetime.utcnow().timestamp()
 
@@ -39,7 +145,52 @@ class FilebeatClient(object):
         data = data.encode()
 
         self._logger.debug(f"-> {data}")
-        self._send_data(data)
+        try:
+            self._queue.put(data, timeout=self._socket_timeout)
+        except queue.Full:
+            if self._spool_dir is None:
+                raise FilebeatExn("Timed out waiting for the queued events to be sent to Filebeat") from None
+            self._spool([data])
+
+    def flush(self, timeout=None):
+        """
+        Waits for the events queued so far to be sent, spooled or dropped.
+        :param timeout: Seconds to wait, forever if None
+        :return: True if the events were flushed, False on timeout or if events were dropped
+        """
+        flushed = threading.Event()
+        try:
+            self._queue.put(flushed, timeout=timeout)
+        except queue.Full:
+            return False
+        return flushed.wait(timeout) and not self._check_dropped_events()
+
+    def close(self, timeout=None):
+        """
+        Flushes the queued events and stops the sender thread.
+        :param timeout: Seconds to wait for the queued events to be flushed, forever if None
+        :return: True if every event was sent, False if events were dropped or are left in the spool
+        """
+        if not self._closed:
+            self._closed = True
+            atexit.unregister(self.close)
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._sender.join(timeout)
+            if not self._sender.is_alive():
+                if self._socket is not None:
+                    self._socket.close()
+                    self._socket = None
+                # Unlock the files left to send so that other clients can claim them
+                with self._spool_lock:
+                    if self._spool_file is not None:
+                        self._spool_file.close()
+                        self._spool_file = None
+                for _, replay_file in self._replay_files:
+                    replay_file.close()
+        return not self.dropped_event_count and not self._spool_pending and self._queue.empty()
 
     def _open_socket(self):
         self._logger.info(f"Connecting to Filebeat on {self._filebeat_host}:{self._filebeat_port}")
@@ -49,19 +200,200 @@ class FilebeatClient(object):
 
         try:
             self._socket.connect((self._filebeat_host, self._filebeat_port))
-        except (ConnectionError, socket.timeout):
+        except (OSError, socket.timeout):
+            self._socket.close()
+            self._socket = None
             raise FilebeatExn("Failed to connect to Filebeat") from None
 
-    def _send_data(self, data):
-        total_sent = 0
+    def _connect(self):
+        """
+        Reconnects to Filebeat if the socket was closed. After a failed connection, the events are spooled without
+        trying to connect for RECONNECT_INTERVAL seconds if there is a spool directory.
+        :return: True if connected
+        """
+        if self._socket is None and (self._spool_dir is None or time.monotonic() >= self._next_connect_time):
+            try:
+                self._open_socket()
+            except FilebeatExn:
+                self._logger.debug("Filebeat is still unreachable")
+                self._next_connect_time = time.monotonic() + RECONNECT_INTERVAL
+        return self._socket is not None
 
-        while total_sent < len(data):
+    def _send_events(self):
+        while True:
+            item = self._queue.get()
+            lines = []
+            flushed_events = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                elif isinstance(item, threading.Event):
+                    flushed_events.append(item)
+                else:
+                    lines.append(item)
+                    if len(lines) >= self._batch_size:
+                        break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if lines or self._spool_pending:
+                try:
+                    self._deliver(lines)
+                except Exception:
+                    # keep the sender thread alive so flush() and close() return
+                    self._logger.exception(f"Failed to deliver {len(lines)} events to Filebeat")
+                    self.dropped_event_count += len(lines)
+            for flushed in flushed_events:
+                flushed.set()
+            if stop:
+                return
+
+    def _deliver(self, lines):
+        if self._connect() and self._replay_spool() and (not lines or self._send_data(b"".join(lines))):
+            self.sent_event_count += len(lines)
+        elif self._spool_dir is not None:
+            self._spool(lines)
+        elif lines:
+            self._logger.error(f"Failed to send {len(lines)} events to Filebeat")
+            self.dropped_event_count += len(lines)
+
+    def _send_data(self, data):
+        """
+        Writes data to the socket, reconnecting and resending it once if the socket was closed by Filebeat.
+        When the data cannot be sent after a connection succeeded, the next batch tries to reconnect right away.
+        :return: True if the data was sent
+        """
+        for attempt in range(2):
+            if self._socket is None:
+                try:
+                    self._open_socket()
+                except FilebeatExn:
+                    self._next_connect_time = time.monotonic() + RECONNECT_INTERVAL
+                    return False
             try:
-                sent = self._socket.send(data[total_sent:])
-            except BrokenPipeError:
+                self._socket.sendall(data)
+                return True
+            except (OSError, socket.timeout):
                 self._logger.debug("Filebeat socket closed by peer")
                 self._socket.close()
-                self._open_socket()
-                total_sent = 0
-            else:
-                total_sent = total_sent + sent
+                self._socket = None
+        return False
+
+    def _spool(self, lines):
+        if not lines:
+            return
+        with self._spool_lock:
+            if self._spool_file is None:
+                self._spool_file = self._create_spool_file()
+            self._spool_file.write(b"".join(lines))
+            self._spool_file.flush()
+            self.spooled_event_count += len(lines)
+            self._spool_pending = True
+        self._logger.debug(f"Spooled {len(lines)} events to {self._spool_path}")
+
+    def _create_spool_file(self):
+        if fcntl is None:
+            return open(self._spool_path, "ab")
+        # The file is locked before it gets a spool file name, so that other clients never claim it while it is used
+        temp_spool_path = self._spool_path + ".tmp"
+        spool_file = open(temp_spool_path, "ab")
+        try:
+            _lock_file(spool_file)
+            os.replace(temp_spool_path, self._spool_path)
+        except OSError:
+            spool_file.close()
+            raise
+        return spool_file
+
+    def _list_spooled_files(self):
+        return sorted(name for name in os.listdir(self._spool_dir)
+                      if name.startswith((SPOOL_FILE_PREFIX, REPLAY_FILE_PREFIX)) and name.endswith(SPOOL_FILE_SUFFIX))
+
+    def _claim_file(self, path):
+        """
+        Renames a spool or replay file which is not used by another client to a replay file of this client.
+        :return: The (path, open and locked file) of the replay file, or None if the file is used by another client
+        """
+        replay_path = os.path.join(self._spool_dir, f"{REPLAY_FILE_PREFIX}{self._client_id}."
+                                                    f"{next(self._replay_file_numbers)}{SPOOL_FILE_SUFFIX}")
+        try:
+            if fcntl is None:
+                os.replace(path, replay_path)
+                return replay_path, open(replay_path, "rb")
+            replay_file = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            _lock_file(replay_file)
+            # The file may have been claimed and sent by another client between the open and the lock
+            if os.fstat(replay_file.fileno()).st_ino == os.stat(path).st_ino:
+                os.replace(path, replay_path)
+                return replay_path, replay_file
+        except OSError:
+            pass
+        replay_file.close()
+        return None
+
+    def _claim_spooled_files(self):
+        # Closing the spool file unlocks it, the next spooled events go to a new spool file
+        with self._spool_lock:
+            if self._spool_file is not None:
+                self._spool_file.close()
+                self._spool_file = None
+        claimed_paths = {path for path, _ in self._replay_files}
+        for name in self._list_spooled_files():
+            path = os.path.join(self._spool_dir, name)
+            if path not in claimed_paths:
+                claimed_file = self._claim_file(path)
+                if claimed_file is not None:
+                    self._replay_files.append(claimed_file)
+
+    def _send_replay_file(self, replay_file):
+        event_count = 0
+        replay_file.seek(0)
+        lines = []
+        for line in replay_file:
+            lines.append(line if line.endswith(b"\n") else line + b"\n")
+            if len(lines) >= self._batch_size:
+                if not self._send_data(b"".join(lines)):
+                    return None
+                event_count += len(lines)
+                lines = []
+        if lines and not self._send_data(b"".join(lines)):
+            return None
+        return event_count + len(lines)
+
+    def _replay_spool(self):
+        """
+        Sends the spooled events, which are older than the queued ones.
+        :return: True if the spool is empty, False if Filebeat became unreachable while sending it
+        """
+        while self._spool_pending:
+            self._claim_spooled_files()
+            while self._replay_files:
+                # A replay file left by a failed replay is sent again in full, the events are sent at least once
+                replay_path, replay_file = self._replay_files[0]
+                event_count = self._send_replay_file(replay_file)
+                if event_count is None:
+                    return False
+                if fcntl is not None:
+                    # Removed while it is locked, so that no other client claims it
+                    os.remove(replay_path)
+                    replay_file.close()
+                else:
+                    replay_file.close()
+                    try:
+                        os.remove(replay_path)
+                    except OSError:
+                        pass
+                del self._replay_files[0]
+                self.sent_event_count += event_count
+                self._logger.info(f"Sent {event_count} spooled events to Filebeat")
+
+            with self._spool_lock:
+                self._spool_pending = self._spool_file is not None
+        return True
@@ -4,14 +4,121 @@ Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright
 SPDX-License-Identifier: Apache-2.0 OR MIT
 """
 
+import array
+import collections.abc
+import functools
 import logging
+import mmap
+import os
 import re
-from typing import List, Optional, Dict, Generator, Tuple
+from typing import List, Optional, Dict, Generator, Iterable, Tuple
 import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _build_line_dispatch(int_lines: Tuple, float_lines: Tuple, tuple_lines: Tuple, str_lines: Tuple,
+                         errors_warnings: re.Pattern) -> Dict[str, List]:
+    """
+    Groups the line parsing regular expressions by the literal first word they match, so a line only has to be tested
+    against the few expressions sharing its first word instead of every expression.
+    Every expression must start with '^' followed by a literal word.
+
+    :return: dictionary of first word -> list of (compiled regex, run key or tuple of run keys, converter function)
+    """
+    dispatch = {}
+
+    def add(pattern, run_keys, converter):
+        first_word = pattern.pattern.lstrip("^").split(" ", 1)[0]
+        dispatch.setdefault(first_word, []).append((pattern, run_keys, converter))
+
+    for pattern, run_key in int_lines:
+        add(pattern, run_key, lambda groups: int(groups[0]))
+    for pattern, run_key in float_lines:
+        add(pattern, run_key, lambda groups: float(groups[0]))
+    for pattern, run_key in tuple_lines:
+        add(pattern, run_key, lambda groups: (int(groups[0]), int(groups[1])))
+    for pattern, run_key in str_lines:
+        add(pattern, run_key, lambda groups: groups[0])
+    # JobLogs log both errors and warnings on the same line
+    add(errors_warnings, ("Errors", "Warnings"), lambda groups: (int(groups[0]), int(groups[1])))
+    return dispatch
+
+
+class MappedLogLines(collections.abc.Sequence):
+    """
+    Read-only sequence of the trimmed lines of one run, stored as byte offsets into a memory mapped log file.
+    Lines are decoded when accessed, so a run only costs 16 bytes per line regardless of the line lengths.
+    """
+
+    def __init__(self, buffer: mmap.mmap) -> None:
+        self._buffer = buffer
+        self._starts = array.array("Q")
+        self._ends = array.array("Q")
+
+    def _append_span(self, start: int, end: int) -> None:
+        self._starts.append(start)
+        self._ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._buffer[self._starts[index]:self._ends[index]].decode("utf-8", errors="replace")
+
+
+class _LineTokenIndex:
+    """
+    Inverted index of the words found in the lines of a run, used to narrow down the lines which can contain a
+    searched string before testing them.
+    """
+
+    _TOKEN_RE = re.compile(r"\w+")
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self._postings = {}
+        for line_index, line in enumerate(lines):
+            for token in set(self._TOKEN_RE.findall(line)):
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = array.array("I")
+                postings.append(line_index)
+
+    def _token_line_indexes(self, token: str, whole_start: bool, whole_end: bool) -> set:
+        # A word at the edge of the searched string can be the end, start or middle of a longer word in the line
+        if whole_start and whole_end:
+            matching_tokens = [token] if token in self._postings else []
+        elif whole_start:
+            matching_tokens = [indexed for indexed in self._postings if indexed.startswith(token)]
+        elif whole_end:
+            matching_tokens = [indexed for indexed in self._postings if indexed.endswith(token)]
+        else:
+            matching_tokens = [indexed for indexed in self._postings if token in indexed]
+        line_indexes = set()
+        for matching_token in matching_tokens:
+            line_indexes.update(self._postings[matching_token])
+        return line_indexes
+
+    def candidate_lines(self, search_strings: List[str]) -> Optional[set]:
+        """
+        Returns the indexes of the lines which may contain all of the search strings, or None if the search strings
+        contain no words to look up and every line is a candidate.
+        """
+        candidates = None
+        for search_string in search_strings:
+            for match in self._TOKEN_RE.finditer(search_string):
+                line_indexes = self._token_line_indexes(match.group(), match.start() > 0,
+                                                        match.end() < len(search_string))
+                candidates = line_indexes if candidates is None else candidates & line_indexes
+                if not candidates:
+                    return candidates
+        return candidates
+
+
 class APOutputParser:
     """
     Asset Processor Parser to extract information from generic asset processor output.
@@ -24,6 +131,7 @@ class APOutputParser:
     _NEW_RUN_LINE = "AzFramework File Logging New Run"
 
     # Regular expression constants and keys used for looking up information later.
+    # Each expression must start with a literal word, lines are dispatched to the expressions by their first word.
     _RE_INT_LINES = (  # Extract an integer
         (re.compile(r"^Number of Assets Successfully Processed: (\d*)."), "Successes"),
         (re.compile(r"^Number of Assets Failed to Process: (\d*)."), "Failures"),
@@ -46,6 +154,7 @@ class APOutputParser:
 
     def __init__(self, raw_output: str) -> None:
         self._runs = []
+        self._line_indexes = {}
 
         self.log_type = "Output"
         self._parse_lines(raw_output)
@@ -60,8 +169,8 @@ class APOutputParser:
         """
         Returns all runs from the log as a list of dictionaries.
         Dictionary keys are as follows:
-            ["Lines"]: [str] - All lines from the log for that run.
-            ["Timestamps"]: [int] - Timestamp from each entry in Lines list
+            ["Lines"]: [str] - All lines from the log for that run. A read-only sequence for APLogParser.
+            ["Timestamps"]: array of int - Timestamp from each entry in Lines list
             ["Errors"]: int - the number of errors produced.
             ["Warnings"]: int - the number of warnings produced.
             ["Successes"]: int - the recorded number of successful assets processed.
@@ -77,6 +186,10 @@ class APOutputParser:
         """
         return self._runs
 
+    def iter_runs(self) -> Generator[Dict, None, None]:
+        """Yields the runs from the log one at a time. See runs for the dictionary keys."""
+        yield from self.runs
+
     def get_line_type(self, line: str) -> str:
         """Parses the line type from a trimmed log line. See: APLogParser._trim_line(self, line)"""
         split = line.split(self._SEPARATOR, 1)
@@ -100,50 +213,82 @@ class APOutputParser:
         Filter results returned using the [contains] string.
         Or return a regex match object via the [regex] string.
         Prioritizes [regex] searching over [contains] searching.
+        [contains] searches use an index of the words in each run, built on the first search of that run.
 
         :param run: The index of the run to search. If None, all runs are searched
         :param contains: A string (or list of strings) to search for in the log
         :param regex: A regular expression string to use to search the log.
         :return: Each line that matches
         """
-        runs_to_search = []
+        runs = self.runs
         if run is None:
-            runs_to_search = self._runs
+            run_indexes = range(len(runs))
         else:
-            runs_to_search.append(self._runs[run])
-        for run in runs_to_search:
-            for line in run["Lines"]:
-                if regex is not None:
-                    match = re.match(regex, line)
+            run_indexes = [range(len(runs))[run]]
+
+        if regex is not None:
+            pattern = re.compile(regex)
+            for run_index in run_indexes:
+                for line in runs[run_index]["Lines"]:
+                    match = pattern.match(line)
                     if match:
                         yield match
-                elif contains is not None:
-                    if type(contains) == str:
-                        contains = [contains]
-
+        elif contains is not None:
+            if type(contains) == str:
+                contains = [contains]
+            for run_index in run_indexes:
+                lines = runs[run_index]["Lines"]
+                candidates = self._get_line_index(run_index).candidate_lines(contains)
+                candidate_lines = (lines[i] for i in sorted(candidates)) if candidates is not None else lines
+                for line in candidate_lines:
                     # List comprehension returns empty list if all search strings are in the line
                     if not [True for search_string in contains if search_string not in line]:
                         yield line
-                else:
-                    yield line
+        else:
+            for run_index in run_indexes:
+                yield from runs[run_index]["Lines"]
+
+    def _get_line_index(self, run_index: int) -> _LineTokenIndex:
+        line_index = self._line_indexes.get(run_index)
+        if line_index is None:
+            line_index = self._line_indexes[run_index] = _LineTokenIndex(self.runs[run_index]["Lines"])
+        return line_index
 
     def _parse_lines(self, all_lines: str):
-        current_run = self._create_log_dict()
-        for i, line in enumerate(all_lines):
-            trimmed, timestamp = self._trim_line(line)
+        self._runs = list(self._iter_runs(
+            ((self._NEW_RUN_LINE in all_lines[i - 1],) + self._trim_line(line) + (None,)
+             for i, line in enumerate(all_lines)),
+            list))
+
+    def _iter_runs(self, parsed_lines: Iterable[Tuple[bool, str, int, Optional[Tuple[int, int]]]],
+                   create_lines: callable) -> Generator[Dict, None, None]:
+        """
+        Groups parsed log lines into runs, yielding each run once the next one starts.
+
+        :param parsed_lines: iterable of (whether the previous raw line started a new run, trimmed line, timestamp,
+            (start, end) span of the trimmed line in the log file or None to store the trimmed line itself)
+        :param create_lines: returns the empty container to store the lines of a run in
+        :return: Each run, see runs for the dictionary keys
+        """
+        current_run = self._create_log_dict(create_lines())
+        for previous_line_is_new_run, trimmed, timestamp, span in parsed_lines:
             line_type = self.get_line_type(trimmed)
             if trimmed and line_type:
                 if line_type != self._NONE_LINE:
                     # not a "None" line, digest the line
+                    if span is None:
+                        current_run["Lines"].append(trimmed)
+                    else:
+                        current_run["Lines"]._append_span(*span)
                     self._digest_line(trimmed, current_run, timestamp)
-                elif self._NEW_RUN_LINE in all_lines[i - 1] and current_run["Lines"]:
+                elif previous_line_is_new_run and current_run["Lines"]:
                     # Hit the end of a "run" in the log. Store it, clear it and continue
-                    self._runs.append(current_run)
-                    current_run = self._create_log_dict()
+                    yield current_run
+                    current_run = self._create_log_dict(create_lines())
         if current_run["Lines"]:
-            self._runs.append(current_run)
+            yield current_run
 
-    def _trim_line(self, line: str) -> str:
+    def _trim_line(self, line: str) -> Tuple[str, int]:
 
         """ For raw input in APOutputParser simply returns the line (Already "trimmed")
         APLogParser's implementation trims a raw log line to remove the first 3 sections when using a log
@@ -152,51 +297,29 @@ class APOutputParser:
         return line, int(round(time.time() * 1000))
 
     def _digest_line(self, trimmed_line: str, current_run: Dict, line_timestamp: int) -> None:
-        """Extracts relevant information (if present) and adds line to list of all lines"""
-        line_type = self.get_line_type(trimmed_line)
-        # Store all lines under ["Lines"]
-        if line_type in current_run.keys():
-            current_run[line_type].append(trimmed_line.split(self._SEPARATOR)[1])
-        current_run["Lines"].append(trimmed_line)
+        """Extracts relevant information (if present) from a line already stored in current_run["Lines"]"""
         current_run["Timestamps"].append(line_timestamp)
         trimmed_line = self.remove_line_type(trimmed_line)
 
-        # Parse useful data if present. Parsing rules declared in static constants.
-        for pattern, run_key in self._RE_INT_LINES:
-            # Look for integer data (Errors, warnings... etc.)
+        # Parse useful data if present. Parsing rules declared in static constants, looked up by the first word.
+        dispatch = _build_line_dispatch(self._RE_INT_LINES, self._RE_FLOAT_LINES, self._RE_TUPLE_LINES,
+                                        self._RE_STR_LINES, self._RE_ERRORS_WARNINGS)
+        for pattern, run_keys, converter in dispatch.get(trimmed_line.split(" ", 1)[0], ()):
             result = pattern.match(trimmed_line)
             if result:
-                current_run[run_key] = int(result.groups()[0])
-                return
-        for pattern, run_key in self._RE_FLOAT_LINES:
-            # Look for float data (Time... etc.)
-            result = pattern.match(trimmed_line)
-            if result:
-                current_run[run_key] = float(result.groups()[0])
-                return
-        for pattern, run_key in self._RE_TUPLE_LINES:
-            # Look for tuple data ("x / y files required full analysis"... etc.)
-            result = pattern.match(trimmed_line)
-            if result:
-                current_run[run_key] = (int(result.groups()[0]), int(result.groups()[1]))
-                return
-        for pattern, run_key in self._RE_STR_LINES:
-            # Look for string data (Source, Platform... etc.)
-            result = pattern.match(trimmed_line)
-            if result:
-                current_run[run_key] = result.groups()[0]
+                value = converter(result.groups())
+                if isinstance(run_keys, tuple):
+                    for run_key, run_value in zip(run_keys, value):
+                        current_run[run_key] = run_value
+                else:
+                    current_run[run_keys] = value
                 return
-        # JobLog Errors /  Warnings are reported on a single line. Handle separately
-        result = self._RE_ERRORS_WARNINGS.match(trimmed_line)
-        if result and len(result.groups()) == 2:
-            current_run["Errors"] = int(result.groups()[0])
-            current_run["Warnings"] = int(result.groups()[1])
 
     @staticmethod
-    def _create_log_dict() -> Dict:
+    def _create_log_dict(lines: List = None) -> Dict:
         """Creates a dictionary ready to used to store log information"""
         return {
-            "Lines": [],
+            "Lines": lines if lines is not None else [],
             "Errors": None,
             "Successes": None,
             "Warnings": None,
@@ -204,13 +327,16 @@ class APOutputParser:
             "Full Analysis": None,
             "Source": None,
             "Platforms:": None,
-            "Timestamps": []
+            "Timestamps": array.array("q")
         }
 
 
 class APLogParser(APOutputParser):
     """
     Asset Processor Log Parser to extract information from an asset processor log.
+    The log file is memory mapped and the lines of each run are kept as offsets into the file, which stays mapped
+    while any of the runs are referenced. Call close(), or use the parser as a context manager, to unmap the file so
+    that it can be truncated or deleted.
     Immutable.
     """
 
@@ -219,8 +345,16 @@ class APLogParser(APOutputParser):
     _NONE_LINE = "none"
     _NEW_RUN_LINE = "AzFramework File Logging New Run"
 
-    def __init__(self, file_path: str, raw_output: str = None) -> None:
-        self._runs = []
+    def __init__(self, file_path: str, raw_output: str = None, lazy: bool = False) -> None:
+        """
+        :param file_path: path of the asset processor log file to parse
+        :param raw_output: unused
+        :param lazy: if True the file is not parsed until the runs are requested, and iter_runs() streams the runs
+            from the file without keeping them
+        """
+        self._runs = None
+        self._line_indexes = {}
+        self._run_lines = weakref.WeakSet()
         self._file_path = file_path
         self.log_type = None
         if "JobLogs" in file_path:
@@ -230,25 +364,108 @@ class APLogParser(APOutputParser):
         elif "AP_GUI" in file_path:
             self.log_type = "GUI"
 
-        self._parse_file()
+        if not lazy:
+            self._parse_file()
+
+    def __enter__(self) -> "APLogParser":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmaps the log file. The lines of the runs returned before can no longer be read, the runs are parsed again
+        from the file if they are requested afterwards.
+        """
+        self._runs = None
+        self._line_indexes = {}
+        for lines in list(self._run_lines):
+            lines._buffer.close()
+        self._run_lines = weakref.WeakSet()
 
     @property
     def file_path(self) -> str:
         """Parsed log file path"""
         return self._file_path
 
+    @property
+    def runs(self) -> List[Dict]:
+        """Returns all runs from the log as a list of dictionaries, see APOutputParser.runs"""
+        if self._runs is None:
+            self._parse_file()
+        return self._runs
+
+    def iter_runs(self) -> Generator[Dict, None, None]:
+        """
+        Yields the runs from the log one at a time. If the file has not been parsed yet the runs are streamed from it
+        and are not kept, so only one run is held in memory at a time. The file is unmapped once the runs are
+        streamed and no longer referenced by the caller.
+        """
+        if self._runs is not None:
+            yield from self._runs
+        else:
+            yield from self._iter_file_runs()
+
     def _parse_file(self) -> None:
         """
         Parses the APLogParser's file and populates a "run" for every AP logging run present.
         """
+        self._line_indexes = {}
+        self._runs = list(self._iter_file_runs())
+
+    def _iter_file_runs(self) -> Generator[Dict, None, None]:
+        logger.info(f"Parsing log file file: {self._file_path}")
         try:
-            logger.info(f"Parsing log file file: {self._file_path}")
-            with open(self._file_path, "r") as log_file:
-                all_lines = log_file.readlines()
-                self._parse_lines(all_lines)
+            with open(self._file_path, "rb") as log_file:
+                if os.fstat(log_file.fileno()).st_size == 0:
+                    return
+                buffer = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
         except OSError:
             logger.error(f"Error opening file: {self._file_path}")
-            self._runs = []
+            return
+
+        run_lines = weakref.WeakSet()
+
+        def create_lines() -> MappedLogLines:
+            lines = MappedLogLines(buffer)
+            run_lines.add(lines)
+            self._run_lines.add(lines)
+            return lines
+
+        try:
+            yield from self._iter_runs(self._iter_mapped_lines(buffer), create_lines)
+        finally:
+            # The runs which are still referenced read their lines from the mapping, it is then unmapped when they are
+            # released or by close()
+            if not run_lines:
+                buffer.close()
+
+    def _iter_mapped_lines(self, buffer: mmap.mmap) -> Generator[Tuple[bool, str, int, Tuple[int, int]], None, None]:
+        """Yields the parsed lines of the memory mapped log file, see APOutputParser._iter_runs"""
+        new_run_line = self._NEW_RUN_LINE.encode()
+        separator = self._SEPARATOR.encode()
+        buffer_size = len(buffer)
+        previous_line = b""
+        line_start = 0
+        while line_start < buffer_size:
+            line_end = buffer.find(b"\n", line_start)
+            if line_end == -1:
+                line_end = buffer_size
+            raw_line = buffer[line_start:line_end]
+            previous_line_is_new_run = new_run_line in previous_line
+            previous_line = raw_line
+
+            stripped = raw_line.lstrip()
+            split = stripped.rstrip().split(separator, 4)
+            if len(split) > 4:
+                trimmed_start = line_start + len(raw_line) - len(stripped)
+                trimmed_start += sum(len(section) for section in split[:4]) + 4 * len(separator)
+                trimmed_span = (trimmed_start, trimmed_start + len(split[4]))
+                yield previous_line_is_new_run, split[4].decode("utf-8", errors="replace"), int(split[1]), trimmed_span
+            else:
+                yield previous_line_is_new_run, "", 0, None
+            line_start = line_end + 1
 
     def _trim_line(self, line: str) -> Tuple[str, int]:
 
@@ -182,15 +182,15 @@ class AssetProcessor(object):
             if not os.path.exists(self._workspace.paths.ap_gui_log()):
                 logger.debug(f"Log at {self._workspace.paths.ap_gui_log()} doesn't exist, sleeping")
             else:
-                log = APLogParser(self._workspace.paths.ap_gui_log())
-                if len(log.runs):
-                    try:
-                        port = log.runs[-1][port_type]
-                        if port:
-                            logger.info(f"Read port type {port_type} : {port}")
-                            return port
-                    except Exception:  # intentionally broad
-                        pass
+                with APLogParser(self._workspace.paths.ap_gui_log()) as log:
+                    if len(log.runs):
+                        try:
+                            port = log.runs[-1][port_type]
+                            if port:
+                                logger.info(f"Read port type {port_type} : {port}")
+                                return port
+                        except Exception:  # intentionally broad
+                            pass
             time.sleep(1)
         logger.warning(f"Failed to read port type {port_type}")
         return 0
@@ -9,14 +9,21 @@ Small library of functions to support autotests for asset processor
 
 # Import builtin libraries
 import pytest
+import atexit
 import binascii
+import collections
+import concurrent.futures
 import hashlib
+import json
 import os
 import re
 import hashlib
 import shutil
 import logging
 import subprocess
+import tempfile
+import threading
+import time
 import psutil
 from configparser import ConfigParser
 from typing import Dict, List, Tuple, Optional, Callable
@@ -32,6 +39,14 @@ logger = logging.getLogger(__name__)
 AP_FASTSCAN_KEY = r"Software\O3DE\O3DE Asset Processor\Options"
 AP_FASTSCAN_SUBKEY = r"EnableZeroAnalysis"
 
+# Persistent file hash cache location and format
+FILE_HASH_CACHE_PATH = os.path.join(tempfile.gettempdir(), "LyTestTools", "file_hash_cache.json")
+FILE_HASH_CACHE_VERSION = 1
+FILE_HASH_BUFFER_SIZE = 1024 * 1024
+# Files modified within this many nanoseconds of being hashed are not cached, as a file system with coarse timestamps
+# could give the same modification time to a later write
+FILE_HASH_RECENT_MODIFICATION_NS = 2 * 1000 * 1000 * 1000
+
 
 class ProcessOutput(object):
     # Process data holding object
@@ -43,6 +58,130 @@ class ProcessOutput(object):
         self.exception_occurred = False
 
 
+class FileHashCache(object):
+    """
+    Hashes file contents and keeps a persistent cache of the digests keyed by file path, size and modification time,
+    so unchanged files are not read again by later calls or later test runs.
+    """
+
+    def __init__(self, cache_file: str = FILE_HASH_CACHE_PATH, buffer_size: int = FILE_HASH_BUFFER_SIZE) -> None:
+        """
+        :param cache_file: Path to the json file the digests are persisted in, or None to only cache in memory
+        :param buffer_size: Size of the chunks files are read in
+        """
+        self.cache_file = cache_file
+        self.buffer_size = buffer_size
+        self._entries = None
+        self._modified = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        self._entries = {}
+        if not self.cache_file or not os.path.isfile(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r") as cache_file:
+                cache_data = json.load(cache_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"File hash cache '{self.cache_file}' failed to load, it will be rebuilt: {e}")
+            return
+        if cache_data.get("version") == FILE_HASH_CACHE_VERSION:
+            self._entries = cache_data.get("algorithms", {})
+
+    def save(self) -> None:
+        """
+        Atomically writes the cached digests to the cache file if any were added since it was loaded
+
+        :return: None
+        """
+        with self._lock:
+            if not self._modified or not self.cache_file:
+                return
+            temp_cache_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+                with open(temp_cache_file, "w") as cache_file:
+                    json.dump({"version": FILE_HASH_CACHE_VERSION, "algorithms": self._entries}, cache_file,
+                              separators=(",", ":"))
+                os.replace(temp_cache_file, self.cache_file)
+            except OSError as e:
+                logger.warning(f"File hash cache '{self.cache_file}' failed to save: {e}")
+                return
+            self._modified = False
+
+    def _hash_file(self, file_path: str, algorithm: str) -> str:
+        file_hash = hashlib.new(algorithm)
+        with open(file_path, "rb") as hashed_file:
+            while True:
+                data = hashed_file.read(self.buffer_size)
+                if not data:
+                    break
+                file_hash.update(data)
+        return file_hash.hexdigest()
+
+    def get_hash(self, file_path: str, algorithm: str = "sha256") -> str:
+        """
+        Returns the hex digest of the file contents, from the cache if the file is unchanged since it was last hashed
+
+        :param file_path: Path to the file to hash
+        :param algorithm: Name of the hashlib algorithm to use
+        :return: Hex digest of the file contents. Raises OSError if the file cannot be read.
+        """
+        file_path = os.path.abspath(file_path)
+        file_stat = os.stat(file_path)
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            entry = self._entries.get(algorithm, {}).get(file_path)
+        if entry and entry[0] == file_stat.st_size and entry[1] == file_stat.st_mtime_ns:
+            return entry[2]
+
+        digest = self._hash_file(file_path, algorithm)
+        if time.time_ns() - file_stat.st_mtime_ns >= FILE_HASH_RECENT_MODIFICATION_NS:
+            with self._lock:
+                self._entries.setdefault(algorithm, {})[file_path] = [file_stat.st_size, file_stat.st_mtime_ns, digest]
+                self._modified = True
+        return digest
+
+    def get_hashes(self, file_paths: List[str], algorithm: str = "sha256",
+                   max_workers: int = None) -> Dict[str, str or OSError]:
+        """
+        Hashes many files in parallel, reading only the files which changed since they were last hashed.
+
+        :param file_paths: Paths to the files to hash
+        :param algorithm: Name of the hashlib algorithm to use
+        :param max_workers: Maximum number of files hashed at once, defaults to the ThreadPoolExecutor default
+        :return: Dict of file path -> hex digest, or the OSError raised while reading that file
+        """
+        def get_hash_or_error(file_path):
+            try:
+                return self.get_hash(file_path, algorithm)
+            except OSError as e:
+                return e
+
+        # hashlib releases the GIL while hashing large buffers, so threads hash files in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            file_hashes = dict(zip(file_paths, executor.map(get_hash_or_error, file_paths)))
+        self.save()
+        return file_hashes
+
+
+_file_hash_cache = None
+
+
+def get_file_hash_cache() -> FileHashCache:
+    """
+    Returns the FileHashCache shared by the hashing helpers, which is saved when the process exits
+
+    :return: The shared FileHashCache
+    """
+    global _file_hash_cache
+    if _file_hash_cache is None:
+        _file_hash_cache = FileHashCache()
+        atexit.register(_file_hash_cache.save)
+    return _file_hash_cache
+
+
 def compare_assets_with_cache(assets: List[str], assets_cache_path: str) -> Tuple[List[str], List[str]]:
     """
     Given a list of assets names, will try to find them (disrespecting file extensions)
@@ -55,12 +194,13 @@ def compare_assets_with_cache(assets: List[str], assets_cache_path: str) -> Tupl
     missing_assets = []
     existing_assets = []
     if os.path.exists(assets_cache_path):
-        files_in_cache = list(map(fs.remove_path_and_extension, os.listdir(assets_cache_path)))
+        # Count of each name in the cache, every cache file can only match one asset
+        files_in_cache = collections.Counter(map(fs.remove_path_and_extension, os.listdir(assets_cache_path)))
         for asset in assets:
             file_without_ext = fs.remove_path_and_extension(asset).lower()
-            if file_without_ext in files_in_cache:
+            if files_in_cache[file_without_ext] > 0:
                 existing_assets.append(file_without_ext)
-                files_in_cache.remove(file_without_ext)
+                files_in_cache[file_without_ext] -= 1
             else:
                 missing_assets.append(file_without_ext)
     else:
@@ -151,20 +291,30 @@ def clear_project_test_assets_dir(test_assets_dir: str) -> None:
     os.mkdir(test_assets_dir)
 
 
-def get_files_hashsum(path_to_files_dir: str) -> Dict[str, int]:
+def get_files_hashsum(path_to_files_dir: str, max_workers: int = None) -> Dict[str, bytes]:
     """
-    On call - calculates md5 hashsums for filecontents.
+    On call - calculates sha256 hashsums for filecontents, in parallel. Unchanged files reuse the hashsum stored in the
+    persistent file hash cache.
 
     :param path_to_files_dir: A path to files directory
+    :param max_workers: Maximum number of files hashed at once
     :return: Returns a dict with initial filenames from path_to_files_dir as keys and their contents hashsums as values
     """
     checksum_dict = {}
     try:
-        for fname in os.listdir(path_to_files_dir):
-            with open(os.path.join(path_to_files_dir, fname), "rb") as fopen:
-                checksum_dict[fname] = hashlib.sha256(fopen.read()).digest()
+        file_names = os.listdir(path_to_files_dir)
     except IOError:
         logger.error("An error occurred trying to read file")
+        return checksum_dict
+
+    file_paths = [os.path.join(path_to_files_dir, fname) for fname in file_names]
+    file_hashes = get_file_hash_cache().get_hashes(file_paths, "sha256", max_workers)
+    for fname, file_path in zip(file_names, file_paths):
+        file_hash = file_hashes[file_path]
+        if isinstance(file_hash, OSError):
+            logger.error(f"An error occurred trying to read file '{file_path}': {file_hash}")
+        else:
+            checksum_dict[fname] = bytes.fromhex(file_hash)
     return checksum_dict
 
 
@@ -478,7 +628,8 @@ def validate_log_messages(
     """
 
     # Search the log lines in the latest log run
-    validate_log_output(APLogParser(log_file).runs[-1]["Lines"], expected_queries, unexpected_queries)
+    with APLogParser(log_file) as log:
+        validate_log_output(log.runs[-1]["Lines"], expected_queries, unexpected_queries)
 
 
 def validate_relocation_report(
@@ -501,18 +652,19 @@ def validate_relocation_report(
     in_relocation_report = False
 
     # Search the log lines which appear between opening and closing RELOCATION REPORT lines in the latest log run
-    for line in APLogParser(log_file).runs[-1]["Lines"]:
-        if "RELOCATION REPORT" in line:
-            in_relocation_report = not in_relocation_report
-            continue  # Go to next log line
-
-        if in_relocation_report:
-            # Remove queries expectedly found in the relocation report from queries to expect
-            for found_query in find_queries(line, expected_queries):
-                expected_queries.remove(found_query)
-            # Save unexpectedly found lines
-            if find_queries(line, unexpected_queries):
-                unexpectedly_found.append(line)
+    with APLogParser(log_file) as log:
+        for line in log.runs[-1]["Lines"]:
+            if "RELOCATION REPORT" in line:
+                in_relocation_report = not in_relocation_report
+                continue  # Go to next log line
+
+            if in_relocation_report:
+                # Remove queries expectedly found in the relocation report from queries to expect
+                for found_query in find_queries(line, expected_queries):
+                    expected_queries.remove(found_query)
+                # Save unexpectedly found lines
+                if find_queries(line, unexpected_queries):
+                    unexpectedly_found.append(line)
 
     # Assert no unexpected lines found and all expected queries found
     assert unexpectedly_found == [], f"Unexpected line(s) were found in the relocation report: {unexpectedly_found}"
@@ -566,12 +718,9 @@ def check_for_perforce():
 
 
 def get_file_hash(filePath, hashBufferSize = 65536):
+    """
+    Returns the sha1 hex digest of the file contents, from the persistent file hash cache if the file is unchanged.
+    hashBufferSize is kept for compatibility, files are read in chunks of FILE_HASH_BUFFER_SIZE.
+    """
     assert os.path.exists(filePath), f"Cannot get file hash, file at path '{filePath}' does not exist."
-    sha1 = hashlib.sha1()
-    with open(filePath, 'rb') as cacheFile:
-        while True:
-            data = cacheFile.read(hashBufferSize)
-            if not data:
-                break
-            sha1.update(data)
-    return sha1.hexdigest()
+    return get_file_hash_cache().get_hash(filePath, "sha1")
@@ -0,0 +1,128 @@
+"""
+Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+
+SPDX-License-Identifier: Apache-2.0 OR MIT
+
+Unit tests for ly_test_tools.o3de.ap_log_parser
+"""
+
+import weakref
+
+import pytest
+
+import ly_test_tools.o3de.ap_log_parser as ap_log_parser
+
+pytestmark = pytest.mark.SUITE_smoke
+
+AP_LOG_CONTENTS = (
+    "~~1000~~1~~0001~~AssetProcessor~~Number of Assets Successfully Processed: 5.\n"
+    "~~1001~~1~~0001~~AssetProcessor~~Total Assets Processing Time: 1.5s\r\n"
+    "~~1002~~1~~0001~~AssetProcessor~~AzFramework File Logging New Run\n"
+    "~~1003~~1~~0001~~none~~Log started\n"
+    "  ~~1004~~1~~0001~~AssetProcessor~~Builder optimization: 3 / 10 files required full analysis  \n"
+    "not a log line\n"
+    "~~1005~~1~~0001~~AssetProcessor~~Missing dependency in surfacetypes.xml\n"
+    "~~1006~~1~~0001~~AssetBuilder~~S: 2 errors, 7 warnings"
+)
+
+
+@pytest.fixture
+def ap_log_path(tmp_path):
+    log_path = tmp_path / "AP_Batch.log"
+    log_path.write_bytes(AP_LOG_CONTENTS.encode())
+    return str(log_path)
+
+
+class TestAPLogParser(object):
+
+    def test_Init_LogWithTwoRuns_ParsesRuns(self, ap_log_path):
+        under_test = ap_log_parser.APLogParser(ap_log_path)
+
+        assert under_test.log_type == "Batch"
+        assert len(under_test.runs) == 2
+        first_run, second_run = under_test.runs
+        assert list(first_run["Lines"]) == [
+            "AssetProcessor~~Number of Assets Successfully Processed: 5.",
+            "AssetProcessor~~Total Assets Processing Time: 1.5s",
+            "AssetProcessor~~AzFramework File Logging New Run"]
+        assert list(first_run["Timestamps"]) == [1000, 1001, 1002]
+        assert first_run["Successes"] == 5
+        assert first_run["Time"] == 1.5
+        assert second_run["Lines"][0] == "AssetProcessor~~Builder optimization: 3 / 10 files required full analysis"
+        assert second_run["Lines"][-1] == "AssetBuilder~~S: 2 errors, 7 warnings"
+        assert list(second_run["Timestamps"]) == [1004, 1005, 1006]
+        assert second_run["Full Analysis"] == (3, 10)
+        assert second_run["Errors"] == 2
+        assert second_run["Warnings"] == 7
+
+    def test_Init_MissingFile_NoRuns(self, tmp_path):
+        under_test = ap_log_parser.APLogParser(str(tmp_path / "missing.log"))
+
+        assert under_test.runs == []
+
+    def test_IterRuns_Lazy_StreamsRunsWithoutKeepingThem(self, ap_log_path):
+        under_test = ap_log_parser.APLogParser(ap_log_path, lazy=True)
+
+        assert [len(run["Lines"]) for run in under_test.iter_runs()] == [3, 3]
+        assert under_test._runs is None
+
+    def test_IterRuns_Lazy_UnmapsFileWhenStreamedRunsAreReleased(self, ap_log_path):
+        under_test = ap_log_parser.APLogParser(ap_log_path, lazy=True)
+
+        for run in under_test.iter_runs():
+            break
+        buffer = weakref.ref(run["Lines"]._buffer)
+        del run
+
+        assert buffer() is None
+
+    def test_IterRuns_Lazy_KeepsFileMappedForHeldRuns(self, ap_log_path):
+        under_test = ap_log_parser.APLogParser(ap_log_path, lazy=True)
+
+        runs = list(under_test.iter_runs())
+
+        assert runs[0]["Lines"][0] == "AssetProcessor~~Number of Assets Successfully Processed: 5."
+        under_test.close()
+        with pytest.raises(ValueError):
+            runs[0]["Lines"][0]
+
+    def test_Close_ContextManager_UnmapsFileAndParsesAgainOnRequest(self, ap_log_path):
+        with ap_log_parser.APLogParser(ap_log_path) as under_test:
+            lines = under_test.runs[0]["Lines"]
+            assert lines[0] == "AssetProcessor~~Number of Assets Successfully Processed: 5."
+
+        with pytest.raises(ValueError):
+            lines[0]
+        assert len(under_test.runs) == 2
+        under_test.close()
+
+    def test_GetLines_Contains_MatchesPartialWords(self, ap_log_path):
+        under_test = ap_log_parser.APLogParser(ap_log_path)
+
+        assert list(under_test.get_lines(-1, ["ypes.x", "Missing dep"])) == [
+            "AssetProcessor~~Missing dependency in surfacetypes.xml"]
+        assert list(under_test.get_lines(None, "Processing Time: 1.5")) == [
+            "AssetProcessor~~Total Assets Processing Time: 1.5s"]
+        assert list(under_test.get_lines(None, ["Missing", "Time"])) == []
+        assert len(list(under_test.get_lines(0, "~~"))) == 3
+
+    def test_GetLines_Regex_ReturnsMatches(self, ap_log_path):
+        under_test = ap_log_parser.APLogParser(ap_log_path)
+
+        matches = list(under_test.get_lines(None, regex=r"AssetBuilder~~S: (\d*)"))
+
+        assert [match.group(1) for match in matches] == ["2"]
+
+
+class TestAPOutputParser(object):
+
+    def test_Init_OutputLines_ParsesRun(self):
+        under_test = ap_log_parser.APOutputParser([
+            "AssetProcessor: Number of Errors Reported: 4.",
+            "AssetProcessor: Listening Port: 45643",
+            "AssetProcessor: Missing dependency found"])
+
+        assert len(under_test.runs) == 1
+        assert under_test.runs[0]["Errors"] == 4
+        assert under_test.runs[0]["Listening Port"] == 45643
+        assert list(under_test.get_lines(-1, "Missing dependency")) == ["AssetProcessor: Missing dependency found"]
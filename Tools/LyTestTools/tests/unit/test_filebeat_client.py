@@ -0,0 +1,174 @@
+"""
+Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+
+SPDX-License-Identifier: Apache-2.0 OR MIT
+
+Unit tests for ly_test_tools.mars.filebeat_client, against a local TCP server standing in for Filebeat.
+"""
+import json
+import logging
+import socket
+import threading
+import time
+
+import pytest
+
+import ly_test_tools.mars.filebeat_client as filebeat_client
+
+pytestmark = pytest.mark.SUITE_smoke
+
+logger = logging.getLogger(__name__)
+
+
+class FilebeatStandIn(object):
+    """
+    Local TCP server collecting the lines sent to it, like the Filebeat TCP input.
+    """
+
+    def __init__(self):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(5)
+        self._server.settimeout(0.1)
+        self.port = self._server.getsockname()[1]
+        self.lines = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                connection, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            data = b''
+            with connection:
+                connection.settimeout(5)
+                chunk = connection.recv(65536)
+                while chunk:
+                    data += chunk
+                    chunk = connection.recv(65536)
+            self.lines.extend(json.loads(line) for line in data.splitlines())
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._server.close()
+
+
+@pytest.fixture
+def filebeat():
+    filebeat = FilebeatStandIn()
+    yield filebeat
+    filebeat.close()
+
+
+@pytest.fixture
+def unreachable_port():
+    # a bound socket which is not listening refuses connections
+    reserved_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    reserved_socket.bind(('127.0.0.1', 0))
+    yield reserved_socket.getsockname()[1]
+    reserved_socket.close()
+
+
+def spooled_files(spool_dir):
+    return sorted(path.name for path in spool_dir.iterdir() if path.suffix == filebeat_client.SPOOL_FILE_SUFFIX)
+
+
+def wait_for_lines(filebeat, count, timeout=10):
+    end_time = time.monotonic() + timeout
+    while len(filebeat.lines) < count and time.monotonic() < end_time:
+        time.sleep(0.01)
+    return filebeat.lines
+
+
+class TestFilebeatClient(object):
+
+    def test_SendEvent_ManyEvents_SentInOrderInBatches(self, filebeat):
+        client = filebeat_client.FilebeatClient(logger, port=filebeat.port, batch_size=7)
+        for event_index in range(100):
+            client.send_event({'value': event_index}, 'test.index', timestamp=event_index)
+
+        assert client.close()
+        lines = wait_for_lines(filebeat, 100)
+
+        assert [json.loads(line['payload'])['value'] for line in lines] == list(range(100))
+        assert lines[0] == {'index': 'test.index', 'timestamp': 0, 'pipeline': 'filebeat', 'payload': '{"value": 0}'}
+        assert client.sent_event_count == 100
+
+    def test_Flush_QueuedEvents_AllSent(self, filebeat):
+        with filebeat_client.FilebeatClient(logger, port=filebeat.port) as client:
+            client.send_event({'value': 1}, 'test.index', timestamp=0)
+
+            assert client.flush(timeout=10)
+            assert client.sent_event_count == 1
+
+    def test_Init_UnreachableWithoutSpool_RaisesFilebeatExn(self, unreachable_port):
+        with pytest.raises(filebeat_client.FilebeatExn):
+            filebeat_client.FilebeatClient(logger, port=unreachable_port)
+
+    def test_SendEvent_UnreachableWithSpool_SpooledThenReplayedFirst(self, unreachable_port, filebeat, tmp_path):
+        spooling_client = filebeat_client.FilebeatClient(logger, port=unreachable_port, spool_dir=str(tmp_path))
+        for event_index in range(10):
+            spooling_client.send_event({'value': event_index}, 'test.index', timestamp=event_index)
+
+        assert not spooling_client.close()
+        assert spooling_client.spooled_event_count == 10
+        assert len(spooled_files(tmp_path)) == 1
+        assert spooled_files(tmp_path)[0].startswith(filebeat_client.SPOOL_FILE_PREFIX)
+
+        replaying_client = filebeat_client.FilebeatClient(logger, port=filebeat.port, spool_dir=str(tmp_path), batch_size=3)
+        replaying_client.send_event({'value': 10}, 'test.index', timestamp=10)
+
+        assert replaying_client.close()
+        lines = wait_for_lines(filebeat, 11)
+        assert [json.loads(line['payload'])['value'] for line in lines] == list(range(11))
+        assert not list(tmp_path.iterdir())
+
+    def test_SendEvent_SpoolOfOpenClient_NotReplayedByOtherClient(self, unreachable_port, filebeat, tmp_path):
+        spooling_client = filebeat_client.FilebeatClient(logger, port=unreachable_port, spool_dir=str(tmp_path))
+        spooling_client.send_event({'value': 0}, 'test.index', timestamp=0)
+        assert spooling_client.flush(timeout=10)
+
+        other_client = filebeat_client.FilebeatClient(logger, port=filebeat.port, spool_dir=str(tmp_path))
+        other_client.send_event({'value': 1}, 'test.index', timestamp=1)
+        assert other_client.close()
+        assert [json.loads(line['payload'])['value'] for line in wait_for_lines(filebeat, 1)] == [1]
+        assert len(spooled_files(tmp_path)) == 1
+
+        assert not spooling_client.close()
+        replaying_client = filebeat_client.FilebeatClient(logger, port=filebeat.port, spool_dir=str(tmp_path))
+        assert replaying_client.flush(timeout=10)
+        assert replaying_client.close()
+        assert [json.loads(line['payload'])['value'] for line in wait_for_lines(filebeat, 2)] == [1, 0]
+        assert not list(tmp_path.iterdir())
+
+    def test_SendEvent_UnreachableWithoutSpool_DropsReportedAndNextBatchReconnects(self, unreachable_port, filebeat):
+        client = filebeat_client.FilebeatClient(logger, port=filebeat.port)
+        client._filebeat_port = unreachable_port
+        client._socket.close()
+        client.send_event({'value': 0}, 'test.index', timestamp=0)
+
+        assert not client.flush(timeout=10)
+        assert client.dropped_event_count == 1
+        # The earlier drop is only reported by flush, the next event is still queued
+        client.send_event({'value': 1}, 'test.index', timestamp=1)
+        assert not client.flush(timeout=10)
+        assert client.dropped_event_count == 2
+
+        # The first batch after the failure reconnects to Filebeat
+        client._filebeat_port = filebeat.port
+        client.send_event({'value': 3}, 'test.index', timestamp=3)
+        assert client.flush(timeout=10)
+        assert client.sent_event_count == 1
+        assert not client.close()
+        assert [json.loads(line['payload'])['value'] for line in wait_for_lines(filebeat, 1)] == [3]
+
+    def test_SendEvent_ClosedClient_RaisesFilebeatExn(self, filebeat):
+        client = filebeat_client.FilebeatClient(logger, port=filebeat.port)
+        client.close()
+
+        with pytest.raises(filebeat_client.FilebeatExn):
+            client.send_event({'value': 1}, 'test.index')
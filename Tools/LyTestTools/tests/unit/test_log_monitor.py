@@ -232,3 +232,69 @@ class TestLogMonitor(object):
         with pytest.raises(ly_test_tools.log.log_monitor.LogMonitorException):
             mock_lm._validate_results(mock_expected_lines_not_found, mock_unexpected_lines_found, mock_expected_lines,
                                       mock_unexpected_lines)
+
+    @mock.patch('os.path.exists', mock.MagicMock(return_value=True))
+    def test_Monitor_PartialLastLine_MatchedOnceLineCompletes(self):
+        mock_file = io.StringIO(u'')
+        line_parts = [u'exp', u'ected line\n']
+        mock_lm = mock_log_monitor()
+
+        def write_line_part():
+            # Simulates the launcher writing the line in two halves between reads of the log
+            if not line_parts:
+                return False
+            read_position = mock_file.tell()
+            mock_file.seek(0, io.SEEK_END)
+            mock_file.write(line_parts.pop(0))
+            mock_file.seek(read_position)
+            return True
+        mock_launcher.is_alive.side_effect = write_line_part
+
+        with mock.patch('ly_test_tools.log.log_monitor.open', return_value=mock_file, create=True):
+            assert mock_lm.monitor_log_for_lines(['expected line'], ['exp'])
+
+    @mock.patch('os.path.exists', mock.MagicMock(return_value=True))
+    def test_Monitor_NoTrailingNewline_LastLineIsRead(self):
+        mock_file = io.StringIO(u'foo\nbar')
+        mock_launcher.is_alive.side_effect = [True, False]
+
+        with mock.patch('ly_test_tools.log.log_monitor.open', return_value=mock_file, create=True):
+            assert mock_log_monitor().monitor_log_for_lines(['foo', 'bar'], [])
+
+    @mock.patch('os.path.exists', mock.MagicMock(return_value=True))
+    def test_Monitor_PyLogMaxSize_DiscardsOldestLines(self):
+        mock_file = io.StringIO(u'first\nsecond\nthird\n')
+        mock_launcher.is_alive.side_effect = [False]
+        mock_lm = ly_test_tools.log.log_monitor.LogMonitor(
+            launcher=mock_launcher, log_file_path='mock_path', py_log_max_size=40)
+
+        with mock.patch('ly_test_tools.log.log_monitor.open', return_value=mock_file, create=True):
+            mock_lm.monitor_log_for_lines(['third'], [])
+
+        assert mock_lm.py_log == '<18 characters discarded>\n|mock_path| second\n|mock_path| third\n'
+
+    def test_LineMatcher_OverlappingAndPrefixStrings_AllMatched(self):
+        expected_lines = ['foo', 'foo bar', 'bar baz', 'baz', 'ba']
+        unexpected_lines = ['qux', 'bar']
+        matcher = ly_test_tools.log.log_monitor.LineMatcher(expected_lines, unexpected_lines)
+
+        expected_found, unexpected_found = matcher.match('foo bar baz')
+
+        assert expected_found == ['foo', 'foo bar', 'bar baz', 'baz']
+        assert unexpected_found == ['bar']
+
+    def test_LineMatcher_RemovedStrings_NoLongerMatched(self):
+        expected_lines = ['foo', 'bar']
+        matcher = ly_test_tools.log.log_monitor.LineMatcher(expected_lines, [])
+
+        expected_found, _ = matcher.match('foo')
+        matcher.remove(expected_found, matcher.expected_lines)
+
+        assert matcher.match('foo') == ([], [])
+        assert matcher.match('bar') == (['bar'], [])
+
+    def test_LineMatcher_PartialMatch_NotMatched(self):
+        matcher = ly_test_tools.log.log_monitor.LineMatcher(['exactly', '($1/1).t'], [])
+
+        assert matcher.match('exactlyy') == ([], [])
+        assert matcher.match('Log Monitoring Test ($1/1).t text') == (['($1/1).t'], [])
@@ -0,0 +1,99 @@
+"""
+Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+
+SPDX-License-Identifier: Apache-2.0 OR MIT
+
+Unit tests for ly_test_tools.o3de.pipeline_utils
+"""
+
+import hashlib
+import os
+import unittest.mock as mock
+
+import pytest
+
+import ly_test_tools.o3de.pipeline_utils as pipeline_utils
+
+pytestmark = pytest.mark.SUITE_smoke
+
+
+def _write_old_file(file_path, contents):
+    """Writes a file with a modification time old enough for its hash to be cached."""
+    with open(file_path, 'wb') as written_file:
+        written_file.write(contents)
+    os.utime(file_path, ns=(1000000000, 1000000000))
+
+
+class TestFileHashCache(object):
+
+    def test_GetHash_UnchangedFile_ReadOnce(self, tmp_path):
+        file_path = str(tmp_path / 'asset.bin')
+        _write_old_file(file_path, b'asset contents')
+        under_test = pipeline_utils.FileHashCache(str(tmp_path / 'cache.json'))
+
+        with mock.patch.object(under_test, '_hash_file', wraps=under_test._hash_file) as mock_hash_file:
+            assert under_test.get_hash(file_path) == hashlib.sha256(b'asset contents').hexdigest()
+            assert under_test.get_hash(file_path) == hashlib.sha256(b'asset contents').hexdigest()
+            assert under_test.get_hash(file_path, 'sha1') == hashlib.sha1(b'asset contents').hexdigest()
+
+        assert mock_hash_file.call_count == 2
+
+    def test_GetHash_ChangedFile_Rehashed(self, tmp_path):
+        file_path = str(tmp_path / 'asset.bin')
+        _write_old_file(file_path, b'asset contents')
+        under_test = pipeline_utils.FileHashCache(None)
+        under_test.get_hash(file_path)
+
+        _write_old_file(file_path, b'changed asset contents')
+
+        assert under_test.get_hash(file_path) == hashlib.sha256(b'changed asset contents').hexdigest()
+
+    def test_GetHash_RecentlyModifiedFile_NotCached(self, tmp_path):
+        file_path = str(tmp_path / 'asset.bin')
+        with open(file_path, 'wb') as written_file:
+            written_file.write(b'asset contents')
+        under_test = pipeline_utils.FileHashCache(None)
+
+        with mock.patch.object(under_test, '_hash_file', wraps=under_test._hash_file) as mock_hash_file:
+            under_test.get_hash(file_path)
+            under_test.get_hash(file_path)
+
+        assert mock_hash_file.call_count == 2
+
+    def test_GetHashes_SavedCache_ReusedByNewInstance(self, tmp_path):
+        file_paths = [str(tmp_path / f'asset{index}.bin') for index in range(4)]
+        for index, file_path in enumerate(file_paths):
+            _write_old_file(file_path, b'asset %d' % index)
+        cache_file = str(tmp_path / 'cache' / 'cache.json')
+        missing_path = str(tmp_path / 'missing.bin')
+
+        file_hashes = pipeline_utils.FileHashCache(cache_file).get_hashes(file_paths + [missing_path], max_workers=2)
+        under_test = pipeline_utils.FileHashCache(cache_file)
+
+        with mock.patch.object(under_test, '_hash_file') as mock_hash_file:
+            assert under_test.get_hashes(file_paths) == {
+                file_path: hashlib.sha256(b'asset %d' % index).hexdigest() for index, file_path in enumerate(file_paths)}
+        mock_hash_file.assert_not_called()
+        assert isinstance(file_hashes[missing_path], OSError)
+
+
+class TestPipelineUtils(object):
+
+    def test_GetFilesHashsum_Directory_ReturnsDigestPerFile(self, tmp_path):
+        _write_old_file(str(tmp_path / 'a.txt'), b'a')
+        _write_old_file(str(tmp_path / 'b.txt'), b'b')
+
+        with mock.patch.object(pipeline_utils, '_file_hash_cache', pipeline_utils.FileHashCache(None)):
+            under_test = pipeline_utils.get_files_hashsum(str(tmp_path))
+
+        assert under_test == {'a.txt': hashlib.sha256(b'a').digest(), 'b.txt': hashlib.sha256(b'b').digest()}
+
+    def test_CompareAssetsWithCache_DuplicateAssets_EachCacheFileMatchedOnce(self, tmp_path):
+        for file_name in ['asset_a.dds', 'asset_b.dds', 'asset_b.dds.assetinfo', 'Upper.dds']:
+            (tmp_path / file_name).write_bytes(b'')
+
+        missing_assets, existing_assets = pipeline_utils.compare_assets_with_cache(
+            ['asset_a.tif', 'asset_a.png', 'asset_b.tif', 'Upper.tif', 'missing.tif'], str(tmp_path))
+
+        assert existing_assets == ['asset_a', 'asset_b']
+        assert missing_assets == ['asset_a', 'upper', 'missing']
@@ -8,14 +8,47 @@ Unit test for ly_test_tools.image.screenshot_compare_qssim
 
 import unittest.mock as mock
 
+import imageio
 import numpy as np
 import pytest
+from scipy import ndimage
 
 import ly_test_tools.image.screenshot_compare_qssim as screenshot_compare
 
 pytestmark = pytest.mark.SUITE_smoke
 
 
+def _reference_qssim(img1, img2, channel_max=255):
+    """Full image float64 quaternion SSIM computed with full quaternion products, to validate qssim() against."""
+    hue1 = np.zeros(img1.shape[:2] + (4,))
+    hue2 = np.zeros(img1.shape[:2] + (4,))
+    hue1[:, :, 1:4] = img1 / channel_max
+    hue2[:, :, 1:4] = img2 / channel_max
+    mu1 = ndimage.gaussian_filter1d(ndimage.gaussian_filter1d(hue1, 1.5, 0), 1.5, 1)
+    mu2 = ndimage.gaussian_filter1d(ndimage.gaussian_filter1d(hue2, 1.5, 0), 1.5, 1)
+
+    def blur_product(q1, q2):
+        product = screenshot_compare._quaternion_matrix_mult(q1, screenshot_compare._quaternion_matrix_conj(q2))
+        return ndimage.gaussian_filter1d(ndimage.gaussian_filter1d(product, 1.5, 0), 1.5, 1)
+
+    mu12 = screenshot_compare._quaternion_matrix_mult(mu1, screenshot_compare._quaternion_matrix_conj(mu2))
+    sigma12 = blur_product(hue1 - mu1, hue2 - mu2)
+    offset1 = np.array([0.01 ** 2, 0, 0, 0])
+    offset2 = np.array([0.03 ** 2, 0, 0, 0])
+    part1 = screenshot_compare._quaternion_matrix_norm(2 * mu12 + offset1) / (
+        (mu1 ** 2).sum(2) + (mu2 ** 2).sum(2) + offset1[0])
+    part2 = screenshot_compare._quaternion_matrix_norm(2 * sigma12 + offset2) / (
+        blur_product(hue1 - mu1, hue1 - mu1)[:, :, 0] + blur_product(hue2 - mu2, hue2 - mu2)[:, :, 0] + offset2[0])
+    return np.abs(part1 * part2).mean()
+
+
+def _random_image_pair(shape, seed):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, shape).astype(np.uint8)
+    noisy_image = np.clip(image.astype(np.int32) + rng.integers(-40, 40, shape), 0, 255).astype(np.uint8)
+    return image, noisy_image
+
+
 class TestScreenshotCompare(object):
 
     def test_QuaternionMatrixConj_4x3Matrix_ValidConjugate(self):
@@ -97,3 +130,37 @@ class TestScreenshotCompare(object):
         mock_imageRead.side_effect = [matrix_a,matrix_b]
         screenshot_compare.qssim('test1.jpg', 'test2.jpg')
         mock_imageSave.assert_called()
+
+    @pytest.mark.parametrize('tile_rows', [1, 5, 64])
+    @mock.patch('imageio.imread')
+    @mock.patch('imageio.imwrite', mock.MagicMock())
+    def test_qssim_Tiled_MatchesFullImageReference(self, mock_imageRead, tile_rows):
+        matrix_a, matrix_b = _random_image_pair((37, 23, 3), seed=1)
+        mock_imageRead.side_effect = [matrix_a, matrix_b]
+        result = screenshot_compare.qssim('test1.png', 'test2.png', tile_rows=tile_rows)
+        assert result == pytest.approx(_reference_qssim(matrix_a, matrix_b), abs=1e-6)
+
+    @mock.patch('imageio.imread')
+    @mock.patch('imageio.imwrite', mock.MagicMock())
+    def test_qssim_ThresholdNotReachable_ReturnsUpperBoundBelowThreshold(self, mock_imageRead):
+        matrix_a, matrix_b = _random_image_pair((40, 10, 3), seed=2)
+        matrix_b[:, :] = 0
+        mock_imageRead.side_effect = [matrix_a, matrix_b]
+        result = screenshot_compare.qssim('test1.png', 'test2.png', threshold=0.9, tile_rows=4)
+        assert _reference_qssim(matrix_a, matrix_b) <= result < 0.9
+
+    def test_qssimBatch_ImagePairs_ReturnsResultsInOrder(self, tmp_path):
+        image_pairs = []
+        for index, seed in enumerate([3, 4]):
+            matrix_a, matrix_b = _random_image_pair((16, 12, 3), seed=seed)
+            screenshot = str(tmp_path / 'screenshot{}.png'.format(index))
+            golden_image = str(tmp_path / 'golden{}.png'.format(index))
+            imageio.imwrite(screenshot, matrix_a)
+            imageio.imwrite(golden_image, matrix_a if index == 0 else matrix_b)
+            image_pairs.append((screenshot, golden_image))
+
+        results = screenshot_compare.qssim_batch(image_pairs, diff_path=str(tmp_path), max_workers=2)
+
+        assert results[0] == 1
+        assert results[1] < 1
+        assert (tmp_path / 'screenshot1_diff.png').exists()
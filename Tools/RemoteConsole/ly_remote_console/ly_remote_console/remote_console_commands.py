@@ -6,8 +6,12 @@ SPDX-License-Identifier: Apache-2.0 OR MIT
 RemoteConsole: Used to interact with Lumberyard Launchers through the Remote Console to execute console commands.
 """
 
+import collections
+import itertools
 import logging
 import os
+import re
+import selectors
 import socket
 import threading
 import time
@@ -29,6 +33,20 @@ CONSOLE_MESSAGE_MAP = {
     'GAMEPLAYEVENT': BASE_MSG_TYPE + 22
 }
 
+# Every message is null terminated, the launcher waits for a reply to each message it sends before sending the next one
+MESSAGE_TERMINATOR = b'\0'
+NOOP_MESSAGE = bytes([CONSOLE_MESSAGE_MAP['NOOP']]) + MESSAGE_TERMINATOR
+
+RECV_BUFFER_SIZE = 65536
+
+# Seconds the loop thread waits for data before running the calls queued by other threads, such as adding sockets
+LOOP_SELECT_TIMEOUT = 0.1
+
+# Seconds to wait for the loop thread to stop reading the socket of a RemoteConsole being stopped
+REMOVE_TIMEOUT = 10
+
+_handler_versions = itertools.count(1)
+
 
 def capture_screenshot_command(remote_console_instance):
     # type: (RemoteConsole) -> None
@@ -89,10 +107,199 @@ def _default_disconnect():
     logger.info('Disconnecting from the Port')
 
 
+class MessageFramer:
+    """
+    Splits the byte stream received from a launcher into its null terminated messages. A single recv() can return
+    part of a message or several messages, so incomplete data is kept until the rest of its message arrives.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        # type: (bytes) -> list
+        """
+        Appends received data to the pending bytes.
+        :param data: The bytes received from the socket
+        :return: The complete messages, each one with its message type and its null terminator
+        """
+        self._buffer += data
+        end = self._buffer.rfind(MESSAGE_TERMINATOR) + 1
+        if not end:
+            return []
+        messages = bytes(self._buffer[:end - 1]).split(MESSAGE_TERMINATOR)
+        del self._buffer[:end]
+        return [message + MESSAGE_TERMINATOR for message in messages if message]
+
+
+class HandlerDict(dict):
+    """
+    Dictionary of the expected log lines to the events to set when they are logged, which changes its version every
+    time its keys change so the LogLineMatcher knows when to recompile its pattern.
+    """
+    version = 0
+
+    def __setitem__(self, key, value):
+        is_new_key = key not in self
+        super().__setitem__(key, value)
+        if is_new_key:
+            self.version = next(_handler_versions)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version = next(_handler_versions)
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self.version = next(_handler_versions)
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self.version = next(_handler_versions)
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self.version = next(_handler_versions)
+        return value
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version = next(_handler_versions)
+
+    def clear(self):
+        super().clear()
+        self.version = next(_handler_versions)
+
+
+class LogLineMatcher:
+    """
+    Matches a log line against all the expected log lines of a handlers dictionary with a single regular expression,
+    instead of searching the log line for each of them in turn.
+    """
+
+    def __init__(self):
+        self._handlers = None
+        self._version = None
+        self._pattern = None
+        self._contained_keys = {}
+
+    def match(self, handlers, log_line):
+        # type: (dict, bytes) -> list
+        """
+        Sets and removes the handlers of the expected log lines found in a log line.
+        :param handlers: Dictionary of the expected log lines (bytes) to the threading.Event to set when found
+        :param log_line: The log line to search
+        :return: The expected log lines found
+        """
+        self._compile(handlers)
+        if self._pattern is None:
+            return []
+
+        found_keys = set()
+        for match in self._pattern.finditer(log_line):
+            # only the longest key is reported at each position, the keys it contains are found with it
+            found_keys.update(self._contained_keys[match.group(1)])
+        for key in found_keys:
+            event = handlers.pop(key, None)
+            if event is not None:
+                logger.info("matched key=<{}>".format(key))
+                event.set()
+        return list(found_keys)
+
+    def _compile(self, handlers):
+        # type: (dict) -> None
+        """
+        Compiles the pattern of the keys of the handlers, unless they did not change since it was last compiled.
+        Plain dictionaries have no version, so their keys are compared instead.
+        """
+        version = getattr(handlers, 'version', None)
+        if version is None:
+            version = frozenset(handlers)
+        if handlers is self._handlers and version == self._version:
+            return
+        keys = sorted(set(handlers), key=len, reverse=True)
+        self._handlers = handlers
+        self._version = version
+        if not keys:
+            self._pattern = None
+            self._contained_keys = {}
+            return
+        self._pattern = re.compile(b'(?=(' + b'|'.join(re.escape(key) for key in keys) + b'))')
+        self._contained_keys = {key: [other_key for other_key in keys if other_key in key] for key in keys}
+
+
+class RemoteConsoleLoop:
+    """
+    Reads the sockets of any number of RemoteConsole instances on a single thread with a selector, so a single
+    process can follow the logs of dozens of launchers. The thread is started when the first RemoteConsole is added
+    and stops once all of them are removed.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._calls = collections.deque()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, remote_console):
+        # type: (RemoteConsole) -> None
+        """
+        Starts reading the socket of a connected RemoteConsole.
+        :param remote_console: RemoteConsole instance
+        """
+        self._call_soon(self._selector.register, remote_console.socket, selectors.EVENT_READ, remote_console)
+
+    def remove(self, remote_console, timeout=REMOVE_TIMEOUT):
+        # type: (RemoteConsole, int) -> bool
+        """
+        Stops reading the socket of a RemoteConsole, waiting for the loop thread to let go of it.
+        :param remote_console: RemoteConsole instance
+        :param timeout: The timeout in seconds to wait for the loop thread
+        :return: True if the socket is no longer read, False if the timeout is reached
+        """
+        removed = threading.Event()
+        self._call_soon(self._unregister, remote_console.socket, removed)
+        return removed.wait(timeout)
+
+    def _unregister(self, sock, removed):
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        removed.set()
+
+    def _call_soon(self, func, *args):
+        # The selector is only used by the loop thread, other threads queue calls for it
+        self._calls.append((func, args))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='RemoteConsoleLoop', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            while self._calls:
+                func, args = self._calls.popleft()
+                func(*args)
+
+            with self._lock:
+                if not self._calls and not self._selector.get_map():
+                    self._thread = None
+                    return
+
+            for key, _ in self._selector.select(LOOP_SELECT_TIMEOUT):
+                remote_console = key.data
+                remote_console.pump()
+                if remote_console.stop_pump.is_set():
+                    self._unregister(key.fileobj, threading.Event())
+
+
 class RemoteConsole:
     def __init__(self, addr='127.0.0.1', port=4600, on_disconnect=_default_disconnect,
-                 on_message_received=_default_on_message_received):
-        # type: (str, int, func, func) -> None
+                 on_message_received=_default_on_message_received, loop=None):
+        # type: (str, int, func, func, RemoteConsoleLoop) -> None
         """
         Creates a port connection using port 4600 to issue console commands and poll for specific console log lines.
         :param addr: The ip address where the launcher lives that we want to connect to
@@ -101,16 +308,21 @@ class RemoteConsole:
         :param on_disconnect: User can supply their own disconnect functionality if they would like
         :param on_message_received: on_message_received function in case they want their logging info handled in a
         different way
+        :param loop: RemoteConsoleLoop reading the socket, share one between RemoteConsole instances to read all of
+        them on a single thread. Each instance gets its own loop by default
         """
-        self.handlers = {}
+        self.handlers = HandlerDict()
         self.connected = False
         self.addr = addr
         self.port = port
         self.on_disconnect = on_disconnect
         self.on_display = on_message_received
-        self.pump_thread = threading.Thread(target=self.pump)
+        self.loop = loop or RemoteConsoleLoop()
         self.stop_pump = threading.Event()
         self.ready = threading.Event()
+        self._framer = MessageFramer()
+        self._matcher = LogLineMatcher()
+        self._pending_commands = collections.deque()
 
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
@@ -133,7 +345,7 @@ class RemoteConsole:
         self.socket.settimeout(None)
 
         # Check if the remote console is ready
-        self.pump_thread.start()
+        self.loop.add(self)
         if not self.ready.wait(timeout):
             raise Exception("remote_console_commands.py:start: Remote console connection never became ready. "
                             "Waited for {} seconds.".format(timeout))
@@ -191,37 +403,50 @@ class RemoteConsole:
             return
 
         self.stop_pump.set()
+        self.loop.remove(self)
         self.socket.shutdown(socket.SHUT_WR)
         self.socket.close()
-        self.pump_thread.join()
         self.connected = False
 
     def send_command(self, command):
         # type: (str) -> None
         """
-        Transforms and sends commands to the Launcher instance.
+        Transforms and queues commands for the Launcher instance. The launcher only reads a message in reply to one of
+        its own messages, so the command is sent as the reply to the next message received.
         :param command: The command to be sent to the Launcher instance
         """
         message = self._create_message(CONSOLE_MESSAGE_MAP['COMMAND'], command)
-        try:
-            self._send_message(message)
-        except:
+        if self.stop_pump.is_set():
             self.on_disconnect()
+            return
+        self._pending_commands.append(message)
 
     def pump(self):
         # type: () -> None
         """
-        Pump function that is used by the pump_thread. Listens to receive messages from the socket
-        and disconnects during an exception.
+        Pump function that is called by the loop when the socket has data to read. Handles each complete message
+        received and replies to it with the next queued command, or a NOOP, and disconnects during an exception.
         """
-        while not self.stop_pump.is_set():
-            # Sending a NOOP message in order to get log lines
-            self._send_message(self._create_message(CONSOLE_MESSAGE_MAP['NOOP']))
-            try:
-                self._handle_message(self.socket.recv(4096))
-            except:
-                self.on_disconnect()
-                self.stop_pump.set()
+        try:
+            data = self.socket.recv(RECV_BUFFER_SIZE)
+            if not data:
+                raise ConnectionError('The launcher closed the remote console connection')
+            for message in self._framer.feed(data):
+                self._handle_message(message)
+                self._send_message(self._next_reply())
+        except:
+            self.on_disconnect()
+            self.stop_pump.set()
+
+    def _next_reply(self):
+        # type: () -> bytes
+        """
+        :return: The next queued command, or a NOOP message if there is none
+        """
+        try:
+            return self._pending_commands.popleft()
+        except IndexError:
+            return NOOP_MESSAGE
 
     def expect_log_line(self, match_string, timeout=30):
         # type: (str, int) -> bool
@@ -287,12 +512,8 @@ class RemoteConsole:
         # display the message if it's a logging message type
         if CONSOLE_MESSAGE_MAP['LOGMESSAGE'] <= message_type <= CONSOLE_MESSAGE_MAP['LOGERROR']:
             self.on_display(message_body)
-            for key in self.handlers.keys():
-                # message received, set flag handler as True for success
-                if key in message_body:
-                    logger.info("matched key=<{}>".format(key))
-                    self.handlers[key].set()
-                    continue
+            # message received, set and remove the handlers of the expected log lines it contains
+            self._matcher.match(self.handlers, message_body)
 
         # The very first connection using the socket will return all of the auto complete items, turned off so no one
         # wouldn't need to see them
@@ -303,9 +524,3 @@ class RemoteConsole:
         # looking at for an autocompletelistdone message
         elif message_type == CONSOLE_MESSAGE_MAP['AUTOCOMPLETELISTDONE']:
             self.ready.set()
-
-        # cleanup expect_log_line handers if the matching string was found or timeout happened.
-        handlers_dict = self.handlers.copy()
-        for key in handlers_dict.keys():
-            if self.handlers[key].is_set():
-                del self.handlers[key]
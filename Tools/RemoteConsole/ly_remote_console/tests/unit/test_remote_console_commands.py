@@ -10,6 +10,8 @@ try:  # Py2
 except ImportError:  # Py3
     import unittest.mock as mock
 import pytest
+import socket
+import threading
 
 import ly_remote_console.remote_console_commands as remote_console
 
@@ -79,14 +81,54 @@ class TestRemoteConsole():
         mock_create_message.assert_called_once()
 
     @mock.patch('socket.socket', mock.MagicMock())
-    def test_Pump_CheckSendMessage_AssertSendMessageCalled(self):
+    def test_Pump_HandleMessageRaises_DisconnectsWithoutReply(self):
         rc_instance = remote_console.RemoteConsole()
+        rc_instance.on_disconnect = mock.MagicMock()
+        rc_instance.socket.recv.return_value = b'1\x00'
         rc_instance._send_message = mock.MagicMock()
         rc_instance._handle_message = mock.MagicMock()
         rc_instance._handle_message.side_effect = Exception()  # to force except path in pump()
 
         rc_instance.pump()
-        rc_instance._send_message.assert_called_once()
+
+        rc_instance._send_message.assert_not_called()
+        rc_instance.on_disconnect.assert_called_once()
+        assert rc_instance.stop_pump.is_set()
+
+    @mock.patch('socket.socket', mock.MagicMock())
+    def test_Pump_MergedMessages_NoopReplyToEachMessage(self):
+        rc_instance = remote_console.RemoteConsole()
+        rc_instance.socket.recv.return_value = b'1\x002foo\x002bar\x00'
+        rc_instance._send_message = mock.MagicMock()
+        rc_instance._handle_message = mock.MagicMock()
+
+        rc_instance.pump()
+
+        assert rc_instance._handle_message.mock_calls == [mock.call(b'1\x00'), mock.call(b'2foo\x00'), mock.call(b'2bar\x00')]
+        assert rc_instance._send_message.mock_calls == [mock.call(remote_console.NOOP_MESSAGE)] * 3
+
+    @mock.patch('socket.socket', mock.MagicMock())
+    def test_Pump_CommandQueued_CommandSentAsReply(self):
+        rc_instance = remote_console.RemoteConsole()
+        rc_instance.socket.recv.return_value = b'1\x001\x00'
+        rc_instance._send_message = mock.MagicMock()
+
+        rc_instance.send_command('foo_command')
+        rc_instance.pump()
+
+        assert rc_instance._send_message.mock_calls == [mock.call(bytearray(b'5foo_command\x00')),
+                                                        mock.call(remote_console.NOOP_MESSAGE)]
+
+    @mock.patch('socket.socket', mock.MagicMock())
+    def test_Pump_ConnectionClosed_Disconnects(self):
+        rc_instance = remote_console.RemoteConsole()
+        rc_instance.on_disconnect = mock.MagicMock()
+        rc_instance.socket.recv.return_value = b''
+
+        rc_instance.pump()
+
+        rc_instance.on_disconnect.assert_called_once()
+        assert rc_instance.stop_pump.is_set()
 
     @mock.patch('socket.socket', mock.MagicMock())
     @mock.patch('ly_remote_console.remote_console_commands.threading', mock.MagicMock())
@@ -151,3 +193,127 @@ class TestRemoteConsole():
         rc_instance.on_display.assert_not_called()
         rc_instance.ready.set.assert_called_once()
 
+    @mock.patch('socket.socket', mock.MagicMock())
+    @mock.patch('ly_remote_console.remote_console_commands.threading', mock.MagicMock())
+    def test_HandleMessage_SeveralHandlersMatch_AllSetAndRemoved(self):
+        rc_instance = remote_console.RemoteConsole()
+        rc_instance.on_display = mock.MagicMock()
+        handlers = {key: mock.MagicMock() for key in (b'foo', b'foo bar', b'bar', b'baz')}
+        rc_instance.handlers.update(handlers)
+
+        rc_instance._handle_message(b'2a foo bar line\x00')
+
+        for key in (b'foo', b'foo bar', b'bar'):
+            handlers[key].set.assert_called_once()
+        handlers[b'baz'].set.assert_not_called()
+        assert list(rc_instance.handlers.keys()) == [b'baz']
+
+
+@pytest.mark.unit
+class TestMessageFramer():
+
+    def test_Feed_SplitAndMergedChunks_CompleteMessagesReturned(self):
+        framer = remote_console.MessageFramer()
+
+        assert framer.feed(b'2fo') == []
+        assert framer.feed(b'o\x002ba') == [b'2foo\x00']
+        assert framer.feed(b'r\x00\x007\x002') == [b'2bar\x00', b'7\x00']
+        assert framer.feed(b'baz\x00') == [b'2baz\x00']
+
+
+@pytest.mark.unit
+class TestLogLineMatcher():
+
+    def test_Match_HandlersChanged_PatternRecompiled(self):
+        matcher = remote_console.LogLineMatcher()
+        handlers = remote_console.HandlerDict()
+        handlers[b'foo'] = threading.Event()
+
+        assert matcher.match(handlers, b'bar') == []
+        handlers[b'bar'] = bar_event = threading.Event()
+        assert matcher.match(handlers, b'a bar line') == [b'bar']
+        assert bar_event.is_set()
+        assert list(handlers) == [b'foo']
+
+    def test_Match_PlainDictChanged_PatternRecompiled(self):
+        matcher = remote_console.LogLineMatcher()
+        handlers = {}
+
+        assert matcher.match(handlers, b'foo.bar') == []
+        handlers[b'foo.bar'] = threading.Event()
+        assert matcher.match(handlers, b'fooxbar') == []
+        assert matcher.match(handlers, b'a foo.bar line') == [b'foo.bar']
+        assert handlers == {}
+
+
+def _serve_launcher(server_socket, log_line_count):
+    """
+    Serves a single remote console client like a launcher does, sending one message at a time and waiting for the
+    reply to each one, and returns the commands received.
+    """
+    connection, _ = server_socket.accept()
+    framer = remote_console.MessageFramer()
+    commands = []
+
+    def send_and_receive_reply(message):
+        connection.sendall(message)
+        replies = []
+        while not replies:
+            data = connection.recv(4096)
+            if not data:
+                raise ConnectionError()
+            replies = framer.feed(data)
+        commands.extend(reply[1:-1].decode() for reply in replies if reply[0] == remote_console.CONSOLE_MESSAGE_MAP['COMMAND'])
+
+    with connection:
+        send_and_receive_reply(b'1\x00')
+        send_and_receive_reply(b'7\x00')
+        for line_index in range(log_line_count):
+            send_and_receive_reply('2log line {}\x00'.format(line_index).encode())
+        while 'quit' not in commands:
+            send_and_receive_reply(b'1\x00')
+    return commands
+
+
+@pytest.mark.unit
+class TestRemoteConsoleLoop():
+
+    def test_SharedLoop_SeveralLaunchers_AllLogLinesAndCommandsReceived(self):
+        console_count = 8
+        log_line_count = 500
+        loop = remote_console.RemoteConsoleLoop()
+        servers = []
+        for _ in range(console_count):
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server_socket.bind(('127.0.0.1', 0))
+            server_socket.listen(1)
+            result = {}
+            thread = threading.Thread(target=lambda s=server_socket, r=result: r.update(commands=_serve_launcher(s, log_line_count)))
+            thread.start()
+            servers.append((server_socket, thread, result))
+
+        consoles = []
+        try:
+            for server_socket, _, _ in servers:
+                lines = []
+                console = remote_console.RemoteConsole(port=server_socket.getsockname()[1], loop=loop,
+                                                       on_message_received=lines.append)
+                last_line_event = threading.Event()
+                console.handlers['log line {}'.format(log_line_count - 1).encode()] = last_line_event
+                console.start(timeout=10, timeout_port=10, retry_delay=1)
+                consoles.append((console, lines, last_line_event))
+
+            for console, lines, last_line_event in consoles:
+                assert last_line_event.wait(30)
+                assert lines == ['log line {}'.format(line_index).encode() for line_index in range(log_line_count)]
+                console.send_command('foo_command')
+                console.send_command('quit')
+
+            for _, thread, result in servers:
+                thread.join(30)
+                assert result['commands'] == ['foo_command', 'quit']
+        finally:
+            for console, _, _ in consoles:
+                console.stop()
+            for server_socket, _, _ in servers:
+                server_socket.close()
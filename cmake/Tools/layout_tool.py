@@ -7,7 +7,9 @@
 
 
 import argparse
+import concurrent.futures
 import hashlib
+import json
 import logging
 import os
 import pathlib
@@ -36,6 +38,12 @@ ALL_ASSET_MODES = [ASSET_MODE_PAK, ASSET_MODE_LOOSE, ASSET_MODE_VFS]
 
 PAK_FOLDER_NAME = 'Pak'
 
+# Version of the layout manifest format, manifests of other versions are ignored and the layout fully synced again
+LAYOUT_MANIFEST_VERSION = 1
+
+# Minimum number of files to copy before spreading the copies over a thread pool
+MIN_FILES_FOR_PARALLEL_COPY = 16
+
 # Maintain a list of build configs that only will support PAK mode
 PAK_ONLY_BUILD_CONFIGS = ['RELEASE']
 
@@ -224,6 +232,7 @@ def copy_asset_files_to_layout(project_asset_folder, target_platform, layout_tar
 
     src_asset_contents = os.listdir(project_asset_folder)
     allowed_system_config_prefix = 'system_{}'.format(target_platform.lower())
+    files_to_copy = []
     for src_file in src_asset_contents:
 
         # For each source file found in the root of the source project asset folder, apply various rules to determine
@@ -255,18 +264,18 @@ def copy_asset_files_to_layout(project_asset_folder, target_platform, layout_tar
             continue
 
         if os.path.isfile(abs_dst):
-            # The target is a file, do a fingerprint check
+            # The target is a file, copy2 preserves the modification time so an unchanged file has the same size and
+            # modification time as its source
             # TODO: Evaluate if we want to just junction the files instead of doing a copy
-            src_hash = common.file_fingerprint(abs_src)
-            dst_hash = common.file_fingerprint(abs_dst)
-            if src_hash == dst_hash:
-                logging.debug("Skipping layout copy of '%s', fingerprints of source and destination matches (%s)",
-                              src_file,
-                              src_hash)
+            src_state = get_file_state(abs_src)
+            if src_state == get_file_state(abs_dst):
+                logging.debug("Skipping layout copy of '%s', size and modification time of source and destination match",
+                              src_file)
                 continue
 
-            logging.debug("Copying %s -> %s", abs_src, abs_dst)
-            shutil.copy2(abs_src, abs_dst)
+        files_to_copy.append((abs_src, abs_dst))
+
+    copy_files(files_to_copy)
 
 
 def remove_link(link:pathlib.PurePath):
@@ -331,6 +340,251 @@ def create_link(src:pathlib.Path, tgt:pathlib.Path, copy):
             raise common.LmbrCmdError(f"Error trying to create {link_type} {src} => {tgt} : {e}", e.errno)
 
 
+def get_file_state(path):
+    """
+    Get the state of a file which changes when the file is modified
+
+    :param path:    The path to the file
+    :return: The [size, modification time in nanoseconds] of the file, None if it does not exist
+    """
+    try:
+        path_stat = os.stat(path)
+    except OSError:
+        return None
+    return [path_stat.st_size, path_stat.st_mtime_ns]
+
+
+def _copy_file(src, dst):
+    """
+    Copy a file with its metadata, replacing a read-only destination file
+
+    :param src: The source file path
+    :param dst: The destination file path
+    :return: The state of the destination file after the copy
+    """
+    try:
+        shutil.copy2(src, dst)
+    except PermissionError:
+        os.chmod(dst, stat.S_IWRITE)
+        shutil.copy2(src, dst)
+    return get_file_state(dst)
+
+
+def copy_files(files_to_copy):
+    """
+    Copy files with their metadata, in parallel when there are enough of them
+
+    :param files_to_copy:   List of (source file path, destination file path) to copy
+    :return: The list of the states of the destination files after the copies
+    """
+    for src, dst in files_to_copy:
+        logging.debug("Copying %s -> %s", src, dst)
+    try:
+        if len(files_to_copy) < MIN_FILES_FOR_PARALLEL_COPY:
+            return [_copy_file(src, dst) for src, dst in files_to_copy]
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            return list(executor.map(lambda copy_args: _copy_file(*copy_args), files_to_copy))
+    except (OSError, shutil.Error) as e:
+        raise common.LmbrCmdError(f'Error trying to copy files to the layout: {e}', common.ERROR_CODE_ERROR_DIRECTORY)
+
+
+class LayoutManifest(object):
+    """
+    Manifest of the links and copied folders created by the previous sync of a layout, so that the next sync only
+    applies what changed. Each entry is keyed by the absolute path of the link (or folder copy) and records the path
+    of its source, whether it is a copy, and for copies the [size, source modification time, destination modification
+    time] of each file copied, keyed by its relative path.
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        self.modified = False
+        try:
+            with open(manifest_path, 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get('version') == LAYOUT_MANIFEST_VERSION:
+                self.entries = manifest.get('entries', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    @staticmethod
+    def for_layout(layout_target):
+        """
+        Load the manifest of a layout folder, which is kept next to the layout folder since the layout folder itself
+        may be a link into the project cache
+
+        :param layout_target:   The path of the target layout folder
+        :return: The LayoutManifest of the layout
+        """
+        layout_target = os.path.abspath(layout_target)
+        return LayoutManifest(os.path.join(os.path.dirname(layout_target), f'.{os.path.basename(layout_target)}.layout_manifest.json'))
+
+    def get(self, target):
+        return self.entries.get(os.path.abspath(target))
+
+    def set(self, target, entry):
+        self.entries[os.path.abspath(target)] = entry
+        self.modified = True
+
+    def remove(self, target):
+        if self.entries.pop(os.path.abspath(target), None) is not None:
+            self.modified = True
+
+    def save(self):
+        if not self.modified:
+            return
+        temp_manifest_path = f'{self.manifest_path}.tmp'
+        with open(temp_manifest_path, 'w') as manifest_file:
+            json.dump({'version': LAYOUT_MANIFEST_VERSION, 'entries': self.entries}, manifest_file)
+        os.replace(temp_manifest_path, self.manifest_path)
+        self.modified = False
+
+
+def is_link(path):
+    """
+    Check if a path is a symlink, or a directory junction on windows
+    """
+    return os.path.islink(path) or (hasattr(os.path, 'isjunction') and os.path.isjunction(path))
+
+
+def is_link_to(link, src):
+    """
+    Check if a path is a symlink or junction to a source folder
+
+    :param link:    The path to check
+    :param src:     The path of the source folder
+    :return: True if the path links to the source folder
+    """
+    return os.path.normcase(os.path.abspath(link)) != os.path.normcase(os.path.abspath(src)) and \
+        os.path.normcase(os.path.realpath(link)) == os.path.normcase(os.path.realpath(src))
+
+
+def remove_layout_path(path):
+    """
+    Remove a link, a folder, or a broken link from the layout
+    """
+    if is_link(path):
+        os.unlink(path)
+    elif os.path.isdir(path):
+        remove_link(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def scan_folder(folder):
+    """
+    Scan the files and subfolders of a folder, following links like shutil.copytree
+
+    :param folder:  The folder to scan
+    :return: Tuple of the {relative path: state} of the files and the list of relative paths of the subfolders
+    """
+    files = {}
+    subfolders = []
+    pending_folders = ['']
+    while pending_folders:
+        relative_folder = pending_folders.pop()
+        with os.scandir(os.path.join(folder, relative_folder)) as folder_entries:
+            for folder_entry in folder_entries:
+                relative_path = os.path.join(relative_folder, folder_entry.name)
+                try:
+                    if folder_entry.is_dir():
+                        subfolders.append(relative_path)
+                        pending_folders.append(relative_path)
+                    else:
+                        entry_stat = folder_entry.stat()
+                        files[relative_path] = [entry_stat.st_size, entry_stat.st_mtime_ns]
+                except OSError:
+                    logging.warning("Skipping '%s', it cannot be read", os.path.join(folder, relative_path))
+    return files, subfolders
+
+
+def sync_folder_copy(src, tgt, manifest):
+    """
+    Make a folder a copy of a source folder, only copying the files that changed since the copy recorded in the
+    manifest and removing the files that are no longer in the source folder
+
+    :param src:         The source folder
+    :param tgt:         The target folder
+    :param manifest:    The LayoutManifest of the layout
+    :return: True if the target folder was modified
+    """
+    entry = manifest.get(tgt)
+    if entry and entry.get('copy') and entry.get('source') == os.path.abspath(src) and \
+            os.path.isdir(tgt) and not is_link(tgt):
+        copied_files = entry.get('files', {})
+        tgt_files, tgt_subfolders = scan_folder(tgt)
+    else:
+        # Not a copy made by a previous sync, replace it
+        remove_layout_path(tgt)
+        copied_files = {}
+        tgt_files, tgt_subfolders = {}, []
+    src_files, src_subfolders = scan_folder(src)
+
+    # Remove what is no longer in the source folder
+    modified = False
+    for relative_path in tgt_files.keys() - src_files.keys():
+        logging.debug("Removing %s", os.path.join(tgt, relative_path))
+        os.remove(os.path.join(tgt, relative_path))
+        modified = True
+    src_subfolders_set = set(src_subfolders)
+    for relative_path in sorted(set(tgt_subfolders) - src_subfolders_set, reverse=True):
+        if os.path.isdir(os.path.join(tgt, relative_path)):
+            remove_layout_path(os.path.join(tgt, relative_path))
+            modified = True
+
+    # Copy the files which changed on either side since they were copied
+    os.makedirs(tgt, exist_ok=True)
+    for relative_path in sorted(src_subfolders_set - set(tgt_subfolders)):
+        os.makedirs(os.path.join(tgt, relative_path), exist_ok=True)
+        modified = True
+    files_state = {}
+    files_to_copy = []
+    for relative_path, src_state in src_files.items():
+        copied_state = copied_files.get(relative_path)
+        tgt_state = tgt_files.get(relative_path)
+        if copied_state and tgt_state and copied_state == src_state + tgt_state[1:] and tgt_state[0] == src_state[0]:
+            files_state[relative_path] = copied_state
+        else:
+            files_to_copy.append(relative_path)
+    if files_to_copy:
+        logging.debug(f'Copying {len(files_to_copy)} of {len(src_files)} files from {src} to {tgt}')
+        copied_states = copy_files([(os.path.join(src, relative_path), os.path.join(tgt, relative_path))
+                                    for relative_path in files_to_copy])
+        for relative_path, copied_state in zip(files_to_copy, copied_states):
+            files_state[relative_path] = src_files[relative_path] + copied_state[1:]
+        modified = True
+
+    if modified or not entry:
+        manifest.set(tgt, {'source': os.path.abspath(src), 'copy': True, 'files': files_state})
+    return modified
+
+
+def sync_link(src, tgt, copy, manifest):
+    """
+    Make a directory link to, or a copy of, a source folder, unless the manifest and the file system show that it
+    already is one
+
+    :param src:         The source folder of the link
+    :param tgt:         The path of the link to create
+    :param copy:        Perform a directory copy instead of a link
+    :param manifest:    The LayoutManifest of the layout
+    :return: True if the link or copy was modified
+    """
+    if copy:
+        return sync_folder_copy(src, tgt, manifest)
+
+    entry = manifest.get(tgt)
+    if entry and not entry.get('copy') and entry.get('source') == os.path.abspath(src) and is_link_to(tgt, src):
+        logging.debug(f'Skipping link {src} => {tgt}, it is up to date')
+        return False
+
+    remove_layout_path(tgt)
+    create_link(src, tgt, copy)
+    manifest.set(tgt, {'source': os.path.abspath(src), 'copy': False})
+    return True
+
+
 def construct_and_validate_cache_project_asset_folder(project_path, asset_type, warn_on_missing_project_cache):
     """
     Given the parameters for a project (project_path, asset type), construct and validate the absolute path
@@ -399,37 +653,34 @@ def sync_layout_vfs(target_platform, project_path, asset_type, warning_on_missin
 
     temp_vfs_layout_project_config_path = os.path.join(temp_vfs_layout_project_path, 'config')
 
-    # If the temporary folder was created previously, always reset it
-    if os.path.isdir(temp_vfs_layout_project_path):
-        if os.path.isdir(temp_vfs_layout_project_config_path):
-            os.rmdir(temp_vfs_layout_project_config_path)
-        shutil.rmtree(temp_vfs_layout_project_path)
+    # The temporary folder is kept between syncs, the manifest records what it links to so that only what changed is
+    # synced again. The links inside it are always links, a copied layout copies the files through them.
+    manifest = LayoutManifest.for_layout(layout_target)
     os.makedirs(temp_vfs_layout_project_path, exist_ok=True)
+    sync_link(vfs_asset_source, temp_vfs_layout_project_config_path, False, manifest)
 
-    # Create the 'project asset platform cache' junction before copying configuration files at the engine root to it
-    layout_project_folder_target = layout_target
-    # Remove previous layout folder if it is a directory
-    if os.path.isdir(layout_project_folder_target):
-        remove_link(layout_project_folder_target)
-    if os.path.isdir(temp_vfs_layout_project_path):
-        create_link(temp_vfs_layout_project_path, layout_project_folder_target, copy)
-
-    # Create the link
-    create_link(vfs_asset_source, temp_vfs_layout_project_config_path, copy)
-
-    # Create the assets to the layout
+    # Copy the asset files to the temporary folder, and remove the ones which are no longer in the project cache
     copy_asset_files_to_layout(project_asset_folder=project_asset_folder,
                                target_platform=target_platform,
-                               layout_target=layout_target)
-
-    # Reset the 'gems' junction if any in the layout
+                               layout_target=temp_vfs_layout_project_path)
+    for temp_file in os.listdir(temp_vfs_layout_project_path):
+        abs_temp_file = os.path.join(temp_vfs_layout_project_path, temp_file)
+        if os.path.isfile(abs_temp_file) and not is_link(abs_temp_file) and \
+                not os.path.isfile(os.path.join(project_asset_folder, temp_file)):
+            os.remove(abs_temp_file)
+
+    # Sync the 'gems' junction if any in the layout
     layout_gems_folder_src = os.path.join(project_asset_folder, 'gems')
-    layout_gems_folder_target = os.path.join(layout_target, 'gems')
-    if os.path.isdir(layout_gems_folder_target):
-        remove_link(layout_gems_folder_target)
+    layout_gems_folder_target = os.path.join(temp_vfs_layout_project_path, 'gems')
     if os.path.isdir(layout_gems_folder_src):
-        create_link(layout_gems_folder_src, layout_gems_folder_target, copy)
+        sync_link(layout_gems_folder_src, layout_gems_folder_target, False, manifest)
+    elif os.path.lexists(layout_gems_folder_target):
+        remove_layout_path(layout_gems_folder_target)
+        manifest.remove(layout_gems_folder_target)
 
+    # Sync the 'project asset platform cache' junction last, so that a copied layout includes the files above
+    sync_link(temp_vfs_layout_project_path, layout_target, copy, manifest)
+    manifest.save()
 
 
 def sync_layout_non_vfs(mode, target_platform, project_path, asset_type, warning_on_missing_assets, layout_target, override_pak_folder, copy):
@@ -453,9 +704,6 @@ def sync_layout_non_vfs(mode, target_platform, project_path, asset_type, warning
         raise common.LmbrCmdError(f'Project at path {project_path} does not have a valid project.json')
 
     project_name_lower = project_name.lower()
-    layout_gems_folder_target = os.path.join(layout_target, 'gems')
-    if os.path.isdir(layout_gems_folder_target):
-        remove_link(layout_gems_folder_target)
 
     if mode == ASSET_MODE_PAK:
         target_pak_folder_name = '{}_{}_paks'.format(project_name_lower, asset_type)
@@ -482,27 +730,17 @@ def sync_layout_non_vfs(mode, target_platform, project_path, asset_type, warning
     else:
         assert False, "Invalid Mode {}".format(mode)
 
-    # Create the 'project asset platform cache' junction before copying additional files to it
-    layout_project_folder_src = project_asset_folder
-    # Remove previous layout folder if it is a directory
-    if os.path.isdir(layout_target):
-        remove_link(layout_target)
-    if os.path.isdir(layout_project_folder_src):
-        create_link(layout_project_folder_src, layout_target, copy)
+    # Sync the 'project asset platform cache' junction before copying additional files to it. The 'gems' folder of
+    # the project asset folder is part of the junction, or of the copy.
+    manifest = LayoutManifest.for_layout(layout_target)
+    sync_link(project_asset_folder, layout_target, copy, manifest)
+    manifest.save()
 
     # Create the assets to the layout
     copy_asset_files_to_layout(project_asset_folder=project_asset_folder,
                                target_platform=target_platform,
                                layout_target=layout_target)
 
-    # Reset the 'gems' junction if any in the layout (only in loose mode).
-    layout_gems_folder_src = os.path.join(project_asset_folder, 'gems')
-
-    # The gems link only is valid in LOOSE mode. If in PAK, then dont re-link
-    if mode == ASSET_MODE_LOOSE and os.path.isdir(layout_gems_folder_src):
-        if os.path.isdir(layout_gems_folder_src):
-            create_link(layout_gems_folder_src, layout_gems_folder_target, copy)
-
 
 def sync_layout_pak(target_platform, project_path, asset_type, warning_on_missing_assets, layout_target,
                     override_pak_folder, copy):
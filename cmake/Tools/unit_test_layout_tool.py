@@ -27,7 +27,7 @@ def test_copy_asset_files_to_layout_success():
     old_os_listdir = os.listdir
     old_os_path_isdir = os.path.isdir
     old_os_path_isfile = os.path.isfile
-    old_common_filefingerprint = common.file_fingerprint
+    old_layout_tool_get_file_state = layout_tool.get_file_state
     old_shutil_copy2 = shutil.copy2
 
     try:
@@ -100,19 +100,19 @@ def test_copy_asset_files_to_layout_success():
             return False
         os.path.isfile = _mock_os_path_isfile
 
-        def _mock_common_file_fingerprint(path):
+        def _mock_layout_tool_get_file_state(path):
             basename = os.path.basename(path)
             dirname = os.path.dirname(path)
             if basename in test_dest_same_as_src:
-                return "SOURCE_FINGERPRINT"
+                return [1, 1]
             elif basename in test_dest_diff_as_src:
                 if dirname == test_game_asset_folder:
-                    return "SOURCE_FINGERPRINT"
+                    return [1, 1]
                 else:
-                    return "TARGET_FINGERPRINT"
+                    return [1, 2]
             else:
-                assert False
-        common.file_fingerprint = _mock_common_file_fingerprint
+                return None
+        layout_tool.get_file_state = _mock_layout_tool_get_file_state
         
         result_copy_files = []
 
@@ -134,7 +134,7 @@ def test_copy_asset_files_to_layout_success():
         os.listdir = old_os_listdir
         os.path.isdir = old_os_path_isdir
         os.path.isfile = old_os_path_isfile
-        common.file_fingerprint = old_common_filefingerprint
+        layout_tool.get_file_state = old_layout_tool_get_file_state
         shutil.copy2 = old_shutil_copy2
 
 
@@ -256,52 +256,24 @@ def test_sync_layout_vfs_success(tmpdir, existing_temp_vfs_folder, existing_gems
     old_tempfile_gettempdir = tempfile.gettempdir
     old_create_link = layout_tool.create_link
     old_copy_asset_files_to_layout = layout_tool.copy_asset_files_to_layout
-    old_rmdir = os.rmdir
-    old_unlink = os.unlink
+    old_remove_layout_path = layout_tool.remove_layout_path
     
     try:
         # Simple Test Parameters
-        test_engine_root = str(tmpdir.join('engine-root').realpath())
         test_project_path = str(tmpdir.join('Foo').realpath())
-        test_project_name_lower = 'foo'
         test_target_platform = 'bogus'
         test_asset_type = 'pc'
 
-        # Setup a test dev and game cache folder structure inside the temp folder
-
-        # Capture relevant real paths in the temp folder so we can verify our assertions
-        cache_game_folder = os.path.join(test_project_path, 'Cache')
-
-        cache_game_folder_gems = os.path.join(cache_game_folder, test_asset_type, 'gems')
+        # Setup a test project cache folder structure inside the temp folder, with the 'config' and 'gems' folders
+        # that are linked into the temporary vfs folder
+        cache_game_folder = os.path.join(test_project_path, 'Cache', test_asset_type)
+        cache_game_folder_config = os.path.join(cache_game_folder, 'config')
+        cache_game_folder_gems = os.path.join(cache_game_folder, 'gems')
+        os.makedirs(cache_game_folder_config)
+        os.makedirs(cache_game_folder_gems)
 
         layout_target_root_realpath = str(tmpdir.join('layout').realpath())
         layout_target_gems_realpath = os.path.join(layout_target_root_realpath, 'gems')
-        layout_target_game_realpath = os.path.join(layout_target_root_realpath)
-        
-        # If we are optionally testing existing links in a layout folder, track the expected and actual rmdirs
-        actual_rmdir_paths = set()
-        expected_rmdir_paths = set()
-        
-        # The rmdir will serve as a wrapper to track the paths that are actually deleted
-        def _mock_os_rmdir(path):
-            actual_rmdir_paths.add(os.path.normcase(path))
-            old_rmdir(path)
-        def _mock_os_unlink(link):
-            actual_rmdir_paths.add(os.path.normcase(link))
-
-        if existing_gems_link:
-            # Optionally make a dummy folder for the target layout for gems and add it to the expected folder to delete
-            os.makedirs(layout_target_gems_realpath, exist_ok=False)
-            expected_rmdir_paths.add(os.path.normcase(layout_target_gems_realpath))
-            os.rmdir = _mock_os_rmdir
-            os.unlink = _mock_os_unlink
-            
-        if existing_game_link:
-            # Optionally make a dummy folder for the target layout for the game folder and add it to the expected folder to delete
-            os.makedirs(layout_target_game_realpath, exist_ok=False)
-            expected_rmdir_paths.add(os.path.normcase(layout_target_game_realpath))
-            os.rmdir = _mock_os_rmdir
-            os.unlink = _mock_os_unlink
 
         def _mock_gettempdir():
             # mock tempfile.gettempdir() to use tmpdir from pytest
@@ -313,34 +285,61 @@ def test_sync_layout_vfs_success(tmpdir, existing_temp_vfs_folder, existing_gems
         hasher.update(test_project_path.encode('UTF-8'))
         result = hasher.hexdigest()
         tmp_folder_subfolder = 'ly-layout-{}'.format(result)
-        test_layout_folder = str(tmpdir.join('{}/vfs/foo'.format(tmp_folder_subfolder)).realpath())
-        test_layout_config_folder = str(tmpdir.join('{}/vfs/foo/config'.format(tmp_folder_subfolder)).realpath())
+        test_layout_folder = str(tmpdir.join('{}/vfs'.format(tmp_folder_subfolder)).realpath())
+        test_layout_config_folder = os.path.join(test_layout_folder, 'config')
+        test_layout_gems_folder = os.path.join(test_layout_folder, 'gems')
         test_override_pak_folder = ''
-        
+
+        # Track the paths which are actually removed, the layout folder and the links of the temporary folder are
+        # only removed if something is there without a matching manifest entry
+        actual_removed_paths = set()
+        expected_removed_paths = set()
+
+        def _mock_remove_layout_path(path):
+            if os.path.lexists(path):
+                actual_removed_paths.add(os.path.normcase(path))
+            old_remove_layout_path(path)
+        layout_tool.remove_layout_path = _mock_remove_layout_path
+
+        if existing_gems_link:
+            # Optionally make a dummy folder for gems in the target layout, it goes away with the layout folder
+            os.makedirs(layout_target_gems_realpath, exist_ok=False)
+            expected_removed_paths.add(os.path.normcase(layout_target_root_realpath))
+
+        if existing_game_link:
+            # Optionally make a dummy layout folder for the game folder and add it to the expected paths to remove
+            os.makedirs(layout_target_root_realpath, exist_ok=True)
+            expected_removed_paths.add(os.path.normcase(layout_target_root_realpath))
+
         if existing_temp_vfs_folder:
-            # Optionally make a dummy folder for the temp vfs and add the test layout folder and its child config to the expected folders to delete
+            # Optionally make a dummy temp vfs folder with a child config folder. Only the config folder is replaced,
+            # the temp vfs folder itself is kept between syncs
             os.makedirs(test_layout_config_folder, exist_ok=False)
-            expected_rmdir_paths.add(os.path.normcase(test_layout_folder))
-            expected_rmdir_paths.add(os.path.normcase(test_layout_config_folder))
-            os.rmdir = _mock_os_rmdir
-            
+            tmpdir.ensure('{}/vfs/keep/keep.txt'.format(tmp_folder_subfolder))
+            expected_removed_paths.add(os.path.normcase(test_layout_config_folder))
+
         mock_layout_tool_create_link_validation = {
-            os.path.normcase(cache_game_folder_gems): os.path.normcase(layout_target_gems_realpath),
-            os.path.normcase(test_layout_folder): os.path.normcase(layout_target_game_realpath)
+            os.path.normcase(cache_game_folder_config): os.path.normcase(test_layout_config_folder),
+            os.path.normcase(cache_game_folder_gems): os.path.normcase(test_layout_gems_folder),
+            os.path.normcase(test_layout_folder): os.path.normcase(layout_target_root_realpath)
         }
+        actual_create_link_sources = set()
 
         def _mock_layout_tool_create_link(src, dst, copy):
             check_src = os.path.normcase(src)
             check_dst = os.path.normcase(dst)
             assert check_src in mock_layout_tool_create_link_validation, "Unexpected create link call to {}->{}".format(src, dst)
             assert mock_layout_tool_create_link_validation[check_src] == check_dst, "Assertion on create linked failed: {}->{}".format(src, dst)
+            assert not copy, "The links of the temporary vfs folder are never copies"
+            actual_create_link_sources.add(check_src)
             
         layout_tool.create_link = _mock_layout_tool_create_link
 
-        def _mock_copy_asset_files_to_layout(project_path, project_asset_folder, target_platform, layout_target):
-            # Validate the correct call to copy asset files
-            assert target_platform == target_platform
-            assert os.path.normcase(layout_target) == os.path.normcase(layout_target_root_realpath)
+        def _mock_copy_asset_files_to_layout(project_asset_folder, target_platform, layout_target):
+            # Validate the correct call to copy asset files, they are copied to the temporary vfs folder
+            assert os.path.normcase(project_asset_folder) == os.path.normcase(cache_game_folder)
+            assert target_platform == test_target_platform
+            assert os.path.normcase(layout_target) == os.path.normcase(test_layout_folder)
         layout_tool.copy_asset_files_to_layout = _mock_copy_asset_files_to_layout
 
         layout_tool.sync_layout_vfs(target_platform           = test_target_platform,
@@ -351,19 +350,88 @@ def test_sync_layout_vfs_success(tmpdir, existing_temp_vfs_folder, existing_gems
                                     override_pak_folder       = test_override_pak_folder,
                                     copy                      = False)
 
-        # Verify if any the rmdir calls based on the test parameters
-        assert actual_rmdir_paths == expected_rmdir_paths
+        # Verify the links created and the paths removed based on the test parameters
+        assert actual_create_link_sources == set(mock_layout_tool_create_link_validation.keys())
+        assert actual_removed_paths == expected_removed_paths
+        assert os.path.isdir(test_layout_folder)
+        if existing_temp_vfs_folder:
+            assert os.path.isfile(os.path.join(test_layout_folder, 'keep', 'keep.txt'))
 
     finally:
         tempfile.gettempdir = old_tempfile_gettempdir
         layout_tool.create_link = old_create_link
         layout_tool.copy_asset_files_to_layout = old_copy_asset_files_to_layout
-        os.rmdir = old_rmdir
-        os.unlink = old_unlink 
+        layout_tool.remove_layout_path = old_remove_layout_path
+
+
+def test_sync_layout_vfs_resync_only_applies_changes(tmpdir):
+
+    old_tempfile_gettempdir = tempfile.gettempdir
+    old_create_link = layout_tool.create_link
+
+    try:
+        test_project_path = str(tmpdir.join('Foo').realpath())
+        cache_game_folder = os.path.join(test_project_path, 'Cache', 'pc')
+        _write_file(os.path.join(cache_game_folder, 'config', 'bootstrap.game.setreg'), '{}')
+        _write_file(os.path.join(cache_game_folder, 'gems', 'gem.txt'), 'gem')
+        _write_file(os.path.join(cache_game_folder, 'engine.json'), '{}')
+        layout_target = str(tmpdir.join('layout').realpath())
+
+        def _mock_gettempdir():
+            # mock tempfile.gettempdir() to use tmpdir from pytest
+            return str(tmpdir.realpath())
+        tempfile.gettempdir = _mock_gettempdir
+
+        # Wrap create_link to record the links that are actually created
+        created_links = []
+
+        def _recording_create_link(src, tgt, copy):
+            created_links.append(os.path.basename(tgt))
+            old_create_link(src, tgt, copy)
+        layout_tool.create_link = _recording_create_link
+
+        def _sync():
+            created_links.clear()
+            layout_tool.sync_layout_vfs(target_platform='bogus',
+                                        project_path=test_project_path,
+                                        asset_type='pc',
+                                        warning_on_missing_assets=False,
+                                        layout_target=layout_target,
+                                        override_pak_folder='',
+                                        copy=False)
+
+        _sync()
+        assert sorted(created_links) == ['config', 'gems', 'layout']
+        assert os.path.isfile(os.path.join(layout_target, 'config', 'bootstrap.game.setreg'))
+        assert os.path.isfile(os.path.join(layout_target, 'gems', 'gem.txt'))
+        assert os.path.isfile(os.path.join(layout_target, 'engine.json'))
+
+        # Nothing changed in the project cache, so the second sync creates no link
+        _sync()
+        assert created_links == []
+
+        # Removing the gems and a file from the project cache only removes them from the layout
+        shutil.rmtree(os.path.join(cache_game_folder, 'gems'))
+        os.remove(os.path.join(cache_game_folder, 'engine.json'))
+        _sync()
+        assert created_links == []
+        assert not os.path.lexists(os.path.join(layout_target, 'gems'))
+        assert not os.path.exists(os.path.join(layout_target, 'engine.json'))
+        assert os.path.isfile(os.path.join(layout_target, 'config', 'bootstrap.game.setreg'))
+
+        # Adding the gems back only links the gems again
+        _write_file(os.path.join(cache_game_folder, 'gems', 'gem.txt'), 'gem')
+        _sync()
+        assert created_links == ['gems']
+        assert os.path.isfile(os.path.join(layout_target, 'gems', 'gem.txt'))
+
+    finally:
+        tempfile.gettempdir = old_tempfile_gettempdir
+        layout_tool.create_link = old_create_link
 
 
 @pytest.mark.parametrize(
-    "mode, existing_game_link, existing_gems_link, test_override_pak_folder", [
+    "mode, existing_game_link, existing_gems_folder, test_override_pak_folder", [
         pytest.param("LOOSE", False, False, None),
         pytest.param("LOOSE", False, True, None),
         pytest.param("LOOSE", True, False, None),
@@ -374,78 +442,58 @@ def test_sync_layout_vfs_success(tmpdir, existing_temp_vfs_folder, existing_gems
         pytest.param("PAK", True, None, 'override_paks')
     ]
 )
-def test_sync_layout_non_vfs_success(tmpdir, mode, existing_game_link, existing_gems_link, test_override_pak_folder):
-    old_rmdir = os.rmdir
+def test_sync_layout_non_vfs_success(tmpdir, mode, existing_game_link, existing_gems_folder, test_override_pak_folder):
     old_copy_asset_files_to_layout = layout_tool.copy_asset_files_to_layout
-    old_remove_link = layout_tool.remove_link
+    old_remove_layout_path = layout_tool.remove_layout_path
+    old_create_link = layout_tool.create_link
     try:
         # Simple Test Parameters
-        engine_root_realpath = str(tmpdir.join('engine-root').realpath())
         test_project_path = str(tmpdir.join('Foo').realpath())
         test_project_name_lower = 'foo'
         test_target_platform = 'bogus'
         test_asset_type = 'pc'
         cache_game_folder_realpath = os.path.join(test_project_path, 'Cache')
-        
-        # Make sure a dummy layout folder is created
-        tmpdir.ensure('layout/dummy.txt')
+        tmpdir.join('Foo/project.json').write('{"project_name": "Foo"}', ensure=True)
+
         test_layout_target_realpath = str(tmpdir.join('layout').realpath())
-        test_layout_target_gems_realpath = os.path.join(test_layout_target_realpath, 'gems')
-        test_layout_target_game_realpath = os.path.join(test_layout_target_realpath,)
 
-        # If we are optionally testing existing links in a layout folder, track the expected and actual rmdirs
-        actual_rmdir_paths = set()
-        expected_rmdir_paths = set()
-        
-        def _mock_remove_link(link):
-            actual_rmdir_paths.add(os.path.normcase(link))
-        layout_tool.remove_link = _mock_remove_link 
-        
-        # The rmdir will serve as a wrapper to track the paths that are actually deleted
-        def _mock_os_rmdir(path):
-            actual_rmdir_paths.add(os.path.normcase(path))
-            old_rmdir(path)
+        # Track the paths which are actually removed, only an existing layout folder is replaced by the link
+        actual_removed_paths = set()
+        expected_removed_paths = set()
+
+        def _mock_remove_layout_path(path):
+            if os.path.lexists(path):
+                actual_removed_paths.add(os.path.normcase(path))
+            old_remove_layout_path(path)
+        layout_tool.remove_layout_path = _mock_remove_layout_path
 
         if existing_game_link:
-            # Optionally make a dummy folder for the target layout for the game folder and add it to the expected folder to delete
-            os.makedirs(test_layout_target_game_realpath, exist_ok=False)
-            expected_rmdir_paths.add(os.path.normcase(test_layout_target_game_realpath))
-            os.rmdir = _mock_os_rmdir
+            # Optionally make a dummy layout folder for the game folder and add it to the expected paths to remove
+            tmpdir.ensure('layout/dummy.txt')
+            expected_removed_paths.add(os.path.normcase(test_layout_target_realpath))
 
-        mock_layout_tool_create_link_validation = {}
         if mode == 'PAK':
-            # In PAK Mode, the linking rules are slightly different. The 'game folder' link points to inside the pak folder, and there is no 'gems' link
-            if test_override_pak_folder:
-                test_game_asset_folder = os.path.join(engine_root_realpath, test_override_pak_folder,
-                                                      f'{test_project_name_lower}_{test_asset_type}_paks')
-                cache_game_folder_game_realpath = os.path.join(test_game_asset_folder)
-            else:
-                test_game_asset_folder = os.path.join(engine_root_realpath, 'Pak',
-                                                      f'{test_project_name_lower}_{test_asset_type}_paks')
-                cache_game_folder_game_realpath = os.path.join(test_game_asset_folder)
-
-            mock_layout_tool_create_link_validation[os.path.normcase(cache_game_folder_game_realpath)] = os.path.normcase(test_layout_target_game_realpath)
+            # In PAK Mode, the 'game folder' link points to inside the pak folder of the project
+            test_game_asset_folder = os.path.join(test_project_path, test_override_pak_folder or 'Pak',
+                                                  f'{test_project_name_lower}_{test_asset_type}_paks')
 
         elif mode == "LOOSE":
-            # In LOOSE Mode, both game and gems will be linked
-    
-            if existing_gems_link:
-                # Optionally make a dummy folder for the target layout for gems and add it to the expected folder to delete
-                os.makedirs(test_layout_target_gems_realpath, exist_ok=False)
-                expected_rmdir_paths.add(os.path.normcase(test_layout_target_gems_realpath))
-                os.rmdir = _mock_os_rmdir
-    
+            # In LOOSE Mode, the 'game folder' link points to the project cache. Its 'gems' folder is part of the
+            # link, and is never linked on its own
             test_game_asset_folder = os.path.join(cache_game_folder_realpath, test_asset_type)
-            cache_game_folder_gems_realpath = os.path.join(cache_game_folder_realpath, test_asset_type, 'gems')
-            cache_game_folder_game_realpath = os.path.join(cache_game_folder_realpath, test_asset_type)
-            mock_layout_tool_create_link_validation[os.path.normcase(cache_game_folder_gems_realpath)] = os.path.normcase(test_layout_target_gems_realpath)
-            mock_layout_tool_create_link_validation[os.path.normcase(cache_game_folder_game_realpath)] = os.path.normcase(test_layout_target_game_realpath)
+            if existing_gems_folder:
+                os.makedirs(os.path.join(test_game_asset_folder, 'gems'))
 
         else:
             assert False, "Invalid Mode {}".format(mode)
         os.makedirs(test_game_asset_folder, exist_ok=True)
 
-        def _mock_copy_asset_files_to_layout(project_path, project_asset_folder, target_platform, layout_target):
+        mock_layout_tool_create_link_validation = {
+            os.path.normcase(test_game_asset_folder): os.path.normcase(test_layout_target_realpath)
+        }
+        actual_create_link_sources = set()
+
+        def _mock_copy_asset_files_to_layout(project_asset_folder, target_platform, layout_target):
             assert os.path.normcase(project_asset_folder) == os.path.normcase(test_game_asset_folder)
             assert target_platform == test_target_platform
             assert layout_target == test_layout_target_realpath
@@ -456,6 +504,7 @@ def test_sync_layout_non_vfs_success(tmpdir, mode, existing_game_link, existing_
             check_dst = os.path.normcase(dst)
             assert check_src in mock_layout_tool_create_link_validation, "Unexpected create link call to {}->{}".format(src, dst)
             assert mock_layout_tool_create_link_validation[check_src] == check_dst, "Assertion on create linked failed: {}->{}".format(src, dst)
+            actual_create_link_sources.add(check_src)
         layout_tool.create_link = _mock_layout_tool_create_link
 
         layout_tool.sync_layout_non_vfs(mode                        = mode,
@@ -467,10 +516,67 @@ def test_sync_layout_non_vfs_success(tmpdir, mode, existing_game_link, existing_
                                         override_pak_folder         = test_override_pak_folder,
                                         copy                        = False)
         
-        assert actual_rmdir_paths == expected_rmdir_paths
+        assert actual_create_link_sources == set(mock_layout_tool_create_link_validation.keys())
+        assert actual_removed_paths == expected_removed_paths
 
-        pass
     finally:
-        os.rmdir = old_rmdir
         layout_tool.copy_asset_files_to_layout = old_copy_asset_files_to_layout
-        layout_tool.remove_link = old_remove_link 
+        layout_tool.remove_layout_path = old_remove_layout_path
+        layout_tool.create_link = old_create_link
+
+
+def _write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+def test_sync_link_unchanged_skipped(tmpdir):
+    src = os.path.join(str(tmpdir), 'src')
+    tgt = os.path.join(str(tmpdir), 'layout')
+    _write_file(os.path.join(src, 'a.txt'), 'a')
+
+    manifest = layout_tool.LayoutManifest.for_layout(tgt)
+    assert layout_tool.sync_link(src, tgt, False, manifest)
+    manifest.save()
+    assert os.path.realpath(tgt) == os.path.realpath(src)
+
+    manifest = layout_tool.LayoutManifest.for_layout(tgt)
+    assert not layout_tool.sync_link(src, tgt, False, manifest)
+    assert not manifest.modified
+
+
+def test_sync_link_copy_applies_changes(tmpdir):
+    src = os.path.join(str(tmpdir), 'src')
+    tgt = os.path.join(str(tmpdir), 'layout')
+    for index in range(layout_tool.MIN_FILES_FOR_PARALLEL_COPY):
+        _write_file(os.path.join(src, 'sub', f'{index}.txt'), str(index))
+    _write_file(os.path.join(src, 'modified.txt'), 'before')
+    _write_file(os.path.join(src, 'removed', 'removed.txt'), 'removed')
+
+    manifest = layout_tool.LayoutManifest.for_layout(tgt)
+    assert layout_tool.sync_link(src, tgt, True, manifest)
+    manifest.save()
+    assert not os.path.islink(tgt)
+    assert len(os.listdir(os.path.join(tgt, 'sub'))) == layout_tool.MIN_FILES_FOR_PARALLEL_COPY
+
+    manifest = layout_tool.LayoutManifest.for_layout(tgt)
+    assert not layout_tool.sync_link(src, tgt, True, manifest)
+
+    _write_file(os.path.join(src, 'modified.txt'), 'after, with a different size')
+    _write_file(os.path.join(src, 'added.txt'), 'added')
+    shutil.rmtree(os.path.join(src, 'removed'))
+    assert layout_tool.sync_link(src, tgt, True, manifest)
+    manifest.save()
+
+    with open(os.path.join(tgt, 'modified.txt')) as modified_file:
+        assert modified_file.read() == 'after, with a different size'
+    assert os.path.isfile(os.path.join(tgt, 'added.txt'))
+    assert not os.path.exists(os.path.join(tgt, 'removed'))
+
+    # A file modified in the layout is copied again
+    _write_file(os.path.join(tgt, 'added.txt'), 'edited in the layout')
+    manifest = layout_tool.LayoutManifest.for_layout(tgt)
+    assert layout_tool.sync_link(src, tgt, True, manifest)
+    with open(os.path.join(tgt, 'added.txt')) as added_file:
+        assert added_file.read() == 'added'
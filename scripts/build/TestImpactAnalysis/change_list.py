@@ -0,0 +1,188 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import os
+import json
+import collections
+import git_utils
+
+CREATED = "A"
+UPDATED = "M"
+DELETED = "D"
+
+# Change lists older than the most recent ones are removed from the cache
+MAX_CACHED_CHANGE_LISTS = 64
+
+# Status of a file after a change with the first status followed by a change with the second one, None if the file
+# exists neither before nor after the changes
+COMPOSED_STATUSES = {
+    (CREATED, CREATED): CREATED,
+    (CREATED, UPDATED): CREATED,
+    (CREATED, DELETED): None,
+    (UPDATED, CREATED): UPDATED,
+    (UPDATED, UPDATED): UPDATED,
+    (UPDATED, DELETED): DELETED,
+    (DELETED, CREATED): UPDATED,
+    (DELETED, UPDATED): UPDATED,
+    (DELETED, DELETED): DELETED
+}
+
+# Returns a predicate checking whether or not a path is within any of the specified parent paths
+# The paths are compared case insensitively on case insensitive platforms
+def make_child_path_checker(parent_paths):
+    parent_paths = [os.path.normcase(os.path.abspath(parent_path)) for parent_path in parent_paths]
+    prefixes = tuple(os.path.join(parent_path, "") for parent_path in parent_paths)
+    def is_child_of_any(path):
+        path = os.path.normcase(os.path.abspath(path))
+        return path in parent_paths or path.startswith(prefixes)
+    return is_child_of_any
+
+# Returns the changes between the src and dst commits as a dictionary of paths to CREATED, UPDATED or DELETED
+def diff_changes(src_commit_hash, dst_commit_hash):
+    changes = {}
+    for status, path, new_path in git_utils.stream_diff_name_status(src_commit_hash, dst_commit_hash):
+        if status == "R":
+            # Treat renames as a deletion and an addition
+            changes[path] = DELETED
+            changes[new_path] = CREATED
+        elif status == "C":
+            changes[new_path] = CREATED
+        elif status == "A":
+            changes[path] = CREATED
+        elif status == "D":
+            changes[path] = DELETED
+        elif status in "MT":
+            changes[path] = UPDATED
+    return changes
+
+# Returns the changes of the first change list followed by the second one
+def compose_changes(first_changes, second_changes):
+    changes = dict(first_changes)
+    for path, status in second_changes.items():
+        if path in changes:
+            composed_status = COMPOSED_STATUSES[(changes[path], status)]
+            if composed_status is None:
+                del changes[path]
+            else:
+                changes[path] = composed_status
+        else:
+            changes[path] = status
+    return changes
+
+# Returns the change list in the JSON format the test impact analysis runtime expects
+def to_change_list(changes):
+    change_list = {}
+    change_list["createdFiles"] = sorted(path for path, status in changes.items() if status == CREATED)
+    change_list["updatedFiles"] = sorted(path for path, status in changes.items() if status == UPDATED)
+    change_list["deletedFiles"] = sorted(path for path, status in changes.items() if status == DELETED)
+    return change_list
+
+# On disk cache of the changes between pairs of commits
+class ChangeListCache:
+    def __init__(self, cache_dir, max_entries = MAX_CACHED_CHANGE_LISTS):
+        self.__cache_dir = cache_dir
+        self.__max_entries = max_entries
+
+    def __entry_path(self, src_commit_hash, dst_commit_hash):
+        return os.path.join(self.__cache_dir, f"{src_commit_hash}_{dst_commit_hash}.json")
+
+    # Returns the cached changes between the src and dst commits, or None if they are not cached
+    def get(self, src_commit_hash, dst_commit_hash):
+        try:
+            with open(self.__entry_path(src_commit_hash, dst_commit_hash), "r") as entry_data:
+                return json.load(entry_data)["changes"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    # Caches the changes between the src and dst commits, evicting the oldest change lists
+    def put(self, src_commit_hash, dst_commit_hash, changes):
+        os.makedirs(self.__cache_dir, exist_ok=True)
+        entry_path = self.__entry_path(src_commit_hash, dst_commit_hash)
+        temp_path = f"{entry_path}.tmp"
+        with open(temp_path, "w") as entry_data:
+            json.dump({"src": src_commit_hash, "dst": dst_commit_hash, "changes": changes}, entry_data)
+        os.replace(temp_path, entry_path)
+
+        entries = sorted(self.__list_entries(), key=lambda entry: entry[2], reverse=True)
+        for src, dst, _ in entries[self.__max_entries:]:
+            try:
+                os.remove(self.__entry_path(src, dst))
+            except OSError:
+                pass
+
+    # Returns the cached commit pairs as (src, dst, modification time) tuples
+    def __list_entries(self):
+        entries = []
+        try:
+            with os.scandir(self.__cache_dir) as dir_entries:
+                for dir_entry in dir_entries:
+                    name, extension = os.path.splitext(dir_entry.name)
+                    if extension == ".json" and name.count("_") == 1:
+                        src, dst = name.split("_")
+                        try:
+                            entries.append((src, dst, dir_entry.stat().st_mtime))
+                        except OSError:
+                            pass
+        except OSError:
+            pass
+        return entries
+
+    # Returns the commits reachable from the src commit through cached change lists, as a dictionary of commits to the
+    # chain of commits leading to them from the src commit
+    def reachable_commits(self, src_commit_hash):
+        edges = collections.defaultdict(list)
+        for src, dst, _ in self.__list_entries():
+            edges[src].append(dst)
+        chains = {src_commit_hash: [src_commit_hash]}
+        pending = collections.deque([src_commit_hash])
+        while pending:
+            commit = pending.popleft()
+            for next_commit in edges[commit]:
+                if next_commit not in chains:
+                    chains[next_commit] = chains[commit] + [next_commit]
+                    pending.append(next_commit)
+        return chains
+
+# Returns the changes between the src and dst commits, reusing the cached change lists of the commits in between
+# Composed change lists may list files whose changes were later reverted, which only makes the change list conservative
+def generate_changes(src_commit_hash, dst_commit_hash, cache):
+    changes = cache.get(src_commit_hash, dst_commit_hash)
+    if changes is not None:
+        print(f"Using cached change list between commits '{src_commit_hash}' and '{dst_commit_hash}'.")
+        return changes
+
+    # Find the cached commit between the src and dst commits closest to the dst commit
+    chains = cache.reachable_commits(src_commit_hash)
+    closest_commit = src_commit_hash
+    closest_distance = None
+    for commit in chains:
+        if commit == src_commit_hash or not git_utils.is_descendent(commit, dst_commit_hash):
+            continue
+        distance = git_utils.count_commits_between(commit, dst_commit_hash)
+        if distance is not None and (closest_distance is None or distance < closest_distance):
+            closest_commit = commit
+            closest_distance = distance
+
+    changes = {}
+    chain = chains[closest_commit]
+    for chain_src, chain_dst in zip(chain, chain[1:]):
+        chain_changes = cache.get(chain_src, chain_dst)
+        if chain_changes is None:
+            # The change list was evicted or is unreadable, fall back to the full diff
+            changes = {}
+            closest_commit = src_commit_hash
+            break
+        changes = compose_changes(changes, chain_changes)
+    if closest_commit != src_commit_hash:
+        print(f"Reusing cached change lists from commit '{src_commit_hash}' to commit '{closest_commit}'.")
+    if closest_commit != dst_commit_hash:
+        remaining_changes = diff_changes(closest_commit, dst_commit_hash)
+        cache.put(closest_commit, dst_commit_hash, remaining_changes)
+        changes = compose_changes(changes, remaining_changes)
+    if closest_commit != src_commit_hash:
+        cache.put(src_commit_hash, dst_commit_hash, changes)
+    return changes
@@ -6,9 +6,14 @@
 #
 
 import os
+import re
 import subprocess
 import git
 
+# Status field of git diff --name-status, e.g. 'M' or 'R097'
+NAME_STATUS_PATTERN = re.compile(r"([ACDMRTUX])([0-9]*)")
+DIFF_READ_SIZE = 64 * 1024
+
 # Returns True if the dst commit descends from the src commit, otherwise False
 def is_descendent(src_commit_hash, dst_commit_hash):
     if src_commit_hash is None or dst_commit_hash is None:
@@ -16,14 +21,45 @@ def is_descendent(src_commit_hash, dst_commit_hash):
     result = subprocess.run(["git", "merge-base", "--is-ancestor", src_commit_hash, dst_commit_hash])
     return result.returncode == 0
 
-# Attempts to create a diff from the src and dst commits and write to the specified output file
-def create_diff_file(src_commit_hash, dst_commit_hash, output_path):
-    if os.path.isfile(output_path):
-        os.remove(output_path)
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    # git diff will only write to the output file if both commit hashes are valid
-    subprocess.run(["git", "diff", "--name-status", f"--output={output_path}", src_commit_hash, dst_commit_hash])
-    if not os.path.isfile(output_path):
+# Returns the full hash of the specified commit, or None if it is not a valid commit
+def rev_parse(commit_hash):
+    result = subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"{commit_hash}^{{commit}}"], stdout=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+# Returns the number of commits reachable from the dst commit but not from the src commit
+def count_commits_between(src_commit_hash, dst_commit_hash):
+    result = subprocess.run(["git", "rev-list", "--count", f"{src_commit_hash}..{dst_commit_hash}"], stdout=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        return None
+    return int(result.stdout.strip())
+
+# Streams the diff between the src and dst commits, yielding a (status, path, new_path) tuple per changed file
+# new_path is only set for renames and copies
+def stream_diff_name_status(src_commit_hash, dst_commit_hash):
+    # -z separates the fields with NUL characters so that paths are neither quoted nor split on whitespace
+    process = subprocess.Popen(["git", "diff", "--name-status", "-z", src_commit_hash, dst_commit_hash], stdout=subprocess.PIPE)
+    try:
+        fields = []
+        remainder = b""
+        for chunk in iter(lambda: process.stdout.read(DIFF_READ_SIZE), b""):
+            tokens = (remainder + chunk).split(b"\0")
+            remainder = tokens.pop()
+            for token in tokens:
+                fields.append(os.fsdecode(token))
+                match = NAME_STATUS_PATTERN.fullmatch(fields[0])
+                if match is None:
+                    raise ValueError(f"Unexpected git diff status '{fields[0]}'")
+                status = match.group(1)
+                if len(fields) == (3 if status in "RC" else 2):
+                    yield status, fields[1], fields[2] if len(fields) == 3 else None
+                    fields = []
+    finally:
+        process.stdout.close()
+        return_code = process.wait()
+    # git diff only outputs anything if both commit hashes are valid
+    if return_code != 0:
         raise FileNotFoundError(f"Source commit '{src_commit_hash}' and/or destination commit '{dst_commit_hash}' are invalid")
 
 # Basic representation of a repository
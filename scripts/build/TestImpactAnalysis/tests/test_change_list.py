@@ -0,0 +1,162 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import ntpath
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import change_list
+from change_list import CREATED, UPDATED, DELETED
+
+
+class GitRepo:
+    """Git repository in a temporary folder, the working directory of the tests using it"""
+    def __init__(self, root):
+        self.root = root
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "test")
+
+    def git(self, *args):
+        return subprocess.run(["git", *args], cwd=self.root, check=True, stdout=subprocess.PIPE, text=True).stdout.strip()
+
+    def commit(self, files=None, removed_files=None):
+        for path, data in (files or {}).items():
+            os.makedirs(os.path.dirname(os.path.join(self.root, path)), exist_ok=True)
+            with open(os.path.join(self.root, path), "w") as file:
+                file.write(data)
+            self.git("add", path)
+        for path in removed_files or []:
+            self.git("rm", "-q", path)
+        self.git("commit", "-q", "--allow-empty", "-m", "commit")
+        return self.git("rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    repo_root = tmp_path / "repo"
+    repo_root.mkdir()
+    monkeypatch.chdir(repo_root)
+    return GitRepo(str(repo_root))
+
+
+class TestMakeChildPathChecker:
+    def test_checks_paths_within_parent_paths(self, tmp_path):
+        is_child = change_list.make_child_path_checker([str(tmp_path / "a"), str(tmp_path / "b")])
+
+        assert is_child(str(tmp_path / "a"))
+        assert is_child(str(tmp_path / "a" / "file.txt"))
+        assert is_child(str(tmp_path / "b" / "c" / "file.txt"))
+        assert not is_child(str(tmp_path / "ab" / "file.txt"))
+        assert not is_child(str(tmp_path / "file.txt"))
+
+    def test_compares_paths_with_the_case_of_the_platform(self, monkeypatch):
+        monkeypatch.setattr(change_list, "os", types.SimpleNamespace(path=ntpath))
+        is_child = change_list.make_child_path_checker(["C:\\Workspace\\Active"])
+
+        assert is_child("c:\\workspace\\active\\file.txt")
+        assert is_child("C:/WORKSPACE/ACTIVE")
+        assert not is_child("C:\\Workspace\\Historic\\file.txt")
+
+
+class TestComposeChanges:
+    @pytest.mark.parametrize("first_status, second_status, composed_status", [
+        (CREATED, UPDATED, CREATED),
+        (CREATED, DELETED, None),
+        (UPDATED, UPDATED, UPDATED),
+        (UPDATED, DELETED, DELETED),
+        (DELETED, CREATED, UPDATED)
+    ])
+    def test_composes_statuses_of_same_file(self, first_status, second_status, composed_status):
+        changes = change_list.compose_changes({"file": first_status}, {"file": second_status})
+
+        assert changes == ({} if composed_status is None else {"file": composed_status})
+
+    def test_keeps_changes_of_other_files(self):
+        first_changes = {"a": CREATED, "b": UPDATED}
+        changes = change_list.compose_changes(first_changes, {"b": DELETED, "c": CREATED})
+
+        assert changes == {"a": CREATED, "b": DELETED, "c": CREATED}
+        assert first_changes == {"a": CREATED, "b": UPDATED}
+
+    def test_to_change_list_sorts_paths_by_status(self):
+        assert change_list.to_change_list({"b": CREATED, "a": CREATED, "c": UPDATED, "d": DELETED}) == {
+            "createdFiles": ["a", "b"], "updatedFiles": ["c"], "deletedFiles": ["d"]}
+
+
+class TestChangeListCache:
+    def test_get_returns_put_changes(self, tmp_path):
+        cache = change_list.ChangeListCache(str(tmp_path / "cache"))
+        assert cache.get("a", "b") is None
+
+        cache.put("a", "b", {"file": CREATED})
+        assert cache.get("a", "b") == {"file": CREATED}
+        assert cache.get("b", "a") is None
+
+    def test_put_evicts_oldest_change_lists(self, tmp_path):
+        cache_dir = tmp_path / "cache"
+        cache = change_list.ChangeListCache(str(cache_dir), max_entries=2)
+        for index, (src, dst) in enumerate([("a", "b"), ("b", "c")]):
+            cache.put(src, dst, {})
+            os.utime(cache_dir / f"{src}_{dst}.json", (index, index))
+        cache.put("c", "d", {})
+
+        assert cache.get("a", "b") is None
+        assert cache.get("b", "c") == {}
+        assert cache.get("c", "d") == {}
+
+    def test_reachable_commits_follows_cached_change_lists(self, tmp_path):
+        cache = change_list.ChangeListCache(str(tmp_path / "cache"))
+        for src, dst in [("a", "b"), ("b", "c"), ("a", "d"), ("x", "y")]:
+            cache.put(src, dst, {})
+
+        assert cache.reachable_commits("a") == {"a": ["a"], "b": ["a", "b"], "c": ["a", "b", "c"], "d": ["a", "d"]}
+
+
+class TestGenerateChanges:
+    def test_diffs_and_caches_changes(self, repo, tmp_path):
+        first_commit = repo.commit({"kept.txt": "1", "removed.txt": "1", "updated.txt": "1"})
+        second_commit = repo.commit({"added file.txt": "1", "updated.txt": "2"}, ["removed.txt"])
+        cache = change_list.ChangeListCache(str(tmp_path / "cache"))
+
+        changes = change_list.generate_changes(first_commit, second_commit, cache)
+
+        assert changes == {"added file.txt": CREATED, "updated.txt": UPDATED, "removed.txt": DELETED}
+        assert cache.get(first_commit, second_commit) == changes
+
+    def test_reuses_cached_change_lists_of_commits_in_between(self, repo, tmp_path):
+        commits = [repo.commit({"a.txt": "1", "b.txt": "1"})]
+        commits.append(repo.commit({"c.txt": "1"}, ["a.txt"]))
+        commits.append(repo.commit({"b.txt": "2", "c.txt": "2"}))
+        commits.append(repo.commit({"a.txt": "2"}, ["c.txt"]))
+        cache = change_list.ChangeListCache(str(tmp_path / "cache"))
+        change_list.generate_changes(commits[0], commits[1], cache)
+        change_list.generate_changes(commits[1], commits[2], cache)
+
+        changes = change_list.generate_changes(commits[0], commits[3], cache)
+
+        # c.txt was created then deleted, a.txt deleted then created again
+        assert changes == {"a.txt": UPDATED, "b.txt": UPDATED}
+        assert changes == change_list.diff_changes(commits[0], commits[3])
+        assert cache.get(commits[2], commits[3]) == {"a.txt": CREATED, "c.txt": DELETED}
+        assert cache.get(commits[0], commits[3]) == changes
+
+    def test_falls_back_to_full_diff_when_chain_is_evicted(self, repo, tmp_path):
+        commits = [repo.commit({"a.txt": "1"}), repo.commit({"b.txt": "1"}), repo.commit({"c.txt": "1"})]
+        cache_dir = tmp_path / "cache"
+        cache = change_list.ChangeListCache(str(cache_dir))
+        change_list.generate_changes(commits[0], commits[1], cache)
+        # the unreadable change list is still listed, so the chain through it is found
+        (cache_dir / f"{commits[0]}_{commits[1]}.json").write_text("not json")
+        changes = change_list.generate_changes(commits[0], commits[2], cache)
+
+        assert changes == {"b.txt": CREATED, "c.txt": CREATED}
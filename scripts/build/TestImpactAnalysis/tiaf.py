@@ -8,17 +8,12 @@
 import os
 import json
 import subprocess
-import re
 import git_utils
+import change_list as change_list_utils
 from git_utils import Repo
+from change_list import ChangeListCache
 from enum import Enum
 
-# Returns True if the specified child path is a child of the specified parent path, otherwise False
-def is_child_path(parent_path, child_path):
-    parent_path = os.path.abspath(parent_path)
-    child_path = os.path.abspath(child_path)
-    return os.path.commonpath([os.path.abspath(parent_path)]) == os.path.commonpath([os.path.abspath(parent_path), os.path.abspath(child_path)])
-
 class TestImpact:
     def __init__(self, config_file, dst_commit, src_branch, dst_branch, pipeline, seeding_branches, seeding_pipelines):
         # Commit
@@ -74,6 +69,9 @@ class TestImpact:
             self.__active_workspace = config["workspace"]["active"]["root"]
             self.__historic_workspace = config["workspace"]["historic"]["root"]
             self.__temp_workspace = config["workspace"]["temp"]["root"]
+            self.__is_restricted_file = change_list_utils.make_child_path_checker([self.__active_workspace, self.__historic_workspace, self.__temp_workspace])
+            # Change lists between commits are kept along with the historic data to be reused by the following runs
+            self.__change_list_cache_dir = os.path.join(self.__historic_workspace, "change_lists")
             # Last commit hash
             last_commit_hash_path_file = config["workspace"]["historic"]["relative_paths"]["last_run_hash_file"]
             self.__last_commit_hash_path = os.path.join(self.__historic_workspace, last_commit_hash_path_file)
@@ -81,7 +79,7 @@ class TestImpact:
 
     # Restricts change lists from checking in test impact analysis files
     def __check_for_restricted_files(self, file_path):
-        if is_child_path(self.__active_workspace, file_path) or is_child_path(self.__historic_workspace, file_path) or is_child_path(self.__temp_workspace, file_path):
+        if self.__is_restricted_file(file_path):
             raise ValueError(f"Checking in test impact analysis framework files is illegal: '{file_path}''.")
 
     def __read_last_run_hash(self):
@@ -108,42 +106,21 @@ class TestImpact:
             if git_utils.is_descendent(self.__src_commit, self.__dst_commit) == False:
                 print(f"Source commit '{self.__src_commit}' and destination commit '{self.__dst_commit}' are not related.")
                 return
-            diff_path = os.path.join(self.__temp_workspace, "changelist.diff")
+            src_commit = git_utils.rev_parse(self.__src_commit)
+            dst_commit = git_utils.rev_parse(self.__dst_commit)
+            if src_commit is None or dst_commit is None:
+                print(f"Source commit '{self.__src_commit}' and/or destination commit '{self.__dst_commit}' are invalid")
+                return
             try:
-                git_utils.create_diff_file(self.__src_commit, self.__dst_commit, diff_path)
+                changes = change_list_utils.generate_changes(src_commit, dst_commit, ChangeListCache(self.__change_list_cache_dir))
             except FileNotFoundError as e:
                 print(e)
                 return
-            # A diff was generated, attempt to parse the diff and construct the change list
-            print(f"Generated diff between commits '{self.__src_commit}' and '{self.__dst_commit}': '{diff_path}'.") 
-            change_list = {}
-            change_list["createdFiles"] = []
-            change_list["updatedFiles"] = []
-            change_list["deletedFiles"] = []
-            with open(diff_path, "r") as diff_data:
-                lines = diff_data.readlines()
-                for line in lines:
-                    match = re.split("^R[0-9]+\\s(\\S+)\\s(\\S+)", line)
-                    if len(match) > 1:
-                        # File rename
-                        self.__check_for_restricted_files(match[1])
-                        self.__check_for_restricted_files(match[2])
-                        # Treat renames as a deletion and an addition
-                        change_list["deletedFiles"].append(match[1])
-                        change_list["createdFiles"].append(match[2])
-                    else:
-                        match = re.split("^[AMD]\\s(\\S+)", line)
-                        self.__check_for_restricted_files(match[1])
-                        if len(match) > 1:
-                            if line[0] == 'A':
-                                # File addition
-                                change_list["createdFiles"].append(match[1])
-                            elif line[0] == 'M':
-                                # File modification
-                                change_list["updatedFiles"].append(match[1])
-                            elif line[0] == 'D':
-                                # File Deletion
-                                change_list["deletedFiles"].append(match[1])
+            # A diff was generated, check the changed files and construct the change list
+            print(f"Generated diff between commits '{self.__src_commit}' and '{self.__dst_commit}'.")
+            for file_path in changes:
+                self.__check_for_restricted_files(file_path)
+            change_list = change_list_utils.to_change_list(changes)
             # Serialize the change list to the JSON format the test impact analysis runtime expects
             change_list_json = json.dumps(change_list, indent = 4)
             change_list_path = os.path.join(self.__temp_workspace, "changelist.json")
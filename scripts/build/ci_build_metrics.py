@@ -6,6 +6,8 @@
 #
 
 import argparse
+import collections
+import concurrent.futures
 import datetime
 import json
 import math
@@ -23,8 +25,11 @@ import submit_metrics
 
 if platform.system() == 'Windows':
     EXE_EXTENSION = '.exe'
+    # DirEntry.stat() leaves st_nlink, st_ino and st_dev at 0 on Windows, files are stat'ed again to find hard links
+    SCANDIR_STAT_HAS_LINKS = False
 else:
     EXE_EXTENSION = ''
+    SCANDIR_STAT_HAS_LINKS = True
 
 DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
@@ -75,17 +80,148 @@ def clean_folder(folder):
             shutil.rmtree(folder, onerror=on_rmtree_error)
         print(f'[ci_build_metrics] Cleaned {folder}', flush=True)
 
-def compute_folder_size(folder):
-    total = 0
+# Totals of the files directly inside a directory. Files with several hard links are kept apart in linked_files, as
+# (device, inode, size, extension), so they are only counted once no matter how many directories link to them
+DirectoryTotals = collections.namedtuple('DirectoryTotals', ['mtime_ns', 'size', 'file_count', 'size_by_extension',
+                                                             'linked_files', 'subfolders'])
+
+class FolderSizer:
+    """
+    Computes the size of folders by listing their directories with os.scandir on a thread pool.
+    The totals of each directory are kept between calls, and a directory is only listed again if its mtime changed,
+    that is if files were added, removed or renamed in it. Files rewritten in place are not measured again.
+    Hard linked files are counted once. On Windows this takes an os.stat call per file, as os.scandir does not
+    return the link count there.
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.directory_totals = {}
+
+    def _scan_directory(self, path, mtime_ns):
+        """Returns the totals of a directory and its subdirectories as (path, mtime_ns), from the cache if possible"""
+        cached_totals = self.directory_totals.get(path)
+        if cached_totals and cached_totals.mtime_ns == mtime_ns:
+            subfolders = []
+            for name in cached_totals.subfolders:
+                try:
+                    subfolders.append((os.path.join(path, name), os.stat(os.path.join(path, name)).st_mtime_ns))
+                except OSError:
+                    pass
+            return path, cached_totals, subfolders, False
+
+        size = 0
+        file_count = 0
+        size_by_extension = collections.defaultdict(int)
+        linked_files = []
+        subfolders = []
+        subfolder_names = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subfolder_names.append(entry.name)
+                            subfolders.append((entry.path, entry.stat(follow_symlinks=False).st_mtime_ns))
+                        elif entry.is_file():
+                            entry_stat = entry.stat() if SCANDIR_STAT_HAS_LINKS else os.stat(entry.path)
+                            extension = os.path.splitext(entry.name)[1].lower()
+                            if entry_stat.st_nlink > 1:
+                                linked_files.append((entry_stat.st_dev, entry_stat.st_ino, entry_stat.st_size, extension))
+                            else:
+                                size += entry_stat.st_size
+                                file_count += 1
+                                size_by_extension[extension] += entry_stat.st_size
+                    except OSError:
+                        # the entry was removed while scanning
+                        pass
+        except OSError:
+            pass
+        return path, DirectoryTotals(mtime_ns, size, file_count, dict(size_by_extension), linked_files,
+                                     subfolder_names), subfolders, True
+
+    def compute(self, folder):
+        """
+        Computes the size of a folder, counting hard linked files once.
+        :return: dict with the total 'size' and 'file_count', and the size broken down by extension and by top level
+                 subfolder ('.' for the files directly in the folder)
+        """
+        directory_totals = {}
+        scanned_count = 0
+        root_path = os.path.normpath(folder)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending_scans = {executor.submit(self._scan_directory, root_path, os.stat(root_path).st_mtime_ns)}
+            while pending_scans:
+                done_scans, pending_scans = concurrent.futures.wait(
+                    pending_scans, return_when=concurrent.futures.FIRST_COMPLETED)
+                for done_scan in done_scans:
+                    path, totals, subfolders, scanned = done_scan.result()
+                    directory_totals[path] = totals
+                    scanned_count += scanned
+                    for subfolder_path, mtime_ns in subfolders:
+                        pending_scans.add(executor.submit(self._scan_directory, subfolder_path, mtime_ns))
+        # directories that were removed are dropped from the cache
+        self.directory_totals.update(directory_totals)
+        for path in [path for path in self.directory_totals if path not in directory_totals
+                     and (path == root_path or path.startswith(os.path.join(root_path, '')))]:
+            del self.directory_totals[path]
+
+        size = 0
+        file_count = 0
+        size_by_extension = collections.defaultdict(int)
+        size_by_subfolder = collections.defaultdict(int)
+        counted_inodes = set()
+        root_prefix_length = len(os.path.join(root_path, ''))
+        # sorted so that a hard linked file is always attributed to the same subfolder
+        for path, totals in sorted(directory_totals.items()):
+            subfolder = path[root_prefix_length:].split(os.sep, 1)[0] if path != root_path else '.'
+            directory_size = totals.size
+            file_count += totals.file_count
+            for extension, extension_size in totals.size_by_extension.items():
+                size_by_extension[extension] += extension_size
+            for device, inode, file_size, extension in totals.linked_files:
+                if (device, inode) not in counted_inodes:
+                    counted_inodes.add((device, inode))
+                    directory_size += file_size
+                    file_count += 1
+                    size_by_extension[extension] += file_size
+            size += directory_size
+            size_by_subfolder[subfolder] += directory_size
+
+        return {
+            'size': size,
+            'file_count': file_count,
+            'size_by_extension': dict(size_by_extension),
+            'size_by_subfolder': dict(size_by_subfolder),
+            'scanned_directories': scanned_count,
+            'cached_directories': len(directory_totals) - scanned_count
+        }
+
+def _sizes_to_list(sizes, key_name):
+    # Lists of objects rather than dicts keyed by name so that the reported documents have a fixed set of fields
+    return [{key_name: key, 'size': size} for key, size in sorted(sizes.items(), key=lambda item: -item[1])]
+
+def compute_folder_size(folder, sizer=None):
+    """
+    Computes the size of a folder, reusing the directory totals of the previous runs of sizer if given.
+    :return: dict with the total 'size', 'file_count', and the size by extension and by subfolder
+    """
+    folder_size = {'size': 0, 'file_count': 0, 'size_by_extension': [], 'size_by_subfolder': []}
     if os.path.exists(folder):
         folder_path = Path(folder)
         print(f'[ci_build_metrics] Computing size of {folder_path}...', flush=True)
         if not METRICS_TEST_MODE:
-            total += sum(f.stat().st_size for f in folder_path.glob('**/*') if f.is_file())
+            start = time.time()
+            result = (sizer or FolderSizer()).compute(folder)
+            folder_size['size'] = result['size']
+            folder_size['file_count'] = result['file_count']
+            folder_size['size_by_extension'] = _sizes_to_list(result['size_by_extension'], 'extension')
+            folder_size['size_by_subfolder'] = _sizes_to_list(result['size_by_subfolder'], 'subfolder')
+            print(f'[ci_build_metrics] Scanned {result["scanned_directories"]} directories and reused '
+                  f'{result["cached_directories"]} in {time.time() - start:.2f} seconds', flush=True)
         print(f'[ci_build_metrics] Computed size of {folder_path}', flush=True)
-    return total
+    return folder_size
 
-def build(metrics, folders_of_interest, build_config_filename, platform, build_type, output_directory, time_delta = 0):
+def build(metrics, folders_of_interest, build_config_filename, platform, build_type, output_directory, time_delta = 0, sizer = None):
     build_start = time.time()
     if not METRICS_TEST_MODE:
         metrics['result'] = ci_build.build(build_config_filename, platform, build_type)
@@ -98,14 +234,22 @@ def build(metrics, folders_of_interest, build_config_filename, platform, build_t
 
     metrics['output_sizes'] = []
     output_sizes = metrics['output_sizes']
+    sizes_start = time.time()
     for folder in folders_of_interest:
         output_size = dict()
         if folder != output_directory:
             output_size['folder'] = folder
         else:
             output_size['folder'] = 'OUTPUT_DIRECTORY' # make it homogenous to facilitate search
-        output_size['output_size'] = compute_folder_size(os.path.join(engine_dir, folder))
+        folder_size = compute_folder_size(os.path.join(engine_dir, folder), sizer)
+        output_size['output_size'] = folder_size['size']
+        output_size['file_count'] = folder_size['file_count']
+        output_size['size_by_extension'] = folder_size['size_by_extension']
+        output_size['size_by_subfolder'] = folder_size['size_by_subfolder']
         output_sizes.append(output_size)
+    # time spent collecting the metrics themselves, not part of the build duration
+    metrics['metrics_duration'] = round(time.time() - sizes_start, 2)
+    print(f'[ci_build_metrics] Computed output sizes in {metrics["metrics_duration"]} seconds', flush=True)
 
 def gather_build_metrics(current_dir, build_config_filename, platform):
     config_dir = os.path.abspath(os.path.join(current_dir, 'Platform', platform))
@@ -163,6 +307,8 @@ def gather_build_metrics(current_dir, build_config_filename, platform):
         
         metrics['build_metrics'] = []
         build_metrics = metrics['build_metrics']
+        # The zero and generation builds change few directories, so their sizes reuse the totals of the previous build
+        sizer = FolderSizer()
 
         # Do the clean build
         shutdown_processes()
@@ -171,13 +317,13 @@ def gather_build_metrics(current_dir, build_config_filename, platform):
 
         build_metric_clean = dict()
         build_metric_clean['build_metric'] = 'clean'
-        build(build_metric_clean, folders_of_interest, build_config_filename, platform, build_type, output_directory)
+        build(build_metric_clean, folders_of_interest, build_config_filename, platform, build_type, output_directory, sizer=sizer)
         build_metrics.append(build_metric_clean)
 
         # Do the incremental "zero" build
         build_metric_zero = dict()
         build_metric_zero['build_metric'] = 'zero'
-        build(build_metric_zero, folders_of_interest, build_config_filename, platform, build_type, output_directory)
+        build(build_metric_zero, folders_of_interest, build_config_filename, platform, build_type, output_directory, sizer=sizer)
         build_metrics.append(build_metric_zero)
 
         # Do a reconfigure
@@ -188,7 +334,7 @@ def gather_build_metrics(current_dir, build_config_filename, platform):
             os.remove(last_configure_file)
         build_metric_generation = dict()
         build_metric_generation['build_metric'] = 'generation'
-        build(build_metric_generation, folders_of_interest, build_config_filename, platform, build_type, output_directory, build_metric_zero['duration'])        
+        build(build_metric_generation, folders_of_interest, build_config_filename, platform, build_type, output_directory, build_metric_zero['duration'], sizer)        
         build_metrics.append(build_metric_generation)
 
         # Clean the otuput before ending to reduce the size of these workspaces
@@ -230,6 +376,12 @@ def submit_report_document(report_file):
     with open(report_file) as json_file:
         report_json = json.load(json_file)
 
+    # All the documents are sent in the background through one connection
+    client = submit_metrics.create_client()
+    if client is None:
+        print(f'[ci_build_metrics] {report_file} failed to submit')
+        return False
+
     ret = True
     for build_type in report_json['build_types']:
         for build_metric in build_type['build_metrics']:
@@ -244,12 +396,14 @@ def submit_report_document(report_file):
                 'reason': build_type['reason'],
                 'metric': build_metric['build_metric'],
                 'duration': build_metric['duration'],
+                'metrics_duration': build_metric.get('metrics_duration', 0),
                 'output_sizes': build_metric['output_sizes']
             }
 
             index = "pappeste.build_metrics." + datetime.datetime.strptime(report_json['timestamp'], DATE_FORMAT).strftime("%Y.%m")
-            ret &= submit_metrics.submit(index, newjson)
+            ret &= submit_metrics.submit(index, newjson, client=client)
 
+    ret &= client.close()
     if ret:
         print(f'[ci_build_metrics] {report_file} submitted')
     else:
@@ -0,0 +1,94 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+"""
+Times the selection of the files of a package filelist on the engine tree, globbing each pattern of the filelist in
+turn with glob3 against matching all the patterns at once with a GlobMatcher, and checks that both select the same files.
+Character classes of the patterns are matched literally as glob3 does, a 'Possible nested set' FutureWarning from the
+translated patterns fails the benchmark.
+Ex. from the scripts/build/package folder: python benchmark_glob.py --filelist package_filelists/all.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+from glob3 import glob
+from glob_to_regex import GlobMatcher, engine_root_path
+
+
+def glob_filter_files(data, base, prefix='', support_symlinks=True):
+    """The filelist selection globbing each pattern in turn, as package.filter_files used to"""
+    includes = {}
+    excludes = set()
+    for key, value in data.items():
+        pattern = os.path.join(base, prefix, key)
+        if not isinstance(value, dict):
+            pattern = os.path.normpath(pattern)
+            result = glob(pattern, recursive=True)
+            files = [x for x in result if os.path.isfile(x) or (support_symlinks and os.path.islink(x))]
+            if value == "#exclude":
+                excludes.update(files)
+            elif value == "#include":
+                for file in files:
+                    includes[file] = os.path.relpath(file, base)
+            elif value.startswith('#move:'):
+                for file in files:
+                    file_name = os.path.relpath(file, os.path.join(base, prefix))
+                    dst_dir = value.replace('#move:', '').strip(' ')
+                    includes[file] = os.path.join(dst_dir, file_name)
+            elif value.startswith('#rename:'):
+                for file in files:
+                    dst_file = value.replace('#rename:', '').strip(' ')
+                    includes[file] = dst_file
+        else:
+            includes.update(glob_filter_files(value, base, os.path.join(prefix, key), support_symlinks))
+
+    for exclude in excludes:
+        includes.pop(exclude, None)
+    return includes
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times the package filelist selection per pattern and with a GlobMatcher.')
+    parser.add_argument('--engine-root', default=str(engine_root_path), help='Folder the filelist patterns are relative to, defaults to the engine root')
+    parser.add_argument('--filelist', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'package_filelists', 'all.json'),
+                        help='Package filelist to select the files of')
+    parser.add_argument('--root-key', default='@lyengine', help='Key of the filelist patterns relative to the engine root')
+    args = parser.parse_args()
+
+    with open(args.filelist, 'r') as filelist:
+        data = json.load(filelist)[args.root_key]
+    base = os.path.normpath(args.engine_root)
+
+    glob_files, glob_time = time_call(glob_filter_files, data, base)
+    print(f'Per pattern glob: {len(glob_files)} files in {glob_time:.2f} seconds')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', FutureWarning)
+        matcher_files, matcher_time = time_call(lambda: GlobMatcher(data).filter_files(base))
+    print(f'GlobMatcher:      {len(matcher_files)} files in {matcher_time:.2f} seconds ({glob_time / max(matcher_time, 1e-9):.1f}x)')
+
+    if glob_files != matcher_files:
+        print('The GlobMatcher selection differs from the per pattern glob selection:')
+        for file in sorted(set(glob_files) ^ set(matcher_files))[:20]:
+            print(f'  {file}: {glob_files.get(file)} != {matcher_files.get(file)}')
+        for file in sorted(file for file in set(glob_files) & set(matcher_files) if glob_files[file] != matcher_files[file])[:20]:
+            print(f'  {file}: {glob_files[file]} != {matcher_files[file]}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
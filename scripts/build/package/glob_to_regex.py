@@ -16,6 +16,8 @@ except ImportError:
     pip.main(['install', 'six', '--ignore-installed', '-q'])
     import six
 from pathlib import Path
+from glob3 import has_magic
+from util import warn
 
 this_file_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -127,3 +129,198 @@ def generate_include_exclude_regexes(package_platform, package_type, root, prohi
 
 def generate_exclude_regexes_for_platform(root, platform):
     return re.compile('|'.join(generate_excludes_for_platform(root, platform)), re.IGNORECASE)
+
+
+def char_class_to_regex_pattern(char_class):
+    """
+    Translates the characters of a glob character class. A '-' between two characters is a range, every other
+    character is escaped so that '[', '\\' and the set operations of future Python versions are matched literally
+    """
+    regex = []
+    for index, char in enumerate(char_class):
+        if char == '-' and 0 < index < len(char_class) - 1:
+            regex.append(char)
+        else:
+            regex.append(re.escape(char))
+    return ''.join(regex)
+
+def glob_component_to_regex_pattern(component):
+    """Translates one path component of a glob pattern, where wildcards do not match the path separator"""
+    regex = []
+    index = 0
+    while index < len(component):
+        char = component[index]
+        index += 1
+        if char == '*':
+            regex.append('[^/]*')
+        elif char == '?':
+            regex.append('[^/]')
+        elif char == '[':
+            end = index
+            if end < len(component) and component[end] == '!':
+                end += 1
+            if end < len(component) and component[end] == ']':
+                end += 1
+            end = component.find(']', end)
+            if end < 0:
+                regex.append(re.escape(char))
+            else:
+                char_class = component[index:end]
+                negated = char_class.startswith('!')
+                if negated:
+                    char_class = char_class[1:]
+                regex.append('[' + ('^/' if negated else '') + char_class_to_regex_pattern(char_class) + ']')
+                index = end + 1
+        else:
+            regex.append(re.escape(char))
+    return ''.join(regex)
+
+def glob_to_regex_pattern(pattern):
+    """
+    Translates a '/' separated glob pattern into a regex pattern matching relative paths, with the same rules as
+    glob3: '*' and '?' do not match across folders, and a '**' component matches zero or more folders or, at the end
+    of the pattern, everything inside the folder
+    """
+    components = pattern.split('/')
+    regex = []
+    for index, component in enumerate(components):
+        is_last = index == len(components) - 1
+        if component == '**':
+            regex.append('.+' if is_last else '(?:[^/]+/)*')
+        else:
+            regex.append(glob_component_to_regex_pattern(component) + ('' if is_last else '/'))
+    return ''.join(regex) + r'\Z'
+
+def literal_root(pattern):
+    """Returns the leading folders of a '/' separated glob pattern which do not contain wildcards"""
+    root = []
+    for component in pattern.split('/')[:-1]:
+        if has_magic(component):
+            break
+        root.append(component)
+    return '/'.join(root)
+
+class _Directive(object):
+    def __init__(self, pattern, value, prefix, levels, regex):
+        self.pattern = pattern
+        self.value = value
+        self.prefix = prefix
+        self.levels = levels
+        self.regex = regex
+
+class GlobMatcher(object):
+    """
+    Matches files against all the include, exclude, move and rename directives of a package filelist at once, and
+    lists the files of a folder with a single walk.
+    A file gets the last include, move or rename directive matching it, unless an exclude directive of the same
+    filelist level or of an enclosing level matches it. This is the same result as globbing each pattern in turn.
+    """
+    def __init__(self, filelist, prefix=''):
+        self.flags = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+        self.includes = []
+        self.excludes = []
+        self.level_count = 0
+        self._add_directives(filelist, prefix, ())
+
+        # The includes are tried last directive first, so the alternative that matches is the final directive
+        self.include_regex = None
+        if self.includes:
+            self.include_regex = re.compile('|'.join('(?P<d{}>{})'.format(index, directive.regex.pattern)
+                                                     for index, directive in reversed(list(enumerate(self.includes)))), self.flags)
+        self.exclude_regex = None
+        if self.excludes:
+            self.exclude_regex = re.compile('|'.join('(?:{})'.format(directive.regex.pattern) for directive in self.excludes), self.flags)
+
+    def _add_directives(self, filelist, prefix, levels):
+        levels = levels + (self.level_count,)
+        self.level_count += 1
+        for key, value in six.iteritems(filelist):
+            pattern = os.path.normpath(os.path.join(prefix, key)).replace(os.sep, '/')
+            if isinstance(value, dict):
+                self._add_directives(value, os.path.join(prefix, key), levels)
+                continue
+            directive = _Directive(pattern, value, prefix, levels, re.compile(glob_to_regex_pattern(pattern), self.flags))
+            if value == '#exclude':
+                self.excludes.append(directive)
+            elif value == '#include' or value.startswith('#move:') or value.startswith('#rename:'):
+                self.includes.append(directive)
+            else:
+                warn('Unknown directive {} for pattern {}'.format(value, pattern))
+
+    def match(self, path):
+        """Returns the final directive of a '/' separated path relative to the filelist root, or None if excluded"""
+        if self.include_regex is None:
+            return None
+        if self.exclude_regex is None or not self.exclude_regex.match(path):
+            match = self.include_regex.match(path)
+            return self.includes[int(match.lastgroup[1:])] if match else None
+        # An exclude only applies to the directives of its level and of the levels inside it
+        excluded_levels = set(directive.levels[-1] for directive in self.excludes if directive.regex.match(path))
+        for directive in reversed(self.includes):
+            if directive.regex.match(path) and excluded_levels.isdisjoint(directive.levels):
+                return directive
+        return None
+
+    def walk(self, base, support_symlinks=True):
+        """
+        Yields the '/' separated paths relative to base of the files and symlinks the directives can match, listing
+        each folder once. Symlinked folders are not entered, as with glob3 '**' patterns.
+        """
+        patterns = [directive.pattern for directive in self.includes + self.excludes]
+        roots = sorted(set(literal_root(pattern) for pattern in patterns if has_magic(pattern)), key=len)
+        walked_roots = []
+        for root in roots:
+            # folders inside a folder that is already walked are not walked again
+            root_key = os.path.normcase(root)
+            if any(walked_root == '' or root_key.startswith(walked_root + '/') or root_key == walked_root for walked_root in walked_roots):
+                continue
+            walked_roots.append(root_key)
+            for path in self._walk(base, root, support_symlinks):
+                yield path
+
+        for pattern in patterns:
+            if has_magic(pattern):
+                continue
+            root_key = os.path.normcase(pattern)
+            if any(walked_root == '' or root_key.startswith(walked_root + '/') for walked_root in walked_roots):
+                continue
+            path = os.path.join(base, pattern)
+            if os.path.isfile(path) or (support_symlinks and os.path.islink(path)):
+                yield pattern
+
+    def _walk(self, base, root, support_symlinks):
+        folders = [root]
+        while folders:
+            folder = folders.pop()
+            try:
+                with os.scandir(os.path.join(base, folder)) as entries:
+                    for entry in entries:
+                        path = folder + '/' + entry.name if folder else entry.name
+                        if entry.is_symlink():
+                            if support_symlinks or entry.is_file():
+                                yield path
+                        elif entry.is_dir():
+                            folders.append(path)
+                        elif entry.is_file():
+                            yield path
+            except OSError:
+                # glob skips folders it cannot list
+                pass
+
+    def filter_files(self, base, support_symlinks=True):
+        """Returns a dictionary of the files below base selected by the directives to their path in the package"""
+        files = {}
+        for path in sorted(set(self.walk(base, support_symlinks)), key=os.path.normcase):
+            directive = self.match(path)
+            if directive is None:
+                continue
+            file = os.path.join(base, path.replace('/', os.sep))
+            if directive.value == '#include':
+                files[file] = os.path.relpath(file, base)
+            elif directive.value.startswith('#move:'):
+                file_name = os.path.relpath(file, os.path.join(base, directive.prefix))
+                dst_dir = directive.value.replace('#move:', '').strip(' ')
+                files[file] = os.path.join(dst_dir, file_name)
+            else:
+                files[file] = directive.value.replace('#rename:', '').strip(' ')
+        return files
@@ -6,7 +6,6 @@
 #
 import os
 import sys
-import zipfile
 import timeit
 import progressbar
 from optparse import OptionParser
@@ -15,7 +14,8 @@ cur_dir = cur_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, f'{cur_dir}/..')
 from ci_build import build
 from util import *
-from glob3 import glob
+from glob_to_regex import GlobMatcher
+from zip_builder import create_zip
 
 
 def package(options):
@@ -72,52 +72,27 @@ def create_package(package_env, package_target):
     print('Creating zipfile at {}'.format(package_path))
     start = timeit.default_timer()
     with progressbar.ProgressBar(max_value=len(files), redirect_stderr=True) as bar:
-        with zipfile.ZipFile(package_path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as myzip:
-            i = 0
-            bar.update(i)
-            last_bar_update = timeit.default_timer()
-            for f in files:
-                if os.path.islink(f):
-                    zipInfo = zipfile.ZipInfo(files[f])
-                    zipInfo.create_system = 3
-                    # long type of hex val of '0xA1ED0000L',
-                    # say, symlink attr magic...
-                    zipInfo.external_attr |= 0xA0000000
-                    myzip.writestr(zipInfo, os.readlink(f))
-                else:
-                    myzip.write(f, files[f])
-                i += 1
-                # Update progress bar every 2 minutes
-                if int(timeit.default_timer() - last_bar_update) > 120:
-                    last_bar_update = timeit.default_timer()
-                    bar.update(i)
-            bar.update(i)
+        bar.update(0)
+        last_bar_update = timeit.default_timer()
+
+        def update_progress(member_count):
+            nonlocal last_bar_update
+            # Update progress bar every 2 minutes
+            if int(timeit.default_timer() - last_bar_update) > 120 or member_count == len(files):
+                last_bar_update = timeit.default_timer()
+                bar.update(member_count)
+
+        # The MD5 is calculated while the package is written
+        package_md5 = create_zip(package_path, files, progress_callback=update_progress)
 
     stop = timeit.default_timer()
     total_time = int(stop - start)
     print('{} is created. Total time: {} seconds.'.format(package_path, total_time))
 
-    def get_MD5(file_path):
-        from hashlib import md5
-        chunk_size = 200 * 1024
-        h = md5()
-        with open(file_path, 'rb') as f:
-            while True:
-                chunk = f.read(chunk_size)
-                if len(chunk):
-                    h.update(chunk)
-                else:
-                    break
-        return h.hexdigest()
-
     md5_file = '{}.MD5'.format(package_path)
     print('Creating MD5 file at {}'.format(md5_file))
-    start = timeit.default_timer()
     with open(md5_file, 'w') as output:
-        output.write(get_MD5(package_path))
-    stop = timeit.default_timer()
-    total_time = int(stop - start)
-    print('{} is created. Total time: {} seconds.'.format(md5_file, total_time))
+        output.write(package_md5)
 
 
 def upload_package(package_env, package_target):
@@ -135,40 +110,8 @@ def upload_package(package_env, package_target):
 
 
 def filter_files(data, base, prefix='', support_symlinks=True):
-    includes = {}
-    excludes = set()
-    for key, value in data.items():
-        pattern = os.path.join(base, prefix, key)
-        if not isinstance(value, dict):
-            pattern = os.path.normpath(pattern)
-            result = glob(pattern, recursive=True)
-            files = [x for x in result if os.path.isfile(x) or (support_symlinks and os.path.islink(x))]
-            if value == "#exclude":
-                excludes.update(files)
-            elif value == "#include":
-                for file in files:
-                    includes[file] = os.path.relpath(file, base)
-            else:
-                if value.startswith('#move:'):
-                    for file in files:
-                        file_name = os.path.relpath(file, os.path.join(base, prefix))
-                        dst_dir = value.replace('#move:', '').strip(' ')
-                        includes[file] = os.path.join(dst_dir, file_name)
-                elif value.startswith('#rename:'):
-                    for file in files:
-                        dst_file = value.replace('#rename:', '').strip(' ')
-                        includes[file] = dst_file
-                else:
-                    warn('Unknown directive {} for pattern {}'.format(value, pattern))
-        else:
-            includes.update(filter_files(value, base, os.path.join(prefix, key), support_symlinks))
-
-    for exclude in excludes:
-        try:
-            includes.pop(exclude)
-        except KeyError:
-            pass
-    return includes
+    """Returns a dictionary of the files below base selected by the filelist data to their path in the package"""
+    return GlobMatcher(data, prefix).filter_files(os.path.normpath(base), support_symlinks)
 
 
 def parse_args():
@@ -0,0 +1,119 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import fnmatch
+import os
+import re
+import sys
+import warnings
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark_glob import glob_filter_files
+from glob_to_regex import GlobMatcher, glob_component_to_regex_pattern
+
+FIXTURE_FILES = [
+    'engine.json',
+    'README.md',
+    '.gitignore',
+    'Code/Framework/AzCore/AzCore.h',
+    'Code/Framework/AzCore/AzCore.cpp',
+    'Code/Framework/AzCore/Platform/Windows/AzCore_Windows.cpp',
+    'Code/Framework/AzCore/Platform/Linux/AzCore_Linux.cpp',
+    'Code/Framework/AzCore/.hidden/config.h',
+    'Code/Tools/Tool.exe',
+    'Code/Tools/Tool.pdb',
+    'Gems/Atom/gem.json',
+    'Gems/Atom/Assets/shader[1].azsl',
+    'Gems/Atom/Assets/shader2.azsl',
+    'Gems/Atom/Assets/a-b.txt',
+    'Gems/Atom/Assets/back\\slash.txt' if os.name != 'nt' else 'Gems/Atom/Assets/backslash.txt',
+    'Gems/Atom/Platform/Windows/atom_windows.json',
+    'Gems/Empty/readme.txt',
+    'python/python.sh',
+    'python/runtime/lib/site.py',
+]
+
+# Include, exclude, move and rename directives at several filelist levels, as in the package filelists
+FILELIST = {
+    '*.json': '#include',
+    '*.md': '#include',
+    'Code': {
+        '**/*.h': '#include',
+        '**/*.cpp': '#include',
+        '**/Platform/Linux/**': '#exclude',
+        'Tools/*.[!p]*': '#include',
+    },
+    'Gems/**': '#include',
+    'Gems/*/Platform/**': '#exclude',
+    'Gems/Atom/Assets/shader[[]1].azsl': '#rename: Assets/renamed.azsl',
+    'Gems/Atom/Assets/[a-c]-[b]*': '#move: Moved',
+    'Gems/Atom/Assets/*[\\]*': '#include',
+    'python/**': '#move: Runtime/python',
+    'python/runtime/**': '#exclude',
+}
+
+
+@pytest.fixture
+def fixture_tree(tmp_path):
+    for relative_path in FIXTURE_FILES:
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relative_path)
+    return str(tmp_path)
+
+
+class TestGlobComponentToRegexPattern:
+    NAMES = ['file.txt', 'file.h', 'file.c', 'File.H', '.hidden', 'a', 'b', '-', '[', ']', '\\', '^', '!', '&', '~',
+             '|', 'a-b', 'x[1]', 'ab', 'abc']
+    PATTERNS = ['*', '*.txt', 'file.?', '*.[ch]', '*.[!c]', '[a-c]', '[!a-c]', '[[]', '[]]', '[!]]', '[\\]', '[^]',
+                '[a-]', '[-a]', '[&&]', '[~~]', '[||]', '[a--]', 'x[[]1]', '[', '[!', 'a[', '[ab][bc]', '?*']
+
+    @pytest.mark.parametrize('pattern', PATTERNS)
+    def test_matches_like_fnmatch(self, pattern):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            try:
+                regex = re.compile(glob_component_to_regex_pattern(pattern) + r'\Z')
+            except re.error:
+                # fnmatch drops invalid ranges, which glob3 patterns never have
+                assert pattern == '[a--]'
+                return
+
+        for name in self.NAMES:
+            assert bool(regex.match(name)) == fnmatch.fnmatchcase(name, pattern), name
+
+
+class TestGlobMatcher:
+    def test_filter_files_matches_per_pattern_glob(self, fixture_tree):
+        expected_files = glob_filter_files(FILELIST, fixture_tree)
+
+        assert GlobMatcher(FILELIST).filter_files(fixture_tree) == expected_files
+        # the fixture exercises every kind of directive
+        assert os.path.join('Assets', 'renamed.azsl') in expected_files.values()
+        assert os.path.join('Moved', 'Gems', 'Atom', 'Assets', 'a-b.txt') in expected_files.values()
+        assert os.path.join('Runtime', 'python', 'python', 'python.sh') in expected_files.values()
+        assert os.path.join(fixture_tree, 'Code', 'Framework', 'AzCore', 'Platform', 'Linux', 'AzCore_Linux.cpp') not in expected_files
+
+    @pytest.mark.parametrize('key', list(FILELIST))
+    def test_filter_files_matches_glob_of_each_directive(self, fixture_tree, key):
+        filelist = {key: FILELIST[key]}
+
+        assert GlobMatcher(filelist).filter_files(fixture_tree) == glob_filter_files(filelist, fixture_tree)
+
+    @pytest.mark.skipif(not hasattr(os, 'symlink'), reason="symlinks are not supported")
+    def test_filter_files_matches_glob_with_symlinks(self, fixture_tree):
+        try:
+            os.symlink(os.path.join(fixture_tree, 'Gems', 'Atom'), os.path.join(fixture_tree, 'Gems', 'AtomLink'))
+            os.symlink(os.path.join(fixture_tree, 'engine.json'), os.path.join(fixture_tree, 'Gems', 'Empty', 'link.txt'))
+        except OSError:
+            pytest.skip("symlinks cannot be created")
+
+        for support_symlinks in [True, False]:
+            assert GlobMatcher(FILELIST).filter_files(fixture_tree, support_symlinks) == \
+                glob_filter_files(FILELIST, fixture_tree, support_symlinks=support_symlinks)
@@ -0,0 +1,119 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import hashlib
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import zip_builder
+
+
+def make_files(root, contents):
+    """Writes the files of contents, a dictionary of relative path to bytes, and returns the package files argument"""
+    files = {}
+    for relative_path, data in contents.items():
+        file_path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as file:
+            file.write(data)
+        files[file_path] = relative_path
+    return files
+
+
+def create_serial_zip(package_path, files):
+    with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as package:
+        for file_path, arcname in files.items():
+            package.write(file_path, arcname)
+
+
+def read_members(package_path):
+    with zipfile.ZipFile(package_path, 'r') as package:
+        assert package.testzip() is None
+        return [(zip_info.filename, zip_info.CRC, zip_info.file_size, package.read(zip_info))
+                for zip_info in package.infolist()]
+
+
+def md5_of(file_path):
+    with open(file_path, 'rb') as file:
+        return hashlib.md5(file.read()).hexdigest()
+
+
+@pytest.fixture
+def contents():
+    return {
+        'empty.txt': b'',
+        'text/readme.txt': b'readme ' * 1000,
+        'bin/random.bin': os.urandom(200 * 1024),
+        'bin/unicode_é.bin': os.urandom(10),
+        'deep/a/b/c/d.txt': b'deep',
+    }
+
+
+def test_CreateZip_MatchesSerialZipFile(tmp_path, contents):
+    files = make_files(str(tmp_path / 'source'), contents)
+    package_path = str(tmp_path / 'package.zip')
+    serial_package_path = str(tmp_path / 'serial.zip')
+
+    package_md5 = zip_builder.create_zip(package_path, files, max_workers=2)
+    create_serial_zip(serial_package_path, files)
+
+    assert package_md5 == md5_of(package_path)
+    assert read_members(package_path) == read_members(serial_package_path)
+
+
+def test_CreateZip_SmallInlineLimit_SpooledMembersMatch(tmp_path, contents, monkeypatch):
+    monkeypatch.setattr(zip_builder, 'MAX_INLINE_MEMBER_SIZE', 1024)
+    files = make_files(str(tmp_path / 'source'), contents)
+    package_path = str(tmp_path / 'package.zip')
+    serial_package_path = str(tmp_path / 'serial.zip')
+
+    # The worker processes only see the patched limit when they are forked
+    zip_builder.create_zip(package_path, files, max_workers=1)
+    create_serial_zip(serial_package_path, files)
+
+    assert read_members(package_path) == read_members(serial_package_path)
+
+
+def test_CreateZip_PreviousPackage_UnchangedMembersCopiedStaleMembersRebuilt(tmp_path, contents, capsys):
+    source = str(tmp_path / 'source')
+    files = make_files(source, contents)
+    package_path = str(tmp_path / 'package.zip')
+    zip_builder.create_zip(package_path, files, max_workers=2)
+    capsys.readouterr()
+
+    # Modify one member, remove one and add one
+    files.update(make_files(source, {'text/readme.txt': b'changed ' * 1000, 'added.txt': b'added'}))
+    removed_path = os.path.join(source, 'deep/a/b/c/d.txt')
+    del files[removed_path]
+    os.remove(removed_path)
+
+    package_md5 = zip_builder.create_zip(package_path, files, max_workers=2)
+    serial_package_path = str(tmp_path / 'serial.zip')
+    create_serial_zip(serial_package_path, files)
+
+    # empty.txt, random.bin and unicode_é.bin are unchanged
+    assert 'Copied 3 unchanged members from the previous package.' in capsys.readouterr().out
+    assert package_md5 == md5_of(package_path)
+    assert read_members(package_path) == read_members(serial_package_path)
+
+
+def test_CreateZip_ReuseDisabled_NoMembersCopied(tmp_path, contents, capsys):
+    files = make_files(str(tmp_path / 'source'), contents)
+    package_path = str(tmp_path / 'package.zip')
+    zip_builder.create_zip(package_path, files, max_workers=2)
+    capsys.readouterr()
+
+    zip_builder.create_zip(package_path, files, max_workers=2, reuse_previous=False)
+
+    assert 'unchanged members' not in capsys.readouterr().out
+    serial_package_path = str(tmp_path / 'serial.zip')
+    create_serial_zip(serial_package_path, files)
+    assert read_members(package_path) == read_members(serial_package_path)
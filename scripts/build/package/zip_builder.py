@@ -0,0 +1,298 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+"""
+Builds zip packages by compressing the members in parallel worker processes and assembling the compressed members
+into a single zip file in the main process.
+The MD5 of the package is computed while it is written, and members whose contents did not change since the previous
+package are copied from it as they are instead of being compressed again.
+"""
+
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import zipfile
+import zlib
+
+COMPRESSION_LEVEL = zlib.Z_DEFAULT_COMPRESSION
+READ_CHUNK_SIZE = 1024 * 1024
+# Compressed members larger than this are passed back from the workers through a spool file instead of in memory
+MAX_INLINE_MEMBER_SIZE = 8 * 1024 * 1024
+# Number of members queued per worker, which bounds the memory used by compressed members waiting to be written
+PENDING_MEMBERS_PER_WORKER = 8
+
+_CONTENT_HASHES_SUFFIX = '.contents.json'
+_LOCAL_HEADER_SIZE = struct.calcsize(zipfile.structFileHeader)
+# Indices of the file name and extra field lengths in the local file header
+_LOCAL_HEADER_FILENAME_LENGTH = 10
+_LOCAL_HEADER_EXTRA_FIELD_LENGTH = 11
+_previous_content_hashes = frozenset()
+
+
+def get_content_hashes_path(package_path):
+    """Returns the path of the file storing the content hash of each member of a package"""
+    return package_path + _CONTENT_HASHES_SUFFIX
+
+
+def _init_worker(previous_content_hashes):
+    global _previous_content_hashes
+    _previous_content_hashes = previous_content_hashes
+
+
+def _hash_file(file_path):
+    content_hash = hashlib.sha1()
+    crc = 0
+    with open(file_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), b''):
+            content_hash.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+    return content_hash.hexdigest(), crc
+
+
+def _compress_member(file_path, arcname, spool_dir):
+    """
+    Compresses one member of the package in a worker process.
+    Returns (zip info, content hash, compressed data) where the compressed data is bytes, the path of a spool file,
+    or None if the member can be copied from the previous package
+    """
+    if os.path.islink(file_path):
+        zip_info = zipfile.ZipInfo(arcname)
+        zip_info.create_system = 3
+        # long type of hex val of '0xA1ED0000L',
+        # say, symlink attr magic...
+        zip_info.external_attr |= 0xA0000000
+        data = os.readlink(file_path).encode('utf-8')
+        zip_info.file_size = zip_info.compress_size = len(data)
+        zip_info.CRC = zlib.crc32(data)
+        return zip_info, None, data
+
+    zip_info = zipfile.ZipInfo.from_file(file_path, arcname)
+    zip_info.compress_type = zipfile.ZIP_DEFLATED
+    content_hash, zip_info.CRC = _hash_file(file_path)
+    if content_hash in _previous_content_hashes:
+        return zip_info, content_hash, None
+
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+    compressed_chunks = []
+    compressed_size = 0
+    spool_file = None
+    with open(file_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), b''):
+            compressed_chunks.append(compressor.compress(chunk))
+            compressed_size += len(compressed_chunks[-1])
+            if compressed_size > MAX_INLINE_MEMBER_SIZE:
+                if spool_file is None:
+                    spool_file = tempfile.NamedTemporaryFile(dir=spool_dir, delete=False)
+                spool_file.write(b''.join(compressed_chunks))
+                compressed_chunks = []
+    compressed_chunks.append(compressor.flush())
+    compressed_size += len(compressed_chunks[-1])
+    zip_info.compress_size = compressed_size
+    if spool_file is None:
+        return zip_info, content_hash, b''.join(compressed_chunks)
+    with spool_file:
+        spool_file.write(b''.join(compressed_chunks))
+    return zip_info, content_hash, spool_file.name
+
+
+class _HashingWriter:
+    """Writes to a file sequentially, tracking the offset and the MD5 of everything written"""
+    def __init__(self, output):
+        self.output = output
+        self.offset = 0
+        self.md5 = hashlib.md5()
+
+    def write(self, data):
+        self.output.write(data)
+        self.md5.update(data)
+        self.offset += len(data)
+
+
+class _PreviousPackage:
+    """The members of a previously built package, by content hash, which can be copied into a new package"""
+    def __init__(self, package_path):
+        self.zip_file = None
+        self.members = {}
+        content_hashes_path = get_content_hashes_path(package_path)
+        if not os.path.isfile(package_path) or not os.path.isfile(content_hashes_path):
+            return
+        try:
+            with open(content_hashes_path, 'r') as source:
+                content_hashes = json.load(source)
+            self.zip_file = zipfile.ZipFile(package_path, 'r')
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print('Not reusing members of {}: {}'.format(package_path, e))
+            return
+        for zip_info in self.zip_file.infolist():
+            content_hash = content_hashes.get(zip_info.filename)
+            if content_hash and zip_info.compress_type == zipfile.ZIP_DEFLATED:
+                self.members[content_hash] = zip_info
+
+    def open_member_data(self, content_hash, zip_info):
+        """
+        Seeks to the compressed data of the previous member with the same content, and updates zip_info to describe it
+        :return: The previous package file, positioned at the start of the compressed data
+        """
+        previous_info = self.members[content_hash]
+        zip_info.CRC = previous_info.CRC
+        zip_info.compress_size = previous_info.compress_size
+        source = self.zip_file.fp
+        source.seek(previous_info.header_offset)
+        local_header = struct.unpack(zipfile.structFileHeader, source.read(_LOCAL_HEADER_SIZE))
+        source.seek(local_header[_LOCAL_HEADER_FILENAME_LENGTH] + local_header[_LOCAL_HEADER_EXTRA_FIELD_LENGTH],
+                    os.SEEK_CUR)
+        return source
+
+    def close(self):
+        if self.zip_file:
+            self.zip_file.close()
+
+
+def _copy_data(source, output, size):
+    while size > 0:
+        chunk = source.read(min(size, READ_CHUNK_SIZE))
+        if not chunk:
+            raise zipfile.BadZipFile('Unexpected end of data while copying a package member')
+        output.write(chunk)
+        size -= len(chunk)
+
+
+def _encode_filename(zip_info):
+    try:
+        return zip_info.filename.encode('ascii'), zip_info.flag_bits
+    except UnicodeEncodeError:
+        return zip_info.filename.encode('utf-8'), zip_info.flag_bits | 0x800
+
+
+def _write_local_header(zip_info, output):
+    zip_info.header_offset = output.offset
+    zip64 = zip_info.file_size > zipfile.ZIP64_LIMIT or zip_info.compress_size > zipfile.ZIP64_LIMIT
+    output.write(zip_info.FileHeader(zip64))
+
+
+def _write_central_directory(zip_infos, output):
+    """Writes the central directory and end of archive records, as zipfile.ZipFile.close() does"""
+    central_directory_offset = output.offset
+    for zip_info in zip_infos:
+        extra = []
+        file_size = zip_info.file_size
+        compress_size = zip_info.compress_size
+        header_offset = zip_info.header_offset
+        if file_size > zipfile.ZIP64_LIMIT or compress_size > zipfile.ZIP64_LIMIT:
+            extra.extend((file_size, compress_size))
+            file_size = compress_size = 0xffffffff
+        if header_offset > zipfile.ZIP64_LIMIT:
+            extra.append(header_offset)
+            header_offset = 0xffffffff
+        extra_data = zip_info.extra
+        version = zipfile.DEFAULT_VERSION
+        if extra:
+            extra_data = struct.pack('<HH' + 'Q' * len(extra), 1, 8 * len(extra), *extra) + extra_data
+            version = zipfile.ZIP64_VERSION
+        filename, flag_bits = _encode_filename(zip_info)
+        dos_date = (zip_info.date_time[0] - 1980) << 9 | zip_info.date_time[1] << 5 | zip_info.date_time[2]
+        dos_time = zip_info.date_time[3] << 11 | zip_info.date_time[4] << 5 | (zip_info.date_time[5] // 2)
+        output.write(struct.pack(zipfile.structCentralDir, zipfile.stringCentralDir,
+                                 max(version, zip_info.create_version), zip_info.create_system,
+                                 max(version, zip_info.extract_version), zip_info.reserved, flag_bits,
+                                 zip_info.compress_type, dos_time, dos_date, zip_info.CRC, compress_size, file_size,
+                                 len(filename), len(extra_data), len(zip_info.comment), 0, zip_info.internal_attr,
+                                 zip_info.external_attr, header_offset))
+        output.write(filename)
+        output.write(extra_data)
+        output.write(zip_info.comment)
+
+    central_directory_end = output.offset
+    entry_count = len(zip_infos)
+    central_directory_size = central_directory_end - central_directory_offset
+    if entry_count > zipfile.ZIP_FILECOUNT_LIMIT or central_directory_offset > zipfile.ZIP64_LIMIT \
+            or central_directory_size > zipfile.ZIP64_LIMIT:
+        output.write(struct.pack(zipfile.structEndArchive64, zipfile.stringEndArchive64, 44, 45, 45, 0, 0,
+                                 entry_count, entry_count, central_directory_size, central_directory_offset))
+        output.write(struct.pack(zipfile.structEndArchive64Locator, zipfile.stringEndArchive64Locator, 0,
+                                 central_directory_end, 1))
+        entry_count = min(entry_count, 0xffff)
+        central_directory_size = min(central_directory_size, 0xffffffff)
+        central_directory_offset = min(central_directory_offset, 0xffffffff)
+    output.write(struct.pack(zipfile.structEndArchive, zipfile.stringEndArchive, 0, 0, entry_count, entry_count,
+                             central_directory_size, central_directory_offset, 0))
+
+
+def create_zip(package_path, files, max_workers=None, reuse_previous=True, progress_callback=None):
+    """
+    Creates a zip package, compressing the members in parallel, and returns the MD5 of the package.
+    Members are written in the order of files.
+
+    :param package_path: Path of the zip file to create, replacing any existing file once the new one is complete
+    :param files: Dictionary of the path of each file to add to its name in the package
+    :param max_workers: Number of compression worker processes, defaults to the number of processors
+    :param reuse_previous: Copy members whose content did not change from the existing package at package_path
+    :param progress_callback: Called with the number of members written so far after each member
+    :return: The hex MD5 of the package
+    """
+    previous_package = _PreviousPackage(package_path) if reuse_previous else _PreviousPackage('')
+    max_workers = max_workers or os.cpu_count() or 1
+    package_dir = os.path.dirname(os.path.abspath(package_path))
+    temp_package_path = package_path + '.tmp'
+    zip_infos = []
+    content_hashes = {}
+    reused_count = 0
+    try:
+        with tempfile.TemporaryDirectory(dir=package_dir) as spool_dir, \
+                concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                                       initargs=(frozenset(previous_package.members),)) as executor, \
+                open(temp_package_path, 'wb') as package_file:
+            output = _HashingWriter(package_file)
+            pending_members = collections.deque()
+            file_items = iter(files.items())
+
+            def submit_members():
+                for file_path, arcname in file_items:
+                    pending_members.append(executor.submit(_compress_member, file_path, arcname, spool_dir))
+                    if len(pending_members) >= max_workers * PENDING_MEMBERS_PER_WORKER:
+                        break
+
+            submit_members()
+            while pending_members:
+                zip_info, content_hash, data = pending_members.popleft().result()
+                submit_members()
+                if data is None:
+                    source = previous_package.open_member_data(content_hash, zip_info)
+                    _write_local_header(zip_info, output)
+                    _copy_data(source, output, zip_info.compress_size)
+                    reused_count += 1
+                elif isinstance(data, bytes):
+                    _write_local_header(zip_info, output)
+                    output.write(data)
+                else:
+                    _write_local_header(zip_info, output)
+                    with open(data, 'rb') as spool_file:
+                        _copy_data(spool_file, output, zip_info.compress_size)
+                    os.remove(data)
+                zip_infos.append(zip_info)
+                if content_hash:
+                    content_hashes[zip_info.filename] = content_hash
+                if progress_callback:
+                    progress_callback(len(zip_infos))
+
+            _write_central_directory(zip_infos, output)
+    except BaseException:
+        if os.path.exists(temp_package_path):
+            os.remove(temp_package_path)
+        raise
+    finally:
+        previous_package.close()
+
+    os.replace(temp_package_path, package_path)
+    with open(get_content_hashes_path(package_path), 'w') as content_hashes_file:
+        json.dump(content_hashes, content_hashes_file)
+    if reused_count:
+        print('Copied {} unchanged members from the previous package.'.format(reused_count))
+    return output.md5.hexdigest()
@@ -6,11 +6,22 @@
 #
 
 import argparse
+import importlib.util
 import logging
 import json
-import socket
+import os
 from datetime import datetime
 
+# The Filebeat client only depends on the standard library, it is loaded from its file so that this script does not
+# need LyTestTools to be installed
+FILEBEAT_CLIENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Tools', 'LyTestTools',
+                                    'ly_test_tools', 'mars', 'filebeat_client.py')
+_filebeat_client_spec = importlib.util.spec_from_file_location('filebeat_client', FILEBEAT_CLIENT_PATH)
+filebeat_client = importlib.util.module_from_spec(_filebeat_client_spec)
+_filebeat_client_spec.loader.exec_module(filebeat_client)
+FilebeatClient = filebeat_client.FilebeatClient
+FilebeatExn = filebeat_client.FilebeatExn
+
 SOCKET_TIMEOUT = 60
 DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
 FILEBEAT_PIPELINE = "filebeat"
@@ -34,48 +45,43 @@ def parse_args():
     parser.add_argument("-f", "--file", default=None, type=file_arg, help="File containing JSON data to upload.")
     parser.add_argument("-i", "--index", default=None, help="Index to use when sending the data")
     parser.add_argument("-ip", "--filebeat_ip", default=FILEBEAT_DEFAULT_IP, help="IP address where filebeat service is listening")
-    parser.add_argument("-port", "--filebeat_port", default=FILEBEAT_DEFAULT_PORT, help="Port where filebeat service is listening")
+    parser.add_argument("-port", "--filebeat_port", default=FILEBEAT_DEFAULT_PORT, type=int, help="Port where filebeat service is listening")
+    parser.add_argument("-s", "--spool_dir", default=None, help="Folder where the data is kept when filebeat is unreachable, to be sent on the next submission")
     return parser.parse_args()
 
-def submit(index, payload, filebeat_ip = FILEBEAT_DEFAULT_IP, filebeat_port = FILEBEAT_DEFAULT_PORT):
+def create_client(filebeat_ip = FILEBEAT_DEFAULT_IP, filebeat_port = FILEBEAT_DEFAULT_PORT, spool_dir = None):
+    """
+    Returns a FilebeatClient sending the submitted documents in the background, or None if filebeat is unreachable
+    and there is no spool folder. Close it to wait for the documents to be sent.
+    """
     try:
-        filebeat_address = filebeat_ip,  filebeat_port
-
-        logging.debug(f"Connecting to Filebeat on '{filebeat_address[0]}:{filebeat_address[1]}'")
-        fb_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        fb_socket.settimeout(SOCKET_TIMEOUT)
-        fb_socket.connect(filebeat_address)
-
-        event = {
-            "index": index, 
-            "timestamp": datetime.strptime(payload['timestamp'], DATE_FORMAT).strftime(DATE_FORMAT),
-            "pipeline": FILEBEAT_PIPELINE,
-            "payload": json.dumps(payload),
-        }
+        return FilebeatClient(logging.getLogger(__name__), filebeat_ip, filebeat_port, SOCKET_TIMEOUT, spool_dir=spool_dir)
+    except FilebeatExn:
+        logging.error("Failed to connect to Filebeat")
+        return None
 
-        # Serialise event, add new line and encode as UTF-8 before sending to Filebeat.
-        data = json.dumps(event) + "\n"
-        data = data.encode()
-        
-        total_sent = 0
+def submit(index, payload, filebeat_ip = FILEBEAT_DEFAULT_IP, filebeat_port = FILEBEAT_DEFAULT_PORT, client = None):
+    """
+    Queues the payload on the client if one is given, or sends it with a new client which is closed before returning.
+    Returns False if the payload could not be queued or sent.
+    """
+    owns_client = client is None
+    if owns_client:
+        client = create_client(filebeat_ip, filebeat_port)
+        if client is None:
+            return False
 
-        logging.debug(f"Sending JSON data")
-        while total_sent < len(data):
-            try:
-                sent = fb_socket.send(data[total_sent:])
-            except BrokenPipeError:
-                print("An exception occurred while sending data")
-                fb_socket.close()
-                total_sent = 0
-            else:
-                total_sent = total_sent + sent
-        logging.debug("JSON data sent")
-        fb_socket.close()
-        logging.debug(f"Disconnected from Filebeat on '{filebeat_address[0]}:{filebeat_address[1]}'")
-    except (ConnectionError, socket.timeout):
-        logging.error("Failed to connect to Filebeat")
-        return False
-    return True
+    timestamp = datetime.strptime(payload['timestamp'], DATE_FORMAT).strftime(DATE_FORMAT)
+    submitted = True
+    try:
+        client.send_event(payload, index, timestamp, FILEBEAT_PIPELINE)
+    except FilebeatExn as err:
+        logging.error(f"Failed to send JSON data: {err}")
+        submitted = False
+    if owns_client and not client.close():
+        logging.error("Failed to send JSON data to Filebeat")
+        submitted = False
+    return submitted
 
 if __name__ == "__main__":
     # Parse CLI arguments.
@@ -83,6 +89,10 @@ if __name__ == "__main__":
     if not args.index:
          logging.error(f"Index not specified")
          exit(1)
-    
-    if not submit(args.index, json.dumps(args.file), args.filebeat_ip, args.filebeat_port):
+
+    client = create_client(args.filebeat_ip, args.filebeat_port, args.spool_dir)
+    if client is None:
+        exit(1)
+    submitted = submit(args.index, args.file, client=client)
+    if not client.close() or not submitted:
         exit(1)
@@ -0,0 +1,110 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ci_build_metrics
+
+
+def make_files(root, contents):
+    """Writes the files of contents, a dictionary of relative path to bytes"""
+    for relative_path, data in contents.items():
+        path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(data)
+
+
+def touch_directory(path):
+    """Moves the mtime of a directory forward, so that the change is seen on file systems with a coarse mtime"""
+    directory_stat = os.stat(path)
+    os.utime(path, ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns + 10 ** 9))
+
+
+def walk_size(folder):
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(folder) for name in names)
+
+
+@pytest.fixture
+def build_folder(tmp_path):
+    make_files(str(tmp_path), {
+        'root.txt': b'1',
+        os.path.join('bin', 'app.exe'): b'22',
+        os.path.join('bin', 'lib', 'a.dll'): b'333',
+        os.path.join('bin', 'lib', 'b.dll'): b'4444',
+        os.path.join('obj', 'a.obj'): b'55555'
+    })
+    return str(tmp_path)
+
+
+class TestFolderSizer:
+    def test_compute_sizes_folder(self, build_folder):
+        sizes = ci_build_metrics.FolderSizer().compute(build_folder)
+
+        assert sizes['size'] == walk_size(build_folder) == 15
+        assert sizes['file_count'] == 5
+        assert sizes['size_by_extension'] == {'.txt': 1, '.exe': 2, '.dll': 7, '.obj': 5}
+        assert sizes['size_by_subfolder'] == {'.': 1, 'bin': 9, 'obj': 5}
+        assert sizes['scanned_directories'] == 4
+        assert sizes['cached_directories'] == 0
+
+    def test_compute_unchanged_folder_reuses_directory_totals(self, build_folder):
+        sizer = ci_build_metrics.FolderSizer()
+        first_sizes = sizer.compute(build_folder)
+        second_sizes = sizer.compute(build_folder)
+
+        assert second_sizes['scanned_directories'] == 0
+        assert second_sizes['cached_directories'] == 4
+        for key in ['size', 'file_count', 'size_by_extension', 'size_by_subfolder']:
+            assert second_sizes[key] == first_sizes[key]
+
+    def test_compute_changed_subfolder_is_scanned_again(self, build_folder):
+        sizer = ci_build_metrics.FolderSizer()
+        sizer.compute(build_folder)
+
+        lib_folder = os.path.join(build_folder, 'bin', 'lib')
+        make_files(lib_folder, {'c.dll': b'666666'})
+        touch_directory(lib_folder)
+        sizes = sizer.compute(build_folder)
+
+        # only the changed subfolder is listed again, its parents keep their mtime
+        assert sizes['scanned_directories'] == 1
+        assert sizes['cached_directories'] == 3
+        assert sizes['size'] == walk_size(build_folder) == 21
+        assert sizes['size_by_subfolder'] == {'.': 1, 'bin': 15, 'obj': 5}
+
+    def test_compute_removed_subfolder_is_dropped(self, build_folder):
+        sizer = ci_build_metrics.FolderSizer()
+        sizer.compute(build_folder)
+
+        shutil.rmtree(os.path.join(build_folder, 'bin', 'lib'))
+        touch_directory(os.path.join(build_folder, 'bin'))
+        sizes = sizer.compute(build_folder)
+
+        assert sizes['scanned_directories'] == 1
+        assert sizes['size'] == walk_size(build_folder) == 8
+        assert os.path.join(build_folder, 'bin', 'lib') not in sizer.directory_totals
+
+    @pytest.mark.skipif(not hasattr(os, 'link'), reason="hard links are not supported")
+    @pytest.mark.parametrize('scandir_stat_has_links', [
+        pytest.param(True, marks=pytest.mark.skipif(os.name == 'nt', reason="os.scandir has no link count on Windows")),
+        False
+    ])
+    def test_compute_counts_hard_linked_files_once(self, build_folder, monkeypatch, scandir_stat_has_links):
+        monkeypatch.setattr(ci_build_metrics, 'SCANDIR_STAT_HAS_LINKS', scandir_stat_has_links)
+        os.link(os.path.join(build_folder, 'obj', 'a.obj'), os.path.join(build_folder, 'bin', 'a.obj'))
+        sizes = ci_build_metrics.FolderSizer().compute(build_folder)
+
+        assert sizes['size'] == 15
+        assert sizes['file_count'] == 5
+        # the file is attributed to the first subfolder in sorted order
+        assert sizes['size_by_subfolder'] == {'.': 1, 'bin': 14, 'obj': 0}
@@ -7,6 +7,7 @@ Config file for pytest & PythonTestTools. Warns user if the packaged Python is n
 being used.
 """
 import argparse
+import concurrent.futures
 import os
 import pathlib
 import subprocess
@@ -38,6 +39,8 @@ def getCommandLineArgs():
                         help='Required: specifies the path to the o3de project to use')
     parser.add_argument('--engine-path', type=pathlib.Path, default=DEFAULT_ENGINE_ROOT,
                         help='specifies the path to the engine root to use')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='The maximum number of platforms to generate auxiliary content for at the same time, defaults to the number of cores.')
     return parser.parse_args()
 
 
@@ -76,6 +79,7 @@ def main():
         printMessage("Skipping asset processing")
 
     platformsSplit = args.platforms.split(',')
+    rc_cmds = []
     for platform in platformsSplit:
         printMessage("Generating auxiliary content for platform {}".format(platform))
         # Call RC to generate the auxiliary content.
@@ -86,8 +90,13 @@ def main():
                  f" --regset=/Amazon/AzCore/Bootstrap/project_path={str(args.project_path)} " \
                  f"--recompress={recompressArg}" \
                  f" --use_fastest={useFastestArg} --skiplevelPaks={skiplevelPaksArg}"
+        rc_cmds.append(rc_cmd)
 
-        subprocessWithPrint(rc_cmd)
+    # Each platform writes its own auxiliary content, so the platforms are generated at the same time
+    max_workers = max(1, min(args.jobs or 1, len(rc_cmds)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for rc_job in [executor.submit(subprocessWithPrint, rc_cmd) for rc_cmd in rc_cmds]:
+            rc_job.result()
 
 
 if __name__ == "__main__":
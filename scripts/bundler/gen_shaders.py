@@ -5,6 +5,9 @@
 #
 #
 import argparse
+import collections
+import concurrent.futures
+import hashlib
 import importlib
 import json
 import logging
@@ -20,6 +23,11 @@ if ROOT_ENGINE_PATH not in sys.path:
     sys.path.append(ROOT_ENGINE_PATH)
 
 
+STAMP_FILE_NAME = 'gen_shaders_stamps.json'
+STAMP_HASH_CHUNK_SIZE = 1024 * 1024
+FAILED_JOB_LOG_LINES = 20
+
+
 class _Configuration:
     def __init__(self, platform, asset_platform, core_compiler):
         self.platform = platform
@@ -76,17 +84,210 @@ def read_project_name_from_project_json(project_path):
     return project_name
 
 
-def gen_shaders(shader_type, shader_config, shader_list, bin_folder, project_path, engine_path, verbose):
+def _hash_file(file_path, digest):
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(STAMP_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+
+def hash_folder_manifest(folder):
+    """Returns the hash of the relative path, size and modification time of every file in the folder"""
+    manifest = []
+    pending_folders = [folder]
+    while pending_folders:
+        try:
+            with os.scandir(pending_folders.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            pending_folders.append(entry.path)
+                        else:
+                            entry_stat = entry.stat()
+                            manifest.append('{}\0{}\0{}'.format(os.path.relpath(entry.path, folder),
+                                                                entry_stat.st_size, entry_stat.st_mtime_ns))
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return hashlib.sha256('\n'.join(sorted(manifest)).encode('utf-8')).hexdigest()
+
+
+class _ShaderJob:
     """
-    Generates the shaders for a specific platform and shader type using a list of shaders using ShaderCacheGen.
+    A ShaderCacheGen run for a shader type and configuration.
+    Jobs that write the same output folder, or need a different shader list copied to the shared shaderlist.txt,
+    cannot run at the same time. This is tracked through the resources of the job, which map a resource name to the
+    value the job needs it to have.
+    The output folder is chosen by ShaderCacheGen from the shader type, so it is shared by the asset platforms of a
+    shader type, and the stamps of the last successful runs are kept per output folder.
+    """
+    def __init__(self, shader_type, shader_config, shader_list_path, cache_shader_list, output_folder,
+                 command_arguments, log_path, source_folder):
+        self.shader_type = shader_type
+        self.shader_config = shader_config
+        self.shader_list_path = shader_list_path
+        self.cache_shader_list = cache_shader_list
+        self.output_folder = output_folder
+        self.output_key = os.path.normcase(os.path.realpath(output_folder))
+        self.command_arguments = command_arguments
+        self.source_folder = source_folder
+        self.log_path = log_path
+        self.name = '{}-{}-{}'.format(shader_type, shader_config.platform, shader_config.asset_platform)
+
+        digest = hashlib.sha256()
+        if os.path.isfile(shader_list_path):
+            _hash_file(shader_list_path, digest)
+        self.shader_list_digest = digest.hexdigest()
+        self.resources = {
+            self.output_key: self.name,
+            os.path.normcase(os.path.realpath(cache_shader_list)): self.shader_list_digest
+        }
+
+    def compute_stamp(self, shadergen_digest, source_digest):
+        """
+        Returns the hash of everything the job output depends on: the shader list, the shader sources in the asset
+        cache, the compiler and its arguments
+        """
+        digest = hashlib.sha256()
+        digest.update(self.shader_list_digest.encode('utf-8'))
+        digest.update(source_digest.encode('utf-8'))
+        digest.update(shadergen_digest.encode('utf-8'))
+        digest.update('\0'.join(self.command_arguments).encode('utf-8'))
+        return digest.hexdigest()
+
+    def copy_shader_list(self):
+        """Copies the shader list to the shaderlist.txt read by ShaderCacheGen"""
+        normalized_shaderlist_path = os.path.normpath(os.path.normcase(os.path.realpath(self.shader_list_path)))
+        normalized_cache_shader_list = os.path.normpath(os.path.normcase(os.path.realpath(self.cache_shader_list)))
+
+        if normalized_shaderlist_path != normalized_cache_shader_list:
+            cache_shader_list_basename = os.path.split(self.cache_shader_list)[0]
+            os.makedirs(cache_shader_list_basename, exist_ok=True)
+            print("[{}] Copying shader_list from {} to {}".format(self.name, self.shader_list_path, self.cache_shader_list))
+            shutil.copy2(self.shader_list_path, self.cache_shader_list)
+
+    def run(self, verbose):
+        """Runs ShaderCacheGen, capturing its output in the job log. Returns the process return code"""
+        shutil.rmtree(self.output_folder, ignore_errors=True)
+
+        if verbose:
+            print('[{}] Running: {}'.format(self.name, ' '.join(self.command_arguments)))
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, 'w') as log_file:
+            return subprocess.call(self.command_arguments, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def _print_log_tail(job):
+    try:
+        with open(job.log_path, 'r', errors='replace') as log_file:
+            lines = log_file.readlines()
+    except OSError:
+        return
+    for line in lines[-FAILED_JOB_LOG_LINES:]:
+        print('[{}] {}'.format(job.name, line.rstrip()))
+
+
+def _load_stamps(stamp_file_path):
+    try:
+        with open(stamp_file_path, 'r') as stamp_file:
+            stamps = json.load(stamp_file)
+        if isinstance(stamps, dict):
+            return stamps
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def _save_stamps(stamp_file_path, stamps):
+    os.makedirs(os.path.dirname(stamp_file_path), exist_ok=True)
+    temp_file_path = stamp_file_path + '.tmp'
+    with open(temp_file_path, 'w') as stamp_file:
+        json.dump(stamps, stamp_file, indent=4, sort_keys=True)
+    os.replace(temp_file_path, stamp_file_path)
+
+
+def run_shader_jobs(jobs, shadergen_path, stamp_file_path, max_workers=None, force=False, verbose=False):
+    """
+    Runs the shader jobs concurrently on up to max_workers processes, never running together jobs that share a resource.
+    Jobs whose stamp, the hash of their shader list, shader sources and compiler inputs, matches the one of the last
+    successful run that wrote their output folder are skipped unless force is set.
+    :return: list of the names of the jobs that failed
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    digest = hashlib.sha256()
+    _hash_file(shadergen_path, digest)
+    shadergen_digest = digest.hexdigest()
+
+    stamps = _load_stamps(stamp_file_path)
+    source_digests = {}
+    output_job_counts = collections.Counter(job.output_key for job in jobs)
+    pending_jobs = []
+    for job in jobs:
+        if job.source_folder not in source_digests:
+            source_digests[job.source_folder] = hash_folder_manifest(job.source_folder)
+        job.stamp = job.compute_stamp(shadergen_digest, source_digests[job.source_folder])
+        # the output folder only holds the shaders of the last job writing it, so the jobs sharing it are always run
+        if not force and output_job_counts[job.output_key] == 1 and stamps.get(job.output_key) == job.stamp \
+                and os.path.isdir(job.output_folder):
+            print('[{}] Shader list, shader sources and compiler inputs are unchanged, skipping'.format(job.name))
+        else:
+            pending_jobs.append(job)
+
+    failed_jobs = []
+    held_resources = {}
+    running_jobs = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending_jobs or running_jobs:
+            for job in list(pending_jobs):
+                if len(running_jobs) >= max_workers:
+                    break
+                if all(held_resources.get(resource, (value, 0))[0] == value for resource, value in job.resources.items()):
+                    # the shader list is copied once by the first job using it, never while other jobs are reading it
+                    shader_list_in_use = os.path.normcase(os.path.realpath(job.cache_shader_list)) in held_resources
+                    for resource, value in job.resources.items():
+                        held_resources[resource] = (value, held_resources.get(resource, (value, 0))[1] + 1)
+                    pending_jobs.remove(job)
+                    print('[{}] Generating shaders, log: {}'.format(job.name, job.log_path))
+                    if not shader_list_in_use:
+                        job.copy_shader_list()
+                    # the output folder is cleared by the job, so it no longer holds the output of the last stamp
+                    if stamps.pop(job.output_key, None) is not None:
+                        _save_stamps(stamp_file_path, stamps)
+                    running_jobs[executor.submit(job.run, verbose)] = job
+
+            done_jobs, _ = concurrent.futures.wait(running_jobs, return_when=concurrent.futures.FIRST_COMPLETED)
+            for done_job in done_jobs:
+                job = running_jobs.pop(done_job)
+                for resource in job.resources:
+                    value, count = held_resources[resource]
+                    if count > 1:
+                        held_resources[resource] = (value, count - 1)
+                    else:
+                        del held_resources[resource]
+                try:
+                    return_code = done_job.result()
+                except OSError as err:
+                    print('[{}] Unable to run ShaderCacheGen: {}'.format(job.name, err))
+                    return_code = None
+                if return_code == 0:
+                    print('[{}] Finished generating shaders'.format(job.name))
+                    stamps[job.output_key] = job.stamp
+                    _save_stamps(stamp_file_path, stamps)
+                else:
+                    print('[{}] ShaderCacheGen failed with return code {}, see {}'.format(job.name, return_code, job.log_path))
+                    _print_log_tail(job)
+                    failed_jobs.append(job.name)
+    return failed_jobs
+
+
+def get_shader_job(shader_type, shader_config, shader_list, bin_folder, project_path, engine_path):
+    """
+    Prepares the generation of the shaders for a specific platform and shader type using a list of shaders using ShaderCacheGen.
     The generated shaders will be output at Cache/<game_name>/<asset_platform>/user/cache/Shaders/Cache/<shader_type>
+    The shader sources are read from the asset cache of the asset platform, at <project_path>/Cache/<asset_platform>
     """
-    platform = shader_config.platform
-    asset_platform = shader_config.asset_platform
     compiler = shader_config.compiler
-
-    project_name = read_project_name_from_project_json(project_path)
-    asset_cache_root = os.path.join(project_path, 'Cache', asset_platform)
+    asset_platform = shader_config.asset_platform
 
     # Make sure that the <project-path>/user folder exists
     user_cache_folder = os.path.join(project_path, 'user', 'Cache')
@@ -113,36 +314,45 @@ def gen_shaders(shader_type, shader_config, shader_list, bin_folder, project_pat
     else:
         shader_list_path = shader_list
 
-    normalized_shaderlist_path = os.path.normpath(os.path.normcase(os.path.realpath(shader_list_path)))
-    normalized_cache_shader_list = os.path.normpath(os.path.normcase(os.path.realpath(cache_shader_list)))
+    platform_shader_cache_path = os.path.join(user_cache_folder, 'shaders', 'cache', shader_type.lower())
 
-    if normalized_shaderlist_path != normalized_cache_shader_list:
-        cache_shader_list_basename = os.path.split(cache_shader_list)[0]
-        if not os.path.exists(cache_shader_list_basename):
-            os.makedirs(cache_shader_list_basename)
-        print("Copying shader_list from {} to {}".format(shader_list_path, cache_shader_list))
-        shutil.copy2(shader_list_path, cache_shader_list)
+    command_arguments = [
+        get_shadergen_path(bin_folder, engine_path),
+        f'--project-path={project_path}',
+        '--BuildGlobalCache',
+        '--ShadersPlatform={}'.format(shader_type),
+        '--TargetPlatform={}'.format(asset_platform)
+    ]
+    log_path = os.path.join(user_cache_folder, 'shaders', 'logs',
+                            '{}_{}_{}.log'.format(shader_type, shader_config.platform, asset_platform))
+    asset_cache_root = os.path.join(project_path, 'Cache', asset_platform)
+    return _ShaderJob(shader_type, shader_config, shader_list_path, cache_shader_list, platform_shader_cache_path,
+                      command_arguments, log_path, asset_cache_root)
 
-    platform_shader_cache_path = os.path.join(user_cache_folder, 'shaders', 'cache', shader_type.lower())
-    shutil.rmtree(platform_shader_cache_path, ignore_errors=True)
 
+def get_shadergen_path(bin_folder, engine_path):
     shadergen_path = os.path.join(engine_path, bin_folder, 'ShaderCacheGen')
     if is_windows():
         shadergen_path += '.exe'
 
     if not os.path.isfile(shadergen_path):
         error("ShaderCacheGen could not be found at {}".format(shadergen_path))
-    else:
-        command_arguments = [
-            shadergen_path,
-            f'--project-path={project_path}',
-            '--BuildGlobalCache',
-            '--ShadersPlatform={}'.format(shader_type),
-            '--TargetPlatform={}'.format(asset_platform)
-        ]
-        if verbose:
-            print('Running: {}'.format(' '.join(command_arguments)))
-        subprocess.call(command_arguments)
+    return shadergen_path
+
+
+def gen_shaders(shader_type, shader_config, shader_list, bin_folder, project_path, engine_path, verbose, force=False):
+    """
+    Generates the shaders for a specific platform and shader type using a list of shaders using ShaderCacheGen.
+    The generated shaders will be output at Cache/<game_name>/<asset_platform>/user/cache/Shaders/Cache/<shader_type>
+    :return: True if the shaders were generated or up to date
+    """
+    job = get_shader_job(shader_type, shader_config, shader_list, bin_folder, project_path, engine_path)
+    return not run_shader_jobs([job], job.command_arguments[0], get_stamp_file_path(project_path),
+                               max_workers=1, force=force, verbose=verbose)
+
+
+def get_stamp_file_path(project_path):
+    return os.path.join(project_path, 'user', 'Cache', 'shaders', STAMP_FILE_NAME)
 
 def add_shaders_types():
     """
@@ -189,41 +399,66 @@ def add_shaders_types():
 
     return shaders
 
-def check_arguments(args, parser, shader_types):
+def get_shader_configurations(args, parser, shader_types):
     """
-    Check that the platform and shader type arguments are correct.
+    Check that the platform and shader type arguments are correct, and returns the (shader type, configuration) pairs
+    to generate. Both the shader types and asset platforms can be comma separated lists.
     """
     shader_names = [shader.name for shader in shader_types]
+    asset_platforms = [asset_platform for asset_platform in args.asset_platform.split(',') if asset_platform]
+
+    shader_configurations = []
+    used_asset_platforms = set()
+    for shader_type_name in [name for name in args.shader_type.split(',') if name]:
+        shader_found = find_shader_type(shader_type_name, shader_types)
+        if shader_found is None:
+            parser.error('Invalid shader type {}. Must be one of [{}]'.format(shader_type_name, ' '.join(shader_names)))
+
+        configurations_found = [(asset_platform, find_shader_configuration(args.shader_platform, asset_platform, shader_found.configurations))
+                                for asset_platform in asset_platforms]
+        configurations_found = [(asset_platform, config) for asset_platform, config in configurations_found if config]
+        if not configurations_found:
+            parser.error('Invalid configuration for shader type "{}". It must be one of the following: {}'.format(shader_found.name, ', '.join(str(config) for config in shader_found.configurations)))
+        for asset_platform, config in configurations_found:
+            used_asset_platforms.add(asset_platform)
+            shader_configurations.append((shader_found.name, config))
 
-    shader_found = find_shader_type(args.shader_type, shader_types)
-    if shader_found is None:
-        parser.error('Invalid shader type {}. Must be one of [{}]'.format(args.shader_type, ' '.join(shader_names)))
+    unused_asset_platforms = [asset_platform for asset_platform in asset_platforms if asset_platform not in used_asset_platforms]
+    if unused_asset_platforms:
+        parser.error('No shader type generates shaders for asset platforms {}'.format(', '.join(unused_asset_platforms)))
+    return shader_configurations
 
-    else:
-        config_found = find_shader_configuration(args.shader_platform, args.asset_platform, shader_found.configurations)
-        if config_found is None:
-            parser.error('Invalid configuration for shader type "{}". It must be one of the following: {}'.format(shader_found.name, ', '.join(str(config) for config in shader_found.configurations)))
 
+def main():
+    parser = argparse.ArgumentParser(description='Generates the shaders for specific platforms and shader types.')
+    parser.add_argument('asset_platform', type=str, help="The asset cache sub folder to use for shader generation, or a comma separated list of them")
+    parser.add_argument('shader_type', type=str, help="The shader type to use, or a comma separated list of them")
+    parser.add_argument('-p', '--shader-platform', type=str, required=False, default='', help="The target platform to generate shaders for.")
+    parser.add_argument('-b', '--bin-folder', type=str, help="Folder where the ShaderCacheGen executable lives. This is used along the project (ShaderCacheGen)")
+    parser.add_argument('-e', '--engine-path', type=str, help="Path to the engine root folder. This the same as game_path for non external projects")
+    parser.add_argument('-g', '--project-path', type=str, required=True, help="Path to the game root folder. This the same as engine_path for non external projects")
+    parser.add_argument('-s', '--shader-list', type=str, required=False, help="Optional path to the list of shaders. If not provided will use the list generated by the local shader compiler.")
+    parser.add_argument('-j', '--jobs', type=int, required=False, default=os.cpu_count(), help="Maximum number of ShaderCacheGen processes to run at the same time, defaults to the number of cores")
+    parser.add_argument('-f', '--force', action="store_true", required=False, help="Generate the shaders even if the shader list, shader sources and compiler are unchanged since the last generation")
+    parser.add_argument('-v', '--verbose', action="store_true", required=False, help="Increase the logging output")
+
+    args = parser.parse_args()
 
-parser = argparse.ArgumentParser(description='Generates the shaders for a specific platform and shader type.')
-parser.add_argument('asset_platform', type=str, help="The asset cache sub folder to use for shader generation")
-parser.add_argument('shader_type', type=str, help="The shader type to use")
-parser.add_argument('-p', '--shader-platform', type=str, required=False, default='', help="The target platform to generate shaders for.")
-parser.add_argument('-b', '--bin-folder', type=str, help="Folder where the ShaderCacheGen executable lives. This is used along the project (ShaderCacheGen)")
-parser.add_argument('-e', '--engine-path', type=str, help="Path to the engine root folder. This the same as game_path for non external projects")
-parser.add_argument('-g', '--project-path', type=str, required=True, help="Path to the game root folder. This the same as engine_path for non external projects")
-parser.add_argument('-s', '--shader-list', type=str, required=False, help="Optional path to the list of shaders. If not provided will use the list generated by the local shader compiler.")
-parser.add_argument('-v', '--verbose', action="store_true", required=False, help="Increase the logging output")
+    shader_types = add_shaders_types()
 
-args = parser.parse_args()
+    shader_configurations = get_shader_configurations(args, parser, shader_types)
+    print('Generating shaders for {} (shaders={}, platform={}, assets={})'.format(args.project_path, args.shader_type, args.shader_platform, args.asset_platform))
 
-shader_types = add_shaders_types()
+    jobs = [get_shader_job(shader_type, shader_config, args.shader_list, args.bin_folder, args.project_path, args.engine_path)
+            for shader_type, shader_config in shader_configurations]
+    failed_jobs = run_shader_jobs(jobs, get_shadergen_path(args.bin_folder, args.engine_path),
+                                  get_stamp_file_path(args.project_path), max_workers=args.jobs, force=args.force,
+                                  verbose=args.verbose)
+    if failed_jobs:
+        error('Failed generating shaders for {}'.format(', '.join(failed_jobs)))
 
-check_arguments(args, parser, shader_types)
-print('Generating shaders for {} (shaders={}, platform={}, assets={})'.format(args.project_path, args.shader_type, args.shader_platform, args.asset_platform))
+    print('Finish generating shaders')
 
-shader = find_shader_type(args.shader_type, shader_types)
-shader_config = find_shader_configuration(args.shader_platform, args.asset_platform, shader.configurations)
-gen_shaders(args.shader_type, shader_config, args.shader_list, args.bin_folder, args.project_path, args.engine_path, args.verbose)
 
-print('Finish generating shaders')
+if __name__ == '__main__':
+    main()
@@ -5,35 +5,197 @@
 #
 #
 import argparse
+import concurrent.futures
 import fnmatch
 import glob
+import hashlib
+import json
 import os
 import re
 import sys
+import tempfile
 import zipfile
 
+MANIFEST_SUFFIX = '.manifest'
+MANIFEST_VERSION = 1
 
-def _create_zip(source_path, zip_file_path, append, filter_list, ignore_list, compression_level, zip_internal_path = ''):
+SHADER_CACHE_IGNORE_LIST = ['shaderlist.txt', 'shadercachemisses.txt']
+
+SHADER_CACHE_FILTERS = ['*.*']
+
+SHADER_CACHE_STARTUP_FILTERS = ['Common.cfib', 'FXConstantDefs.cfib', 'FXSamplerDefs.cfib', 'FXSetupEnvVars.cfib',
+                                'FXStreamDefs.cfib', 'fallback.cfxb', 'fallback.fxb', 'FixedPipelineEmu.cfxb',
+                                'FixedPipelineEmu.fxb', 'Stereo.cfxb', 'Stereo.fxb', 'lookupdata.bin',
+                                'Video.cfxb', 'Video.fxb',
+                                os.path.join('CGPShaders', 'FixedPipelineEmu@*'),
+                                os.path.join('CGVShaders', 'FixedPipelineEmu@*'),
+                                os.path.join('CGPShaders', 'FixedPipelineEmu', '*'),
+                                os.path.join('CGVShaders', 'FixedPipelineEmu', '*'),
+                                os.path.join('CGPShaders', 'Stereo@*'),
+                                os.path.join('CGVShaders', 'Stereo@*'),
+                                os.path.join('CGPShaders', 'Stereo', '*'),
+                                os.path.join('CGVShaders', 'Stereo', '*'),
+                                os.path.join('CGPShaders', 'Video@*'),
+                                os.path.join('CGVShaders', 'Video@*'),
+                                os.path.join('CGPShaders', 'Video', '*'),
+                                os.path.join('CGVShaders', 'Video', '*')
+                                ]
+
+
+def _compile_filters(filter_list):
+    """
+    Compiles a list of fnmatch filters into a single case insensitive regex, so each file is matched once
+    instead of once per filter.
+    """
+    return re.compile(r'|'.join([fnmatch.translate(os.path.normcase(filter.lower())) for filter in filter_list]))
+
+
+def _find_files(source_path, ignore_regex):
+    """
+    Returns (relative path in lower case, source path) for all the files in source_path which do not match the ignore
+    regex. The relative paths are lower case since file matching is case insensitive and the paks use lower case names.
+    """
+    files = []
+    for root, dirnames, filenames in os.walk(source_path):
+        dirnames.sort()
+        for file in sorted(filenames):
+            if not ignore_regex.match(file.lower()):
+                file_path = os.path.join(root, file)
+                files.append((os.path.relpath(file_path, source_path).lower(), file_path))
+    return files
+
+
+def _select_files(files, filter_regex, zip_internal_path):
+    """Returns a dictionary of pak entry name to source path for the files which match the filter regex"""
+    entries = {}
+    for relative_path, file_path in files:
+        if filter_regex.match(os.path.normcase(relative_path)):
+            entries[os.path.join(zip_internal_path, relative_path).replace(os.sep, '/')] = file_path
+    return entries
+
+
+def _hash_file(file_path):
+    file_hash = hashlib.sha1()
+    with open(file_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_manifest_folder(output_folder):
+    """
+    Returns the default folder of the manifests of the paks written to output_folder. The manifests are build
+    intermediates, so they are kept in a temporary folder specific to the output folder instead of next to the paks
+    which are deployed.
+    """
+    hasher = hashlib.md5()
+    hasher.update(os.path.normcase(os.path.abspath(output_folder)).encode('UTF-8'))
+    return os.path.join(tempfile.gettempdir(), 'ly-pak-shaders-{}'.format(hasher.hexdigest()))
+
+
+def _load_manifest(zip_file_path, manifest_path):
+    """
+    Returns the manifest of a pak, a dictionary of entry name to [size, mtime_ns, sha1] of the source file the entry
+    was written from, or None if there is no manifest or the pak was modified after the manifest was written.
+    """
+    try:
+        with open(manifest_path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+        zip_stat = os.stat(zip_file_path)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('pak') != [zip_stat.st_size, zip_stat.st_mtime_ns]:
+        return None
+    return manifest['entries']
+
+
+def _save_manifest(zip_file_path, manifest_path, entries):
+    zip_stat = os.stat(zip_file_path)
+    manifest = {'version': MANIFEST_VERSION, 'pak': [zip_stat.st_size, zip_stat.st_mtime_ns], 'entries': entries}
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    temp_manifest_path = manifest_path + '.tmp'
+    with open(temp_manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(temp_manifest_path, manifest_path)
+
+
+def _update_zip(zip_file_path, files, append, compression, manifest_path):
     """
-    Internal function for creating a zip file containing the files that match the list of filters provided.
-    File matching is case insensitive.
+    Internal function for writing the files to a zip file, given as a dictionary of entry name to source path.
+    Without append the zip will contain exactly these files, with append they are added to the existing entries.
+    A manifest is kept at manifest_path with the size, modification time and hash of the source of each entry, so
+    files which did not change since the zip was written are not written again. The zip is left untouched when
+    nothing changed, new files are appended to it, and otherwise it is rewritten with the unchanged entries
+    copied from the previous zip.
     """
-    ignore_list = [filter.lower() for filter in ignore_list]
-    filter_list = [filter.lower() for filter in filter_list]
-    
-    ignore_list = r'|'.join([fnmatch.translate(x) for x in ignore_list])
     try:
-        mode = 'a' if append else 'w'        
-        with zipfile.ZipFile(zip_file_path, mode, compression_level) as myzip:
-            # Go through all the files in the source path.
-            for root, dirnames, filenames in os.walk(source_path):
-                # Remove files that match the ignore list.
-                files = [os.path.relpath(os.path.join(root, file), source_path).lower() for file in filenames if not re.match(ignore_list, file.lower())]
-                # Match the files we have found against the filters.
-                for filter in filter_list:
-                    for filename in fnmatch.filter(files, filter):
-                        # Add the file to the zip using the specified internal destination.
-                        myzip.write(os.path.join(source_path, filename), os.path.join(zip_internal_path, filename))
+        zip_exists = os.path.isfile(zip_file_path)
+        previous_entries = _load_manifest(zip_file_path, manifest_path) if zip_exists else None
+        if previous_entries is None:
+            # Without a manifest, the entries of the existing zip can be kept but not compared with the sources
+            previous_entries = {}
+            reuse_zip = append and zip_exists
+            previous_names = set()
+            if reuse_zip:
+                with zipfile.ZipFile(zip_file_path) as previous_zip:
+                    previous_names = set(previous_zip.namelist())
+        else:
+            reuse_zip = True
+            previous_names = set(previous_entries)
+
+        entries = {name: previous_entries.get(name) for name in previous_names} if append else {}
+        new_files = {}
+        changed_files = {}
+        for name, file_path in files.items():
+            file_stat = os.stat(file_path)
+            previous_entry = previous_entries.get(name)
+            if previous_entry and previous_entry[0] == file_stat.st_size and previous_entry[1] == file_stat.st_mtime_ns:
+                entries[name] = previous_entry
+                continue
+            file_hash = _hash_file(file_path)
+            if previous_entry and previous_entry[0] == file_stat.st_size and previous_entry[2] == file_hash:
+                entries[name] = [file_stat.st_size, file_stat.st_mtime_ns, file_hash]
+                continue
+            entries[name] = [file_stat.st_size, file_stat.st_mtime_ns, file_hash]
+            if name in previous_names:
+                changed_files[name] = file_path
+            else:
+                new_files[name] = file_path
+
+        removed_names = previous_names - set(entries)
+        if reuse_zip and not new_files and not changed_files and not removed_names:
+            print('{} is up to date'.format(zip_file_path))
+        elif reuse_zip and not changed_files and not removed_names:
+            with zipfile.ZipFile(zip_file_path, 'a', compression) as myzip:
+                for name, file_path in new_files.items():
+                    myzip.write(file_path, name)
+        else:
+            temp_zip_file_path = zip_file_path + '.tmp'
+            with zipfile.ZipFile(temp_zip_file_path, 'w', compression) as myzip:
+                previous_zip = zipfile.ZipFile(zip_file_path) if previous_names else None
+                try:
+                    for name in entries:
+                        file_path = files.get(name)
+                        if file_path is None or (name in previous_names and name not in changed_files):
+                            # Unchanged entries are copied from the previous zip, keeping their timestamps
+                            previous_info = previous_zip.getinfo(name)
+                            zip_info = zipfile.ZipInfo(name, previous_info.date_time)
+                            zip_info.compress_type = compression
+                            zip_info.external_attr = previous_info.external_attr
+                            zip_info.file_size = previous_info.file_size
+                            with previous_zip.open(previous_info) as source, myzip.open(zip_info, 'w') as target:
+                                while True:
+                                    chunk = source.read(1024 * 1024)
+                                    if not chunk:
+                                        break
+                                    target.write(chunk)
+                        else:
+                            myzip.write(file_path, name)
+                finally:
+                    if previous_zip:
+                        previous_zip.close()
+            os.replace(temp_zip_file_path, zip_file_path)
+        _save_manifest(zip_file_path, manifest_path, entries)
     except IOError as error:
        print("I/O error({0}) while creating zip file {1}: {2}".format(error.errno, zip_file_path, error.strerror))
        return False
@@ -43,63 +205,67 @@ def _create_zip(source_path, zip_file_path, append, filter_list, ignore_list, co
 
     return True
 
-# Create or append a pak file with all the shaders found in source_path.
-def pak_shaders_in_folder(source_path, output_folder, shader_type, append):
+
+def pak_shader_folders(shader_folders, output_folder, append=False, manifest_folder=None):
     """
-    Creates the shadercache.pak and the shadercachestartup.pak using the shader files located at source_path.
+    Creates the shadercache.pak and the shadercachestartup.pak using the shader files of each (shader type, source
+    path) pair. The source folders are listed concurrently, and then both paks are written concurrently.
+    The manifests of the paks are kept in manifest_folder, which defaults to get_manifest_folder(output_folder).
     """
+    for shader_type, source_path in shader_folders:
+        print('Packing shader source folder {}'.format(source_path))
+        if not os.path.exists(source_path):
+            print('[Error] Shader source folder is not available at {}. Shader type: {}.'.format(source_path, shader_type))
+            return False
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    if manifest_folder is None:
+        manifest_folder = get_manifest_folder(output_folder)
 
-    ignore_list = ['shaderlist.txt', 'shadercachemisses.txt']
-
-    shaders_cache_startup_filters = ['Common.cfib', 'FXConstantDefs.cfib', 'FXSamplerDefs.cfib', 'FXSetupEnvVars.cfib',
-                                     'FXStreamDefs.cfib', 'fallback.cfxb', 'fallback.fxb', 'FixedPipelineEmu.cfxb',
-                                     'FixedPipelineEmu.fxb', 'Stereo.cfxb', 'Stereo.fxb', 'lookupdata.bin',
-                                     'Video.cfxb', 'Video.fxb',
-                                     os.path.join('CGPShaders', 'FixedPipelineEmu@*'),
-                                     os.path.join('CGVShaders', 'FixedPipelineEmu@*'),
-                                     os.path.join('CGPShaders', 'FixedPipelineEmu', '*'),
-                                     os.path.join('CGVShaders', 'FixedPipelineEmu', '*'),
-                                     os.path.join('CGPShaders', 'Stereo@*'),
-                                     os.path.join('CGVShaders', 'Stereo@*'),
-                                     os.path.join('CGPShaders', 'Stereo', '*'),
-                                     os.path.join('CGVShaders', 'Stereo', '*'),
-                                     os.path.join('CGPShaders', 'Video@*'),
-                                     os.path.join('CGVShaders', 'Video@*'),
-                                     os.path.join('CGPShaders', 'Video', '*'),
-                                     os.path.join('CGVShaders', 'Video', '*')
-                                     ]
-
-    print('Packing shader source folder {}'.format(source_path))
-    result = True
-    if os.path.exists(source_path):
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-
-        # We want the files to be added to the "shaders/cache/$shader_type" path inside the pak file.
-        zip_interal_path = os.path.join('shaders', 'cache', shader_type)
-
-        result &= _create_zip(source_path, os.path.join(output_folder, 'shadercache.pak'), append, ['*.*'], ignore_list, zipfile.ZIP_STORED, zip_interal_path)
-        result &= _create_zip(source_path, os.path.join(output_folder, 'shadercachestartup.pak'), append, shaders_cache_startup_filters, ignore_list, zipfile.ZIP_STORED, zip_interal_path)
-    else:
-        print('[Error] Shader source folder is not available at {}. Shader type: {}.'.format(source_path, shader_type))
-        result = False
+    ignore_regex = re.compile(r'|'.join([fnmatch.translate(x.lower()) for x in SHADER_CACHE_IGNORE_LIST]))
+    paks = [(os.path.join(output_folder, 'shadercache.pak'), _compile_filters(SHADER_CACHE_FILTERS)),
+            (os.path.join(output_folder, 'shadercachestartup.pak'), _compile_filters(SHADER_CACHE_STARTUP_FILTERS))]
+
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        folder_files = list(executor.map(lambda shader_folder: _find_files(shader_folder[1], ignore_regex), shader_folders))
+
+        pak_futures = []
+        for zip_file_path, filter_regex in paks:
+            files = {}
+            for (shader_type, _), source_files in zip(shader_folders, folder_files):
+                # We want the files to be added to the "shaders/cache/$shader_type" path inside the pak file.
+                zip_internal_path = os.path.join('shaders', 'cache', shader_type)
+                files.update(_select_files(source_files, filter_regex, zip_internal_path))
+            # Remove the manifests written next to the paks by previous versions of this script
+            if os.path.isfile(zip_file_path + MANIFEST_SUFFIX):
+                os.remove(zip_file_path + MANIFEST_SUFFIX)
+            manifest_path = os.path.join(manifest_folder, os.path.basename(zip_file_path) + MANIFEST_SUFFIX)
+            pak_futures.append(executor.submit(_update_zip, zip_file_path, files, append, zipfile.ZIP_STORED,
+                                               manifest_path))
+
+        result = True
+        for pak_future in pak_futures:
+            result &= pak_future.result()
     return result
 
+# Create or append a pak file with all the shaders found in source_path.
+def pak_shaders_in_folder(source_path, output_folder, shader_type, append, manifest_folder=None):
+    """
+    Creates the shadercache.pak and the shadercachestartup.pak using the shader files located at source_path.
+    """
+    return pak_shader_folders([(shader_type, source_path)], output_folder, append, manifest_folder)
+
 # Generate a shaders pak file with all the shader types indicated.
 # NOTE: A shader type can specify an specific source path or not. Examples:
 #       - 'metal,specific/path/to/shaders': Use the folder specified as the source path to all metal shaders.
 #       - 'metal': Use source_path/metal as source path to all metal shaders. Wildcard usage is allowed, for example 'gles3*'.
-def pak_shaders(source_path, output_folder, shader_types):
-    shader_flavors_packed = 0
+def pak_shaders(source_path, output_folder, shader_types, manifest_folder=None):
+    shader_folders = []
     for shader_info in shader_types:
         # First element is the type, the second (if present) is the specific source
         shader_type = shader_info[0]
         if len(shader_info) > 1:
-            shader_type_source = shader_info[1]
-            if pak_shaders_in_folder(shader_type_source, output_folder, shader_type, shader_flavors_packed > 0):
-                shader_flavors_packed = shader_flavors_packed + 1
-            else:
-                return False
+            shader_folders.append((shader_type, shader_info[1]))
         else:
             # No specific source path for this shader type so use the global source path. Wildcard allowed.
             listing = glob.glob(os.path.join(source_path, shader_type))
@@ -107,32 +273,33 @@ def pak_shaders(source_path, output_folder, shader_types):
                 if os.path.isdir(shader_type_source):
                     # Since the shader_type can use wildcard we have to obtain the actual shader type found by removing source_path
                     # Example: If shader_type is 'gl4*' then now will be 'gl4_4'
-                    shader_type = shader_type_source[len(source_path)+1:]
-                    if pak_shaders_in_folder(shader_type_source, output_folder, shader_type, shader_flavors_packed > 0):
-                        shader_flavors_packed = shader_flavors_packed + 1
-                    else:
-                        return False
+                    shader_folders.append((shader_type_source[len(source_path)+1:], shader_type_source))
 
-    if shader_flavors_packed == 0:
+    if not shader_folders:
         print('Failed to pack any shader type')
+        return False
 
-    return shader_flavors_packed > 0
+    # All the shader types are packed together, so the paks are only rewritten for what changed since the last run
+    return pak_shader_folders(shader_folders, output_folder, manifest_folder=manifest_folder)
 
 def pair_arg(arg):
     return [str(x) for x in arg.split(',')]
 
-parser = argparse.ArgumentParser(description='Pack the provided shader files into paks.')
-parser.add_argument("output", type=str, help="specify the output folder")
-parser.add_argument('-r', '--source', type=str, required=False, help="specify global input folder")
-parser.add_argument('-s', '--shaders_types', required=True, nargs='+', type=pair_arg,
-                    help='list of shader types with optional source path')
-
-args = parser.parse_args()
-print('Packing shaders...')
-if not pak_shaders(args.source, args.output, args.shaders_types):
-    print('Failed to pack shaders')
-    exit(1)
-
-print('Packs have been placed at "{}"'.format(args.output))
-print('To use them, deploy them in your assets folder.')
-print('Finish packing shaders')
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack the provided shader files into paks.')
+    parser.add_argument("output", type=str, help="specify the output folder")
+    parser.add_argument('-r', '--source', type=str, required=False, help="specify global input folder")
+    parser.add_argument('-s', '--shaders_types', required=True, nargs='+', type=pair_arg,
+                        help='list of shader types with optional source path')
+    parser.add_argument('-m', '--manifest_folder', type=str, required=False,
+                        help="specify the folder of the manifests used to rebuild the paks incrementally")
+
+    args = parser.parse_args()
+    print('Packing shaders...')
+    if not pak_shaders(args.source, args.output, args.shaders_types, args.manifest_folder):
+        print('Failed to pack shaders')
+        exit(1)
+
+    print('Packs have been placed at "{}"'.format(args.output))
+    print('To use them, deploy them in your assets folder.')
+    print('Finish packing shaders')
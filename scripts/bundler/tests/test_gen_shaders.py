@@ -0,0 +1,109 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gen_shaders
+
+# Stands in for ShaderCacheGen: writes the target platform to the output folder and records the run
+FAKE_SHADERGEN = '''
+import os, sys
+output_folder, asset_platform, runs_path, return_code = sys.argv[1:]
+os.makedirs(output_folder, exist_ok=True)
+with open(os.path.join(output_folder, 'shaders.txt'), 'w') as output_file:
+    output_file.write(asset_platform)
+with open(runs_path, 'a') as runs_file:
+    runs_file.write(asset_platform + '\\n')
+sys.exit(int(return_code))
+'''
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(data)
+
+
+class ShaderProject:
+    def __init__(self, root):
+        self.root = str(root)
+        self.shadergen_path = os.path.join(self.root, 'ShaderCacheGen.py')
+        self.runs_path = os.path.join(self.root, 'runs.txt')
+        self.stamp_file_path = gen_shaders.get_stamp_file_path(self.root)
+        self.shader_list_path = os.path.join(self.root, 'ShaderList_METAL.txt')
+        write_file(self.shadergen_path, FAKE_SHADERGEN)
+        write_file(self.shader_list_path, 'Illum\n')
+        for asset_platform in ['mac', 'ios']:
+            write_file(os.path.join(self.root, 'Cache', asset_platform, 'shaders', 'illum.cfx'), asset_platform)
+
+    def make_job(self, asset_platform, return_code=0):
+        config = gen_shaders._Configuration(asset_platform.capitalize(), asset_platform, 'METAL_LLVM_DXC-METAL')
+        user_cache_folder = os.path.join(self.root, 'user', 'Cache')
+        output_folder = os.path.join(user_cache_folder, 'shaders', 'cache', 'metal')
+        command_arguments = [sys.executable, self.shadergen_path, output_folder, asset_platform, self.runs_path,
+                             str(return_code)]
+        return gen_shaders._ShaderJob('METAL', config, self.shader_list_path,
+                                      os.path.join(user_cache_folder, 'shaders', 'shaderlist.txt'), output_folder,
+                                      command_arguments, os.path.join(user_cache_folder, 'shaders', 'logs',
+                                                                      'METAL_{}.log'.format(asset_platform)),
+                                      os.path.join(self.root, 'Cache', asset_platform))
+
+    def run(self, asset_platforms, return_code=0):
+        """Runs the jobs of the asset platforms and returns the (failed jobs, asset platforms which were generated)"""
+        if os.path.isfile(self.runs_path):
+            os.remove(self.runs_path)
+        failed_jobs = gen_shaders.run_shader_jobs([self.make_job(asset_platform, return_code)
+                                                   for asset_platform in asset_platforms],
+                                                  self.shadergen_path, self.stamp_file_path)
+        if not os.path.isfile(self.runs_path):
+            return failed_jobs, []
+        with open(self.runs_path) as runs_file:
+            return failed_jobs, sorted(runs_file.read().split())
+
+
+@pytest.fixture
+def shader_project(tmp_path):
+    return ShaderProject(tmp_path)
+
+
+class TestRunShaderJobs:
+    def test_unchanged_job_is_skipped(self, shader_project):
+        assert shader_project.run(['mac']) == ([], ['mac'])
+        assert shader_project.run(['mac']) == ([], [])
+
+    def test_changed_shader_source_is_generated_again(self, shader_project):
+        assert shader_project.run(['mac']) == ([], ['mac'])
+
+        write_file(os.path.join(shader_project.root, 'Cache', 'mac', 'shaders', 'common.cfi'), 'common')
+        assert shader_project.run(['mac']) == ([], ['mac'])
+        assert shader_project.run(['mac']) == ([], [])
+
+    def test_changed_shader_list_is_generated_again(self, shader_project):
+        assert shader_project.run(['mac']) == ([], ['mac'])
+
+        write_file(shader_project.shader_list_path, 'Illum\nSky\n')
+        assert shader_project.run(['mac']) == ([], ['mac'])
+
+    def test_shared_output_folder_is_generated_again_for_other_asset_platform(self, shader_project):
+        assert shader_project.run(['mac']) == ([], ['mac'])
+        assert shader_project.run(['ios']) == ([], ['ios'])
+
+        # the output folder now holds the ios shaders
+        assert shader_project.run(['mac']) == ([], ['mac'])
+
+    def test_jobs_sharing_output_folder_are_never_skipped(self, shader_project):
+        assert shader_project.run(['mac', 'ios']) == ([], ['ios', 'mac'])
+        assert shader_project.run(['mac', 'ios']) == ([], ['ios', 'mac'])
+
+    def test_failed_job_is_run_again(self, shader_project):
+        assert shader_project.run(['mac'], return_code=1) == (['METAL-Mac-mac'], ['mac'])
+        assert shader_project.run(['mac']) == ([], ['mac'])
+        assert shader_project.run(['mac']) == ([], [])
@@ -0,0 +1,134 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pak_shaders
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def read_pak(pak_path):
+    with zipfile.ZipFile(pak_path) as pak:
+        return {name: pak.read(name) for name in pak.namelist()}
+
+
+@pytest.fixture
+def shader_folders(tmp_path):
+    source = str(tmp_path / 'source' / 'dx12')
+    write_file(os.path.join(source, 'Common.cfib'), b'common')
+    write_file(os.path.join(source, 'Illum.cfxb'), b'illum')
+    write_file(os.path.join(source, 'CGPShaders', 'Illum@0.fxcb'), b'illum pixel shader')
+    write_file(os.path.join(source, 'shaderlist.txt'), b'ignored')
+    return [('dx12', source)]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'output'), str(tmp_path / 'manifests')
+
+
+def pak_and_stat(shader_folders, output_folder, manifest_folder):
+    assert pak_shaders.pak_shader_folders(shader_folders, output_folder, manifest_folder=manifest_folder)
+    return {pak_name: os.stat(os.path.join(output_folder, pak_name)).st_mtime_ns
+            for pak_name in ('shadercache.pak', 'shadercachestartup.pak')}
+
+
+def test_PakShaderFolders_Paks_ContainFilteredShadersAndNoManifest(shader_folders, paths):
+    output_folder, manifest_folder = paths
+    pak_and_stat(shader_folders, output_folder, manifest_folder)
+
+    assert read_pak(os.path.join(output_folder, 'shadercache.pak')) == {
+        'shaders/cache/dx12/common.cfib': b'common',
+        'shaders/cache/dx12/illum.cfxb': b'illum',
+        'shaders/cache/dx12/cgpshaders/illum@0.fxcb': b'illum pixel shader'}
+    assert read_pak(os.path.join(output_folder, 'shadercachestartup.pak')) == {
+        'shaders/cache/dx12/common.cfib': b'common'}
+    # The manifests are intermediates which are not deployed with the paks
+    assert sorted(os.listdir(output_folder)) == ['shadercache.pak', 'shadercachestartup.pak']
+    assert sorted(os.listdir(manifest_folder)) == ['shadercache.pak.manifest', 'shadercachestartup.pak.manifest']
+
+
+def test_PakShaderFolders_Unchanged_PaksNotRewritten(shader_folders, paths, capsys):
+    output_folder, manifest_folder = paths
+    first_mtimes = pak_and_stat(shader_folders, output_folder, manifest_folder)
+    capsys.readouterr()
+
+    # Touching a source without changing it only updates the manifest
+    common_path = os.path.join(shader_folders[0][1], 'Common.cfib')
+    os.utime(common_path, ns=(os.stat(common_path).st_atime_ns, os.stat(common_path).st_mtime_ns + 10 ** 9))
+
+    assert pak_and_stat(shader_folders, output_folder, manifest_folder) == first_mtimes
+    assert capsys.readouterr().out.count('is up to date') == 2
+
+
+def test_PakShaderFolders_ChangedAddedRemoved_PaksUpdated(shader_folders, paths, tmp_path):
+    output_folder, manifest_folder = paths
+    source = shader_folders[0][1]
+    pak_and_stat(shader_folders, output_folder, manifest_folder)
+
+    # A new file is appended to shadercache.pak, shadercachestartup.pak is left untouched
+    startup_mtime = os.stat(os.path.join(output_folder, 'shadercachestartup.pak')).st_mtime_ns
+    write_file(os.path.join(source, 'Added.cfxb'), b'added')
+    pak_and_stat(shader_folders, output_folder, manifest_folder)
+    assert read_pak(os.path.join(output_folder, 'shadercache.pak'))['shaders/cache/dx12/added.cfxb'] == b'added'
+    assert os.stat(os.path.join(output_folder, 'shadercachestartup.pak')).st_mtime_ns == startup_mtime
+
+    # Changed and removed files rewrite the paks
+    write_file(os.path.join(source, 'Common.cfib'), b'common changed')
+    os.remove(os.path.join(source, 'Illum.cfxb'))
+    pak_and_stat(shader_folders, output_folder, manifest_folder)
+
+    expected_pak = {
+        'shaders/cache/dx12/common.cfib': b'common changed',
+        'shaders/cache/dx12/added.cfxb': b'added',
+        'shaders/cache/dx12/cgpshaders/illum@0.fxcb': b'illum pixel shader'}
+    assert read_pak(os.path.join(output_folder, 'shadercache.pak')) == expected_pak
+    assert read_pak(os.path.join(output_folder, 'shadercachestartup.pak')) == {
+        'shaders/cache/dx12/common.cfib': b'common changed'}
+
+    # The incremental pak matches a pak built from scratch
+    clean_output_folder = str(tmp_path / 'clean_output')
+    pak_and_stat(shader_folders, clean_output_folder, str(tmp_path / 'clean_manifests'))
+    assert read_pak(os.path.join(clean_output_folder, 'shadercache.pak')) == expected_pak
+
+
+def test_PakShaderFolders_ModifiedPak_ManifestIgnored(shader_folders, paths):
+    output_folder, manifest_folder = paths
+    pak_and_stat(shader_folders, output_folder, manifest_folder)
+
+    # A pak modified by something else no longer matches its manifest, so it is rebuilt from the sources
+    with zipfile.ZipFile(os.path.join(output_folder, 'shadercache.pak'), 'a') as pak:
+        pak.writestr('shaders/cache/dx12/foreign.cfxb', b'foreign')
+    pak_and_stat(shader_folders, output_folder, manifest_folder)
+
+    assert 'shaders/cache/dx12/foreign.cfxb' not in read_pak(os.path.join(output_folder, 'shadercache.pak'))
+
+
+def test_PakShaderFolders_ManifestNextToPak_Removed(shader_folders, paths):
+    output_folder, manifest_folder = paths
+    write_file(os.path.join(output_folder, 'shadercache.pak' + pak_shaders.MANIFEST_SUFFIX), b'{}')
+    pak_and_stat(shader_folders, output_folder, manifest_folder)
+
+    assert sorted(os.listdir(output_folder)) == ['shadercache.pak', 'shadercachestartup.pak']
+
+
+def test_GetManifestFolder_OutsideOutputFolder(tmp_path):
+    output_folder = str(tmp_path / 'output')
+    manifest_folder = pak_shaders.get_manifest_folder(output_folder)
+
+    assert not os.path.abspath(manifest_folder).startswith(os.path.abspath(output_folder))
+    assert manifest_folder == pak_shaders.get_manifest_folder(output_folder + os.sep)
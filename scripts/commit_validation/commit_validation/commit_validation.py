@@ -6,15 +6,25 @@
 #
 
 import abc
+import concurrent.futures
+import fnmatch
+import functools
 import importlib
 import os
+import pickle
 import pkgutil
 import re
 import time
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Type
 
 VERBOSE = False
 
+MIN_FILES_FOR_PARALLEL_VALIDATION = 32
+"""Commits with fewer files than this are validated in the current process"""
+
+VALIDATION_CHUNKS_PER_WORKER = 4
+"""The files of a commit are split into this many chunks per worker process, to balance uneven file sizes"""
+
 class Commit(abc.ABC):
     """An interface for accessing details about a commit"""
 
@@ -47,20 +57,67 @@ class Commit(abc.ABC):
         """Returns the author of the commit"""
         pass
 
+    def get_file_diff_lines(self, file_name: str) -> List[str]:
+        """Returns the lines of the unified diff of a file, see :meth:`get_file_diff`"""
+        return self.get_file_diff(file_name).splitlines()
 
-def validate_commit(commit: Commit, out_errors: List[str] = None, ignore_validators: List[str] = None) -> bool:
-    """Validates a commit against all validators
+    def get_file_contents(self, file_name: str) -> str:
+        """Returns the current contents of a local file added/modified by the commit, for validators which look at
+        the whole file rather than its diff"""
+        with open(file_name, 'rt', encoding='utf8', errors='replace') as fh:
+            return fh.read()
+
+
+class CachedCommit(Commit):
+    """A :class:`Commit` which forwards to another commit, fetching and splitting the diff and reading the contents
+    of each file only once so they are shared by all of the validators. It can be limited to a subset of the files."""
+
+    def __init__(self, commit: Commit, files: List[str] = None) -> None:
+        """Creates a new instance of :class:`CachedCommit`
+
+        :param commit: the commit to forward to
+        :param files: optional subset of the files of the commit to validate, defaults to all of them
+        """
+        self.commit = commit
+        self.files = commit.get_files() if files is None else files
+        self.file_diffs: Dict[str, str] = {}
+        self.file_diff_lines: Dict[str, List[str]] = {}
+        self.file_contents: Dict[str, str] = {}
+
+    def get_files(self) -> List[str]:
+        return self.files
+
+    def get_removed_files(self) -> List[str]:
+        return self.commit.get_removed_files()
+
+    def get_file_diff(self, file_name: str) -> str:
+        if file_name not in self.file_diffs:
+            self.file_diffs[file_name] = self.commit.get_file_diff(file_name)
+        return self.file_diffs[file_name]
+
+    def get_file_diff_lines(self, file_name: str) -> List[str]:
+        if file_name not in self.file_diff_lines:
+            self.file_diff_lines[file_name] = self.get_file_diff(file_name).splitlines()
+        return self.file_diff_lines[file_name]
+
+    def get_file_contents(self, file_name: str) -> str:
+        if file_name not in self.file_contents:
+            self.file_contents[file_name] = self.commit.get_file_contents(file_name)
+        return self.file_contents[file_name]
+
+    def get_description(self) -> str:
+        return self.commit.get_description()
+
+    def get_author(self) -> str:
+        return self.commit.get_author()
+
+
+def get_validator_classes(ignore_validators: List[str] = None) -> List[Type['CommitValidator']]:
+    """Finds all the validators in the validators package
 
-    :param commit: The commit to validate
-    :param out_errors: if not None, will populate with the list of errors given by the validators
     :param ignore_validators: Optional list of CommitValidator classes to ignore, by class name
-    :return: True if there are no validation errors, and False otherwise
+    :return: the CommitValidator classes, ordered by module name
     """
-    failed_count = 0
-    passed_count = 0
-    start_time = time.time()
-
-    # Find all the validators in the validators package (recursively)
     validator_classes = []
     validators_dir = os.path.join(os.path.dirname(__file__), 'validators')
     for _, module_name, is_package in pkgutil.iter_modules([validators_dir]):
@@ -71,23 +128,95 @@ def validate_commit(commit: Commit, out_errors: List[str] = None, ignore_validat
                 print(f"Disabled validation for '{validator.__name__}'")
             else:
                 validator_classes.append(validator)
+    return validator_classes
+
+
+def _run_validators(validator_classes: List[Type['CommitValidator']], commit: Commit,
+                    files: List[str] = None) -> List[Tuple[bool, List[str]]]:
+    """Runs every validator over the files of a commit, fetching the diff and contents of each file only once
+
+    :return: a (passed, errors) pair for each validator class
+    """
+    cached_commit = CachedCommit(commit, files)
+    results = []
+    for validator_class in validator_classes:
+        error_list = []
+        passed = validator_class().run(cached_commit, errors=error_list)
+        results.append((bool(passed), error_list))
+    return results
+
+
+def _run_validators_in_parallel(validator_classes: List[Type['CommitValidator']], commit: Commit,
+                                max_workers: int) -> Optional[List[List[Tuple[bool, List[str]]]]]:
+    """Splits the files of a commit into chunks which are validated by a pool of worker processes
+
+    :return: the results of :func:`_run_validators` for each chunk, or None if the commit cannot be sent to the workers
+    """
+    try:
+        pickle.dumps(commit)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        if VERBOSE: print(f'{commit.__class__.__name__} cannot be pickled, validating files in a single process.')
+        return None
+
+    files = commit.get_files()
+    chunk_count = min(len(files), max_workers * VALIDATION_CHUNKS_PER_WORKER)
+    chunk_size = -(-len(files) // chunk_count)
+    # contiguous chunks keep the errors in the same order as validating in a single process
+    file_chunks = [files[chunk_start:chunk_start + chunk_size] for chunk_start in range(0, len(files), chunk_size)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(max_workers, len(file_chunks))) as executor:
+        futures = [executor.submit(_run_validators, validator_classes, commit, file_chunk)
+                   for file_chunk in file_chunks]
+        return [future.result() for future in futures]
+
+
+def validate_commit(commit: Commit, out_errors: List[str] = None, ignore_validators: List[str] = None,
+                    max_workers: int = None) -> bool:
+    """Validates a commit against all validators
+
+    Each file's diff is fetched and split once and shared by all of the validators. Large commits are split into
+    chunks of files which are validated by a pool of worker processes, so validators only ever see a subset of the
+    files of the commit and must not rely on seeing all of them in a single run.
+
+    :param commit: The commit to validate
+    :param out_errors: if not None, will populate with the list of errors given by the validators
+    :param ignore_validators: Optional list of CommitValidator classes to ignore, by class name
+    :param max_workers: Optional number of worker processes, defaults to the number of processors
+    :return: True if there are no validation errors, and False otherwise
+    """
+    failed_count = 0
+    passed_count = 0
+    start_time = time.time()
+
+    validator_classes = get_validator_classes(ignore_validators)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunk_results = None
+    if max_workers > 1 and len(commit.get_files()) >= MIN_FILES_FOR_PARALLEL_VALIDATION:
+        chunk_results = _run_validators_in_parallel(validator_classes, commit, max_workers)
+    if chunk_results is None:
+        chunk_results = [_run_validators(validator_classes, commit)]
 
     error_summary = {}
 
     # Process validators
-    for validator_class in validator_classes:
-        validator = validator_class()
-        validator_name = validator.__class__.__name__
+    for validator_index, validator_class in enumerate(validator_classes):
+        validator_name = validator_class.__name__
 
         error_list = []
-        passed = validator.run(commit, errors = error_list)
+        passed = True
+        for results in chunk_results:
+            chunk_passed, chunk_errors = results[validator_index]
+            passed = passed and chunk_passed
+            error_list.extend(chunk_errors)
         if passed:
             passed_count += 1
-            print(f'{validator.__class__.__name__} PASSED')
+            print(f'{validator_name} PASSED')
         else:
             failed_count += 1
-            print(f'{validator.__class__.__name__} FAILED')
+            print(f'{validator_name} FAILED')
         error_summary[validator_name] = error_list
+        if out_errors is not None:
+            out_errors.extend(error_list)
         
     end_time = time.time()
 
@@ -117,6 +246,17 @@ def validate_commit(commit: Commit, out_errors: List[str] = None, ignore_validat
 
     return failed_count == 0
 
+def compile_file_patterns(patterns: List[str]) -> re.Pattern:
+    """Compiles a list of fnmatch patterns into a single regex, matching a path when any of the patterns match it"""
+    # fnmatch.fnmatch compares the normcase of both the path and the pattern
+    return re.compile('|'.join(fnmatch.translate(os.path.normcase(pattern)) for pattern in patterns))
+
+@functools.lru_cache(maxsize=None)
+def IsFileExcluded(file_name) -> bool:
+    """Returns True if the file matches any of the EXCLUDED_VALIDATION_PATTERNS"""
+    return EXCLUDED_VALIDATION_REGEX.match(os.path.normcase(file_name)) is not None
+
+@functools.lru_cache(maxsize=None)
 def IsFileSkipped(file_name) -> bool:
     if os.path.splitext(file_name)[1].lower() not in SOURCE_AND_SCRIPT_FILE_EXTENSIONS:
         skipped = True
@@ -185,3 +325,6 @@ EXCLUDED_VALIDATION_PATTERNS = [
     '*/user/Cache/*',
     '*/user/log/*',
 ]
+
+EXCLUDED_VALIDATION_REGEX: re.Pattern = compile_file_patterns(EXCLUDED_VALIDATION_PATTERNS)
+"""EXCLUDED_VALIDATION_PATTERNS compiled into a single regex"""
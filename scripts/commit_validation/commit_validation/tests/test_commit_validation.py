@@ -0,0 +1,90 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import fnmatch
+import os
+import tempfile
+import unittest
+
+from commit_validation import commit_validation
+from commit_validation.commit_validation import CachedCommit, EXCLUDED_VALIDATION_PATTERNS, IsFileExcluded, validate_commit
+from commit_validation.tests.mocks.mock_commit import MockCommit
+
+SOURCE_FILE_CONTENTS = ('/*\n'
+                        ' * Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.\n'
+                        ' *\n'
+                        ' * SPDX-License-Identifier: Apache-2.0 OR MIT\n'
+                        ' *\n'
+                        ' */\n'
+                        'int main() { return 0; }\n')
+
+
+class CountingMockCommit(MockCommit):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file_diff_requests = []
+
+    def get_file_diff(self, file):
+        self.file_diff_requests.append(file)
+        return super().get_file_diff(file)
+
+
+class CommitValidationTests(unittest.TestCase):
+    def test_cachedCommit_fetchesEachDiffOnce(self):
+        commit = CountingMockCommit(files=['/a.cpp', '/b.cpp'],
+                                    file_diffs={'/a.cpp': '+first\n+second\n', '/b.cpp': '+third\n'})
+        cached_commit = CachedCommit(commit, ['/a.cpp'])
+
+        self.assertEqual(cached_commit.get_files(), ['/a.cpp'])
+        self.assertEqual(cached_commit.get_file_diff_lines('/a.cpp'), ['+first', '+second'])
+        self.assertEqual(cached_commit.get_file_diff('/a.cpp'), '+first\n+second\n')
+        self.assertEqual(cached_commit.get_file_diff_lines('/a.cpp'), ['+first', '+second'])
+        self.assertEqual(commit.file_diff_requests, ['/a.cpp'])
+
+    def test_isFileExcluded_matchesFnmatch(self):
+        for file_name in ['/o3de/3rdParty/zlib/zlib.h', '/o3de/user/log/Editor.cpp', 'build', '/o3de/Code/main.cpp',
+                          '/o3de/Code/Framework/AzCore/AzCore/Math/Vector3.h', 'Docs', '/o3de/Docs/readme.py']:
+            expected = any(fnmatch.fnmatch(file_name, pattern) for pattern in EXCLUDED_VALIDATION_PATTERNS)
+            self.assertEqual(IsFileExcluded(file_name), expected, file_name)
+
+    def test_validateCommit_parallel_matchesSingleProcess(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_diffs = {}
+            for file_index in range(commit_validation.MIN_FILES_FOR_PARALLEL_VALIDATION + 8):
+                file_name = os.path.join(temp_dir, f'Source{file_index}.cpp')
+                with open(file_name, 'w', newline='\n') as fh:
+                    fh.write(SOURCE_FILE_CONTENTS)
+                file_diffs[file_name] = ''.join(f'+{line}\n' for line in SOURCE_FILE_CONTENTS.splitlines())
+            tabbed_files = sorted(file_diffs)[3::10]
+            for file_name in tabbed_files:
+                file_diffs[file_name] += '+\tint tabbed = 0;\n'
+            commit = MockCommit(files=sorted(file_diffs), file_diffs=file_diffs)
+
+            single_process_errors = []
+            single_process_passed = validate_commit(commit, out_errors=single_process_errors, max_workers=1)
+            parallel_errors = []
+            parallel_passed = validate_commit(commit, out_errors=parallel_errors, max_workers=2)
+
+        self.assertFalse(single_process_passed)
+        self.assertFalse(parallel_passed)
+        self.assertEqual(len(single_process_errors), len(tabbed_files))
+        self.assertEqual(parallel_errors, single_process_errors)
+
+    def test_validateCommit_cleanCommit_passes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'Source.cpp')
+            with open(file_name, 'w', newline='\n') as fh:
+                fh.write(SOURCE_FILE_CONTENTS)
+            commit = MockCommit(files=[file_name], file_diffs={file_name: '+int main() { return 0; }\n'})
+
+            errors = []
+            self.assertTrue(validate_commit(commit, out_errors=errors))
+            self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,11 +30,11 @@ class AzPlatformValidator(CommitValidator):
                 if VERBOSE: print(f'{file_name}::{self.__class__.__name__} SKIPPED - File excluded based on PAL allowedlist.')
                 continue
             
-            file_diff = commit.get_file_diff(file_name)
+            file_diff_lines = commit.get_file_diff_lines(file_name)
             previous_line_context = ""
 
             line_number = 1
-            for line in file_diff.splitlines():
+            for line in file_diff_lines:
                 # we only care about lines that start with +
                 if line.startswith('+'):
                     if az_platform_regex.search(line):
@@ -31,10 +31,10 @@ class AzTraitValidator(CommitValidator):
                 if VERBOSE: print(f'{file_name}::{self.__class__.__name__} SKIPPED - File excluded based on PAL allowedlist.')
                 continue
 
-            file_diff = commit.get_file_diff(file_name)
+            file_diff_lines = commit.get_file_diff_lines(file_name)
             previous_line_context = ""
 
-            for line in file_diff.splitlines():
+            for line in file_diff_lines:
                 # we only care about added lines.
                 if line.startswith('+'):
                     if ifdef_regex.search(line) or defined_regex.search(line):
@@ -4,12 +4,13 @@
 # SPDX-License-Identifier: Apache-2.0 OR MIT#
 #
 
-import fnmatch
+import functools
+import io
 import os
 import re
 from typing import Type, List
 
-from commit_validation.commit_validation import Commit, CommitValidator, IsFileSkipped, SOURCE_AND_SCRIPT_FILE_EXTENSIONS, EXCLUDED_VALIDATION_PATTERNS, VERBOSE
+from commit_validation.commit_validation import Commit, CommitValidator, IsFileSkipped, EXCLUDED_VALIDATION_PATTERNS, VERBOSE, compile_file_patterns
 
 OPEN_3D_ENGINE_PATTERN_STALE = re.compile(r'copyright[\s]*(?:\(c\))?[\s]*.*?Contributors\sto\sthe\sOpen\s3D\sEngine\sProject\s*$', re.IGNORECASE | re.DOTALL)
 OPEN_3D_ENGINE_PATTERN = re.compile(r'copyright[\s]*(?:\(c\))?[\s]*.*?Contributors\sto\sthe\sOpen\s3D\sEngine\sProject\.\sFor\scomplete\scopyright\sand\slicense\sterms\splease\ssee\sthe\sLICENSE\sat\sthe\sroot\sof\sthis\sdistribution\.', re.IGNORECASE | re.DOTALL)
@@ -27,8 +28,15 @@ EXCLUDED_COPYRIGHT_VALIDATION_PATTERNS = [
     '*/Code/Framework/AzQtComponents/AzQtComponents/Components/FlowLayout.*'            # Copyright (C) 2015 The Qt Company Ltd.
 ] + EXCLUDED_VALIDATION_PATTERNS
 
+EXCLUDED_COPYRIGHT_VALIDATION_REGEX = compile_file_patterns(EXCLUDED_COPYRIGHT_VALIDATION_PATTERNS)
+
 THIS_FILE = os.path.normcase(__file__)
 
+@functools.lru_cache(maxsize=None)
+def IsCopyrightValidationExcluded(file_name) -> bool:
+    """Returns True if the file matches any of the EXCLUDED_COPYRIGHT_VALIDATION_PATTERNS"""
+    return EXCLUDED_COPYRIGHT_VALIDATION_REGEX.match(os.path.normcase(file_name)) is not None
+
 class CopyrightHeaderValidator(CommitValidator):
     """A file-level validator that makes sure a file contains the standard copyright header"""
 
@@ -37,10 +45,8 @@ class CopyrightHeaderValidator(CommitValidator):
             if os.path.normcase(file_name) == THIS_FILE:
                 # Skip this validator file
                 continue
-            for pattern in EXCLUDED_COPYRIGHT_VALIDATION_PATTERNS:
-                if fnmatch.fnmatch(file_name, pattern):
-                    if VERBOSE: print(f'{file_name}::{self.__class__.__name__} SKIPPED - Validation pattern excluded on path.')
-                    break
+            if IsCopyrightValidationExcluded(file_name):
+                if VERBOSE: print(f'{file_name}::{self.__class__.__name__} SKIPPED - Validation pattern excluded on path.')
             else:
                 if IsFileSkipped(file_name):
                     if VERBOSE: print(f'{file_name}::{self.__class__.__name__} SKIPPED - File excluded based on extension.')
@@ -52,7 +58,7 @@ class CopyrightHeaderValidator(CommitValidator):
                 has_original_amazon_copyright_pattern = False
                 has_stale_o3de_pattern = False
 
-                with open(file_name, 'rt', encoding='utf8', errors='replace') as fh:
+                with io.StringIO(commit.get_file_contents(file_name)) as fh:
                     for line in fh:
                         if OPEN_3D_ENGINE_PATTERN_STALE.search(line):
                             has_stale_o3de_pattern = True
@@ -5,12 +5,11 @@
 #
 #
 
-import fnmatch
 import os
 import re
 from typing import Type, List
 
-from commit_validation.commit_validation import Commit, CommitValidator, IsFileSkipped, SOURCE_AND_SCRIPT_FILE_EXTENSIONS, EXCLUDED_VALIDATION_PATTERNS, VERBOSE
+from commit_validation.commit_validation import Commit, CommitValidator, IsFileExcluded, IsFileSkipped, VERBOSE
 
 __STARTS_WITH_UNCHANGED_LINE = r'(\A|^(?=[^+-]).*\n)'
 __NONZERO_CHANGED_WHITESPACE_LINES = r'(^[+-][\r\t\f\v ]*\n)+'
@@ -28,23 +27,21 @@ class WhitespaceValidator(CommitValidator):
     def run(self, commit: Commit, errors: List[str]) -> bool:
         for file_name in commit.get_files():
             file_identifier = f"{file_name}::{self.__class__.__name__}"
-            for pattern in EXCLUDED_VALIDATION_PATTERNS:
-                if fnmatch.fnmatch(file_name, pattern):
-                    if VERBOSE: print(f'{file_identifier} SKIPPED - Validation pattern excluded on path.')
-                    break
-            else:
-                if IsFileSkipped(file_name):
-                    if VERBOSE: print(f'{file_identifier} SKIPPED - File excluded based on extension.')
-                    continue
-
-                diff = commit.get_file_diff(file_name)
-                
-                if _NONADJACENT_WHITESPACE_DIFF_REGEX.search(diff) and _NONWHITESPACE_DIFF_REGEX.search(diff):
-                    error_message = str(f'{file_identifier} FAILED - Source file contains whitespace-only changes which are '
-                          f'non-contiguous with other non-whitespace changes.  Make whitespace-only changes as a '
-                          f'separate change.')
-                    errors.append(error_message)
-                    if VERBOSE: print(error_message)
+            if IsFileExcluded(file_name):
+                if VERBOSE: print(f'{file_identifier} SKIPPED - Validation pattern excluded on path.')
+                continue
+            if IsFileSkipped(file_name):
+                if VERBOSE: print(f'{file_identifier} SKIPPED - File excluded based on extension.')
+                continue
+
+            diff = commit.get_file_diff(file_name)
+            
+            if _NONADJACENT_WHITESPACE_DIFF_REGEX.search(diff) and _NONWHITESPACE_DIFF_REGEX.search(diff):
+                error_message = str(f'{file_identifier} FAILED - Source file contains whitespace-only changes which are '
+                      f'non-contiguous with other non-whitespace changes.  Make whitespace-only changes as a '
+                      f'separate change.')
+                errors.append(error_message)
+                if VERBOSE: print(error_message)
 
         return (not errors)
 
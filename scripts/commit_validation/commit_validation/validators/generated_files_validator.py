@@ -10,7 +10,7 @@ import os
 import pathlib
 from typing import Type, List
 
-from commit_validation.commit_validation import Commit, CommitValidator, EXCLUDED_VALIDATION_PATTERNS, VERBOSE
+from commit_validation.commit_validation import Commit, CommitValidator, IsFileExcluded, VERBOSE
 
 # Disallowed File Name Patterns
 # these must be LOWER CASE since they will be compared after a 'lower'
@@ -71,10 +71,8 @@ class GeneratedFilesValidator(CommitValidator):
     def run(self, commit: Commit, errors: List[str]) -> bool:
         for file_name in commit.get_files():
             file_identifier = f"{file_name}::{self.__class__.__name__}"
-            for pattern in EXCLUDED_VALIDATION_PATTERNS:
-                if fnmatch.fnmatch(file_name, pattern):
-                    if VERBOSE: print(f'{file_identifier} SKIPPED - Validation pattern excluded on path.')
-                    break
+            if IsFileExcluded(file_name):
+                if VERBOSE: print(f'{file_identifier} SKIPPED - Validation pattern excluded on path.')
             else:
                 file_path_lower = pathlib.Path(file_name.lower())
                 extension = file_path_lower.suffix
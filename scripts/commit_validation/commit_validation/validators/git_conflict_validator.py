@@ -5,6 +5,7 @@
 #
 #
 
+import io
 import os
 import re
 from typing import Type, List
@@ -35,7 +36,7 @@ class GitConflictValidator(CommitValidator):
 
             # we never want conflict markers to be added to our repository
             # so we don't look at the file diffs, but the file contents.
-            with open(file_name, 'rt', encoding='utf8', errors='replace') as fh:
+            with io.StringIO(commit.get_file_contents(file_name)) as fh:
                 previous_line_context = ""
                 for line_number, line in enumerate(fh):
                     if MERGE_TO_MARKER_REGEX.search(line):
@@ -5,12 +5,11 @@
 #
 #
 
-import fnmatch
 import os
 import re
 from typing import Type, List
 
-from commit_validation.commit_validation import Commit, CommitValidator, IsFileSkipped, SOURCE_AND_SCRIPT_FILE_EXTENSIONS, EXCLUDED_VALIDATION_PATTERNS, VERBOSE
+from commit_validation.commit_validation import Commit, CommitValidator, IsFileExcluded, IsFileSkipped, VERBOSE
 
 _SINGLE_NEWLINE_ENDING_REGEX = re.compile(r'\n\Z', re.MULTILINE)
 _MULTI_NEWLINE_ENDING_REGEX = re.compile(r'\n\s*\n\Z', re.MULTILINE)
@@ -24,10 +23,8 @@ class NewlineValidator(CommitValidator):
     def run(self, commit: Commit, errors: List[str]) -> bool:
         for file_name in commit.get_files():
             file_identifier = f"{file_name}::{self.__class__.__name__}"
-            for pattern in EXCLUDED_VALIDATION_PATTERNS:
-                if fnmatch.fnmatch(file_name, pattern):
-                    if VERBOSE: print(f'{file_identifier} SKIPPED - Validation pattern excluded on path.')
-                    break
+            if IsFileExcluded(file_name):
+                if VERBOSE: print(f'{file_identifier} SKIPPED - Validation pattern excluded on path.')
             else:
                 file_extension = os.path.splitext(file_name)[1].lower()
                 if IsFileSkipped(file_name):
@@ -36,31 +33,30 @@ class NewlineValidator(CommitValidator):
 
                 # since this validator focuses on newlines throughout the file, not just in diffs
                 # we use the real file data instead of a diff
-                with open(file_name, 'rt', encoding='utf8', errors='replace') as fh:
-                    lines = fh.read()
-                    if not _SINGLE_NEWLINE_ENDING_REGEX.search(lines):
-                        error_message = str(f'{file_identifier} FAILED - Source file does not end with a trailing newline.')
-                        if VERBOSE: print(error_message)
-                        errors.append(error_message)
+                lines = commit.get_file_contents(file_name)
+                if not _SINGLE_NEWLINE_ENDING_REGEX.search(lines):
+                    error_message = str(f'{file_identifier} FAILED - Source file does not end with a trailing newline.')
+                    if VERBOSE: print(error_message)
+                    errors.append(error_message)
 
-                    if _MULTI_NEWLINE_ENDING_REGEX.search(lines):
-                        error_message = str(f'{file_identifier} FAILED - Source file ends in multiple trailing newlines.')
-                        if VERBOSE: print(error_message)
-                        errors.append(error_message)
+                if _MULTI_NEWLINE_ENDING_REGEX.search(lines):
+                    error_message = str(f'{file_identifier} FAILED - Source file ends in multiple trailing newlines.')
+                    if VERBOSE: print(error_message)
+                    errors.append(error_message)
 
-                    crlf_result = _CRLF_REGEX.search(lines)
-                    only_lf_result = _ONLY_LF_REGEX.search(lines)
-                    if crlf_result and only_lf_result:
-                        error_message = str(f'{file_identifier} FAILED - Source file contains mixed line endings (\\r\\n and \\n)')
-                        if VERBOSE: print(error_message)
-                        errors.append(error_message)
+                crlf_result = _CRLF_REGEX.search(lines)
+                only_lf_result = _ONLY_LF_REGEX.search(lines)
+                if crlf_result and only_lf_result:
+                    error_message = str(f'{file_identifier} FAILED - Source file contains mixed line endings (\\r\\n and \\n)')
+                    if VERBOSE: print(error_message)
+                    errors.append(error_message)
 
-                    if crlf_result:
-                        error_message = str(f'{file_identifier} FAILED - Source file incorrectly contains Windows-style line endings'
-                              f' (\\r\\n), when Unix-style line endings (\\n) were expected.  Enable git option '
-                              f'"core.autocrlf" to avoid this error.')
-                        if VERBOSE: print(error_message)
-                        errors.append(error_message)
+                if crlf_result:
+                    error_message = str(f'{file_identifier} FAILED - Source file incorrectly contains Windows-style line endings'
+                          f' (\\r\\n), when Unix-style line endings (\\n) were expected.  Enable git option '
+                          f'"core.autocrlf" to avoid this error.')
+                    if VERBOSE: print(error_message)
+                    errors.append(error_message)
 
         return (not errors)
 
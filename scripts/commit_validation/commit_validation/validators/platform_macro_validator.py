@@ -55,11 +55,11 @@ class PlatformMacroValidator(CommitValidator):
                       f'folder.')
                 continue
 
-            file_diff = commit.get_file_diff(file_name)
+            file_diff_lines = commit.get_file_diff_lines(file_name)
             previous_line_context = ""
 
             line_number = 1
-            for line in file_diff.splitlines():
+            for line in file_diff_lines:
                 # we only care about added lines.
                 if line.startswith('+'):
                     match = platform_macro_regex.search(line)
@@ -5,11 +5,10 @@
 #
 #
 
-import fnmatch
 import os.path
 from typing import Type, List
 
-from commit_validation.commit_validation import Commit, CommitValidator, IsFileSkipped, SOURCE_AND_SCRIPT_FILE_EXTENSIONS, EXCLUDED_VALIDATION_PATTERNS, VERBOSE
+from commit_validation.commit_validation import Commit, CommitValidator, IsFileExcluded, IsFileSkipped, VERBOSE
 
 allowed_chars = {  
     0xAD, # '_'
@@ -25,23 +24,25 @@ class UnicodeValidator(CommitValidator):
                 if VERBOSE: print(f'{file_name}::{self.__class__.__name__} SKIPPED UnicodeValidator - File excluded based on extension.')
                 continue
 
-            for pattern in EXCLUDED_VALIDATION_PATTERNS:
-                if fnmatch.fnmatch(file_name, pattern):
-                    if VERBOSE: print(f'{file_name} SKIPPED UnicodeValidator - Validation pattern excluded on path.')
-                    break
-            else:
-                with open(file_name, 'r', encoding='utf-8', errors='strict') as fh:
-                    linecount = 1
-                    for line in fh:
-                        columncount = 0
-                        for ch in line:
-                            ord_ch = ord(ch)
-                            if ord_ch > 127 and ord_ch not in allowed_chars:
-                                error_message = str(f'{file_name}::{self.__class__.__name__}:{linecount},{columncount} FAILED - Source file contains unicode character, replace with \\u{ord_ch:X}.')
-                                errors.append(error_message)
-                                if VERBOSE: print(error_message)
-                            columncount += 1
+            if IsFileExcluded(file_name):
+                if VERBOSE: print(f'{file_name} SKIPPED UnicodeValidator - Validation pattern excluded on path.')
+                continue
+
+            with open(file_name, 'r', encoding='utf-8', errors='strict') as fh:
+                linecount = 1
+                for line in fh:
+                    if line.isascii():
                         linecount += 1
+                        continue
+                    columncount = 0
+                    for ch in line:
+                        ord_ch = ord(ch)
+                        if ord_ch > 127 and ord_ch not in allowed_chars:
+                            error_message = str(f'{file_name}::{self.__class__.__name__}:{linecount},{columncount} FAILED - Source file contains unicode character, replace with \\u{ord_ch:X}.')
+                            errors.append(error_message)
+                            if VERBOSE: print(error_message)
+                        columncount += 1
+                    linecount += 1
 
         return (not errors)
 
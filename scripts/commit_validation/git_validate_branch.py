@@ -66,6 +66,21 @@ class GitChange(Commit):
             if diff_item.change_type in ('D', 'R'):
                 self.removed_files_list.append(os.path.abspath(os.path.join(self.git_root_path, diff_item.a_path))) 
 
+    def __getstate__(self) -> Dict:
+        """Pickles the change as commit hashes, since the git repo cannot be sent to the validation worker processes"""
+        state = self.__dict__.copy()
+        state['repo'] = self.repo.working_dir
+        for commit_name in ('source_commit', 'target_commit', 'merge_base'):
+            state[commit_name] = state[commit_name].hexsha
+        del state['diff_index']
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self.repo = git.Repo(state['repo'])
+        for commit_name in ('source_commit', 'target_commit', 'merge_base'):
+            setattr(self, commit_name, self.repo.commit(state[commit_name]))
+
     def get_files(self) -> List[str]:
         """Returns a list of local files added/modified by the commit"""
         return self.files_list
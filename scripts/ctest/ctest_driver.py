@@ -122,8 +122,8 @@ def run_single_test_suite(suite, ctest_path, cmake_build_path, build_config, dis
                 error_code = result.returncode
 
         if generate_xml:
-            rp.collect_test_results(cmake_build_path, test_result_prefix)
-            summary = rp.summarize_test_results(cmake_build_path, repeat)
+            failed_tests = rp.collect_test_results(cmake_build_path, test_result_prefix)
+            summary = rp.summarize_test_results(cmake_build_path, repeat, failed_tests)
             
             print()  # empty line
             print('Test stability summary:')
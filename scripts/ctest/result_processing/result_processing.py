@@ -5,12 +5,20 @@ SPDX-License-Identifier: Apache-2.0 OR MIT
 
 Helper functions for test result xml merging and processing.
 """
+import concurrent.futures
+import functools
 import glob
+import io
 import os
+import shutil
 import xml.etree.ElementTree as xet
 
 TEST_RESULTS_DIR = 'Testing'
 
+# Result files are parsed in worker processes when merging at least this many files into the first one
+MIN_FILES_FOR_PARALLEL_MERGE = 16
+_MERGE_PLACEHOLDER_TAG = '__merge_placeholder__'
+
 
 def _get_ctest_tag_content(cmake_build_path):
     """
@@ -90,33 +98,121 @@ def _get_all_test_results_paths(cmake_build_path, ctest_path_error_ok=False):
     return paths
 
 
+def _get_failed_ctest_tests(testing_node):
+    """
+    Get the names of the failed tests of a CTest results Testing element.
+    :param testing_node: Testing element.
+    :return: List of failed test names.
+    """
+    return [test_node.find('Name').text for test_node in testing_node.findall('Test')
+            if test_node.get('Status') == 'failed']
+
+
+def _iter_failed_ctest_tests(xml_file):
+    """
+    Stream the names of the failed tests out of a CTest results file, keeping only one Test element in memory at a time.
+    :param xml_file: Path to the CTest results file.
+    :return: Generator of failed test names, a test is listed once per Testing element it failed in.
+    """
+    open_nodes = []
+    for event, node in xet.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            open_nodes.append(node)
+            continue
+
+        open_nodes.pop()
+        if len(open_nodes) == 2 and node.tag == 'Test' and open_nodes[1].tag == 'Testing':
+            if node.get('Status') == 'failed':
+                yield node.find('Name').text
+        # Children of the root and of the Testing elements are released once they have been read
+        if len(open_nodes) in (1, 2):
+            open_nodes[-1].remove(node)
+
+
+def _parse_xml_result_file(xml_file, child_element_name, attribute_names, summarize_func=None):
+    """
+    Stream the test result elements out of an XML test result file, without keeping the whole file in memory.
+    :param xml_file: Path to the test result file.
+    :param child_element_name: Name of the XML elements under the root that contain the test results.
+    :param attribute_names: Names of the attributes to aggregate.
+    :param summarize_func: Optional function returning the failed test names of a test result element.
+    :return: Tuple of the serialized test result elements, the values of the aggregated attributes of each element
+             (None when missing), and the failed test names.
+    """
+    serialized_nodes = []
+    attribute_values = []
+    failed_tests = []
+    root = None
+    depth = 0
+    pending_node = None
+
+    def _flush_pending_node():
+        # Elements are serialized once their tail, which follows their end tag, has been parsed
+        serialized_nodes.append(xet.tostring(pending_node, encoding='utf-8'))
+        root.remove(pending_node)
+
+    for event, node in xet.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = node
+            elif depth == 1 and pending_node is not None:
+                _flush_pending_node()
+                pending_node = None
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 0:
+            break
+        if depth == 1:
+            if node.tag == child_element_name:
+                attribute_values.append([node.attrib.get(name) for name in attribute_names])
+                if summarize_func:
+                    failed_tests.extend(summarize_func(node))
+                pending_node = node
+            else:
+                root.remove(node)
+
+    if pending_node is not None:
+        _flush_pending_node()
+    return b''.join(serialized_nodes), attribute_values, failed_tests
+
+
 def _merge_xml_results(xml_results_path, prefix, merged_xml_name, parent_element_name, child_element_name,
-                       attributes_to_aggregate):
+                       attributes_to_aggregate, summarize_func=None):
     """
     Merge the contents of XML test result files.
+    The files are streamed, in parallel when there are many of them, and the merged test result elements are
+    written to a temporary file as they are parsed, so memory does not grow with the total test output.
     :param xml_results_path: Path to the directory containing the files to merge.
     :param prefix: Test result file prefix.
     :param merged_xml_name: Name for the merged test result file.
     :param parent_element_name: Name of the XML element that will store the test results.
     :param child_element_name: Name of the XML element that contains the test results.
     :param attributes_to_aggregate: List of AttributeInfo items used for test result aggregation.
+    :param summarize_func: Optional function returning the failed test names of a test result element.
+    :return: Dictionary of failed test name to the number of times it failed, if summarize_func is given.
     """
     xml_files = glob.glob(os.path.join(xml_results_path, f'{prefix}*.xml'))
+    failed_tests = {}
 
     if not xml_files:
-        return
+        return failed_tests
 
     temp_dict = {}
     for attribute in attributes_to_aggregate:
         temp_dict[attribute.name] = attribute.func(0)
+    attribute_names = [attribute.name for attribute in attributes_to_aggregate]
 
-    def _aggregate_attributes(nodes):
-        for node in nodes:
-            for attribute in attributes_to_aggregate:
-                if attribute.name in node.attrib:
-                    temp_dict[attribute.name] += attribute.func(node.attrib[attribute.name])
+    def _aggregate_results(tag, attribute_values, failed_test_names):
+        for values in attribute_values:
+            for attribute, value in zip(attributes_to_aggregate, values):
+                if value is not None:
+                    temp_dict[attribute.name] += attribute.func(value)
                 else:
-                    print("Failed to find key {} in {}, continuing...".format(attribute.name, node.tag))
+                    print("Failed to find key {} in {}, continuing...".format(attribute.name, tag))
+        for name in failed_test_names:
+            failed_tests[name] = failed_tests.get(name, 0) + 1
 
     base_tree = xet.parse(xml_files[0])
     base_tree_root = base_tree.getroot()
@@ -126,19 +222,47 @@ def _merge_xml_results(xml_results_path, prefix, merged_xml_name, parent_element
     else:
         parent_element = base_tree_root.find(parent_element_name)
 
-    _aggregate_attributes(base_tree_root.findall(child_element_name))
+    base_child_nodes = base_tree_root.findall(child_element_name)
+    _aggregate_results(child_element_name,
+                       [[node.attrib.get(name) for name in attribute_names] for node in base_child_nodes],
+                       [name for node in base_child_nodes for name in summarize_func(node)] if summarize_func else [])
 
-    for xml_file in xml_files[1:]:
-        root = xet.parse(xml_file).getroot()
-        child_nodes = root.findall(child_element_name)
-
-        _aggregate_attributes(child_nodes)
-        parent_element.extend(child_nodes)
-
-    for attribute in attributes_to_aggregate:
-        parent_element.attrib[attribute.name] = str(temp_dict[attribute.name])
-
-    base_tree.write(os.path.join(xml_results_path, merged_xml_name), encoding='UTF-8', xml_declaration=True)
+    merged_xml_files = xml_files[1:]
+    merged_xml_path = os.path.join(xml_results_path, merged_xml_name)
+    merged_nodes_path = merged_xml_path + '.nodes.tmp'
+    parse_xml_result_file = functools.partial(_parse_xml_result_file, child_element_name=child_element_name,
+                                              attribute_names=attribute_names, summarize_func=summarize_func)
+    try:
+        with open(merged_nodes_path, 'wb') as merged_nodes_file:
+            if len(merged_xml_files) >= MIN_FILES_FOR_PARALLEL_MERGE:
+                with concurrent.futures.ProcessPoolExecutor() as executor:
+                    results = executor.map(parse_xml_result_file, merged_xml_files, chunksize=8)
+                    for serialized_nodes, attribute_values, failed_test_names in results:
+                        merged_nodes_file.write(serialized_nodes)
+                        _aggregate_results(child_element_name, attribute_values, failed_test_names)
+            else:
+                for xml_file in merged_xml_files:
+                    serialized_nodes, attribute_values, failed_test_names = parse_xml_result_file(xml_file)
+                    merged_nodes_file.write(serialized_nodes)
+                    _aggregate_results(child_element_name, attribute_values, failed_test_names)
+
+        for attribute in attributes_to_aggregate:
+            parent_element.attrib[attribute.name] = str(temp_dict[attribute.name])
+
+        # Write the base file with the merged test result elements streamed in at the end of the parent element
+        xet.SubElement(parent_element, _MERGE_PLACEHOLDER_TAG)
+        base_xml = io.BytesIO()
+        base_tree.write(base_xml, encoding='UTF-8', xml_declaration=True)
+        base_xml_head, base_xml_tail = base_xml.getvalue().split(f'<{_MERGE_PLACEHOLDER_TAG} />'.encode())
+        with open(merged_xml_path, 'wb') as merged_xml_file, open(merged_nodes_path, 'rb') as merged_nodes_file:
+            merged_xml_file.write(base_xml_head)
+            shutil.copyfileobj(merged_nodes_file, merged_xml_file)
+            merged_xml_file.write(base_xml_tail)
+    finally:
+        if os.path.exists(merged_nodes_path):
+            os.remove(merged_nodes_path)
+
+    return failed_tests
 
 
 def clean_test_results(cmake_build_path):
@@ -180,6 +304,7 @@ def collect_test_results(cmake_build_path, prefix):
     Combines and aggregates test results for each test harness.
     :param cmake_build_path: Path to the CMake build directory.
     :param prefix: Test result file prefix.
+    :return: Dictionary of failed CTest test name to the number of times it failed, see summarize_test_results.
     """
     class AttributeInfo:
         def __init__(self, name, func):
@@ -194,39 +319,33 @@ def collect_test_results(cmake_build_path, prefix):
                                AttributeInfo('time', float)]
 
     results_to_process = [
-        # CTest results don't need aggregation, just merging.
-        [_build_ctest_test_results_path(cmake_build_path), 'Site', 'Testing', []],
+        # CTest results don't need aggregation, just merging. The failed tests are summarized while merging.
+        [_build_ctest_test_results_path(cmake_build_path), 'Site', 'Testing', [], _get_failed_ctest_tests],
         # GTest and Pytest results need aggregation and merging.
-        [_build_gtest_test_results_path(cmake_build_path), 'testsuites', 'testsuite', attributes_to_aggregate],
-        [_build_pytest_test_results_path(cmake_build_path), 'testsuites', 'testsuite', attributes_to_aggregate]
+        [_build_gtest_test_results_path(cmake_build_path), 'testsuites', 'testsuite', attributes_to_aggregate, None],
+        [_build_pytest_test_results_path(cmake_build_path), 'testsuites', 'testsuite', attributes_to_aggregate, None]
     ]
 
+    failed_tests = {}
     for result in results_to_process:
-        _merge_xml_results(result[0], prefix, 'Merged.xml', result[1], result[2], result[3])
+        failed_tests.update(_merge_xml_results(result[0], prefix, 'Merged.xml', result[1], result[2], result[3], result[4]))
+    return failed_tests
 
 
-def summarize_test_results(cmake_build_path, total):
+def summarize_test_results(cmake_build_path, total, failed_tests=None):
     """
     Writes a summary of the test results.
     :param cmake_build_path: Path to the CMake build directory.
     :param total: Total number of times the tests were executed.
+    :param failed_tests: The failed tests returned by collect_test_results. If not given, they are read from the
+                         merged CTest results.
     :return: A list of tests failed with their failure rate.
     """
-    failed_tests = {}
-
-    ctest_results_file = os.path.join(_build_ctest_test_results_path(cmake_build_path), 'Merged.xml')
-    base_tree = xet.parse(ctest_results_file)
-    base_tree_root = base_tree.getroot()
-    testing_nodes = base_tree_root.findall('Testing')
-
-    for testing_node in testing_nodes:
-        test_nodes = testing_node.findall('Test')
-
-        for test_node in test_nodes:
-            if test_node.get('Status') == 'failed':
-                name_element = test_node.find('Name')
-                name = name_element.text
-                failed_tests[name] = failed_tests.get(name, 0) + 1
+    if failed_tests is None:
+        ctest_results_file = os.path.join(_build_ctest_test_results_path(cmake_build_path), 'Merged.xml')
+        failed_tests = {}
+        for name in _iter_failed_ctest_tests(ctest_results_file):
+            failed_tests[name] = failed_tests.get(name, 0) + 1
 
     report = []
     for test, count in failed_tests.items():
@@ -0,0 +1,145 @@
+"""
+Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+
+SPDX-License-Identifier: Apache-2.0 OR MIT
+
+Unit tests for result_processing.py, comparing the streamed merge with the merge of the parsed trees.
+"""
+import glob
+import os
+import sys
+import xml.etree.ElementTree as xet
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import result_processing.result_processing as rp
+
+
+class AttributeInfo:
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+
+ATTRIBUTES_TO_AGGREGATE = [AttributeInfo('tests', int),
+                           AttributeInfo('failures', int),
+                           AttributeInfo('disabled', int),
+                           AttributeInfo('errors', int),
+                           AttributeInfo('time', float)]
+
+
+def merge_parsed_xml_results(xml_files, merged_xml_path, parent_element_name, child_element_name,
+                             attributes_to_aggregate):
+    """The merge of the parsed trees which _merge_xml_results replaced"""
+    temp_dict = {}
+    for attribute in attributes_to_aggregate:
+        temp_dict[attribute.name] = attribute.func(0)
+
+    def _aggregate_attributes(nodes):
+        for node in nodes:
+            for attribute in attributes_to_aggregate:
+                if attribute.name in node.attrib:
+                    temp_dict[attribute.name] += attribute.func(node.attrib[attribute.name])
+
+    base_tree = xet.parse(xml_files[0])
+    base_tree_root = base_tree.getroot()
+    if base_tree_root.tag == parent_element_name:
+        parent_element = base_tree_root
+    else:
+        parent_element = base_tree_root.find(parent_element_name)
+    _aggregate_attributes(base_tree_root.findall(child_element_name))
+
+    for xml_file in xml_files[1:]:
+        child_nodes = xet.parse(xml_file).getroot().findall(child_element_name)
+        _aggregate_attributes(child_nodes)
+        parent_element.extend(child_nodes)
+
+    for attribute in attributes_to_aggregate:
+        parent_element.attrib[attribute.name] = str(temp_dict[attribute.name])
+    base_tree.write(merged_xml_path, encoding='UTF-8', xml_declaration=True)
+
+
+def write_gtest_results(results_path, file_count):
+    for file_index in range(file_count):
+        suites = ''.join(
+            f'  <testsuite name="Suite{file_index}_{suite_index}" tests="2" failures="{suite_index % 2}" '
+            f'disabled="0" errors="0" time="0.{file_index}{suite_index}">\n'
+            f'    <testcase name="Passes" status="run" time="0.001" classname="Suite{suite_index}" />\n'
+            f'    <testcase name="Fails&amp;Escapes" status="run" time="0.002" classname="Suite{suite_index}">'
+            f'<failure message="a &lt; b">details</failure></testcase>\n'
+            f'  </testsuite>\n'
+            for suite_index in range(3))
+        with open(os.path.join(results_path, f'Run-{file_index}-{file_count}-results.xml'), 'w') as results_file:
+            results_file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                               f'<testsuites tests="6" failures="1" disabled="0" errors="0" time="1.5" name="All">\n'
+                               f'{suites}</testsuites>\n')
+
+
+def write_ctest_results(results_path, file_count):
+    for file_index in range(file_count):
+        tests = ''.join(
+            f'    <Test Status="{"failed" if (test_index + file_index) % 3 == 0 else "passed"}">'
+            f'<Name>Test{test_index}</Name><Results><Measurement><Value>output {file_index}</Value></Measurement>'
+            f'</Results></Test>\n'
+            for test_index in range(4))
+        with open(os.path.join(results_path, f'Run-{file_index}-{file_count}-Test.xml'), 'w') as results_file:
+            results_file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                               f'<Site BuildName="build" Name="site">\n'
+                               f'  <Testing>\n    <StartDateTime>now</StartDateTime>\n{tests}  </Testing>\n</Site>\n')
+
+
+@pytest.mark.parametrize('file_count', [1, 3, rp.MIN_FILES_FOR_PARALLEL_MERGE + 1])
+def test_MergeXmlResults_GTestResults_MatchesParsedTreeMerge(tmp_path, file_count):
+    write_gtest_results(str(tmp_path), file_count)
+    expected_path = str(tmp_path / 'Expected.out')
+    merge_parsed_xml_results(glob.glob(os.path.join(str(tmp_path), 'Run*.xml')), expected_path,
+                             'testsuites', 'testsuite', ATTRIBUTES_TO_AGGREGATE)
+
+    failed_tests = rp._merge_xml_results(str(tmp_path), 'Run', 'Merged.xml', 'testsuites', 'testsuite',
+                                         ATTRIBUTES_TO_AGGREGATE)
+
+    assert failed_tests == {}
+    with open(expected_path, 'rb') as expected_file, open(str(tmp_path / 'Merged.xml'), 'rb') as merged_file:
+        assert merged_file.read() == expected_file.read()
+    merged_root = xet.parse(str(tmp_path / 'Merged.xml')).getroot()
+    assert len(merged_root.findall('testsuite')) == 3 * file_count
+    assert merged_root.get('tests') == str(6 * file_count)
+    assert not [xml_file for xml_file in os.listdir(str(tmp_path)) if xml_file.endswith('.tmp')]
+
+
+@pytest.mark.parametrize('file_count', [2, rp.MIN_FILES_FOR_PARALLEL_MERGE + 1])
+def test_MergeXmlResults_CTestResults_MatchesParsedTreeMergeAndSummary(tmp_path, file_count):
+    write_ctest_results(str(tmp_path), file_count)
+    expected_path = str(tmp_path / 'Expected.out')
+    merge_parsed_xml_results(glob.glob(os.path.join(str(tmp_path), 'Run*.xml')), expected_path,
+                             'Site', 'Testing', [])
+
+    failed_tests = rp._merge_xml_results(str(tmp_path), 'Run', 'Merged.xml', 'Site', 'Testing', [],
+                                         rp._get_failed_ctest_tests)
+
+    with open(expected_path, 'rb') as expected_file, open(str(tmp_path / 'Merged.xml'), 'rb') as merged_file:
+        assert merged_file.read() == expected_file.read()
+    expected_failed_tests = {}
+    for file_index in range(file_count):
+        for test_index in range(4):
+            if (test_index + file_index) % 3 == 0:
+                expected_failed_tests[f'Test{test_index}'] = expected_failed_tests.get(f'Test{test_index}', 0) + 1
+    assert failed_tests == expected_failed_tests
+    # The failed tests streamed from the merged file match the ones summarized while merging
+    assert sorted(rp._iter_failed_ctest_tests(str(tmp_path / 'Merged.xml'))) == \
+        sorted(name for name, count in failed_tests.items() for _ in range(count))
+
+
+def test_SummarizeTestResults_WithoutFailedTests_ReadFromMergedResults(tmp_path):
+    testing_path = tmp_path / rp.TEST_RESULTS_DIR
+    results_path = testing_path / '20240101-0000'
+    results_path.mkdir(parents=True)
+    (testing_path / 'TAG').write_text('20240101-0000\nExperimental\n')
+    write_ctest_results(str(results_path), 3)
+    failed_tests = rp._merge_xml_results(str(results_path), 'Run', 'Merged.xml', 'Site', 'Testing', [],
+                                         rp._get_failed_ctest_tests)
+
+    assert sorted(rp.summarize_test_results(str(tmp_path), 3)) == \
+        sorted(rp.summarize_test_results(str(tmp_path), 3, failed_tests))
+    assert len(rp.summarize_test_results(str(tmp_path), 3)) == 4
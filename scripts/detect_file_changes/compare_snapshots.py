@@ -20,10 +20,17 @@ ignore_patterns = []
 
 from snapshot_folder.snapshot_folder import FolderSnapshot, SnapshotComparison
 
+def load_snapshot(filename):
+    """Loads a snapshot saved by make_snapshot.py, including older pickled snapshots"""
+    if FolderSnapshot.is_snapshot_file(filename):
+        return FolderSnapshot.load(filename)
+    with open(filename, 'rb') as snapshot_file:
+        return pickle.load(snapshot_file)
+
 def do_compare(filename1, filename2):
     """Given two filenames, returns the diffs as a list of tuples [(type, file)]"""
-    snap1 = pickle.load(open(filename1, 'rb'))
-    snap2 = pickle.load(open(filename2, 'rb'))
+    snap1 = load_snapshot(filename1)
+    snap2 = load_snapshot(filename2)
 
     comparison = FolderSnapshot.CompareSnapshots(snap1, snap2)
 
@@ -6,7 +6,6 @@
 #
 
 import argparse
-import pickle
 import sys
 
 """This is a command line entry point that, given an out file name, and a folder to scan
@@ -24,7 +23,7 @@ from snapshot_folder.snapshot_folder import FolderSnapshot, SnapshotComparison
 def dump_snapshot(folder_to_scan, filename, ignore_patterns):
     """Workhorse function of this module.  Saves the snapshot to the given file"""
     snap = FolderSnapshot.CreateSnapshot(folder_to_scan, ignore_patterns=ignore_patterns)
-    pickle.dump(snap, open(filename, 'wb'))
+    snap.save(filename)
 
 def init_parser():
     """Prepares the command line parser"""
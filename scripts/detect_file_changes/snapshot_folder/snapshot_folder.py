@@ -1,19 +1,30 @@
 #
 # Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
-# 
+#
 # SPDX-License-Identifier: Apache-2.0 OR MIT
 #
 #
 
+import array
+import concurrent.futures
 import os
 import fnmatch
 import pathlib
+import re
+import struct
+import sys
+import zlib
 
 """This module contains FolderSnapshot, a class which can create and compare 'snapshots'
-of folders (The snapshots just store the modtimes / existence of files and folders), and
+of folders (The snapshots just store the modtimes, sizes, inodes / existence of files and folders), and
 also can compare two snapshots to return a SnapshotComparison which represents the diffs
 """
 
+# Binary snapshot file layout: magic, version, then zlib compressed blocks, each preceded by its compressed size:
+# folder paths, file paths (both sorted and '\0' separated utf-8), file modtimes (float64), sizes and inodes (uint64)
+SNAPSHOT_FILE_MAGIC = b'O3DESNAP'
+SNAPSHOT_FILE_VERSION = 1
+
 class SnapshotComparison:
     """ This class just holds the diffs calculated between two folder trees."""
     def __init__(self):
@@ -22,7 +33,7 @@ class SnapshotComparison:
         self.changed_files = []
         self.dirs_added = []
         self.dirs_removed = []
-    
+
     def any_changed(self):
         """Returns True if any changes were detected"""
         return self.deleted_files or self.added_files or self.changed_files or self.dirs_added or self.dirs_removed
@@ -40,75 +51,219 @@ class SnapshotComparison:
         for dir_entry in self.dirs_removed:
             yield ("FOLDER_DELETED", dir_entry)
 
+def _merge_sorted(before, after):
+    """Walks two sorted lists of paths together, yielding (path, in before, in after) for each distinct path"""
+    before_index = 0
+    after_index = 0
+    before_count = len(before)
+    after_count = len(after)
+    while before_index < before_count and after_index < after_count:
+        before_path = before[before_index]
+        after_path = after[after_index]
+        if before_path == after_path:
+            yield before_path, True, True
+            before_index += 1
+            after_index += 1
+        elif before_path < after_path:
+            yield before_path, True, False
+            before_index += 1
+        else:
+            yield after_path, False, True
+            after_index += 1
+    for path in before[before_index:]:
+        yield path, True, False
+    for path in after[after_index:]:
+        yield path, False, True
+
 class FolderSnapshot:
     """ This class stores a snapshot of a folder state and has utility functions to compare snapshots"""
     def __init__(self):
         self.file_modtimes = {}
+        self.file_sizes = {}
+        self.file_inodes = {}
         self.folder_paths = []
         pass
 
     @staticmethod
-    def _matches_ignore_pattern(in_string, ignore_patterns):
-        for pattern in ignore_patterns:
-            if fnmatch.fnmatch(in_string, pattern):
-                return True
-            # we also care if the last part is in the patterns
-            # this is to cover situatiosn where the pattern has 'build' in it as opposed to *build*
-            # and the name of the file is literally 'build'
-            _, filepart = os.path.split(in_string)
-            if fnmatch.fnmatch(filepart, pattern):
-                return True
-
-        return False
-    
+    def _compile_ignore_patterns(ignore_patterns):
+        """
+        Returns a single regex matching any of the fnmatch patterns, or None if there are no patterns.
+        A path is ignored if either its full path or its last part matches, which covers patterns such as 'build'
+        as opposed to '*build*' when the name of the file or folder is literally 'build'
+        """
+        if not ignore_patterns:
+            return None
+        # fnmatch.fnmatch compares the normcase of both the name and the pattern
+        return re.compile('|'.join(fnmatch.translate(os.path.normcase(pattern)) for pattern in ignore_patterns))
+
     @staticmethod
-    def CreateSnapshot(root_folder, ignore_patterns):
-        """Create a new FolderSnapshot based on a root folder and ignore patterns."""
+    def _scan_folder(folder_path, path_prefix, ignore_regex):
+        """
+        Lists one folder, returning ([(subfolder path, scan it)], [(file path, stat result, inode)]).
+        Ignored entries are left out, and symlinked folders are recorded but not scanned, like os.walk(followlinks=False)
+        """
+        folders = []
+        files = []
+        try:
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    fullpath = path_prefix + entry.name
+                    if ignore_regex and (ignore_regex.match(os.path.normcase(fullpath))
+                                         or ignore_regex.match(os.path.normcase(entry.name))):
+                        continue
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        folders.append((fullpath, not entry.is_symlink()))
+                        continue
+                    try:
+                        stat_result = entry.stat()
+                    except OSError:
+                        # broken symlinks are still tracked
+                        stat_result = entry.stat(follow_symlinks=False)
+                    files.append((fullpath, stat_result, entry.inode()))
+        except OSError:
+            # os.walk skips folders it cannot list
+            pass
+        return folders, files
+
+    @staticmethod
+    def CreateSnapshot(root_folder, ignore_patterns, max_workers=None):
+        """
+        Create a new FolderSnapshot based on a root folder and ignore patterns.
+        Folders are listed in parallel with os.scandir, and ignored folders are never entered.
+        """
+        ignore_regex = FolderSnapshot._compile_ignore_patterns(ignore_patterns)
+        root_path = os.path.normpath(root_folder).replace('\\', '/')
+
+        def path_prefix(folder_path):
+            # paths are recorded as os.path.normpath(os.path.join(root, name)) would produce them
+            if folder_path == '.':
+                return ''
+            return folder_path if folder_path.endswith('/') else folder_path + '/'
+
+        folder_paths = []
+        files = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending_scans = {executor.submit(FolderSnapshot._scan_folder, root_path, path_prefix(root_path),
+                                             ignore_regex)}
+            while pending_scans:
+                done_scans, pending_scans = concurrent.futures.wait(
+                    pending_scans, return_when=concurrent.futures.FIRST_COMPLETED)
+                for done_scan in done_scans:
+                    scanned_folders, scanned_files = done_scan.result()
+                    files.extend(scanned_files)
+                    for folder_path, scan_folder in scanned_folders:
+                        folder_paths.append(folder_path)
+                        if scan_folder:
+                            pending_scans.add(executor.submit(FolderSnapshot._scan_folder, folder_path,
+                                                              path_prefix(folder_path), ignore_regex))
+
         folder_snap = FolderSnapshot()
-        ignored_folders = []
-        for root, dir_names, file_names in os.walk(root_folder, followlinks=False):
-            for dir_name in dir_names:
-                fullpath = os.path.normpath(os.path.join(root, dir_name)).replace('\\', '/')
-                if FolderSnapshot._matches_ignore_pattern(fullpath, ignore_patterns):
-                    ignored_folders.append(fullpath)
-                    continue
-                if os.path.dirname(fullpath) in ignored_folders:
-                    # we want to emulate not 'walking' down any folders themselves that have been omitted:
-                    ignored_folders.append(fullpath)
-                    continue
-                folder_snap.folder_paths.append(fullpath)
-            
-            for file_name in file_names:
-                fullpath = os.path.normpath(os.path.join(root, file_name)).replace('\\', '/')
-                if FolderSnapshot._matches_ignore_pattern(fullpath, ignore_patterns):
-                    continue
-                if os.path.dirname(fullpath) in ignored_folders:
-                    # we want to emulate not 'walking' down any folders themselves that have been omitted:
-                    continue
-                folder_snap.file_modtimes[fullpath] = os.stat(fullpath).st_mtime
-        
-        return folder_snap        
+        folder_paths.sort()
+        folder_snap.folder_paths = folder_paths
+        files.sort(key=lambda file_entry: file_entry[0])
+        for fullpath, stat_result, inode in files:
+            folder_snap.file_modtimes[fullpath] = stat_result.st_mtime
+            folder_snap.file_sizes[fullpath] = stat_result.st_size
+            folder_snap.file_inodes[fullpath] = inode
+        return folder_snap
 
     @staticmethod
     def CompareSnapshots(before, after):
-        """Return a SnapshotComparison representing the difference between two FolderShapshot objects"""
+        """
+        Return a SnapshotComparison representing the difference between two FolderShapshot objects.
+        A file is changed if its modtime, size or inode differ. Paths are compared with a merge of the sorted paths.
+        """
         comparison = SnapshotComparison()
-        for file_name in before.file_modtimes.keys():
-            if file_name not in after.file_modtimes:
+        # snapshots pickled before sizes and inodes were recorded do not have them
+        before_sizes = getattr(before, 'file_sizes', {})
+        after_sizes = getattr(after, 'file_sizes', {})
+        before_inodes = getattr(before, 'file_inodes', {})
+        after_inodes = getattr(after, 'file_inodes', {})
+
+        def differs(before_values, after_values, file_name):
+            return file_name in before_values and file_name in after_values \
+                and before_values[file_name] != after_values[file_name]
+
+        for file_name, in_before, in_after in _merge_sorted(sorted(before.file_modtimes), sorted(after.file_modtimes)):
+            if not in_after:
                 comparison.deleted_files.append(file_name)
-            else:
-                if before.file_modtimes[file_name] != after.file_modtimes[file_name]:
-                    comparison.changed_files.append(file_name)
-        
-        for file_name in after.file_modtimes.keys():
-            if file_name not in before.file_modtimes:
+            elif not in_before:
                 comparison.added_files.append(file_name)
+            elif before.file_modtimes[file_name] != after.file_modtimes[file_name] \
+                    or differs(before_sizes, after_sizes, file_name) \
+                    or differs(before_inodes, after_inodes, file_name):
+                comparison.changed_files.append(file_name)
 
-        for folder_path in before.folder_paths:
-            if folder_path not in after.folder_paths:
+        for folder_path, in_before, in_after in _merge_sorted(sorted(before.folder_paths), sorted(after.folder_paths)):
+            if not in_after:
                 comparison.dirs_removed.append(folder_path)
-        
-        for folder_path in after.folder_paths:
-            if folder_path not in before.folder_paths:
+            elif not in_before:
                 comparison.dirs_added.append(folder_path)
         return comparison
+
+    def save(self, filename):
+        """Saves the snapshot to the given file in the compact binary snapshot format"""
+        file_paths = sorted(self.file_modtimes)
+        modtimes = array.array('d', (self.file_modtimes[path] for path in file_paths))
+        sizes = array.array('Q', (self.file_sizes.get(path, 0) for path in file_paths))
+        inodes = array.array('Q', (self.file_inodes.get(path, 0) for path in file_paths))
+        if sys.byteorder != 'little':
+            for column in (modtimes, sizes, inodes):
+                column.byteswap()
+
+        blocks = [
+            '\0'.join(sorted(self.folder_paths)).encode('utf-8', 'surrogateescape'),
+            '\0'.join(file_paths).encode('utf-8', 'surrogateescape'),
+            modtimes.tobytes(),
+            sizes.tobytes(),
+            inodes.tobytes()
+        ]
+        with open(filename, 'wb') as snapshot_file:
+            snapshot_file.write(SNAPSHOT_FILE_MAGIC)
+            snapshot_file.write(struct.pack('<I', SNAPSHOT_FILE_VERSION))
+            for block in blocks:
+                compressed_block = zlib.compress(block)
+                snapshot_file.write(struct.pack('<Q', len(compressed_block)))
+                snapshot_file.write(compressed_block)
+
+    @staticmethod
+    def load(filename):
+        """Loads a FolderSnapshot saved with save()"""
+        with open(filename, 'rb') as snapshot_file:
+            if snapshot_file.read(len(SNAPSHOT_FILE_MAGIC)) != SNAPSHOT_FILE_MAGIC:
+                raise ValueError(f"{filename} is not a folder snapshot file")
+            version, = struct.unpack('<I', snapshot_file.read(4))
+            if version != SNAPSHOT_FILE_VERSION:
+                raise ValueError(f"{filename} has unsupported folder snapshot version {version}")
+            blocks = []
+            for _ in range(5):
+                block_size, = struct.unpack('<Q', snapshot_file.read(8))
+                blocks.append(zlib.decompress(snapshot_file.read(block_size)))
+
+        def split_paths(block):
+            return block.decode('utf-8', 'surrogateescape').split('\0') if block else []
+
+        def read_column(typecode, block):
+            column = array.array(typecode)
+            column.frombytes(block)
+            if sys.byteorder != 'little':
+                column.byteswap()
+            return column
+
+        folder_snap = FolderSnapshot()
+        folder_snap.folder_paths = split_paths(blocks[0])
+        file_paths = split_paths(blocks[1])
+        folder_snap.file_modtimes = dict(zip(file_paths, read_column('d', blocks[2])))
+        folder_snap.file_sizes = dict(zip(file_paths, read_column('Q', blocks[3])))
+        folder_snap.file_inodes = dict(zip(file_paths, read_column('Q', blocks[4])))
+        return folder_snap
+
+    @staticmethod
+    def is_snapshot_file(filename):
+        """Returns True if the file was saved with save(), as opposed to an older pickled FolderSnapshot"""
+        with open(filename, 'rb') as snapshot_file:
+            return snapshot_file.read(len(SNAPSHOT_FILE_MAGIC)) == SNAPSHOT_FILE_MAGIC
@@ -5,46 +5,37 @@
 #
 #
 
+import os
+import pickle
 import unittest
 from unittest.mock import patch
 from snapshot_folder.snapshot_folder import FolderSnapshot
 
-class empty_object():
-    pass
-
-def fakestat(file_path):
-    f = empty_object()
-    f.st_mtime = 12345
-    return f
-
-@patch('os.stat', side_effect=fakestat)
-@patch('os.walk')
-def test_CreateSnapshot_sanity(mock_os_walk, mock_os_stat):
-    mock_os_walk.return_value = [
-        # this mocks os.walk, which always returns a tuple of (root name, folder names, file names)
-        ( '',  # root name
-          ['subfolder1', 'subfolder2', 'subfolder3'], # folders in here
-          ['file1.cpp'], # files in here
-        ),
-        ( 'subfolder1', 
-          [],
-          ['file1.cpp', 'file2.cpp'], # file1 is same name as above, but different folder name!
-        ),
-        ( 'subfolder2', 
-          [''],
-          [], # empty folders still get tracked
-        ),
-        ( 'subfolder3', 
-          ['subfolder4'], # folders only containing folders
-          [],
-        ),
-        ( 'subfolder3/subfolder4', 
-          [],
-          ['file4.cpp'],
-        )
-    ]
-    snap = FolderSnapshot.CreateSnapshot('.', ignore_patterns=[])
-    
+def make_tree(root, folders, files):
+    """Creates the given relative folders and files under root"""
+    for folder in folders:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+    for file_name in files:
+        with open(os.path.join(root, file_name), 'w') as tree_file:
+            tree_file.write(file_name)
+
+def snapshot_in(root, ignore_patterns):
+    """Creates a snapshot of '.' from inside root, so the recorded paths are relative to root"""
+    previous_cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        return FolderSnapshot.CreateSnapshot('.', ignore_patterns=ignore_patterns)
+    finally:
+        os.chdir(previous_cwd)
+
+def test_CreateSnapshot_sanity(tmp_path):
+    make_tree(tmp_path,
+              ['subfolder1', 'subfolder2', 'subfolder3/subfolder4'],  # empty folders still get tracked
+              ['file1.cpp',
+               'subfolder1/file1.cpp', 'subfolder1/file2.cpp',  # file1 is same name as above, but different folder name!
+               'subfolder3/subfolder4/file4.cpp'])  # folders only containing folders
+    snap = snapshot_in(tmp_path, ignore_patterns=[])
+
     assert 'subfolder1' in snap.folder_paths
     assert 'subfolder2' in snap.folder_paths
     assert 'subfolder3' in snap.folder_paths
@@ -53,42 +44,22 @@ def test_CreateSnapshot_sanity(mock_os_walk, mock_os_stat):
     assert 'subfolder1/file1.cpp' in snap.file_modtimes
     assert 'subfolder1/file2.cpp' in snap.file_modtimes
     assert 'subfolder3/subfolder4/file4.cpp' in snap.file_modtimes
-    
-@patch('os.stat', side_effect=fakestat)
-@patch('os.walk')
-def test_CreateSnapshot_obeys_exclusions(mock_os_walk, mock_os_stat):
-    mock_os_walk.return_value = [
-        (   '.', 
-            ['sub_buildfolder', 'build', 'build_mac', 'normal_subfolder'], # sneaky trap, sub_buildfolder should not be ignored
-            ['file.tif', 'file_not_a_tif.bmp'],
-        ),
-        (   'sub_buildfolder',  # should not be ignored, its not a match to build_*
-            [],
-            ['file2.cpp', 'file2.tif'],
-        ),
-        (   'build_mac', 
-            ['normalfolder'], # does not have build in its name but should still be ignored because parent is
-            ['file3.cpp'],  # even though it doesnt match a rule itself, it should be omitted since its in build
-        ),
-        (   'build_mac/normalfolder', 
-            [],
-            ['file4.cpp'],  # even though it doesnt match a rule itself, it should be omitted since its in build
-        ),
-        (   'build', 
-            [],
-            ['file4.cpp'],  # even though it doesnt match a rule itself, it should be omitted since its in build
-        ),
-        (   'normal_subfolder', 
-            ['build'], # a matching folder in a subfolder
-            [],
-        ),
-        (   'normal_subfolder/build', 
-            ['file.txt'], # a matching folder in a subfolder
-            [],
-        )
-    ]
-    snap = FolderSnapshot.CreateSnapshot('.', ignore_patterns=['*.tif', 'build', 'build_*'])
-    
+    assert snap.file_sizes['subfolder1/file2.cpp'] == len('subfolder1/file2.cpp')
+    assert snap.folder_paths == sorted(snap.folder_paths)
+    assert list(snap.file_modtimes) == sorted(snap.file_modtimes)
+
+def test_CreateSnapshot_obeys_exclusions(tmp_path):
+    make_tree(tmp_path,
+              ['sub_buildfolder',  # sneaky trap, sub_buildfolder should not be ignored, its not a match to build_*
+               'build', 'build_mac/normalfolder', 'normal_subfolder/build'],  # a matching folder in a subfolder
+              ['file.tif', 'file_not_a_tif.bmp',
+               'sub_buildfolder/file2.cpp', 'sub_buildfolder/file2.tif',
+               'build_mac/file3.cpp',  # even though it doesnt match a rule itself, it should be omitted since its in build
+               'build_mac/normalfolder/file4.cpp',
+               'build/file4.cpp',
+               'normal_subfolder/build/file.txt'])
+    snap = snapshot_in(tmp_path, ignore_patterns=['*.tif', 'build', 'build_*'])
+
     assert 'sub_buildfolder' in snap.folder_paths
     assert 'file_not_a_tif.bmp' in snap.file_modtimes
     assert 'sub_buildfolder/file2.cpp' in snap.file_modtimes
@@ -99,14 +70,76 @@ def test_CreateSnapshot_obeys_exclusions(mock_os_walk, mock_os_stat):
     assert 'normal_subfolder/build' not in snap.folder_paths
     assert 'build_mac/normalfolder' not in snap.folder_paths
 
-    assert 'file1.tif' not in snap.file_modtimes
+    assert 'file.tif' not in snap.file_modtimes
     assert 'sub_buildfolder/file2.tif' not in snap.file_modtimes
-    assert 'build/file3.cpp' not in snap.file_modtimes
-    assert 'build_mac/file4.cpp' not in snap.file_modtimes
+    assert 'build_mac/file3.cpp' not in snap.file_modtimes
+    assert 'build/file4.cpp' not in snap.file_modtimes
     assert 'build_mac/normalfolder/file4.cpp' not in snap.file_modtimes
     assert 'normal_subfolder/build/file.txt' not in snap.file_modtimes
-    
 
+def test_CreateSnapshot_ignored_folders_not_entered(tmp_path):
+    make_tree(tmp_path, ['build/nested'], ['build/nested/file.cpp'])
+
+    with patch('os.scandir', wraps=os.scandir) as mock_os_scandir:
+        snap = FolderSnapshot.CreateSnapshot(str(tmp_path), ignore_patterns=['build'])
+
+    assert not snap.folder_paths
+    assert [call.args[0] for call in mock_os_scandir.call_args_list] == [str(tmp_path).replace('\\', '/')]
+
+def test_CreateSnapshot_absolute_root_paths_joined(tmp_path):
+    make_tree(tmp_path, ['folder'], ['folder/file.txt'])
+    root = str(tmp_path).replace('\\', '/')
+
+    snap = FolderSnapshot.CreateSnapshot(root + '/', ignore_patterns=[])
+
+    assert snap.folder_paths == [root + '/folder']
+    assert list(snap.file_modtimes) == [root + '/folder/file.txt']
+
+def test_SaveLoad_roundtrip_preserves_snapshot(tmp_path):
+    snap = FolderSnapshot()
+    snap.folder_paths = ['myfolder2', 'myfolder1']
+    snap.file_modtimes = {'myfolder1/file.txt': 12345.5, 'rootfile.txt': 12345}
+    snap.file_sizes = {'myfolder1/file.txt': 10, 'rootfile.txt': 2 ** 40}
+    snap.file_inodes = {'myfolder1/file.txt': 7, 'rootfile.txt': 8}
+    snapshot_file = str(tmp_path / 'folder.snapshot')
+
+    snap.save(snapshot_file)
+    loaded = FolderSnapshot.load(snapshot_file)
+
+    assert FolderSnapshot.is_snapshot_file(snapshot_file)
+    assert loaded.folder_paths == ['myfolder1', 'myfolder2']
+    assert loaded.file_modtimes == snap.file_modtimes
+    assert loaded.file_sizes == snap.file_sizes
+    assert loaded.file_inodes == snap.file_inodes
+    assert not FolderSnapshot.CompareSnapshots(snap, loaded).any_changed()
+
+def test_CompareSnapshots_size_or_inode_change_detected():
+    snap1 = FolderSnapshot()
+    snap1.file_modtimes = {'resized.txt': 12345, 'replaced.txt': 12345, 'same.txt': 12345}
+    snap1.file_sizes = {'resized.txt': 1, 'replaced.txt': 1, 'same.txt': 1}
+    snap1.file_inodes = {'resized.txt': 1, 'replaced.txt': 2, 'same.txt': 3}
+
+    snap2 = FolderSnapshot()
+    snap2.file_modtimes = {'resized.txt': 12345, 'replaced.txt': 12345, 'same.txt': 12345}
+    snap2.file_sizes = {'resized.txt': 2, 'replaced.txt': 1, 'same.txt': 1}
+    snap2.file_inodes = {'resized.txt': 1, 'replaced.txt': 4, 'same.txt': 3}
+
+    changes = FolderSnapshot.CompareSnapshots(snap1, snap2)
+    assert sorted(changes.changed_files) == ['replaced.txt', 'resized.txt']
+
+def test_CompareSnapshots_pickled_snapshot_without_sizes_compared_by_modtime():
+    snap1 = FolderSnapshot()
+    snap1.file_modtimes = {'file.txt': 12345}
+    del snap1.file_sizes
+    del snap1.file_inodes
+    snap1 = pickle.loads(pickle.dumps(snap1))
+
+    snap2 = FolderSnapshot()
+    snap2.file_modtimes = {'file.txt': 12345}
+    snap2.file_sizes = {'file.txt': 10}
+    snap2.file_inodes = {'file.txt': 11}
+
+    assert not FolderSnapshot.CompareSnapshots(snap1, snap2).any_changed()
 
 def test_CompareSnapshots_identical_snapshots_nodiffs():
     # emulate identical snapshots
@@ -0,0 +1,168 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+"""
+Contains the on-disk discovery index used to locate o3de object json files(gem.json, project.json, etc...)
+within directory trees without walking every directory of the tree on each query
+"""
+
+import json
+import logging
+import os
+import pathlib
+import time
+
+logger = logging.getLogger()
+logging.basicConfig()
+
+DISCOVERY_INDEX_VERSION = 1
+
+O3DE_OBJECT_JSON_FILENAMES = ('engine.json', 'project.json', 'gem.json', 'template.json', 'restricted.json',
+                              'repo.json')
+
+# Directories modified within this many nanoseconds of being scanned are rescanned on the next query,
+# as file systems with coarse timestamps could otherwise hide a change made in the same time slice
+_RECENT_MODIFICATION_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+# Directory entries are stored as [mtime_ns, [subdirectory names], [o3de object json filenames]]
+_MTIME_INDEX = 0
+_SUBDIRS_INDEX = 1
+_OBJECTS_INDEX = 2
+
+
+class DiscoveryIndex(object):
+    """
+    Records, per directory, the subdirectories and o3de object json files it contains along with the
+    directory modification time. A directory is only listed again when its modification time changes,
+    which is the case whenever an entry is added, removed or renamed inside of it
+    """
+    def __init__(self, index_path: pathlib.Path):
+        self.index_path = pathlib.Path(index_path)
+        self._directories = None
+        self._modified = False
+
+    def _load(self) -> None:
+        self._directories = {}
+        if not self.index_path.is_file():
+            return
+        try:
+            with self.index_path.open('r') as f:
+                index_data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f'Discovery index {self.index_path} failed to load, it will be rebuilt: {str(e)}')
+            return
+        if index_data.get('version') == DISCOVERY_INDEX_VERSION:
+            self._directories = index_data.get('directories', {})
+
+    def save(self) -> bool:
+        """
+        Atomically writes the index to disk if it has changed since it was loaded
+        :return: True if the index is up to date on disk
+        """
+        if not self._modified:
+            return True
+        temp_index_path = self.index_path.with_name(f'{self.index_path.name}.{os.getpid()}.tmp')
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with temp_index_path.open('w') as s:
+                json.dump({'version': DISCOVERY_INDEX_VERSION, 'directories': self._directories}, s,
+                          separators=(',', ':'))
+            os.replace(temp_index_path, self.index_path)
+        except OSError as e:
+            logger.warning(f'Discovery index {self.index_path} failed to save: {str(e)}')
+            return False
+        self._modified = False
+        return True
+
+    def _scan_directory(self, dir_path: str, scan_time_ns: int) -> list or None:
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            if self._directories.pop(dir_path, None) is not None:
+                self._modified = True
+            return None
+
+        dir_entry = self._directories.get(dir_path)
+        if dir_entry and dir_entry[_MTIME_INDEX] == mtime_ns:
+            return dir_entry
+
+        subdirs = []
+        objects = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.name in O3DE_OBJECT_JSON_FILENAMES and entry.is_file():
+                            objects.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f'Unable to list directory {dir_path}: {str(e)}')
+            return None
+
+        if scan_time_ns - mtime_ns < _RECENT_MODIFICATION_WINDOW_NS:
+            mtime_ns = -1
+        dir_entry = [mtime_ns, sorted(subdirs), sorted(objects)]
+        self._directories[dir_path] = dir_entry
+        self._modified = True
+        return dir_entry
+
+    def _prune(self, root_path: str, visited: set) -> None:
+        root_prefix = os.path.join(root_path, '')
+        stale_paths = [dir_path for dir_path in self._directories
+                       if dir_path not in visited and (dir_path == root_path or dir_path.startswith(root_prefix))]
+        for dir_path in stale_paths:
+            del self._directories[dir_path]
+
+    def find_o3de_object_directories(self, root_path: str or pathlib.Path,
+                                     json_filenames: tuple = O3DE_OBJECT_JSON_FILENAMES) -> dict:
+        """
+        Locates every directory at or below root_path which contains one of the requested o3de object json files.
+        Directories are visited in the same top down order as os.walk
+        :param root_path: root of the directory tree to search
+        :param json_filenames: o3de object json filenames to locate
+        :return: dictionary of json filename -> list of directories containing that file
+        """
+        if self._directories is None:
+            self._load()
+
+        results = {json_filename: [] for json_filename in json_filenames}
+        root_path = os.fspath(pathlib.Path(root_path).resolve())
+        scan_time_ns = time.time_ns()
+        visited = set()
+        dir_stack = [root_path]
+        while dir_stack:
+            dir_path = dir_stack.pop()
+            dir_entry = self._scan_directory(dir_path, scan_time_ns)
+            if dir_entry is None:
+                continue
+            visited.add(dir_path)
+            for json_filename in dir_entry[_OBJECTS_INDEX]:
+                if json_filename in results:
+                    results[json_filename].append(dir_path)
+            dir_stack.extend(os.path.join(dir_path, subdir) for subdir in reversed(dir_entry[_SUBDIRS_INDEX]))
+
+        # Only a directory which was listed again can have lost subdirectories
+        if self._modified:
+            self._prune(root_path, visited)
+            self.save()
+        return results
+
+
+_discovery_indexes = {}
+
+
+def get_discovery_index(index_path: pathlib.Path) -> DiscoveryIndex:
+    """
+    Returns the shared DiscoveryIndex instance for the supplied index file path
+    :param index_path: path to the on-disk index file
+    """
+    index_key = str(pathlib.Path(index_path))
+    if index_key not in _discovery_indexes:
+        _discovery_indexes[index_key] = DiscoveryIndex(index_path)
+    return _discovery_indexes[index_key]
@@ -18,7 +18,7 @@ import sys
 import urllib.parse
 import urllib.request
 
-from o3de import manifest, repo, utils, validation
+from o3de import manifest, repo, sha256, utils, validation
 
 logger = logging.getLogger()
 logging.basicConfig()
@@ -43,7 +43,7 @@ def validate_downloaded_zip_sha256(download_uri_json_data: dict, download_zip_pa
         logger.warn(f'SECURITY WARNING: The advertised o3de object you downloaded has no "sha256"!!! Be VERY careful!!!'
                     f' We cannot verify this is the actually the advertised object!!!')
     else:
-        sha256B = hashlib.sha256(download_zip_path.open('rb').read()).hexdigest()
+        sha256B = sha256.sha256_file(download_zip_path)
         if sha256A != sha256B:
             logger.error(f'SECURITY VIOLATION: Downloaded zip sha256 {sha256B} does not match'
                          f' the advertised "sha256":{sha256A} in the f{manifest_json_name}. Deleting unzipped files!!!')
@@ -82,16 +82,7 @@ def get_downloadable(engine_name: str = None,
                      gem_name: str = None,
                      template_name: str = None,
                      restricted_name: str = None) -> dict or None:
-    json_data = manifest.load_o3de_manifest()
-    try:
-        o3de_object_uris = json_data['repos']
-    except KeyError as key_err:
-        logger.error(f'Unable to load repos from o3de manifest: {str(key_err)}')
-        return None
-
-    manifest_json = 'repo.json'
-    search_func = lambda: repo.search_repo(manifest_json, engine_name, project_name, gem_name, template_name)
-    return repo.search_o3de_object(manifest_json, o3de_object_uris, search_func)
+    return repo.search_repo(engine_name, project_name, gem_name, template_name, restricted_name)
 
 
 def download_o3de_object(object_name: str, default_folder_name: str, dest_path: str or pathlib.Path,
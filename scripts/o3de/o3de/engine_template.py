@@ -7,6 +7,8 @@
 This file contains all the code that has to do with creating and instantiate engine templates
 """
 import argparse
+import concurrent.futures
+import functools
 import logging
 import os
 import pathlib
@@ -77,19 +79,55 @@ restricted_platforms = {
 template_file_name = 'template.json'
 this_script_parent = pathlib.Path(os.path.dirname(os.path.realpath(__file__)))
 
+# Templated files larger than this are transformed a line at a time instead of being read whole
+stream_transform_file_size = 8 * 1024 * 1024
+
+# Maximum number of files copied and transformed concurrently during template instantiation
+max_template_copy_workers = min(32, (os.cpu_count() or 1) + 4)
+
+
 def _replace_license_text(source_data: str):
-    while '{BEGIN_LICENSE}' in source_data:
-        start = source_data.find('{BEGIN_LICENSE}')
-        if start != -1:
-            line_start = source_data.rfind('\n', 0, start)
-            if line_start == -1:
-                line_start = 0
-            end = source_data.find('{END_LICENSE}')
-            if end != -1:
-                end = source_data.find('\n', end)
-            if end != -1:
-                source_data = source_data[:line_start] + source_data[end + 1:]
-    return source_data
+    # Each license block is removed from the newline preceding the {BEGIN_LICENSE} line through
+    # the end of the {END_LICENSE} line
+    kept_data = []
+    position = 0
+    while True:
+        start = source_data.find('{BEGIN_LICENSE}', position)
+        if start == -1:
+            break
+        end = source_data.find('{END_LICENSE}', start)
+        if end != -1:
+            end = source_data.find('\n', end)
+        if end == -1:
+            break
+        line_start = source_data.rfind('\n', position, start)
+        if line_start == -1:
+            line_start = position
+        kept_data.append(source_data[position:line_start])
+        position = end + 1
+    kept_data.append(source_data[position:])
+    return ''.join(kept_data)
+
+
+# Hand edited ${Random_Uuid} occurrences are each replaced with a new randomly generated uuid
+random_uuid_regex = re.compile(re.escape('${Random_Uuid}'))
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_replacements(replacements: tuple) -> callable:
+    """
+    Internal function which returns the function applying the transformation pairs to data.
+    The pairs are applied in order, each one to the output of the previous ones, so a pair can replace text produced
+    by an earlier pair. ${Random_Uuid} is then replaced by a new randomly generated uuid for every occurrence, in one pass
+    :param replacements: tuple of transformation pairs A->B
+    :return: function which transforms a string
+    """
+    def transform(s_data: str) -> str:
+        for replace_this, with_this in replacements:
+            s_data = s_data.replace(replace_this, with_this)
+        return random_uuid_regex.sub(lambda match: str(uuid.uuid4()), s_data)
+
+    return transform
 
 
 def _transform(s_data: str,
@@ -102,20 +140,43 @@ def _transform(s_data: str,
     :param keep_license_text: whether or not you want to keep license text
     :return: the potentially transformed data
     """
-    # copy the s_data into t_data, then apply all transformations only on t_data
-    t_data = str(s_data)
-    for replacement in replacements:
-        t_data = t_data.replace(replacement[0], replacement[1])
-
-    # if someone hand edits the template to have ${Random_Uuid} then replace it with a randomly generated uuid
-    while '${Random_Uuid}' in t_data:
-        t_data = t_data.replace('${Random_Uuid}', str(uuid.uuid4()), 1)
+    # apply all transformations, as well as replacing any hand edited ${Random_Uuid} with a random uuid
+    t_data = _compile_replacements(tuple(map(tuple, replacements)))(str(s_data))
 
     if not keep_license_text:
         t_data = _replace_license_text(t_data)
     return t_data
 
 
+def _transform_stream(source, destination, replacements: list, keep_license_text: bool = False) -> None:
+    """
+    Internal function which transforms a source text stream into a destination text stream a line at a time.
+    Produces the same result as _transform for data whose replacements do not span lines
+    :param source: the text stream to read
+    :param destination: the text stream to write
+    :param replacements: list of transformation pairs A->B
+    :param keep_license_text: whether or not you want to keep license text
+    """
+    transform_line = _compile_replacements(tuple(map(tuple, replacements)))
+    # The previous line is held back, as the newline preceding a license block is removed along with it
+    pending_line = None
+    in_license = False
+    for line in source:
+        line = transform_line(line)
+        if not keep_license_text:
+            begin = line.find('{BEGIN_LICENSE}') if not in_license else 0
+            if in_license or begin != -1:
+                if not in_license and pending_line is not None and pending_line.endswith('\n'):
+                    pending_line = pending_line[:-1]
+                in_license = not (line.find('{END_LICENSE}', begin) != -1 and line.endswith('\n'))
+                continue
+        if pending_line is not None:
+            destination.write(pending_line)
+        pending_line = line
+    if pending_line is not None:
+        destination.write(pending_line)
+
+
 def _transform_copy(source_file: pathlib.Path,
                     destination_file: pathlib.Path,
                     replacements: list,
@@ -135,22 +196,52 @@ def _transform_copy(source_file: pathlib.Path,
         shutil.copy(source_file, destination_file)
     else:
         try:
-            # open the file and transform its data
+            # if the dst file we are about to write exists already for some reason delete it
+            if os.path.isfile(destination_file):
+                os.unlink(destination_file)
+
+            # open the file and transform its data, large files are streamed instead of being read whole
             with open(source_file, 'r') as s:
-                s_data = s.read()
-                d_data = _transform(s_data, replacements, keep_license_text)
-
-                # if the dst file we are about to write exists already for some reason delete it
-                if os.path.isfile(destination_file):
-                    os.unlink(destination_file)
-                with open(destination_file, 'w') as d:
-                    d.write(d_data)
+                if os.fstat(s.fileno()).st_size > stream_transform_file_size:
+                    with open(destination_file, 'w') as d:
+                        _transform_stream(s, d, replacements, keep_license_text)
+                else:
+                    d_data = _transform(s.read(), replacements, keep_license_text)
+                    with open(destination_file, 'w') as d:
+                        d.write(d_data)
         except Exception as e:
             # usually happens if there is an unknown binary type
             shutil.copy(source_file, destination_file)
             pass
 
 
+def _copy_template_files(copy_file_jobs: list,
+                         replacements: list,
+                         keep_license_text: bool = False) -> None:
+    """
+    Internal function which copies the template files into the instance using a pool of threads
+    :param copy_file_jobs: list of (input file, output file, is templated) tuples
+    :param replacements: list of transformation pairs A->B
+    :param keep_license_text: whether or not you want to keep license text
+    """
+    def copy_template_file(copy_file_job: tuple) -> None:
+        in_file, out_file, is_templated = copy_file_job
+        # if templated _transformCopy the file, if not just copy it
+        if is_templated:
+            _transform_copy(in_file, out_file, replacements, keep_license_text)
+        else:
+            shutil.copy(in_file, out_file)
+
+    # if for some reason the output folder for a file was not created do it now
+    for out_dir in {os.path.dirname(out_file) for _, out_file, _ in copy_file_jobs}:
+        os.makedirs(out_dir, exist_ok=True)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_template_copy_workers) as executor:
+        # consume the results so that any exception is raised to the caller
+        for _ in executor.map(copy_template_file, copy_file_jobs):
+            pass
+
+
 def _execute_template_json(json_data: dict,
                            destination_path: pathlib.Path,
                            template_path: pathlib.Path,
@@ -170,6 +261,7 @@ def _execute_template_json(json_data: dict,
 
     # for each copyFiles entry, _transformCopy the templated source file into a concrete instance file or
     # regular copy if not templated
+    copy_file_jobs = []
     for copy_file in json_data['copyFiles']:
         # construct the input file name
         in_file = template_path / 'Template' /copy_file['file']
@@ -185,14 +277,9 @@ def _execute_template_json(json_data: dict,
         # transform the output file name
         out_file = _transform(out_file.as_posix(), replacements, keep_license_text)
 
-        # if for some reason the output folder for this file was not created above do it now
-        os.makedirs(os.path.dirname(out_file), exist_ok=True)
+        copy_file_jobs.append((in_file, out_file, copy_file['isTemplated']))
 
-        # if templated _transformCopy the file, if not just copy it
-        if copy_file['isTemplated']:
-            _transform_copy(in_file, out_file, replacements, keep_license_text)
-        else:
-            shutil.copy(in_file, out_file)
+    _copy_template_files(copy_file_jobs, replacements, keep_license_text)
 
 
 def _execute_restricted_template_json(json_data: dict,
@@ -234,6 +321,7 @@ def _execute_restricted_template_json(json_data: dict,
 
     # for each copyFiles entry, _transformCopy the templated source file into a concrete instance file or
     # regular copy if not templated
+    copy_file_jobs = []
     for copy_file in json_data['copyFiles']:
         # construct the input file name
         in_file = template_restricted_path / restricted_platform / template_restricted_platform_relative_path\
@@ -253,14 +341,9 @@ def _execute_restricted_template_json(json_data: dict,
         # transform the output file name
         out_file = _transform(out_file.as_posix(), replacements, keep_license_text)
 
-        # if for some reason the output folder for this file was not created above do it now
-        os.makedirs(os.path.dirname(out_file), exist_ok=True)
+        copy_file_jobs.append((in_file, out_file, copy_file['isTemplated']))
 
-        # if templated _transformCopy the file, if not just copy it
-        if copy_file['isTemplated']:
-            _transform_copy(in_file, out_file, replacements, keep_license_text)
-        else:
-            shutil.copy(in_file, out_file)
+    _copy_template_files(copy_file_jobs, replacements, keep_license_text)
 
 
 def _instantiate_template(template_json_data: dict,
@@ -12,8 +12,9 @@ import json
 import logging
 import os
 import pathlib
+import pickle
 
-from o3de import validation
+from o3de import discovery, validation
 
 logger = logging.getLogger()
 logging.basicConfig()
@@ -176,60 +177,114 @@ def get_o3de_manifest() -> pathlib.Path:
     return manifest_path
 
 
+# Json file cache
+# Parsed json data is stored per resolved file path along with the file's modification time and size
+# at the time it was read. Queries reuse the parsed data until the file changes on disk
+# or is rewritten through save_o3de_manifest.
+# Each entry also holds a pickled snapshot of the data: unpickling it returns a copy that callers can modify
+# without altering the cached value, and is about twice as fast as parsing the json file again,
+# whereas copy.deepcopy is slower than parsing it
+_json_file_cache = {}
+
+
+def _json_cache_key(json_path: pathlib.Path) -> pathlib.Path:
+    return pathlib.Path(json_path).resolve()
+
+
+def load_json_file_cached(json_path: pathlib.Path, copy_data: bool = True) -> dict:
+    """
+    Loads the json data at the supplied path, returning previously parsed data if the file
+    modification time and size have not changed since it was last read.
+    json.JSONDecodeError and OSError exceptions are propagated to the caller
+
+    :param json_path: path to the json file to load
+    :param copy_data: if False the cached json data itself is returned, which the caller must not modify
+    :return the parsed json data
+    """
+    json_path = pathlib.Path(json_path)
+    file_stat = json_path.stat()
+    cache_key = _json_cache_key(json_path)
+    cache_entry = _json_file_cache.get(cache_key)
+    if cache_entry and cache_entry[0] == file_stat.st_mtime_ns and cache_entry[1] == file_stat.st_size:
+        json_data, pickled_data = cache_entry[2], cache_entry[3]
+    else:
+        with json_path.open('r') as f:
+            json_data = json.load(f)
+        pickled_data = pickle.dumps(json_data, pickle.HIGHEST_PROTOCOL)
+        _json_file_cache[cache_key] = (file_stat.st_mtime_ns, file_stat.st_size, json_data, pickled_data)
+    return pickle.loads(pickled_data) if copy_data else json_data
+
+
+def invalidate_json_file_cache(json_path: pathlib.Path = None) -> None:
+    """
+    Removes the cached json data for the supplied path or clears the entire cache if json_path is None
+
+    :param json_path: optional path to the json file whose cache entry should be removed
+    """
+    if json_path:
+        _json_file_cache.pop(_json_cache_key(json_path), None)
+    else:
+        _json_file_cache.clear()
+
+
 def load_o3de_manifest(manifest_path: pathlib.Path = None) -> dict:
     """
     Loads supplied manifest file or ~/.o3de/o3de_manifest.json if None
+    The parsed manifest is cached until the file changes on disk
 
     :param manifest_path: optional path to manifest file to load
     """
     if not manifest_path:
         manifest_path = get_o3de_manifest()
-    with manifest_path.open('r') as f:
-        try:
-            json_data = json.load(f)
-        except json.JSONDecodeError as e:
-            logger.error(f'Manifest json failed to load: {str(e)}')
-            return {}
-        else:
-            return json_data
+    try:
+        return load_json_file_cached(manifest_path)
+    except json.JSONDecodeError as e:
+        logger.error(f'Manifest json failed to load: {str(e)}')
+        return {}
 
 
 def save_o3de_manifest(json_data: dict, manifest_path: pathlib.Path = None) -> bool:
     """
         Save the json dictionary to the supplied manifest file or ~/.o3de/o3de_manifest.json if manifest_path is None
+        The file is replaced atomically
 
         :param json_data: dictionary to save in json format at the file path
         :param manifest_path: optional path to manifest file to save
         """
     if not manifest_path:
         manifest_path = get_o3de_manifest()
-    with manifest_path.open('w') as s:
-        try:
+    invalidate_json_file_cache(manifest_path)
+    # Write to a temporary file which replaces the manifest so that readers never observe a partially written file
+    temp_manifest_path = manifest_path.with_name(f'{manifest_path.name}.{os.getpid()}.tmp')
+    try:
+        with temp_manifest_path.open('w') as s:
             s.write(json.dumps(json_data, indent=4) + '\n')
-            return True
-        except OSError as e:
-            logger.error(f'Manifest json failed to save: {str(e)}')
-            return False
+        os.replace(temp_manifest_path, manifest_path)
+        return True
+    except OSError as e:
+        logger.error(f'Manifest json failed to save: {str(e)}')
+        return False
+
 
+def get_o3de_discovery_index() -> discovery.DiscoveryIndex:
+    """
+    Returns the discovery index stored in ~/.o3de/Cache used to locate o3de object json files
+    within registered directories
+    """
+    return discovery.get_discovery_index(get_o3de_cache_folder() / 'o3de_discovery_index.json')
 
 
 def get_gems_from_subdirectories(external_subdirs: list) -> list:
     '''
     Helper Method for scanning a set of external subdirectories for gem.json files
     '''
-    def is_gem_subdirectory(subdir_files):
-        for name in files:
-            if name == 'gem.json':
-                return True
-        return False
-
     gem_directories = []
     # Locate all subfolders with gem.json files within them
     if external_subdirs:
+        discovery_index = get_o3de_discovery_index()
         for subdirectory in external_subdirs:
-            for root, dirs, files in os.walk(pathlib.Path(subdirectory).resolve()):
-                if is_gem_subdirectory(files):
-                    gem_directories.append(pathlib.PurePath(root).as_posix())
+            found_directories = discovery_index.find_o3de_object_directories(subdirectory, ('gem.json',))
+            gem_directories.extend(pathlib.PurePath(root).as_posix() for root in found_directories['gem.json'])
 
     return gem_directories
 
@@ -459,13 +514,12 @@ def get_engine_json_data(engine_name: str = None,
         logger.error(f'Engine json {engine_json} is not valid.')
         return None
 
-    with engine_json.open('r') as f:
-        try:
-            engine_json_data = json.load(f)
-        except json.JSONDecodeError as e:
-            logger.warn(f'{engine_json} failed to load: {str(e)}')
-        else:
-            return engine_json_data
+    try:
+        engine_json_data = load_json_file_cached(engine_json)
+    except json.JSONDecodeError as e:
+        logger.warn(f'{engine_json} failed to load: {str(e)}')
+    else:
+        return engine_json_data
 
     return None
 
@@ -492,13 +546,12 @@ def get_project_json_data(project_name: str = None,
         logger.error(f'Project json {project_json} is not valid.')
         return None
 
-    with project_json.open('r') as f:
-        try:
-            project_json_data = json.load(f)
-        except json.JSONDecodeError as e:
-            logger.warn(f'{project_json} failed to load: {str(e)}')
-        else:
-            return project_json_data
+    try:
+        project_json_data = load_json_file_cached(project_json)
+    except json.JSONDecodeError as e:
+        logger.warn(f'{project_json} failed to load: {str(e)}')
+    else:
+        return project_json_data
 
     return None
 
@@ -525,13 +578,12 @@ def get_gem_json_data(gem_name: str = None, gem_path: str or pathlib.Path = None
         logger.error(f'Gem json {gem_json} is not valid.')
         return None
 
-    with gem_json.open('r') as f:
-        try:
-            gem_json_data = json.load(f)
-        except json.JSONDecodeError as e:
-            logger.warn(f'{gem_json} failed to load: {str(e)}')
-        else:
-            return gem_json_data
+    try:
+        gem_json_data = load_json_file_cached(gem_json)
+    except json.JSONDecodeError as e:
+        logger.warn(f'{gem_json} failed to load: {str(e)}')
+    else:
+        return gem_json_data
 
     return None
 
@@ -558,13 +610,12 @@ def get_template_json_data(template_name: str = None, template_path: str or path
         logger.error(f'Template json {template_json} is not valid.')
         return None
 
-    with template_json.open('r') as f:
-        try:
-            template_json_data = json.load(f)
-        except json.JSONDecodeError as e:
-            logger.warn(f'{template_json} failed to load: {str(e)}')
-        else:
-            return template_json_data
+    try:
+        template_json_data = load_json_file_cached(template_json)
+    except json.JSONDecodeError as e:
+        logger.warn(f'{template_json} failed to load: {str(e)}')
+    else:
+        return template_json_data
 
     return None
 
@@ -591,13 +642,12 @@ def get_restricted_json_data(restricted_name: str = None, restricted_path: str o
         logger.error(f'Restricted json {restricted_json} is not valid.')
         return None
 
-    with restricted_json.open('r') as f:
-        try:
-            restricted_json_data = json.load(f)
-        except json.JSONDecodeError as e:
-            logger.warn(f'{restricted_json} failed to load: {str(e)}')
-        else:
-            return restricted_json_data
+    try:
+        restricted_json_data = load_json_file_cached(restricted_json)
+    except json.JSONDecodeError as e:
+        logger.warn(f'{restricted_json} failed to load: {str(e)}')
+    else:
+        return restricted_json_data
 
     return None
 
@@ -641,75 +691,70 @@ def get_registered(engine_name: str = None,
         for engine in json_data['engines']:
             engine_path = pathlib.Path(engine['path']).resolve()
             engine_json = engine_path / 'engine.json'
-            with engine_json.open('r') as f:
-                try:
-                    engine_json_data = json.load(f)
-                except json.JSONDecodeError as e:
-                    logger.warn(f'{engine_json} failed to load: {str(e)}')
-                else:
-                    this_engines_name = engine_json_data['engine_name']
-                    if this_engines_name == engine_name:
-                        return engine_path
+            try:
+                engine_json_data = load_json_file_cached(engine_json)
+            except json.JSONDecodeError as e:
+                logger.warn(f'{engine_json} failed to load: {str(e)}')
+            else:
+                this_engines_name = engine_json_data['engine_name']
+                if this_engines_name == engine_name:
+                    return engine_path
 
     elif isinstance(project_name, str):
         projects = get_all_projects()
         for project_path in projects:
             project_path = pathlib.Path(project_path).resolve()
             project_json = project_path / 'project.json'
-            with project_json.open('r') as f:
-                try:
-                    project_json_data = json.load(f)
-                except json.JSONDecodeError as e:
-                    logger.warn(f'{project_json} failed to load: {str(e)}')
-                else:
-                    this_projects_name = project_json_data['project_name']
-                    if this_projects_name == project_name:
-                        return project_path
+            try:
+                project_json_data = load_json_file_cached(project_json)
+            except json.JSONDecodeError as e:
+                logger.warn(f'{project_json} failed to load: {str(e)}')
+            else:
+                this_projects_name = project_json_data['project_name']
+                if this_projects_name == project_name:
+                    return project_path
 
     elif isinstance(gem_name, str):
         gems = get_all_gems(project_path)
         for gem_path in gems:
             gem_path = pathlib.Path(gem_path).resolve()
             gem_json = gem_path / 'gem.json'
-            with gem_json.open('r') as f:
-                try:
-                    gem_json_data = json.load(f)
-                except json.JSONDecodeError as e:
-                    logger.warn(f'{gem_json} failed to load: {str(e)}')
-                else:
-                    this_gems_name = gem_json_data['gem_name']
-                    if this_gems_name == gem_name:
-                        return gem_path
+            try:
+                gem_json_data = load_json_file_cached(gem_json)
+            except json.JSONDecodeError as e:
+                logger.warn(f'{gem_json} failed to load: {str(e)}')
+            else:
+                this_gems_name = gem_json_data['gem_name']
+                if this_gems_name == gem_name:
+                    return gem_path
 
     elif isinstance(template_name, str):
         templates = get_all_templates(project_path)
         for template_path in templates:
             template_path = pathlib.Path(template_path).resolve()
             template_json = template_path / 'template.json'
-            with template_json.open('r') as f:
-                try:
-                    template_json_data = json.load(f)
-                except json.JSONDecodeError as e:
-                    logger.warn(f'{template_path} failed to load: {str(e)}')
-                else:
-                    this_templates_name = template_json_data['template_name']
-                    if this_templates_name == template_name:
-                        return template_path
+            try:
+                template_json_data = load_json_file_cached(template_json)
+            except json.JSONDecodeError as e:
+                logger.warn(f'{template_path} failed to load: {str(e)}')
+            else:
+                this_templates_name = template_json_data['template_name']
+                if this_templates_name == template_name:
+                    return template_path
 
     elif isinstance(restricted_name, str):
         restricted = get_all_restricted(project_path)
         for restricted_path in restricted:
             restricted_path = pathlib.Path(restricted_path).resolve()
             restricted_json = restricted_path / 'restricted.json'
-            with restricted_json.open('r') as f:
-                try:
-                    restricted_json_data = json.load(f)
-                except json.JSONDecodeError as e:
-                    logger.warn(f'{restricted_json} failed to load: {str(e)}')
-                else:
-                    this_restricted_name = restricted_json_data['restricted_name']
-                    if this_restricted_name == restricted_name:
-                        return restricted_path
+            try:
+                restricted_json_data = load_json_file_cached(restricted_json)
+            except json.JSONDecodeError as e:
+                logger.warn(f'{restricted_json} failed to load: {str(e)}')
+            else:
+                this_restricted_name = restricted_json_data['restricted_name']
+                if this_restricted_name == restricted_name:
+                    return restricted_path
 
     elif isinstance(default_folder, str):
         if default_folder == 'engines':
@@ -736,13 +781,12 @@ def get_registered(engine_name: str = None,
             cache_file = cache_folder / str(repo_sha256.hexdigest() + '.json')
             if cache_file.is_file():
                 repo = pathlib.Path(cache_file).resolve()
-                with repo.open('r') as f:
-                    try:
-                        repo_json_data = json.load(f)
-                    except json.JSONDecodeError as e:
-                        logger.warn(f'{cache_file} failed to load: {str(e)}')
-                    else:
-                        this_repos_name = repo_json_data['repo_name']
-                        if this_repos_name == repo_name:
-                            return repo_uri
+                try:
+                    repo_json_data = load_json_file_cached(repo)
+                except json.JSONDecodeError as e:
+                    logger.warn(f'{cache_file} failed to load: {str(e)}')
+                else:
+                    this_repos_name = repo_json_data['repo_name']
+                    if this_repos_name == repo_name:
+                        return repo_uri
     return None
@@ -10,6 +10,8 @@ This file contains all the code that has to do with registering engines, project
 """
 
 import argparse
+import concurrent.futures
+import copy
 import hashlib
 import logging
 import json
@@ -80,56 +82,25 @@ def register_all_in_folder(folder_path: pathlib.Path,
     restricted_set = set()
     repo_set = set()
 
-    ret_val = 0
-    for root, dirs, files in os.walk(folder_path):
-        if root in exclude:
-            continue
+    exclude = [pathlib.Path(excluded_path).resolve() for excluded_path in exclude] if exclude else []
+    found_directories = manifest.get_o3de_discovery_index().find_o3de_object_directories(folder_path)
+    for json_filename, o3de_object_set in [('engine.json', engines_set), ('project.json', projects_set),
+                                           ('gem.json', gems_set), ('template.json', templates_set),
+                                           ('restricted.json', restricted_set), ('repo.json', repo_set)]:
+        for root in found_directories[json_filename]:
+            if pathlib.Path(root) in exclude:
+                continue
+            o3de_object_set.add(pathlib.Path(root))
 
-        for name in files:
-            if name == 'engine.json':
-                engines_set.add(root)
-            elif name == 'project.json':
-                projects_set.add(root)
-            elif name == 'gem.json':
-                gems_set.add(root)
-            elif name == 'template.json':
-                templates_set.add(root)
-            elif name == 'restricted.json':
-                restricted_set.add(root)
-            elif name == 'repo.json':
-                repo_set.add(root)
-
-    for engine in sorted(engines_set, reverse=True):
-        error_code = register(engine_path=engine, remove=remove)
-        if error_code:
-            ret_val = error_code
+    registrations = []
+    registrations.extend({'engine_path': engine, 'remove': remove} for engine in sorted(engines_set, reverse=True))
+    for o3de_object_set, register_path_kwarg in [(projects_set, 'project_path'), (gems_set, 'gem_path'),
+                                                 (templates_set, 'template_path'),
+                                                 (restricted_set, 'restricted_path'), (repo_set, 'repo_uri')]:
+        registrations.extend({'engine_path': engine_path, register_path_kwarg: o3de_object_root, 'remove': remove}
+                             for o3de_object_root in sorted(o3de_object_set, reverse=True))
 
-    for project in sorted(projects_set, reverse=True):
-        error_code = register(engine_path=engine_path, project_path=project, remove=remove)
-        if error_code:
-            ret_val = error_code
-
-    for gem in sorted(gems_set, reverse=True):
-        error_code = register(engine_path=engine_path, gem_path=gem, remove=remove)
-        if error_code:
-            ret_val = error_code
-
-    for template in sorted(templates_set, reverse=True):
-        error_code = register(engine_path=engine_path, template_path=template, remove=remove)
-        if error_code:
-            ret_val = error_code
-
-    for restricted in sorted(restricted_set, reverse=True):
-        error_code = register(engine_path=engine_path, restricted_path=restricted, remove=remove)
-        if error_code:
-            ret_val = error_code
-
-    for repo in sorted(repo_set, reverse=True):
-        error_code = register(engine_path=engine_path, repo_uri=repo, remove=remove)
-        if error_code:
-            ret_val = error_code
-
-    return ret_val
+    return register_batch(registrations)
 
 
 def register_all_o3de_objects_of_type_in_folder(o3de_object_path: pathlib.Path,
@@ -150,7 +121,6 @@ def register_all_o3de_objects_of_type_in_folder(o3de_object_path: pathlib.Path,
     o3de_object_type_set = set()
     register_path_kwarg = f'{o3de_object_type}_path' if o3de_object_type != 'repo' else f'{o3de_object_type}_uri'
 
-    ret_val = 0
     for root, dirs, files in os.walk(o3de_object_path):
         # Skip subdirectories where the stop iteration callback is true
         if stop_iteration_callable and stop_iteration_callable(dirs, files):
@@ -161,13 +131,10 @@ def register_all_o3de_objects_of_type_in_folder(o3de_object_path: pathlib.Path,
             # Nested o3de objects of the same type aren't supported(i.e an engine cannot be inside of a engine).
             dirs[:] = []
 
-    for o3de_object_type_root in sorted(o3de_object_type_set, reverse=True):
-        error_code = register(**{register_path_kwarg: o3de_object_type_root},
-                              remove=remove, force=force, **register_kwargs)
-        if error_code:
-            ret_val = error_code
+    registrations = [{register_path_kwarg: o3de_object_type_root, 'remove': remove, 'force': force, **register_kwargs}
+                     for o3de_object_type_root in sorted(o3de_object_type_set, reverse=True)]
 
-    return ret_val
+    return register_batch(registrations)
 
 
 def stop_on_template_folders(dirs: list, files: list) -> bool:
@@ -263,7 +230,8 @@ def add_engine_name_to_path(json_data: dict, engine_path: pathlib.Path, force: b
 def register_engine_path(json_data: dict,
                          engine_path: pathlib.Path,
                          remove: bool = False,
-                         force: bool = False) -> int:
+                         force: bool = False,
+                         skip_validation: bool = False) -> int:
     if not engine_path:
         logger.error(f'Engine path cannot be empty.')
         return 1
@@ -285,7 +253,7 @@ def register_engine_path(json_data: dict,
         return 1
 
     engine_json = engine_path / 'engine.json'
-    if not validation.valid_o3de_engine_json(engine_json):
+    if not skip_validation and not validation.valid_o3de_engine_json(engine_json):
         logger.error(f'Engine json {engine_json} is not valid.')
         return 1
 
@@ -390,17 +358,21 @@ def register_gem_path(json_data: dict,
                       gem_path: pathlib.Path,
                       remove: bool = False,
                       engine_path: pathlib.Path = None,
-                      project_path:  pathlib.Path = None) -> int:
+                      project_path:  pathlib.Path = None,
+                      skip_validation: bool = False) -> int:
     return register_o3de_object_path(json_data, gem_path, 'external_subdirectories', 'gem.json',
-                                     validation.valid_o3de_gem_json, remove, engine_path, project_path)
+                                     None if skip_validation else validation.valid_o3de_gem_json,
+                                     remove, engine_path, project_path)
 
 
 def register_project_path(json_data: dict,
                           project_path: pathlib.Path,
                           remove: bool = False,
-                          engine_path: pathlib.Path = None) -> int:
+                          engine_path: pathlib.Path = None,
+                          skip_validation: bool = False) -> int:
     result = register_o3de_object_path(json_data, project_path, 'projects', 'project.json',
-                                     validation.valid_o3de_project_json, remove, engine_path, None)
+                                     None if skip_validation else validation.valid_o3de_project_json,
+                                     remove, engine_path, None)
 
     if result != 0:
         return result
@@ -433,17 +405,21 @@ def register_project_path(json_data: dict,
 def register_template_path(json_data: dict,
                            template_path: pathlib.Path,
                            remove: bool = False,
-                           engine_path: pathlib.Path = None) -> int:
+                           engine_path: pathlib.Path = None,
+                           skip_validation: bool = False) -> int:
     return register_o3de_object_path(json_data, template_path, 'templates', 'template.json',
-                                       validation.valid_o3de_template_json, remove, engine_path, None)
+                                     None if skip_validation else validation.valid_o3de_template_json,
+                                     remove, engine_path, None)
 
 
 def register_restricted_path(json_data: dict,
                              restricted_path: pathlib.Path,
                              remove: bool = False,
-                             engine_path: pathlib.Path = None) -> int:
+                             engine_path: pathlib.Path = None,
+                             skip_validation: bool = False) -> int:
     return register_o3de_object_path(json_data, restricted_path, 'restricted', 'restricted.json',
-                                     validation.valid_o3de_restricted_json, remove, engine_path, None)
+                                     None if skip_validation else validation.valid_o3de_restricted_json,
+                                     remove, engine_path, None)
 
 
 def register_repo(json_data: dict,
@@ -468,16 +444,11 @@ def register_repo(json_data: dict,
         logger.warn(f'Removing repo uri {repo_uri}.')
         return 0
 
-    repo_sha256 = hashlib.sha256(url.encode())
-    cache_file = manifest.get_o3de_cache_folder() / str(repo_sha256.hexdigest() + '.json')
+    repo_uri = repo_uri.as_posix() if isinstance(repo_uri, pathlib.PurePath) else repo_uri
+    json_data['repos'].insert(0, repo_uri)
 
-    result = utils.download_file(url, cache_file)
-    if result == 0:
-        json_data['repos'].insert(0, repo_uri.as_posix())
-
-    result = repo.process_add_o3de_repo(cache_file, repo_set)
-
-    return result
+    # Only the added repo is downloaded, the other registered repos are kept as they are in the repo cache index
+    return repo.refresh_repos([repo_uri], merge=True)
 
 
 def register_default_o3de_object_folder(json_data: dict,
@@ -556,7 +527,9 @@ def register(engine_path: pathlib.Path = None,
              external_subdir_engine_path: pathlib.Path = None,
              external_subdir_project_path: pathlib.Path = None,
              remove: bool = False,
-             force: bool = False
+             force: bool = False,
+             json_data: dict = None,
+             skip_validation: bool = False
              ) -> int:
     """
     Adds/Updates entries to the ~/.o3de/o3de_manifest.json
@@ -580,11 +553,16 @@ def register(engine_path: pathlib.Path = None,
      The registrations occurs in the project.json in this case
     :param remove: add/remove the entries
     :param force: force update of the engine_path for specified "engine_name" from the engine.json file
+    :param json_data: optional in-memory view of the o3de_manifest.json data to update.
+     When supplied the changes are not saved, the caller is responsible for saving the manifest
+    :param skip_validation: skip the validation of the o3de object json files, which the caller already validated
 
     :return: 0 for success or non 0 failure code
     """
 
-    json_data = manifest.load_o3de_manifest()
+    save_manifest = json_data is None
+    if save_manifest:
+        json_data = manifest.load_o3de_manifest()
 
     result = 0
 
@@ -593,14 +571,14 @@ def register(engine_path: pathlib.Path = None,
         if not project_path:
             logger.error(f'Project path cannot be empty.')
             return 1
-        result = result or register_project_path(json_data, project_path, remove, engine_path)
+        result = result or register_project_path(json_data, project_path, remove, engine_path, skip_validation)
 
     if isinstance(gem_path, pathlib.PurePath):
         if not gem_path:
             logger.error(f'Gem path cannot be empty.')
             return 1
         result = result or register_gem_path(json_data, gem_path, remove,
-                                   external_subdir_engine_path, external_subdir_project_path)
+                                   external_subdir_engine_path, external_subdir_project_path, skip_validation)
     if isinstance(external_subdir_path, pathlib.PurePath):
         if not external_subdir_path:
             logger.error(f'External Subdirectory path is None.')
@@ -612,13 +590,13 @@ def register(engine_path: pathlib.Path = None,
         if not template_path:
             logger.error(f'Template path cannot be empty.')
             return 1
-        result = result or register_template_path(json_data, template_path, remove, engine_path)
+        result = result or register_template_path(json_data, template_path, remove, engine_path, skip_validation)
 
     if isinstance(restricted_path, pathlib.PurePath):
         if not restricted_path:
             logger.error(f'Restricted path cannot be empty.')
             return 1
-        result = result or register_restricted_path(json_data, restricted_path, remove, engine_path)
+        result = result or register_restricted_path(json_data, restricted_path, remove, engine_path, skip_validation)
 
     if isinstance(repo_uri, str) or isinstance(repo_uri, pathlib.PurePath):
         if not repo_uri:
@@ -651,13 +629,119 @@ def register(engine_path: pathlib.Path = None,
         if not engine_path:
             logger.error(f'Engine path cannot be empty.')
             return 1
-        result = result or register_engine_path(json_data, engine_path, remove, force)
+        result = result or register_engine_path(json_data, engine_path, remove, force, skip_validation)
 
-    if not result:
+    if not result and save_manifest:
         manifest.save_o3de_manifest(json_data)
 
     return result
 
+
+# Maps the register() path parameters to the o3de object json file and name of the validation function
+# used to validate the object before it is registered
+_register_path_validation = {
+    'engine_path': ('engine.json', 'valid_o3de_engine_json'),
+    'project_path': ('project.json', 'valid_o3de_project_json'),
+    'gem_path': ('gem.json', 'valid_o3de_gem_json'),
+    'template_path': ('template.json', 'valid_o3de_template_json'),
+    'restricted_path': ('restricted.json', 'valid_o3de_restricted_json')
+}
+
+
+# Maps the register() parameters to the o3de manifest keys which the registration can modify
+_register_manifest_keys = {
+    'engine_path': ('engines', 'engines_path'),
+    'project_path': ('projects',),
+    'gem_path': ('external_subdirectories',),
+    'external_subdir_path': ('external_subdirectories',),
+    'template_path': ('templates',),
+    'restricted_path': ('restricted',),
+    'repo_uri': ('repos',),
+    'default_engines_folder': ('default_engines_folder',),
+    'default_projects_folder': ('default_projects_folder',),
+    'default_gems_folder': ('default_gems_folder',),
+    'default_templates_folder': ('default_templates_folder',),
+    'default_restricted_folder': ('default_restricted_folder',),
+    'default_third_party_folder': ('default_third_party_folder',)
+}
+
+
+def _snapshot_registration_keys(json_data: dict, registration: dict) -> dict:
+    # The registrations replace, insert into or remove from the values of the manifest keys, but never modify the
+    # objects inside them, so a shallow copy of each modified value is enough to roll back a failed registration
+    snapshot = {}
+    for register_kwarg, manifest_keys in _register_manifest_keys.items():
+        if registration.get(register_kwarg) is None:
+            continue
+        for manifest_key in manifest_keys:
+            if manifest_key not in snapshot:
+                snapshot[manifest_key] = copy.copy(json_data[manifest_key]) if manifest_key in json_data else None
+    return snapshot
+
+
+def _restore_registration_keys(json_data: dict, snapshot: dict) -> None:
+    for manifest_key, value in snapshot.items():
+        if value is None:
+            json_data.pop(manifest_key, None)
+        else:
+            json_data[manifest_key] = value
+
+
+def _validate_registration(registration: dict) -> bool:
+    if registration.get('remove', False):
+        return True
+    # register() registers every supplied path, including the engine path supplied as the context of another object
+    for register_path_kwarg, (o3de_json_filename, validation_func_name) in _register_path_validation.items():
+        o3de_object_path = registration.get(register_path_kwarg)
+        if isinstance(o3de_object_path, pathlib.PurePath):
+            o3de_json_path = pathlib.Path(o3de_object_path).resolve() / o3de_json_filename
+            if not getattr(validation, validation_func_name)(o3de_json_path):
+                logger.error(f'o3de json {o3de_json_path} is not valid.')
+                return False
+    return True
+
+
+def register_batch(registrations: list, max_workers: int = None) -> int:
+    """
+    Registers multiple o3de objects, loading and saving the ~/.o3de/o3de_manifest.json only once.
+    The o3de object json files are validated concurrently before any change is applied to the manifest,
+    and the changes of a failed registration are rolled back so that they are not saved
+
+    :param registrations: list of dictionaries of keyword arguments to supply to register() for each object
+    :param max_workers: maximum number of threads used to validate the o3de object json files
+
+    :return: 0 for success or non 0 failure code of the last failing registration
+    """
+    if not registrations:
+        return 0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        validation_results = list(executor.map(_validate_registration, registrations))
+
+    json_data = manifest.load_o3de_manifest()
+
+    ret_val = 0
+    manifest_changed = False
+    for registration, is_valid in zip(registrations, validation_results):
+        if not is_valid:
+            ret_val = 1
+            continue
+        # registrations can modify the manifest data before failing, only the keys they modify are saved
+        snapshot = _snapshot_registration_keys(json_data, registration)
+        error_code = register(**registration, json_data=json_data, skip_validation=True)
+        if error_code:
+            ret_val = error_code
+            _restore_registration_keys(json_data, snapshot)
+        else:
+            manifest_changed = True
+
+    if manifest_changed:
+        if not manifest.save_o3de_manifest(json_data):
+            return 1
+
+    return ret_val
+
+
 def remove_invalid_o3de_projects(manifest_path: pathlib.Path = None) -> int:
     if not manifest_path:
         manifest_path = manifest.get_o3de_manifest()
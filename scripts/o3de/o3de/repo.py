@@ -1,156 +1,283 @@
 #
 # Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
-# 
+#
 # SPDX-License-Identifier: Apache-2.0 OR MIT
 #
 #
+"""
+Contains the repo crawler which downloads the repo.json files registered in the o3de manifest,
+along with the o3de object json files they advertise, into the ~/.o3de/Cache folder
+"""
 
+import concurrent.futures
+import copy
+import hashlib
 import json
 import logging
+import os
 import pathlib
 import shutil
+import urllib.error
 import urllib.parse
 import urllib.request
 
-from o3de import manifest, utils, validation
+from o3de import manifest, validation
 
 logger = logging.getLogger()
 logging.basicConfig()
 
+REPO_CACHE_INDEX_VERSION = 1
+REPO_CACHE_INDEX_NAME = 'repo_cache_index.json'
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 30
+
+# (repo.json key, o3de object json filename, o3de object name key) for each type of o3de object a repo advertises
+repo_object_types = [
+    ('engines', 'engine.json', 'engine_name'),
+    ('projects', 'project.json', 'project_name'),
+    ('gems', 'gem.json', 'gem_name'),
+    ('templates', 'template.json', 'template_name'),
+    ('restricted', 'restricted.json', 'restricted_name')
+]
+
+
+def get_cache_file(uri: str) -> pathlib.Path:
+    """
+    Returns the path in the ~/.o3de/Cache folder where the json file at the supplied uri is stored
+    :param uri: uri of a repo.json or o3de object json file
+    """
+    uri_sha256 = hashlib.sha256(uri.encode())
+    return manifest.get_o3de_cache_folder() / str(uri_sha256.hexdigest() + '.json')
 
-def process_add_o3de_repo(file_name: str or pathlib.Path,
-                          repo_set: set) -> int:
-    file_name = pathlib.Path(file_name).resolve()
-    if not validation.valid_o3de_repo_json(file_name):
-        return 1
 
-    cache_folder = manifest.get_o3de_cache_folder()
+def _replace_cache_file(cache_file: pathlib.Path, write_func: callable) -> None:
+    temp_cache_file = cache_file.with_name(f'{cache_file.name}.{os.getpid()}.tmp')
+    try:
+        write_func(temp_cache_file)
+        os.replace(temp_cache_file, cache_file)
+    finally:
+        if temp_cache_file.exists():
+            temp_cache_file.unlink()
 
-    with file_name.open('r') as f:
+
+def fetch_json_uri(uri: str, cache_file: pathlib.Path, cache_entry: dict,
+                   timeout: float = DEFAULT_TIMEOUT) -> tuple:
+    """
+    Downloads the json file at the uri into the cache file. If the cache file already exists, the download is
+    skipped when the source is unchanged: remote uris are revalidated with the ETag/Last-Modified values stored
+    in the cache entry, local files with their modification time and size
+    :param uri: uri of the json file to download. Can be a http(s)/ftp url or a local path
+    :param cache_file: path to store the json file
+    :param cache_entry: revalidation data returned by the previous fetch of this uri
+    :param timeout: timeout in seconds of remote requests
+    :return: tuple of (0 for success or non 0 failure code, the new cache entry)
+    """
+    parsed_uri = urllib.parse.urlparse(uri)
+    if parsed_uri.scheme in ['http', 'https', 'ftp', 'ftps']:
+        request = urllib.request.Request(uri)
+        if cache_file.is_file():
+            if cache_entry.get('etag'):
+                request.add_header('If-None-Match', cache_entry['etag'])
+            if cache_entry.get('last_modified'):
+                request.add_header('If-Modified-Since', cache_entry['last_modified'])
         try:
-            repo_data = json.load(f)
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response_headers = response.headers
+                _replace_cache_file(cache_file, lambda temp_file: temp_file.write_bytes(response.read()))
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 0, cache_entry
+            logger.error(f'Failed to download {uri}: {str(e)}')
+            return 1, cache_entry
+        except (urllib.error.URLError, OSError) as e:
+            logger.error(f'Failed to download {uri}: {str(e)}')
+            return 1, cache_entry
+        return 0, {'etag': response_headers.get('ETag'), 'last_modified': response_headers.get('Last-Modified')}
+
+    origin_file = pathlib.Path(urllib.request.url2pathname(parsed_uri.path) if parsed_uri.scheme == 'file' else uri)
+    try:
+        origin_stat = origin_file.stat()
+    except OSError:
+        logger.error(f'Json file {uri} does not exist.')
+        return 1, cache_entry
+    if cache_file.is_file() and cache_entry.get('mtime_ns') == origin_stat.st_mtime_ns \
+            and cache_entry.get('size') == origin_stat.st_size:
+        return 0, cache_entry
+    try:
+        _replace_cache_file(cache_file, lambda temp_file: shutil.copyfile(origin_file, temp_file))
+    except OSError as e:
+        logger.error(f'Failed to copy {uri}: {str(e)}')
+        return 1, cache_entry
+    return 0, {'mtime_ns': origin_stat.st_mtime_ns, 'size': origin_stat.st_size}
+
+
+def get_repo_cache_index_path() -> pathlib.Path:
+    return manifest.get_o3de_cache_folder() / REPO_CACHE_INDEX_NAME
+
+
+def load_repo_cache_index() -> dict:
+    """
+    Loads the repo cache index which contains the revalidation data of every downloaded uri
+    and the json data of every o3de object advertised by the registered repos, keyed by object name.
+    The returned data is shared with the json file cache and must not be modified
+    """
+    cache_index_path = get_repo_cache_index_path()
+    if cache_index_path.is_file():
+        try:
+            cache_index = manifest.load_json_file_cached(cache_index_path, copy_data=False)
         except json.JSONDecodeError as e:
-            logger.error(f'{file_name} failed to load: {str(e)}')
-            return 1
-
-        for o3de_object_uris, manifest_json in [(repo_data['engines'], 'engine.json'),
-                                                (repo_data['projects'], 'project.json'),
-                                                (repo_data['gems'], 'gem.json'),
-                                                (repo_data['template'], 'template.json'),
-                                                (repo_data['restricted'], 'restricted.json')]:
-            for o3de_object_uri in o3de_object_uris:
-                manifest_json_uri = f'{o3de_object_uri}/{manifest_json}'
-                manifest_json_sha256 = hashlib.sha256(manifest_json_uri.encode())
-                cache_file = cache_folder / str(manifest_json_sha256.hexdigest() + '.json')
-                if not cache_file.is_file():
-                    parsed_uri = urllib.parse.urlparse(manifest_json_uri)
-                    download_file_result = utils.download_file(parsed_uri, cache_file)
-                    if download_file_result != 0:
-                        return download_file_result
-
-        repo_set |= repo_data['repos']
-    return 0
-
-
-def refresh_repos() -> int:
-    json_data = manifest.load_o3de_manifest()
-
-    # clear the cache
-    cache_folder = manifest.get_o3de_cache_folder()
-    shutil.rmtree(cache_folder)
-    cache_folder = manifest.get_o3de_cache_folder()  # will recreate it
+            logger.warning(f'{cache_index_path} failed to load: {str(e)}')
+        else:
+            if cache_index.get('version') == REPO_CACHE_INDEX_VERSION:
+                return cache_index
+    return {'version': REPO_CACHE_INDEX_VERSION, 'uris': {},
+            'objects': {repo_key: {} for repo_key, _, _ in repo_object_types}}
+
+
+def save_repo_cache_index(cache_index: dict) -> bool:
+    """
+    Saves the repo cache index, the file is replaced atomically
+    :param cache_index: the repo cache index data to save
+    :return True if the repo cache index was saved
+    """
+    cache_index_path = get_repo_cache_index_path()
+    manifest.invalidate_json_file_cache(cache_index_path)
+    try:
+        _replace_cache_file(cache_index_path,
+                            lambda temp_file: temp_file.write_text(json.dumps(cache_index, indent=4) + '\n'))
+    except OSError as e:
+        logger.error(f'Repo cache index {cache_index_path} failed to save: {str(e)}')
+        return False
+    return True
+
+
+def _get_repo_object_uris(repo_data: dict, repo_key: str) -> list:
+    # Older repo.json files use the singular 'template' key
+    if repo_key == 'templates':
+        return repo_data.get('templates', repo_data.get('template', []))
+    return repo_data.get(repo_key, [])
+
+
+def refresh_repos(repo_uris: list = None, max_workers: int = DEFAULT_MAX_WORKERS,
+                  timeout: float = DEFAULT_TIMEOUT, merge: bool = False) -> int:
+    """
+    Downloads the repo.json of each registered repo, the o3de object json files they advertise and
+    any nested repos using a bounded pool of workers. Unchanged files are revalidated instead of downloaded
+    again. The merged view of all o3de objects is stored in the repo cache index.
+    When a file cannot be downloaded, the previously downloaded copy is used if there is one.
+    :param repo_uris: repo uris to refresh. Defaults to the repos registered in the o3de manifest
+    :param max_workers: maximum number of concurrent downloads
+    :param timeout: timeout in seconds of remote requests
+    :param merge: add the refreshed repos to the repo cache index instead of replacing it,
+     keeping the objects of the repos which are not refreshed
+    :return: 0 for success or non 0 failure code
+    """
+    if repo_uris is None:
+        repo_uris = manifest.load_o3de_manifest().get('repos', [])
+
+    previous_cache_index = load_repo_cache_index()
+    previous_uri_entries = previous_cache_index.get('uris', {})
+    if merge:
+        cache_index = copy.deepcopy(previous_cache_index)
+    else:
+        cache_index = {'version': REPO_CACHE_INDEX_VERSION, 'uris': {},
+                       'objects': {repo_key: {} for repo_key, _, _ in repo_object_types}}
 
     result = 0
 
     # set will stop circular references
-    repo_set = set()
-
-    for repo_uri in json_data['repos']:
-        if repo_uri not in repo_set:
-            repo_set.add(repo_uri)
-
-            repo_uri = f'{repo_uri}/repo.json'
-            repo_sha256 = hashlib.sha256(repo_uri.encode())
-            cache_file = cache_folder / str(repo_sha256.hexdigest() + '.json')
-            if not cache_file.is_file():
-                parsed_uri = urllib.parse.urlparse(repo_uri)
-                download_file_result = utils.download_file(parsed_uri, cache_file)
-                if download_file_result != 0:
-                    return download_file_result
-
-                if not validation.valid_o3de_repo_json(cache_file):
-                    logger.error(f'Repo json {repo_uri} is not valid.')
-                    cache_file.unlink()
-                    return 1
-
-                last_failure = process_add_o3de_repo(cache_file, repo_set)
-                if last_failure:
-                    result = last_failure
+    visited_uris = set()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending_fetches = {}
+
+        def fetch(uri: str, repo_key: str) -> None:
+            if uri in visited_uris:
+                return
+            visited_uris.add(uri)
+            future = executor.submit(fetch_json_uri, uri, get_cache_file(uri), previous_uri_entries.get(uri, {}),
+                                     timeout)
+            pending_fetches[future] = (uri, repo_key)
+
+        for repo_uri in repo_uris:
+            fetch(f'{repo_uri}/repo.json', 'repos')
+
+        while pending_fetches:
+            done_fetches, _ = concurrent.futures.wait(pending_fetches,
+                                                      return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done_fetches:
+                uri, repo_key = pending_fetches.pop(future)
+                fetch_result, cache_entry = future.result()
+                cache_file = get_cache_file(uri)
+                if fetch_result:
+                    result = fetch_result
+                    # Keep the last good data of the uri
+                    if uri not in previous_uri_entries or not cache_file.is_file():
+                        continue
+                    logger.warning(f'Using the previously downloaded {uri}.')
+                cache_index['uris'][uri] = cache_entry
+
+                if repo_key == 'repos' and not validation.valid_o3de_repo_json(cache_file):
+                    logger.error(f'Repo json {uri} is not valid.')
+                    result = 1
+                    continue
+                try:
+                    json_data = manifest.load_json_file_cached(cache_file, copy_data=False)
+                except json.JSONDecodeError as e:
+                    logger.error(f'{uri} failed to load: {str(e)}')
+                    result = 1
+                    continue
+
+                if repo_key == 'repos':
+                    for object_repo_key, object_json_filename, _ in repo_object_types:
+                        for o3de_object_uri in _get_repo_object_uris(json_data, object_repo_key):
+                            fetch(f'{o3de_object_uri}/{object_json_filename}', object_repo_key)
+                    for nested_repo_uri in json_data.get('repos', []):
+                        fetch(f'{nested_repo_uri}/repo.json', 'repos')
+                else:
+                    object_name_key = next(name_key for object_repo_key, _, name_key in repo_object_types
+                                           if object_repo_key == repo_key)
+                    object_name = json_data.get(object_name_key)
+                    if not object_name:
+                        logger.warning(f'{uri} is missing "{object_name_key}" key.')
+                        continue
+                    cache_index['objects'][repo_key][object_name] = json_data
+
+    # Remove cached files of uris which are no longer advertised by any repo
+    if not merge:
+        for uri in previous_uri_entries.keys() - visited_uris:
+            stale_cache_file = get_cache_file(uri)
+            if stale_cache_file.is_file():
+                stale_cache_file.unlink()
+
+    if not save_repo_cache_index(cache_index):
+        return 1
 
     return result
 
 
-def search_repo(repo_json_data: dict,
-                engine_name: str = None,
+def find_o3de_object(repo_key: str, object_name: str) -> dict or None:
+    """
+    Looks up an o3de object advertised by the registered repos in the repo cache index
+    :param repo_key: the type of o3de object, one of 'engines', 'projects', 'gems', 'templates' or 'restricted'
+    :param object_name: name of the o3de object
+    :return: the o3de object json data or None if no repo advertises an object with that name
+    """
+    o3de_object_data = load_repo_cache_index()['objects'].get(repo_key, {}).get(object_name)
+    return dict(o3de_object_data) if o3de_object_data else None
+
+
+def search_repo(engine_name: str = None,
                 project_name: str = None,
                 gem_name: str = None,
                 template_name: str = None,
                 restricted_name: str = None) -> dict or None:
-
-    if isinstance(engine_name, str) or isinstance(engine_name, pathlib.PurePath):
-        o3de_object_uris = repo_json_data['engines']
-        manifest_json = 'engine.json'
-        json_key = 'engine_name'
-        search_func = lambda: None if manifest_json_data.get(json_key, '') == engine_name else manifest_json_data
-    elif isinstance(project_name, str) or isinstance(project_name, pathlib.PurePath):
-        o3de_object_uris = repo_json_data['projects']
-        manifest_json = 'project.json'
-        json_key = 'project_name'
-        search_func = lambda: None if manifest_json_data.get(json_key, '') == project_name else manifest_json_data
-    elif isinstance(gem_name, str) or isinstance(gem_name, pathlib.PurePath):
-        o3de_object_uris = repo_json_data['gems']
-        manifest_json = 'gem.json'
-        json_key = 'gem_name'
-        search_func = lambda: None if manifest_json_data.get(json_key, '') == gem_name else manifest_json_data
-    elif isinstance(template_name, str) or isinstance(template_name, pathlib.PurePath):
-        o3de_object_uris = repo_json_data['template']
-        manifest_json = 'template.json'
-        json_key = 'template_name'
-        search_func = lambda: None if manifest_json_data.get(json_key, '') == template_name_name else manifest_json_data
-    elif isinstance(restricted_name, str) or isinstance(restricted_name, pathlib.PurePath):
-        o3de_object_uris = repo_json_data['restricted']
-        manifest_json = 'restricted.json'
-        json_key = 'restricted_name'
-        search_func = lambda: None if manifest_json_data.get(json_key, '') == restricted_name else manifest_json_data
-    else:
-        return None
-
-    o3de_object =  search_o3de_object(manifest_json, o3de_object_uris, search_func)
-    if o3de_object:
-        return o3de_object
-
-    # recurse into the repos object to search for the o3de object
-    o3de_object_uris = repo_json_data['repos']
-    manifest_json = 'repo.json'
-    search_func = lambda: search_repo(manifest_json, engine_name, project_name, gem_name, template_name)
-    return search_o3de_object(manifest_json, o3de_object_uris, search_func)
-
-
-def search_o3de_object(manifest_json, o3de_object_uris, search_func):
-    # Search for the o3de object based on the supplied object name in the current repo
-    cache_folder = manifest.get_o3de_cache_folder()
-    for o3de_object_uri in o3de_object_uris:
-        manifest_json_uri = f'{o3de_object_uri}/{manifest_json}'
-        manifest_json_sha256 = hashlib.sha256(manifest_json_uri.encode())
-        cache_file = cache_folder / str(manifest_json_sha256.hexdigest() + '.json')
-        if cache_file.is_file():
-            with cache_file.open('r') as f:
-                try:
-                    manifest_json_data = json.load(f)
-                except json.JSONDecodeError as e:
-                    logger.warn(f'{cache_file} failed to load: {str(e)}')
-                else:
-                    result_json_data = search_func()
-                    if result_json_data:
-                        return result_json_data
+    """
+    Searches the o3de objects advertised by the registered repos, including nested repos.
+    refresh_repos must have been run to populate the repo cache index
+    """
+    for repo_key, object_name in [('engines', engine_name), ('projects', project_name), ('gems', gem_name),
+                                  ('templates', template_name), ('restricted', restricted_name)]:
+        if isinstance(object_name, str) or isinstance(object_name, pathlib.PurePath):
+            return find_o3de_object(repo_key, str(object_name))
     return None
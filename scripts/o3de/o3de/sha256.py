@@ -6,9 +6,12 @@
 #
 
 import argparse
+import concurrent.futures
 import json
 import logging
 import hashlib
+import mmap
+import os
 import pathlib
 import sys
 
@@ -17,9 +20,130 @@ from o3de import utils
 logger = logging.getLogger()
 logging.basicConfig()
 
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+def sha256_file(file_path: str or pathlib.Path,
+                buffer_size: int = DEFAULT_BUFFER_SIZE,
+                progress_callback: callable = None,
+                use_mmap: bool = True) -> str:
+    """
+    Computes the sha256 of a file without loading the whole file in memory.
+    The file is memory mapped when possible and hashed buffer_size bytes at a time
+    :param file_path: path to the file to hash
+    :param buffer_size: number of bytes hashed at a time
+    :param progress_callback: optional callable invoked with (bytes hashed, total bytes) after each buffer
+    :param use_mmap: memory map the file instead of reading it into a buffer
+    :return: the hex digest of the file
+    """
+    file_path = pathlib.Path(file_path)
+    buffer_size = max(buffer_size, 1)
+    file_hash = hashlib.sha256()
+    with file_path.open('rb') as f:
+        total_size = os.fstat(f.fileno()).st_size
+        mapped_file = None
+        if use_mmap and total_size > 0:
+            try:
+                mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                mapped_file = None
+
+        hashed_size = 0
+        if mapped_file:
+            with mapped_file, memoryview(mapped_file) as mapped_view:
+                while hashed_size < total_size:
+                    file_hash.update(mapped_view[hashed_size:hashed_size + buffer_size])
+                    hashed_size = min(hashed_size + buffer_size, total_size)
+                    if progress_callback:
+                        progress_callback(hashed_size, total_size)
+        else:
+            read_buffer = bytearray(buffer_size)
+            with memoryview(read_buffer) as read_view:
+                while True:
+                    read_size = f.readinto(read_buffer)
+                    if not read_size:
+                        break
+                    file_hash.update(read_view[:read_size])
+                    hashed_size += read_size
+                    if progress_callback:
+                        progress_callback(hashed_size, total_size)
+    return file_hash.hexdigest()
+
+
+def _sha256_file_worker(file_path: str, buffer_size: int) -> str or None:
+    try:
+        return sha256_file(file_path, buffer_size)
+    except OSError as e:
+        logger.error(f'Failed to hash {file_path}: {str(e)}')
+        return None
+
+
+def sha256_files(file_paths: list,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 max_workers: int = None) -> dict:
+    """
+    Computes the sha256 of many files across a pool of processes
+    :param file_paths: paths of the files to hash
+    :param buffer_size: number of bytes hashed at a time
+    :param max_workers: maximum number of worker processes, defaults to the number of processors
+    :return: dictionary of file path -> hex digest, or None for files which could not be read
+    """
+    file_paths = [pathlib.Path(file_path) for file_path in file_paths]
+    if len(file_paths) < 2:
+        return {file_path: _sha256_file_worker(file_path, buffer_size) for file_path in file_paths}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        digests = executor.map(_sha256_file_worker, file_paths, [buffer_size] * len(file_paths))
+        return dict(zip(file_paths, digests))
+
+
+def verify(objects_path: str or pathlib.Path,
+           buffer_size: int = DEFAULT_BUFFER_SIZE,
+           max_workers: int = None) -> int:
+    """
+    Verifies every o3de object json file declaring a "sha256" in a directory tree against the object file it
+    describes, which is the sibling .zip file with the same name as the json file(i.e gem.json -> gem.zip)
+    :param objects_path: directory to verify
+    :param buffer_size: number of bytes hashed at a time
+    :param max_workers: maximum number of worker processes, defaults to the number of processors
+    :return: 0 if every declared sha256 matches, non 0 otherwise
+    """
+    objects_path = pathlib.Path(objects_path).resolve()
+    if not objects_path.is_dir():
+        logger.error(f'Objects path {objects_path} does not exist.')
+        return 1
+
+    result = 0
+    declared_digests = {}
+    for json_path in objects_path.rglob('*.json'):
+        try:
+            with json_path.open('r', encoding='utf-8') as s:
+                json_data = json.load(s)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.debug(f'Skipping {json_path} which is not a valid json file: {str(e)}')
+            continue
+        if not isinstance(json_data, dict) or 'sha256' not in json_data:
+            continue
+        object_file_path = json_path.with_suffix('.zip')
+        if not object_file_path.is_file():
+            logger.error(f'{json_path} declares a sha256 but {object_file_path} does not exist.')
+            result = 1
+            continue
+        declared_digests[object_file_path] = json_data['sha256']
+
+    for object_file_path, digest in sha256_files(list(declared_digests), buffer_size, max_workers).items():
+        if digest != declared_digests[object_file_path]:
+            logger.error(f'{object_file_path} sha256 {digest} does not match the declared'
+                         f' sha256 {declared_digests[object_file_path]}.')
+            result = 1
+        else:
+            print(f'{object_file_path}: OK')
+    return result
+
 
 def sha256(file_path: str or pathlib.Path,
-           json_path: str or pathlib.Path = None) -> int:
+           json_path: str or pathlib.Path = None,
+           buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
     if not file_path:
         logger.error(f'File path cannot be empty.')
         return 1
@@ -34,7 +158,7 @@ def sha256(file_path: str or pathlib.Path,
             logger.error(f'Json path {json_path} does not exist.')
             return 1
 
-    sha256 = hashlib.sha256(file_path.open('rb').read()).hexdigest()
+    sha256 = sha256_file(file_path, buffer_size)
 
     if json_path:
         with json_path.open('r') as s:
@@ -57,8 +181,12 @@ def sha256(file_path: str or pathlib.Path,
 
 
 def _run_sha256(args: argparse) -> int:
+    if args.verify:
+        return verify(args.verify,
+                      args.buffer_size)
     return sha256(args.file_path,
-                  args.json_path)
+                  args.json_path,
+                  args.buffer_size)
 
 
 def add_parser_args(parser):
@@ -68,10 +196,16 @@ def add_parser_args(parser):
     Ex. Directly run from this file alone with: python sha256.py --file-path "C:/TestGem"
     :param parser: the caller passes an argparse parser like instance to this method
     """
-    parser.add_argument('-f', '--file-path', type=str, required=True,
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('-f', '--file-path', type=str,
                                   help='The path to the file you want to sha256.')
+    group.add_argument('--verify', type=str,
+                                  help='The path to a directory of o3de objects to verify. Each json file declaring a'
+                                       ' "sha256" is checked against the .zip file with the same name.')
     parser.add_argument('-j', '--json-path', type=str, required=False,
                                   help='optional path to an o3de json file to add the "sha256" element to.')
+    parser.add_argument('-b', '--buffer-size', type=int, required=False, default=DEFAULT_BUFFER_SIZE,
+                                  help='Number of bytes hashed at a time.')
     parser.set_defaults(func=_run_sha256)
 
 
@@ -0,0 +1,109 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+"""
+Times engine_template.create_project on a synthetic project template containing a large number of files.
+The instantiation is timed with a single copy worker and with the default number of copy workers.
+Ex. from the scripts/o3de folder: python -m tests.benchmark_engine_template --file-count 10000
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import tempfile
+import time
+
+from o3de import engine_template, manifest
+
+TEMPLATED_FILE_CONTENTS = """// {BEGIN_LICENSE}
+/*
+ * Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+ *
+ * SPDX-License-Identifier: Apache-2.0 OR MIT
+ *
+ */
+// {END_LICENSE}
+
+#pragma once
+
+namespace ${Name}
+{
+    class ${SanitizedCppName}Component${Index}
+    {
+    public:
+        AZ_RTTI(${SanitizedCppName}Component${Index}, "${SysCompClassId}");
+        static constexpr const char* Name = "${NameLower}";
+    };
+}
+"""
+
+
+def create_synthetic_template(template_path: pathlib.Path, file_count: int) -> None:
+    template_content_path = template_path / 'Template'
+    copy_files = [{'file': 'project.json', 'origin': 'project.json', 'isTemplated': True, 'isOptional': False}]
+    create_directories = []
+    (template_content_path).mkdir(parents=True, exist_ok=True)
+    (template_content_path / 'project.json').write_text(json.dumps({'project_name': '${Name}'}))
+
+    files_per_directory = 100
+    for file_index in range(file_count):
+        directory = f'Code/Source/Module{file_index // files_per_directory}'
+        if file_index % files_per_directory == 0:
+            (template_content_path / directory).mkdir(parents=True, exist_ok=True)
+            create_directories.append({'dir': directory, 'origin': directory})
+        file_name = f'{directory}/${{Name}}Component{file_index}.h'
+        (template_content_path / file_name).write_text(TEMPLATED_FILE_CONTENTS.replace('${Index}', str(file_index)))
+        copy_files.append({'file': file_name, 'origin': file_name, 'isTemplated': True, 'isOptional': False})
+
+    (template_path / 'template.json').write_text(json.dumps({
+        'template_name': 'BenchmarkProject',
+        'origin': 'BenchmarkProject',
+        'license': 'https://opensource.org/licenses/MIT',
+        'display_name': 'BenchmarkProject',
+        'summary': 'Synthetic project template used to benchmark template instantiation',
+        'canonical_tags': [],
+        'user_tags': [],
+        'icon_path': 'preview.png',
+        'copyFiles': copy_files,
+        'createDirectories': create_directories
+    }, indent=4))
+
+
+def time_create_project(template_path: pathlib.Path, project_path: pathlib.Path, copy_workers: int) -> float:
+    engine_template.max_template_copy_workers = copy_workers
+    start_time = time.perf_counter()
+    result = engine_template.create_project(project_path, template_path=template_path, force=True)
+    elapsed_time = time.perf_counter() - start_time
+    if result != 0:
+        raise RuntimeError(f'create_project failed with result {result}')
+    return elapsed_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark engine_template.create_project')
+    parser.add_argument('--file-count', type=int, default=10000,
+                        help='Number of templated files in the synthetic template.')
+    args = parser.parse_args()
+
+    default_copy_workers = engine_template.max_template_copy_workers
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = pathlib.Path(temp_dir)
+        # Keep the project registration out of the user's ~/.o3de folder
+        manifest.override_home_folder = temp_path / 'home'
+
+        template_path = temp_path / 'BenchmarkTemplate'
+        create_synthetic_template(template_path, args.file_count)
+
+        for copy_workers in [1, default_copy_workers]:
+            elapsed_time = time_create_project(template_path, temp_path / f'Project{copy_workers}', copy_workers)
+            print(f'create_project with {args.file_count} files and {copy_workers} copy workers:'
+                  f' {elapsed_time:.2f} seconds')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import json
+import os
+import pytest
+import pathlib
+from unittest.mock import patch
+
+from o3de import discovery
+
+
+@pytest.fixture
+def gem_tree(tmp_path):
+    gems_root = tmp_path / 'Gems'
+    for gem_name in ['GemA', 'GemB', 'Nested/GemC']:
+        gem_folder = gems_root / gem_name
+        gem_folder.mkdir(parents=True)
+        (gem_folder / 'gem.json').write_text(json.dumps({'gem_name': gem_name}))
+    (gems_root / 'GemA' / 'Code').mkdir()
+    (gems_root / 'Project').mkdir()
+    (gems_root / 'Project' / 'project.json').write_text(json.dumps({'project_name': 'Project'}))
+    return gems_root
+
+
+def _set_directory_mtimes_in_past(root_path: pathlib.Path) -> None:
+    past_time = os.stat(root_path).st_mtime - 60
+    for root, dirs, files in os.walk(root_path):
+        os.utime(root, (past_time, past_time))
+
+
+class TestDiscoveryIndex:
+    def test_find_o3de_object_directories_matches_os_walk(self, tmp_path, gem_tree):
+        index = discovery.DiscoveryIndex(tmp_path / 'index.json')
+        results = index.find_o3de_object_directories(gem_tree)
+
+        expected_gems = sorted(root for root, dirs, files in os.walk(gem_tree.resolve()) if 'gem.json' in files)
+        assert sorted(results['gem.json']) == expected_gems
+        assert results['project.json'] == [str((gem_tree / 'Project').resolve())]
+        assert (tmp_path / 'index.json').is_file()
+
+    def test_unchanged_directories_are_not_listed_again(self, tmp_path, gem_tree):
+        _set_directory_mtimes_in_past(gem_tree)
+        discovery.DiscoveryIndex(tmp_path / 'index.json').find_o3de_object_directories(gem_tree)
+
+        # A new index instance loads the directory listings saved by the previous instance
+        index = discovery.DiscoveryIndex(tmp_path / 'index.json')
+        with patch('os.scandir', side_effect=os.scandir) as scandir_patch:
+            results = index.find_o3de_object_directories(gem_tree, ('gem.json',))
+            assert scandir_patch.call_count == 0
+        assert len(results['gem.json']) == 3
+
+    def test_added_and_removed_gems_are_detected(self, tmp_path, gem_tree):
+        _set_directory_mtimes_in_past(gem_tree)
+        index = discovery.DiscoveryIndex(tmp_path / 'index.json')
+        index.find_o3de_object_directories(gem_tree, ('gem.json',))
+
+        (gem_tree / 'GemB' / 'gem.json').unlink()
+        new_gem_folder = gem_tree / 'GemA' / 'Code' / 'GemD'
+        new_gem_folder.mkdir()
+        (new_gem_folder / 'gem.json').write_text(json.dumps({'gem_name': 'GemD'}))
+
+        results = index.find_o3de_object_directories(gem_tree, ('gem.json',))
+        assert sorted(pathlib.Path(root).name for root in results['gem.json']) == ['GemA', 'GemC', 'GemD']
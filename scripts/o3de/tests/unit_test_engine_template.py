@@ -3,6 +3,7 @@
 #
 # SPDX-License-Identifier: Apache-2.0 OR MIT
 #
+import io
 import json
 import pathlib
 import uuid
@@ -141,6 +142,48 @@ TEST_CONCRETE_GEM_TEMPLATE_JSON_CONTENTS = string.Template(
     TEST_TEMPLATE_JSON_CONTENTS).safe_substitute({'Name': 'TestGem'})
 
 
+@pytest.mark.parametrize(
+    "templated_contents, keep_license_text", [
+        pytest.param(TEST_TEMPLATED_CONTENT_WITH_LICENSE, True),
+        pytest.param(TEST_TEMPLATED_CONTENT_WITH_LICENSE, False),
+        pytest.param('/*\n' + CPP_LICENSE_TEXT + ' */\n' + TEST_TEMPLATED_CONTENT_WITHOUT_LICENSE, False),
+        pytest.param(TEST_TEMPLATED_CONTENT_WITHOUT_LICENSE + CPP_LICENSE_TEXT + CPP_LICENSE_TEXT, False)
+    ]
+)
+def test_transform_stream_matches_transform(templated_contents, keep_license_text):
+    replacements = [('${Name}', 'TestGem'), ('${NameLower}', 'testgem')]
+    with patch('uuid.uuid4', return_value=uuid.uuid5(uuid.NAMESPACE_DNS, 'TestGem')) as uuid4_mock:
+        expected_contents = engine_template._transform(templated_contents, replacements, keep_license_text)
+        destination = io.StringIO()
+        engine_template._transform_stream(io.StringIO(templated_contents), destination, replacements,
+                                          keep_license_text)
+    assert destination.getvalue() == expected_contents
+    assert '${' not in expected_contents
+    assert ('{BEGIN_LICENSE}' in expected_contents) == keep_license_text
+
+
+@pytest.mark.parametrize(
+    "source_contents, replacements, expected_contents", [
+        # Each pair is applied to the output of the previous ones
+        pytest.param('abc', [('bc', 'X'), ('ab', 'Y')], 'aX'),
+        pytest.param('abc', [('ab', 'Y'), ('bc', 'X')], 'Yc'),
+        pytest.param('ac', [('a', 'b'), ('bc', 'X')], 'X'),
+        pytest.param('${Name}', [('${Name}', '${NameLower}Gem'), ('${NameLower}', 'test')], 'testGem'),
+        pytest.param('${Name}', [('${NameLower}', 'test'), ('${Name}', '${NameLower}Gem')], '${NameLower}Gem'),
+        pytest.param('${Name}', [('${Name}', 'A'), ('${Name}', 'B')], 'A')
+    ]
+)
+def test_transform_applies_replacements_in_order(source_contents, replacements, expected_contents):
+    assert engine_template._transform(source_contents, replacements, True) == expected_contents
+
+
+def test_transform_replaces_random_uuid_after_replacements():
+    replacements = [('${ModuleClassId}', '${Random_Uuid}')]
+    transformed_contents = engine_template._transform('${ModuleClassId} ${Random_Uuid}', replacements, True)
+    first_uuid, second_uuid = transformed_contents.split(' ')
+    assert uuid.UUID(first_uuid) != uuid.UUID(second_uuid)
+
+
 @pytest.mark.parametrize(
     "concrete_contents,"
     " templated_contents_with_license, templated_contents_without_license,"
@@ -104,4 +104,47 @@ class TestGetTemplatesForCreation:
                       side_effect=validate_project_json) as validate_project_json, \
                 patch('o3de.validation.valid_o3de_gem_json', side_effect=validate_gem_json) as validate_gem_json:
             templates = manifest.get_templates_for_gem_creation()
-            assert templates == expected_template_paths
\ No newline at end of file
+            assert templates == expected_template_paths
+
+class TestLoadJsonFileCached:
+    def test_cached_data_is_reused_until_file_changes(self, tmp_path):
+        json_path = tmp_path / 'o3de_manifest.json'
+        json_path.write_text(json.dumps({'engines': []}))
+        manifest.invalidate_json_file_cache()
+
+        with patch('json.load', side_effect=json.load) as json_load_patch:
+            first_data = manifest.load_o3de_manifest(json_path)
+            second_data = manifest.load_o3de_manifest(json_path)
+            assert json_load_patch.call_count == 1
+        assert first_data == second_data == {'engines': []}
+
+        # Modifying the returned data must not modify the cached data
+        first_data['engines'].append('D:/o3de/o3de')
+        assert manifest.load_o3de_manifest(json_path) == {'engines': []}
+
+        # A file change with a different size invalidates the cache entry
+        json_path.write_text(json.dumps({'engines': [], 'projects': []}))
+        assert manifest.load_o3de_manifest(json_path) == {'engines': [], 'projects': []}
+
+    def test_save_invalidates_cached_data(self, tmp_path):
+        json_path = tmp_path / 'o3de_manifest.json'
+        json_path.write_text(json.dumps({'engines': []}))
+        manifest.invalidate_json_file_cache()
+
+        assert manifest.load_o3de_manifest(json_path) == {'engines': []}
+        assert manifest.save_o3de_manifest({'engines': ['D:/o3de/o3de']}, json_path)
+        assert manifest.load_o3de_manifest(json_path) == {'engines': ['D:/o3de/o3de']}
+
+    def test_cache_is_keyed_on_the_resolved_path(self, tmp_path):
+        json_path = tmp_path / 'o3de_manifest.json'
+        json_path.write_text(json.dumps({'engines': []}))
+        (tmp_path / 'subfolder').mkdir()
+        manifest.invalidate_json_file_cache()
+
+        with patch('json.load', side_effect=json.load) as json_load_patch:
+            assert manifest.load_o3de_manifest(json_path) == {'engines': []}
+            assert manifest.load_o3de_manifest(tmp_path / 'subfolder' / '..' / 'o3de_manifest.json') == {'engines': []}
+            assert json_load_patch.call_count == 1
+
+        manifest.invalidate_json_file_cache(tmp_path / 'subfolder' / '..' / 'o3de_manifest.json')
+        assert not manifest._json_file_cache
@@ -111,3 +111,79 @@ class TestRegisterThisEngine:
             result = register._run_register(args)
             assert result == expected_result
 
+
+class TestRegisterBatch:
+    def test_register_batch_saves_manifest_once(self):
+        manifest_json = {'external_subdirectories': [], 'templates': []}
+        gem_paths = [pathlib.PurePath(f'D:/o3de/Gems/Gem{index}') for index in range(5)]
+        registrations = [{'gem_path': gem_path} for gem_path in gem_paths]
+        registrations.append({'template_path': pathlib.PurePath('D:/o3de/Templates/DefaultGem')})
+
+        with patch('o3de.manifest.load_o3de_manifest', return_value=manifest_json) as load_manifest_mock, \
+                patch('o3de.manifest.save_o3de_manifest', return_value=True) as save_manifest_mock, \
+                patch('o3de.validation.valid_o3de_gem_json', return_value=True) as valid_gem_mock, \
+                patch('o3de.validation.valid_o3de_template_json', return_value=True) as valid_template_mock, \
+                patch('pathlib.Path.is_dir', return_value=True) as pathlib_is_dir_mock:
+            result = register.register_batch(registrations)
+            assert result == 0
+            assert load_manifest_mock.call_count == 1
+            assert save_manifest_mock.call_count == 1
+
+        assert len(manifest_json['external_subdirectories']) == len(gem_paths)
+        assert len(manifest_json['templates']) == 1
+
+    def test_register_batch_skips_invalid_objects(self):
+        manifest_json = {'external_subdirectories': []}
+        valid_gem_path = pathlib.PurePath('D:/o3de/Gems/ValidGem')
+        invalid_gem_path = pathlib.PurePath('D:/o3de/Gems/InvalidGem')
+
+        def validate_gem_json(gem_json_path) -> bool:
+            return pathlib.Path(gem_json_path).parent.name == valid_gem_path.name
+
+        with patch('o3de.manifest.load_o3de_manifest', return_value=manifest_json) as load_manifest_mock, \
+                patch('o3de.manifest.save_o3de_manifest', return_value=True) as save_manifest_mock, \
+                patch('o3de.validation.valid_o3de_gem_json', side_effect=validate_gem_json) as valid_gem_mock, \
+                patch('pathlib.Path.is_dir', return_value=True) as pathlib_is_dir_mock:
+            result = register.register_batch([{'gem_path': valid_gem_path}, {'gem_path': invalid_gem_path}])
+            assert result == 1
+            assert save_manifest_mock.call_count == 1
+
+        assert len(manifest_json['external_subdirectories']) == 1
+        assert pathlib.Path(manifest_json['external_subdirectories'][0]).name == valid_gem_path.name
+
+    def test_register_batch_rolls_back_failed_registration(self):
+        manifest_json = {'engines': [], 'engines_path': {}}
+        engine_paths = [pathlib.PurePath('D:/o3de/o3de'), pathlib.PurePath('D:/o3de/engine-path')]
+
+        # The second engine has the name of the first one, it is inserted in 'engines' before that fails to register
+        with patch('o3de.manifest.load_o3de_manifest', return_value=manifest_json) as load_manifest_mock, \
+                patch('o3de.manifest.save_o3de_manifest', return_value=True) as save_manifest_mock, \
+                patch('o3de.manifest.get_engine_json_data', return_value={'engine_name': 'o3de'}) as engine_json_mock, \
+                patch('o3de.validation.valid_o3de_engine_json', return_value=True) as valid_engine_mock, \
+                patch('pathlib.Path.is_dir', return_value=True) as pathlib_is_dir_mock:
+            result = register.register_batch([{'engine_path': engine_path} for engine_path in engine_paths])
+            assert result == 1
+            assert save_manifest_mock.call_count == 1
+            # each engine json is validated once, before the registrations
+            assert valid_engine_mock.call_count == len(engine_paths)
+
+        first_engine_path = pathlib.Path(engine_paths[0]).resolve().as_posix()
+        assert manifest_json['engines'] == [{'path': first_engine_path}]
+        assert manifest_json['engines_path'] == {'o3de': first_engine_path}
+
+    def test_register_batch_rollback_only_restores_modified_keys(self):
+        external_subdirectories = ['D:/o3de/Gems/Gem0']
+        manifest_json = {'external_subdirectories': external_subdirectories}
+
+        # The engine json has no engine name, the engine is inserted in 'engines' before that fails to register
+        with patch('o3de.manifest.load_o3de_manifest', return_value=manifest_json) as load_manifest_mock, \
+                patch('o3de.manifest.save_o3de_manifest', return_value=True) as save_manifest_mock, \
+                patch('o3de.manifest.get_engine_json_data', return_value={'restricted_name': 'o3de'}) as engine_json_mock, \
+                patch('o3de.validation.valid_o3de_engine_json', return_value=True) as valid_engine_mock, \
+                patch('pathlib.Path.is_dir', return_value=True) as pathlib_is_dir_mock:
+            result = register.register_batch([{'engine_path': pathlib.PurePath('D:/o3de/o3de')}])
+            assert result == 1
+            assert save_manifest_mock.call_count == 0
+
+        assert manifest_json == {'external_subdirectories': ['D:/o3de/Gems/Gem0']}
+        assert manifest_json['external_subdirectories'] is external_subdirectories
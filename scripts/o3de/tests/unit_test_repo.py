@@ -0,0 +1,141 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import functools
+import http.server
+import json
+import os
+import pytest
+import pathlib
+import threading
+
+from o3de import manifest, repo
+
+
+class RecordingRequestHandler(http.server.SimpleHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_response(self, code, message=None):
+        RecordingRequestHandler.requests.append((self.path, code))
+        super().send_response(code, message)
+
+
+@pytest.fixture
+def repo_server(tmp_path):
+    served_folder = tmp_path / 'served'
+    served_folder.mkdir()
+    handler = functools.partial(RecordingRequestHandler, directory=str(served_folder))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    RecordingRequestHandler.requests = []
+    yield served_folder, f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def o3de_home(tmp_path):
+    old_home_folder = manifest.override_home_folder
+    manifest.override_home_folder = tmp_path / 'home'
+    yield manifest.override_home_folder
+    manifest.override_home_folder = old_home_folder
+
+
+def _write_json(json_path: pathlib.Path, json_data: dict) -> None:
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    json_path.write_text(json.dumps(json_data))
+
+
+class TestRefreshRepos:
+    def test_refresh_repos_indexes_nested_repo_objects(self, repo_server, o3de_home):
+        served_folder, server_url = repo_server
+        _write_json(served_folder / 'main' / 'repo.json', {
+            'repo_name': 'main', 'origin': 'test', 'gems': [f'{server_url}/gems/GemA'],
+            'repos': [f'{server_url}/nested']})
+        _write_json(served_folder / 'nested' / 'repo.json', {
+            'repo_name': 'nested', 'origin': 'test', 'gems': [f'{server_url}/gems/GemB'],
+            'repos': [f'{server_url}/main']})
+        _write_json(served_folder / 'gems' / 'GemA' / 'gem.json', {'gem_name': 'GemA', 'origin': 'a'})
+        _write_json(served_folder / 'gems' / 'GemB' / 'gem.json', {'gem_name': 'GemB', 'origin': 'b'})
+
+        assert repo.refresh_repos([f'{server_url}/main']) == 0
+        assert repo.search_repo(gem_name='GemA') == {'gem_name': 'GemA', 'origin': 'a'}
+        assert repo.search_repo(gem_name='GemB') == {'gem_name': 'GemB', 'origin': 'b'}
+        assert repo.search_repo(gem_name='GemC') is None
+
+        # A second refresh revalidates every file instead of downloading it again
+        RecordingRequestHandler.requests = []
+        assert repo.refresh_repos([f'{server_url}/main']) == 0
+        assert len(RecordingRequestHandler.requests) == 4
+        assert all(code == 304 for path, code in RecordingRequestHandler.requests)
+        assert repo.search_repo(gem_name='GemB') == {'gem_name': 'GemB', 'origin': 'b'}
+
+    def test_refresh_repos_removes_objects_no_longer_advertised(self, repo_server, o3de_home):
+        served_folder, server_url = repo_server
+        _write_json(served_folder / 'main' / 'repo.json', {
+            'repo_name': 'main', 'origin': 'test', 'gems': [f'{server_url}/gems/GemA']})
+        _write_json(served_folder / 'gems' / 'GemA' / 'gem.json', {'gem_name': 'GemA'})
+
+        assert repo.refresh_repos([f'{server_url}/main']) == 0
+        gem_cache_file = repo.get_cache_file(f'{server_url}/gems/GemA/gem.json')
+        assert gem_cache_file.is_file()
+
+        _write_json(served_folder / 'main' / 'repo.json', {'repo_name': 'main', 'origin': 'test', 'gems': []})
+        # Last-Modified has a resolution of one second, move the modification time forward so the change is visible
+        repo_json_mtime = (served_folder / 'main' / 'repo.json').stat().st_mtime + 10
+        os.utime(served_folder / 'main' / 'repo.json', (repo_json_mtime, repo_json_mtime))
+        assert repo.refresh_repos([f'{server_url}/main']) == 0
+        assert repo.search_repo(gem_name='GemA') is None
+        assert not gem_cache_file.is_file()
+
+    def test_refresh_repos_reports_missing_repo(self, repo_server, o3de_home):
+        served_folder, server_url = repo_server
+        assert repo.refresh_repos([f'{server_url}/missing']) == 1
+
+    def test_refresh_repos_keeps_last_good_data_on_failure(self, repo_server, o3de_home):
+        served_folder, server_url = repo_server
+        _write_json(served_folder / 'main' / 'repo.json', {
+            'repo_name': 'main', 'origin': 'test', 'gems': [f'{server_url}/gems/GemA']})
+        _write_json(served_folder / 'gems' / 'GemA' / 'gem.json', {'gem_name': 'GemA'})
+        assert repo.refresh_repos([f'{server_url}/main']) == 0
+
+        (served_folder / 'gems' / 'GemA' / 'gem.json').unlink()
+        assert repo.refresh_repos([f'{server_url}/main']) == 1
+        assert repo.search_repo(gem_name='GemA') == {'gem_name': 'GemA'}
+        assert repo.get_cache_file(f'{server_url}/gems/GemA/gem.json').is_file()
+
+    def test_refresh_repos_merge_only_downloads_added_repo(self, repo_server, o3de_home):
+        served_folder, server_url = repo_server
+        _write_json(served_folder / 'main' / 'repo.json', {
+            'repo_name': 'main', 'origin': 'test', 'gems': [f'{server_url}/gems/GemA']})
+        _write_json(served_folder / 'added' / 'repo.json', {
+            'repo_name': 'added', 'origin': 'test', 'gems': [f'{server_url}/gems/GemB']})
+        _write_json(served_folder / 'gems' / 'GemA' / 'gem.json', {'gem_name': 'GemA'})
+        _write_json(served_folder / 'gems' / 'GemB' / 'gem.json', {'gem_name': 'GemB'})
+        assert repo.refresh_repos([f'{server_url}/main']) == 0
+
+        RecordingRequestHandler.requests = []
+        assert repo.refresh_repos([f'{server_url}/added'], merge=True) == 0
+        assert sorted(path for path, code in RecordingRequestHandler.requests) == ['/added/repo.json',
+                                                                                   '/gems/GemB/gem.json']
+        assert repo.search_repo(gem_name='GemA') == {'gem_name': 'GemA'}
+        assert repo.search_repo(gem_name='GemB') == {'gem_name': 'GemB'}
+
+    def test_refresh_repos_reports_cache_index_save_failure(self, repo_server, o3de_home, caplog):
+        served_folder, server_url = repo_server
+        _write_json(served_folder / 'main' / 'repo.json', {'repo_name': 'main', 'origin': 'test'})
+        # A folder in place of the cache index cannot be replaced by the saved file
+        repo.get_repo_cache_index_path().mkdir(parents=True)
+
+        assert repo.refresh_repos([f'{server_url}/main']) == 1
+        assert 'Repo cache index' in caplog.text
+        assert 'Manifest json' not in caplog.text
+        assert not list(repo.get_repo_cache_index_path().parent.glob('*.tmp'))
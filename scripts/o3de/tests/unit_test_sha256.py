@@ -0,0 +1,61 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import hashlib
+import json
+import pytest
+import pathlib
+
+from o3de import sha256
+
+
+@pytest.mark.parametrize("file_size, buffer_size, use_mmap", [
+    pytest.param(0, 16, True),
+    pytest.param(1000, 16, True),
+    pytest.param(1000, 16, False),
+    pytest.param(1000, 4096, True)
+])
+def test_sha256_file_matches_hashlib(tmp_path, file_size, buffer_size, use_mmap):
+    file_path = tmp_path / 'object.zip'
+    file_data = bytes(index % 251 for index in range(file_size))
+    file_path.write_bytes(file_data)
+
+    progress = []
+    digest = sha256.sha256_file(file_path, buffer_size,
+                                lambda hashed_size, total_size: progress.append((hashed_size, total_size)),
+                                use_mmap)
+    assert digest == hashlib.sha256(file_data).hexdigest()
+    if file_size:
+        assert progress[-1] == (file_size, file_size)
+
+
+def test_verify_detects_mismatched_objects(tmp_path):
+    valid_gem_zip = tmp_path / 'GemA' / 'gem.zip'
+    valid_gem_zip.parent.mkdir()
+    valid_gem_zip.write_bytes(b'GemA')
+    (tmp_path / 'GemA' / 'gem.json').write_text(json.dumps({'gem_name': 'GemA',
+                                                            'sha256': hashlib.sha256(b'GemA').hexdigest()}))
+    assert sha256.verify(tmp_path) == 0
+
+    invalid_gem_zip = tmp_path / 'GemB' / 'gem.zip'
+    invalid_gem_zip.parent.mkdir()
+    invalid_gem_zip.write_bytes(b'GemB')
+    (tmp_path / 'GemB' / 'gem.json').write_text(json.dumps({'gem_name': 'GemB',
+                                                            'sha256': hashlib.sha256(b'GemA').hexdigest()}))
+    assert sha256.verify(tmp_path) == 1
+
+
+def test_verify_skips_files_which_are_not_json(tmp_path):
+    gem_zip = tmp_path / 'GemA' / 'gem.zip'
+    gem_zip.parent.mkdir()
+    gem_zip.write_bytes(b'GemA')
+    (tmp_path / 'GemA' / 'gem.json').write_text(json.dumps({'gem_name': 'GemA', 'summary': 'Gém',
+                                                            'sha256': hashlib.sha256(b'GemA').hexdigest()}),
+                                                encoding='utf-8')
+    (tmp_path / 'GemA' / 'invalid.json').write_text('{')
+    (tmp_path / 'GemA' / 'binary.json').write_bytes(b'\xff\xfe\x00')
+    assert sha256.verify(tmp_path) == 0
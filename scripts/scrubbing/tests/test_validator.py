@@ -0,0 +1,140 @@
+#
+# Copyright (c) Contributors to the Open 3D Engine Project. For complete copyright and license terms please see the LICENSE at the root of this distribution.
+#
+# SPDX-License-Identifier: Apache-2.0 OR MIT
+#
+#
+
+import os
+import re
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import validator
+
+PREFILTER = ['secret']
+# Unbounded, so that a match can end far from the prefilter match
+BAD_PATTERN = r'secret\w*.*leak'
+
+
+def scan_text(text, encoding='utf8'):
+    return validator.FileScanner(PREFILTER, BAD_PATTERN).scan_data(text.encode(encoding))
+
+
+def expected_candidates(text):
+    """Candidates of the whole line checks, for lines short enough to be checked as a whole"""
+    bad_pattern = re.compile(BAD_PATTERN)
+    return [(line_number, line) for line_number, line in enumerate(text.split('\n'), 1)
+            if 'secret' in line.lower() and bad_pattern.search(line)]
+
+
+class TestFileScanner:
+    @pytest.mark.parametrize('encoding', ['utf8', 'utf-16-le'])
+    def test_scan_finds_lines_with_bad_patterns(self, encoding):
+        text = 'clean\nsecret_key leak\nSECRET without match\nsecret then leak\r\nleak only\n'
+
+        assert scan_text(text, encoding) == expected_candidates(text.replace('\r', ''))
+
+    @pytest.mark.parametrize('encoding', ['utf8', 'utf-16-le'])
+    def test_scan_long_line_checks_whole_line(self, encoding):
+        # the bad pattern ends far past the prefilter match
+        long_line = 'x' * 20 + 'secret ' + 'y' * (validator.MAX_LINE_LENGTH // 2) + ' leak ' + 'z' * validator.MAX_LINE_LENGTH
+        candidates = scan_text('first line\n' + long_line + '\n', encoding)
+
+        assert len(candidates) == 1
+        assert candidates[0][0] == 2
+        assert 'leak' in candidates[0][1]
+
+    def test_scan_long_line_finds_match_across_chunks_once(self):
+        chunk_size = validator.MAX_LINE_LENGTH
+        # the match starts a few characters before the end of the first chunk, and the prefilter is in another chunk
+        long_line = 'x' * (chunk_size - 3) + 'secret_leak' + 'y' * chunk_size + 'secret' + 'z' * chunk_size
+        candidates = scan_text(long_line)
+
+        assert len(candidates) == 1
+        assert candidates[0][1].startswith('x' * (chunk_size - 3) + 'secret_leak')
+
+    def test_scan_long_line_without_bad_pattern_has_no_candidates(self):
+        long_line = 'secret ' + 'x' * (3 * validator.MAX_LINE_LENGTH) + ' secret'
+
+        assert scan_text(long_line + '\nleak\n') == []
+
+    def test_scan_buffer_over_prefilter_windows(self, monkeypatch):
+        monkeypatch.setattr(validator, 'PREFILTER_WINDOW_SIZE', 64)
+        text = ''.join('line {} {}\n'.format(index, 'secret leak' if index % 7 == 0 else 'clean')
+                       for index in range(100))
+
+        assert scan_text(text) == expected_candidates(text)
+
+
+class TestScanCache:
+    def make_validator(self, cache_file):
+        scrubbing_validator = validator.Validator(types.SimpleNamespace(cache_file=cache_file, jobs=1), [])
+        scrubbing_validator.prefilter = PREFILTER
+        scrubbing_validator.compiled_bad_pattern = re.compile(BAD_PATTERN)
+        scrubbing_validator.patterns_digest = 'digest'
+        scrubbing_validator.load_scan_cache()
+        return scrubbing_validator
+
+    def scan(self, cache_file, filepaths, monkeypatch):
+        """Returns the scan results of the files, and the files which were read"""
+        read_files = []
+        scan = validator.FileScanner.scan
+
+        def recording_scan(scanner, filepath):
+            read_files.append(os.path.basename(filepath))
+            return scan(scanner, filepath)
+        monkeypatch.setattr(validator.FileScanner, 'scan', recording_scan)
+        scrubbing_validator = self.make_validator(cache_file)
+        results = [(os.path.basename(filepath), skipped, [list(candidate) for candidate in candidates])
+                   for filepath, skipped, candidates in scrubbing_validator.scan_files(filepaths)]
+        scrubbing_validator.save_scan_cache(filepaths)
+        return results, read_files
+
+    def test_unchanged_files_are_not_read_again(self, tmp_path, monkeypatch):
+        cache_file = str(tmp_path / 'cache.json')
+        filepaths = []
+        for name, text in [('a.txt', 'secret leak\n'), ('b.txt', 'clean\n'), ('c.txt', 'x\nsecret and leak\n')]:
+            (tmp_path / name).write_text(text)
+            filepaths.append(str(tmp_path / name))
+
+        first_results, read_files = self.scan(cache_file, filepaths, monkeypatch)
+        assert read_files == ['a.txt', 'b.txt', 'c.txt']
+        assert first_results == [('a.txt', False, [[1, 'secret leak']]), ('b.txt', False, []),
+                                 ('c.txt', False, [[2, 'secret and leak']])]
+
+        cached_results, read_files = self.scan(cache_file, filepaths, monkeypatch)
+        assert read_files == []
+        assert cached_results == first_results
+
+    def test_changed_files_are_scanned_again(self, tmp_path, monkeypatch):
+        cache_file = str(tmp_path / 'cache.json')
+        changed_file = tmp_path / 'changed.txt'
+        touched_file = tmp_path / 'touched.txt'
+        changed_file.write_text('clean\n')
+        touched_file.write_text('secret leak\n')
+        filepaths = [str(changed_file), str(touched_file)]
+        self.scan(cache_file, filepaths, monkeypatch)
+
+        changed_file.write_text('secret leak again\n')
+        touched_stat = touched_file.stat()
+        os.utime(touched_file, ns=(touched_stat.st_atime_ns, touched_stat.st_mtime_ns + 10 ** 9))
+        results, read_files = self.scan(cache_file, filepaths, monkeypatch)
+
+        # the touched file is read again, its candidates come from the cache of its unchanged content
+        assert read_files == ['changed.txt', 'touched.txt']
+        assert results == [('changed.txt', False, [[1, 'secret leak again']]),
+                           ('touched.txt', False, [[1, 'secret leak']])]
+
+    def test_cache_of_other_patterns_is_not_used(self, tmp_path, monkeypatch):
+        cache_file = str(tmp_path / 'cache.json')
+        (tmp_path / 'a.txt').write_text('secret leak\n')
+        self.scan(cache_file, [str(tmp_path / 'a.txt')], monkeypatch)
+
+        scrubbing_validator = self.make_validator(cache_file)
+        scrubbing_validator.patterns_digest = 'other digest'
+        scrubbing_validator.load_scan_cache()
+        assert scrubbing_validator.scan_cache == {'files': {}, 'results': {}}
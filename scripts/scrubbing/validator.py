@@ -14,7 +14,11 @@ references or code that should not be published. Can be used to scan any directo
 from __future__ import absolute_import
 from __future__ import print_function
 import six
+import codecs
+import concurrent.futures
+import hashlib
 import logging
+import mmap
 import os
 import re
 import sys
@@ -31,6 +35,177 @@ import validator_data_LEGAL_REVIEW_REQUIRED # pull in the data we need to config
 sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'build', 'package'))
 from glob_to_regex import generate_include_exclude_regexes
 
+# Size of the head of a file used to sniff its encoding
+ENCODING_SNIFF_SIZE = 64 * 1024
+# Files at least this large are memory mapped rather than read
+MMAP_MIN_SIZE = 1024 * 1024
+# Size of the windows of the files lowercased to search for the prefilter strings
+PREFILTER_WINDOW_SIZE = 1024 * 1024
+# Lines longer than this are validated in chunks of this length rather than as a whole
+MAX_LINE_LENGTH = 10000
+# Characters the chunks of a long line extend into the next chunk, longer than any bad pattern match
+WINDOW_OVERLAP = 1024
+# Below this number of files, scanning in worker processes costs more than it saves
+MIN_FILES_FOR_PARALLEL_SCAN = 64
+SCAN_CHUNK_SIZE = 16
+SCAN_CACHE_VERSION = 1
+
+BOM_ENCODINGS = [(codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')]
+
+
+def sniff_encoding(head):
+    """Guess the encoding of a file from its first bytes. The repo is a mix of UTF-8, UTF-16, and latin-1.
+    Returns the encoding and the length of its byte order mark."""
+    for bom, encoding in BOM_ENCODINGS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    # UTF-16 text without a byte order mark has a NUL byte next to most ASCII characters
+    if len(head) >= 2 and head.count(b'\0') * 4 >= len(head):
+        if head[1::2].count(b'\0') >= head[0::2].count(b'\0'):
+            return 'utf-16-le', 0
+        return 'utf-16-be', 0
+    try:
+        head.decode('utf8')
+    except UnicodeDecodeError as err:
+        # A multibyte character cut at the end of the head is still UTF-8
+        if err.start < len(head) - 3 or len(head) < ENCODING_SNIFF_SIZE:
+            return 'latin-1', 0
+    return 'utf8', 0
+
+
+def count_newlines(buffer, newline, start, end):
+    """Count the newlines in buffer[start:end] without copying large parts of memory mapped files"""
+    if not isinstance(buffer, mmap.mmap):
+        return buffer.count(newline, start, end)
+    count = 0
+    for chunk_start in range(start, end, MMAP_MIN_SIZE):
+        count += buffer[chunk_start:min(end, chunk_start + MMAP_MIN_SIZE)].count(newline)
+    return count
+
+
+class FileScanner(object):
+    """Finds the lines of files that contain both a prefilter string and a bad pattern, which are the lines
+    Validator.validate_line has to check against the acceptable use patterns. Only the lines with prefilter matches
+    are decoded.
+    Pickled to the worker processes, so it only holds the patterns and the digests of the already scanned contents."""
+
+    def __init__(self, prefilter, bad_pattern, known_digests=()):
+        self.prefilter = prefilter
+        self.bad_pattern = bad_pattern
+        self.known_digests = frozenset(known_digests)
+        self.compiled_bad_pattern = re.compile(bad_pattern)
+        # The prefilter strings are searched for in lowercased text, like Validator.validate_line does. Searching bytes
+        # only applies to ASCII compatible encodings, and lowercasing bytes only lowers ASCII letters.
+        self.bytes_prefilter = None
+        if all(p.isascii() for p in prefilter):
+            self.bytes_prefilter = [p.encode('ascii') for p in prefilter]
+
+    def scan(self, filepath):
+        """Returns (size, mtime_ns, skipped, digest, candidates) for the file, where candidates is a list of
+        (line number, text) pairs, or None if the digest is one of the known digests."""
+        stat = os.stat(filepath)
+        if validator_data_LEGAL_REVIEW_REQUIRED.skip_file(filepath):
+            return stat.st_size, stat.st_mtime_ns, True, None, []
+        with open(filepath, 'rb') as f:
+            if stat.st_size >= MMAP_MIN_SIZE:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = f.read()
+        try:
+            digest = hashlib.sha1(data).hexdigest()
+            if digest in self.known_digests:
+                return stat.st_size, stat.st_mtime_ns, False, digest, None
+            return stat.st_size, stat.st_mtime_ns, False, digest, self.scan_data(data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def scan_data(self, data):
+        """Returns the candidate (line number, text) pairs of the file content"""
+        encoding, bom_length = sniff_encoding(data[:ENCODING_SNIFF_SIZE])
+        if encoding in ('utf8', 'latin-1') and self.bytes_prefilter:
+            decode = lambda text: bytes(text).decode(encoding, errors='replace')
+            spans = self.prefilter_spans(data, bom_length, self.bytes_prefilter)
+            return self.scan_buffer(data, bom_length, b'\n', spans, decode)
+        text = bytes(data[bom_length:]).decode(encoding, errors='replace')
+        if len(text.lower()) == len(text):
+            spans = self.prefilter_spans(text, 0, self.prefilter)
+        else:
+            # Lowercasing changes the length of some characters, fall back to a slower case insensitive search
+            prefilter_pattern = re.compile('|'.join(re.escape(p) for p in self.prefilter), re.IGNORECASE)
+            spans = (match.span() for match in prefilter_pattern.finditer(text))
+        return self.scan_buffer(text, 0, '\n', spans, lambda text: text)
+
+    def prefilter_spans(self, buffer, start, prefilter):
+        """Yields the sorted (start, end) positions of the prefilter strings in the lowercased buffer. The buffer is
+        lowercased in windows overlapping by the length of the longest prefilter string so that no match is lost."""
+        overlap = max(len(p) for p in prefilter) - 1
+        for window_start in range(start, len(buffer), PREFILTER_WINDOW_SIZE):
+            window = buffer[window_start:window_start + PREFILTER_WINDOW_SIZE + overlap].lower()
+            spans = []
+            for p in prefilter:
+                position = window.find(p)
+                # Matches starting in the overlap are found by the next window
+                while position != -1 and position < PREFILTER_WINDOW_SIZE:
+                    spans.append((window_start + position, window_start + position + len(p)))
+                    position = window.find(p, position + 1)
+            yield from sorted(spans)
+
+    def scan_buffer(self, buffer, start, newline, prefilter_spans, decode):
+        """Checks the lines containing a prefilter match against the bad pattern. The bad pattern may match anywhere
+        in these lines, so they are checked in full."""
+        candidates = []
+        line_end = -1
+        line_number = 1
+        counted_to = start
+        for match_start, _ in prefilter_spans:
+            if match_start <= line_end:
+                # The line was already checked
+                continue
+            line_start = max(start, buffer.rfind(newline, start, match_start) + 1)
+            line_end = buffer.find(newline, match_start)
+            if line_end == -1:
+                line_end = len(buffer)
+            line_number += count_newlines(buffer, newline, counted_to, line_start)
+            counted_to = line_start
+            if line_end - line_start <= MAX_LINE_LENGTH:
+                self.check_text(decode(buffer[line_start:line_end]), line_number, candidates)
+            else:
+                self.check_long_line(buffer, line_start, line_end, line_number, decode, candidates)
+        return candidates
+
+    def check_long_line(self, buffer, line_start, line_end, line_number, decode, candidates):
+        """Checks a long line in chunks of MAX_LINE_LENGTH, each extended by WINDOW_OVERLAP so that bad patterns
+        crossing chunk boundaries are found. Matches starting in the extension are left to the next chunk."""
+        for chunk_start in range(line_start, line_end, MAX_LINE_LENGTH):
+            chunk_end = min(line_end, chunk_start + MAX_LINE_LENGTH)
+            chunk = decode(buffer[chunk_start:chunk_end])
+            text = (chunk + decode(buffer[chunk_end:min(line_end, chunk_end + WINDOW_OVERLAP)])).rstrip('\r\n')
+            match = self.compiled_bad_pattern.search(text)
+            if match is not None and match.start() < len(chunk):
+                candidates.append((line_number, text))
+
+    def check_text(self, text, line_number, candidates):
+        text = text.rstrip('\r\n')
+        if self.compiled_bad_pattern.search(text) != None:
+            candidates.append((line_number, text))
+
+
+_worker_scanner = None
+
+
+def _init_scan_worker(scanner):
+    global _worker_scanner
+    _worker_scanner = scanner
+
+
+def _scan_file(filepath):
+    try:
+        return _worker_scanner.scan(filepath)
+    except OSError as err:
+        return err
+
+
 class Validator(object):
     """Class to contain the validator program"""
     # Set of all acceptable_use patterns actually used during the run
@@ -145,65 +320,130 @@ class Validator(object):
             # Just print the filepath if we have not already printed it
             print(filepath)
 
-    def validate_file(self, filepath):
-        """Validate the content of a file 'filepath'.
+    def validate_filename(self, filepath):
+        """Check the filename itself to make sure no naughty bits are there.
         Return 0 if no issues are found, and 1 if an issue was noted."""
-        failed = 0
-
-        # Otherwise read the file off disk.  Check the filename itself to make sure no naughty
-        # bits are there.
         errors = []
         info = []
-        failed = self.validate_line(filepath, 'filename', 0, failed, errors, info)
+        failed = self.validate_line(filepath, 'filename', 0, 0, errors, info)
         for e in errors:
             logging.error(e)
         for i in info:
             logging.info(i)
+        return failed
+
+    def validate_candidates(self, filepath, candidates, failed):
+        """Validate the lines of a file found by the FileScanner against the acceptable use patterns.
+        Return 0 if no issues are found, and 1 if an issue was noted."""
+        for fileline, line in candidates:
+            errors = []
+            info = []
+            failed = self.validate_line(line, filepath, fileline, failed, errors, info)
+            for e in errors:
+                logging.error(e)
+            for i in info:
+                logging.info(i)
+        return failed
+
+    def validate_file(self, filepath):
+        """Validate the content of a file 'filepath'.
+        Return 0 if no issues are found, and 1 if an issue was noted."""
+        failed = self.validate_filename(filepath)
 
         # Check if this file is a binary file, or an extension we always skip
         # These extensions are here because they sometimes look like text files,
         # but are not really text files in practice.
-        if validator_data_LEGAL_REVIEW_REQUIRED.skip_file(filepath):
+        _, _, skipped, _, candidates = self.scanner.scan(filepath)
+        if skipped:
             logging.debug('Skipping %s', filepath)
             return
+        logging.debug('Validating %s', filepath)
+        return self.validate_candidates(filepath, candidates, failed)
 
-        # Python3 requires specific encoding but the repo is a mix of UTF-8, UTF-16, and latin-1
-        # Just try except the possibilities until it works
-        encodings = ["utf8", "utf-16-le", "utf-16-be", "latin-1"]
-        for encoding_format in encodings:
-            try:
-                with open(filepath, encoding=encoding_format) as f:
-                    logging.debug('Validating %s', filepath)
-
-                    # Take care to deal with files that have unreasonably large lines.
-                    # if we don't do this, then the validator can segfault as it tries
-                    # to read a line that is insanely large. A try/except will not prevent this.
-                    # This can happen, for example, in XML file or obj files (the 3d format, not
-                    # the compiler output kind).
-                    # Quesion: if we encounter such a file, should we call it "binary" and quit?
-                    # TODO: There is a small "leak" here, in that we don't deal with crossing
-                    # a non line boundary clealy. In particular, a validation pattern
-                    # that occurs in the boundary crossing will not be properly searched.
-                    # The easiest thing to do is probably to retain the prior 128 bytes or
-                    # so from the prior portion of the line as a prefix to the tail of the rest of the line.
-                    # This will make the logic below much more complex.
-                    fileline = 0
-                    line = f.readline(10000)
-                    while line != '':
-                        fileline += 1
-                        errors = []
-                        info = []
-                        failed = self.validate_line(line, filepath, fileline, failed, errors, info)
-                        for e in errors:
-                            logging.error(e)
-                        for i in info:
-                            logging.info(i)
-                        line = f.readline(10000)
-                return failed
-            except UnicodeDecodeError:
-                continue
+    def load_scan_cache(self):
+        """Load the results of the previous scans with the current patterns from the cache file, if any"""
+        self.scan_cache = {'files': {}, 'results': {}}
+        if not self.options_value('cache_file'):
+            return
+        try:
+            with open(self.options.cache_file, 'r') as cache_file:
+                cache = json.load(cache_file)
+            if cache.get('version') == SCAN_CACHE_VERSION and self.patterns_digest in cache.get('patterns', {}):
+                self.scan_cache = cache['patterns'][self.patterns_digest]
+        except (OSError, ValueError, AttributeError):
+            logging.debug('Could not load scan cache %s', self.options.cache_file)
+
+    def save_scan_cache(self, scanned_files):
+        """Save the results of the scan of the files to the cache file, dropping the files not scanned anymore"""
+        if not self.options_value('cache_file'):
+            return
+        cache = {'version': SCAN_CACHE_VERSION, 'patterns': {}}
+        try:
+            with open(self.options.cache_file, 'r') as cache_file:
+                previous_cache = json.load(cache_file)
+            if previous_cache.get('version') == SCAN_CACHE_VERSION:
+                cache['patterns'] = previous_cache['patterns']
+        except (OSError, ValueError, AttributeError, KeyError):
+            pass
+        files = {filepath: self.scan_cache['files'][filepath] for filepath in scanned_files if filepath in self.scan_cache['files']}
+        digests = set(entry[2] for entry in files.values())
+        results = {digest: candidates for digest, candidates in self.scan_cache['results'].items() if digest in digests}
+        cache['patterns'][self.patterns_digest] = {'files': files, 'results': results}
+        temp_cache_file = self.options.cache_file + '.tmp'
+        with open(temp_cache_file, 'w') as cache_file:
+            json.dump(cache, cache_file)
+        os.replace(temp_cache_file, self.options.cache_file)
+
+    def scan_files(self, filepaths):
+        """Scan the files for candidate lines, on a process pool for large sets of files, skipping the files whose
+        content was already scanned. Yields (filepath, skipped, candidates) in the order of filepaths."""
+        files = self.scan_cache['files']
+        results = self.scan_cache['results']
+        pending = []
+        for filepath in filepaths:
+            entry = files.get(filepath)
+            if entry:
+                try:
+                    stat = os.stat(filepath)
+                except OSError:
+                    stat = None
+                if stat and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns and (entry[2] is None or entry[2] in results):
+                    continue
+            pending.append(filepath)
+
+        scanner = FileScanner(self.prefilter, self.compiled_bad_pattern.pattern, results.keys())
+        max_workers = self.options_value('jobs') or os.cpu_count() or 1
+        scan_results = {}
+        if len(pending) >= MIN_FILES_FOR_PARALLEL_SCAN and max_workers > 1:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_init_scan_worker, initargs=(scanner,))
+            scan_results_iter = executor.map(_scan_file, pending, chunksize=SCAN_CHUNK_SIZE)
+        else:
+            executor = None
+            _init_scan_worker(scanner)
+            scan_results_iter = map(_scan_file, pending)
 
-        raise UnicodeError("Could not decode {0} due to an unexpected file encoding".format(filepath))
+        try:
+            # pending keeps the order of filepaths, so the results are matched to the files in order
+            pending_files = set(pending)
+            for filepath in filepaths:
+                entry = files.get(filepath)
+                result = next(scan_results_iter) if filepath in pending_files else None
+                if result is None:
+                    # unchanged since the last scan
+                    yield filepath, entry[2] is None, results.get(entry[2], [])
+                elif isinstance(result, OSError):
+                    logging.error('Unable to load file - check this manually: %s', filepath)
+                    files.pop(filepath, None)
+                    yield filepath, True, []
+                else:
+                    size, mtime_ns, skipped, digest, candidates = result
+                    files[filepath] = [size, mtime_ns, digest]
+                    if candidates is not None:
+                        results[digest] = [list(candidate) for candidate in candidates]
+                    yield filepath, skipped, results.get(digest, [])
+        finally:
+            if executor:
+                executor.shutdown()
 
     # Walk directory tree and find all file paths, and run the search for bad code on each file.
     # We explicitly skip "SDKs" directories, "BinTemp" and "Python" directories and various others.
@@ -222,6 +462,7 @@ class Validator(object):
         validations = 0
         bypassed_directories = validator_data_LEGAL_REVIEW_REQUIRED.get_bypassed_directories(self.options.all)
 
+        filepaths = []
         for dirname, dirnames, filenames in os.walk(os.path.normpath(root)):
             # First deal with the files in the current directory
             for filename in filenames:
@@ -231,18 +472,30 @@ class Validator(object):
                 allowed = include_match and not exclude_match
 
                 if self.options.all or allowed:
-                    scanned += 1
-                    file_failed = self.validate_file(os.path.normpath(filepath))
-                    if file_failed:
-                        platform_failed = file_failed
-                    else:
-                        validations += 1
+                    filepaths.append(os.path.normpath(filepath))
                 counter += 1
 
             # Trim out allowlisted subdirectories in the current directory if allowed
             for name in bypassed_directories:
                 if name in dirnames:
                     dirnames.remove(name)
+
+        # The contents are scanned in parallel, the acceptable use patterns are then checked here in the walk order
+        self.load_scan_cache()
+        for filepath, skipped, candidates in self.scan_files(filepaths):
+            scanned += 1
+            file_failed = self.validate_filename(filepath)
+            if skipped:
+                logging.debug('Skipping %s', filepath)
+                file_failed = None
+            else:
+                logging.debug('Validating %s', filepath)
+                file_failed = self.validate_candidates(filepath, candidates, file_failed)
+            if file_failed:
+                platform_failed = file_failed
+            else:
+                validations += 1
+        self.save_scan_cache(filepaths)
         if counter == 0 or scanned == 0:
             logging.error('No files scanned at target search directory: %s', root)
             platform_failed = 1
@@ -283,6 +536,9 @@ class Validator(object):
             acceptable_pattern = '|'.join([p for p,compiledp,fileset in self.acceptable_use_patterns])
             self.compiled_bad_pattern = re.compile(bad_pattern)
             self.compiled_acceptable_pattern = re.compile(acceptable_pattern)
+            self.scanner = FileScanner(self.prefilter, bad_pattern)
+            # Scan results are only reused while the patterns finding the candidate lines are unchanged
+            self.patterns_digest = hashlib.sha1(json.dumps([sorted(self.prefilter), bad_pattern]).encode('utf8')).hexdigest()
         except:
             logging.error('Could not compile patterns for validation. Check patterns in validator_data_LEGAL_REVIEW_REQUIRED.py for correctness.')
             traceback.print_exc()
@@ -375,6 +631,13 @@ class Validator(object):
         self.compiled_acceptable_pattern = None
         self.bad_patterns = None
         self.acceptable_use_patterns = None
+        self.scanner = None
+        self.patterns_digest = None
+        self.scan_cache = {'files': {}, 'results': {}}
+
+    def options_value(self, name):
+        """Options added after the validator was first written may be missing from options built by other scripts"""
+        return getattr(self.options, name, None)
 
 def parse_options():
     """Set up the options parser, and parse the options the user gave to validator."""
@@ -409,6 +672,13 @@ def parse_options():
                       dest='ignore_file_paths',
                       help='disable the filepath check for accepted_use patterns. Should only be when targeting a directory other than /dev/.')
 
+    parser.add_option('-j', '--jobs', action='store', type='int', default=None,
+                      dest='jobs',
+                      help='Number of processes scanning files. Defaults to the number of cores.')
+    parser.add_option('-c', '--cache-file', action='store', type='string', default='',
+                      dest='cache_file',
+                      help='Cache the scan results of each file in this file, so that unchanged files are not scanned again on the next runs.')
+
     (options, args) = parser.parse_args()
 
     if options.verbose == '1':